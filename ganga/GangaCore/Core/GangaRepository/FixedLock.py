@@ -9,6 +9,7 @@ from __future__ import print_function
 import functools
 import threading
 from collections import namedtuple
+from contextlib import contextmanager
 
 import os
 import time
@@ -149,6 +150,11 @@ class FixedLockManager(object):
         """Pretend to release IDs"""
         return list(ids)
 
+    @contextmanager
+    def batch(self):
+        """Nothing to batch as nothing is written on lock and release"""
+        yield
+
     def check(self):
         """ No need to check as we're disk/runtime consistent by construction. i.e. no parallel sessions """
         pass
@@ -1,182 +1,1169 @@
 from __future__ import absolute_import
-# Note: Following stuff must be considered in a GangaRepository:
+# This class (GangaRepositorySQLite) keeps all of the objects of a registry in a single SQLite database, <registry>.db,
+# next to the directories of the XML repositories.
 #
-# * lazy loading
-# * locking
+# Tables:
+#
+#   objects   one row per object: id, category, classname, the pickled index cache (idx) and the XML of the object
+#             without its subjobs (data). Every scalar value of the index cache is also kept in a column of its own,
+#             "idx:<key>", with an index on it so that objects can be found without reading any blobs, see select_ids
+#   subjobs   one row per subjob: (master, id), status, pickled index cache and XML
+#   sessions  one row per live Ganga session using the database with the time it was last known to be alive
+#   locks     one row per object locked for writing, naming the session holding the lock
+#   counters  the next free id and the number of changes made to the objects. Each object row records the change
+#             which last wrote it (modified) so that update_index only has to read the rows which changed
+#
+# * The database is in WAL mode so readers never block the writer or each other. Writes are done in BEGIN IMMEDIATE
+#   transactions which serialise the writers of all sessions.
+# * Locking: a session owns an object while it holds the row of the object in locks. Sessions refresh their heartbeat
+#   every DiskIOTimeout/3 seconds and the ones which haven't done so for DiskIOTimeout seconds are reaped together
+#   with their locks, as the session files of SessionLockManager are.
+# * XML repositories are converted with migrateXMLRegistry, see the end of this file.
 
-from .GangaRepository import GangaRepository, RepositoryError
 import os
-import os.path
-
+import re
+import time
+import errno
+import datetime
+import threading
 import sqlite3
+from contextlib import contextmanager
+from cStringIO import StringIO
 
 try:
     import cPickle as pickle
-except:
+except ImportError:
     import pickle
 
-import GangaCore.Utility.logging
-logger = GangaCore.Utility.logging.getLogger()
+from GangaCore.Core.GangaRepository.GangaRepository import GangaRepository
+from GangaCore.Core.exceptions import GangaException, RepositoryError, InaccessibleObjectError
+from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+from GangaCore.Core.GangaRepository.SubJobContainer import SubJobContainer, SubJobContainerError
+from GangaCore.Core.GangaRepository.VStreamer import to_file, from_file, XMLFileError, EmptyGangaObject
+from GangaCore.Core.GangaThread import GangaThread
+from GangaCore.GPIDev.Base.Objects import Node, nextDirtyGeneration
+from GangaCore.GPIDev.Base.Proxy import isType, stripProxy, getName
+from GangaCore.GPIDev.Schema.Schema import Schema, Version
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.Plugin import PluginManagerError
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+_SCHEMA = ["CREATE TABLE IF NOT EXISTS objects (id INTEGER PRIMARY KEY, category TEXT, classname TEXT, idx BLOB, "
+           "data BLOB, modified INTEGER NOT NULL DEFAULT 0)",
+           "CREATE INDEX IF NOT EXISTS objects_modified ON objects (modified)",
+           "CREATE TABLE IF NOT EXISTS subjobs (master INTEGER NOT NULL, id INTEGER NOT NULL, status TEXT, idx BLOB, "
+           "data BLOB, PRIMARY KEY (master, id))",
+           "CREATE TABLE IF NOT EXISTS sessions (session TEXT PRIMARY KEY, info TEXT, heartbeat REAL)",
+           "CREATE TABLE IF NOT EXISTS locks (id INTEGER PRIMARY KEY, session TEXT NOT NULL)",
+           "CREATE INDEX IF NOT EXISTS locks_session ON locks (session)",
+           "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+           "INSERT OR IGNORE INTO counters (name, value) VALUES ('next_id', 0)",
+           "INSERT OR IGNORE INTO counters (name, value) VALUES ('changes', 0)"]
+
+_INDEX_COLUMN_PREFIX = 'idx:'
+
+# Most ids passed in one statement, SQLite limits the number of terms in an expression
+_MAX_IDS_PER_STATEMENT = 500
+
+
+def _quote(name):
+    """ Quote the name of a column for use in a statement
+    Args:
+        name (str): name of the column
+    """
+    return '"%s"' % name.replace('"', '""')
+
+
+def _index_column_value(value):
+    """ Returns the value of an index cache entry as stored in its own column, None if it's not a simple value
+    Args:
+        value (object): value from the index cache
+    """
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    if isinstance(value, (unicode, int, long, float)):
+        return value
+    return None
+
+
+def _chunks(ids):
+    """ Split a list of ids into pieces small enough to be passed to a single statement
+    Args:
+        ids (list): ids of the objects
+    """
+    ids = [int(this_id) for this_id in ids]
+    for start in range(0, len(ids), _MAX_IDS_PER_STATEMENT):
+        yield ",".join(str(this_id) for this_id in ids[start:start + _MAX_IDS_PER_STATEMENT])
+
+
+@contextmanager
+def _transaction(db, immediate=True):
+    """ Run the statements in the with block in a single transaction, rolling it back on any error
+    Args:
+        db (sqlite3.Connection): connection in autocommit mode
+        immediate (bool): take the write lock of the database up front, otherwise the transaction only reads
+    """
+    db.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield db
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+def openDatabase(filename, timeout=45):
+    """ Open (creating it if needed) the database of a repository, returns the connection
+    Args:
+        filename (str): full path of the database
+        timeout (float): seconds to wait for the write lock held by another session before giving up
+    """
+    dirname = os.path.dirname(filename)
+    try:
+        os.makedirs(dirname)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    db = sqlite3.connect(filename, timeout=timeout, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    with _transaction(db):
+        for statement in _SCHEMA:
+            db.execute(statement)
+    return db
+
+
+def _read_index_columns(db):
+    """ Returns the set of the index cache keys which have a column of their own in the objects table
+    Args:
+        db (sqlite3.Connection): connection to the database
+    """
+    return set(row[1][len(_INDEX_COLUMN_PREFIX):] for row in db.execute("PRAGMA table_info(objects)")
+               if row[1].startswith(_INDEX_COLUMN_PREFIX))
+
+
+def _index_column_values(db, cache, known_columns):
+    """ Returns the {column: value} of the index cache entries kept in columns of their own, adding the columns
+    (and an index on each) which don't exist yet. Must be called within a write transaction
+    Args:
+        db (sqlite3.Connection): connection to the database
+        cache (dict): index cache of the object
+        known_columns (set): the keys known to have a column, updated with any which are added
+    """
+    values = {}
+    for key, value in cache.iteritems():
+        column_value = _index_column_value(value)
+        if column_value is None:
+            continue
+        if key not in known_columns:
+            known_columns.update(_read_index_columns(db))
+        if key not in known_columns:
+            column = _quote(_INDEX_COLUMN_PREFIX + key)
+            db.execute("ALTER TABLE objects ADD COLUMN %s" % column)
+            db.execute("CREATE INDEX IF NOT EXISTS %s ON objects (%s)" % (_quote("objects_" + _INDEX_COLUMN_PREFIX + key), column))
+            known_columns.add(key)
+        values[_quote(_INDEX_COLUMN_PREFIX + key)] = column_value
+    return values
+
+
+def _next_change(db):
+    """ Count one more change to the objects and return its number. Must be called within a write transaction
+    Args:
+        db (sqlite3.Connection): connection to the database
+    """
+    db.execute("UPDATE counters SET value = value + 1 WHERE name = 'changes'")
+    return db.execute("SELECT value FROM counters WHERE name = 'changes'").fetchone()[0]
+
+
+def _write_object_row(db, this_id, category, classname, cache, data, modified, known_columns):
+    """ Write the whole row of an object. Must be called within a write transaction
+    Args:
+        db (sqlite3.Connection): connection to the database
+        this_id (int): id of the object
+        category (str): category of the class of the object
+        classname (str): name of the class of the object
+        cache (dict): index cache of the object
+        data (str): XML of the object
+        modified (int): number of the change writing the row
+        known_columns (set): the index cache keys known to have a column
+    Returns the number of bytes written
+    """
+    idx = pickle.dumps(cache, pickle.HIGHEST_PROTOCOL)
+    columns = _index_column_values(db, cache, known_columns)
+    names = ["id", "category", "classname", "idx", "data", "modified"] + columns.keys()
+    values = [this_id, category, classname, sqlite3.Binary(idx), sqlite3.Binary(data), modified] + columns.values()
+    db.execute("INSERT OR REPLACE INTO objects (%s) VALUES (%s)" % (", ".join(names), ", ".join("?" * len(names))), values)
+    return len(idx) + len(data)
+
+
+def _object_to_xml(obj, ignore_subs=''):
+    """ Returns the XML of an object as written to the data column
+    Args:
+        obj (GangaObject): object to stream out
+        ignore_subs (str): name of the attribute not to write out
+    """
+    from GangaCore.Core.GangaRepository.GangaRepositoryXML import check_app_hash
+    check_app_hash(obj)
+    xml = StringIO()
+    to_file(obj, xml, ignore_subs)
+    return xml.getvalue()
+
+
+class SQLiteSessionRefresher(GangaThread):
+
+    """ Keeps the heartbeat of the session in the database of a repository up to date """
+
+    def __init__(self, lock_manager, interval):
+        """
+        Args:
+            lock_manager (SQLiteLockManager): the locks of the session in one database
+            interval (float): seconds between two heartbeats
+        """
+        super(SQLiteSessionRefresher, self).__init__(name='SQLiteSessionRefresher_%s' % lock_manager.name, critical=False)
+        self.lock_manager = lock_manager
+        self.interval = interval
+
+    def run(self):
+        try:
+            while not self.should_stop():
+                try:
+                    self.lock_manager.updateNow()
+                except (sqlite3.Error, RepositoryError) as err:
+                    logger.warning("Failed to refresh the session of repository '%s': %s" % (self.lock_manager.name, err))
+                wake_up = time.time() + self.interval
+                while not self.should_stop() and time.time() < wake_up:
+                    time.sleep(0.1)
+        finally:
+            self.unregister()
+
+
+class SQLiteLockManager(object):
+
+    """
+    Row based counterpart of SessionLockManager for a repository in an SQLite database.
+    An object is locked by a session for as long as the locks table has a row for it naming the session.
+    """
+
+    def __init__(self, repo, name):
+        """
+        Args:
+            repo (GangaRepositorySQLite): repository whose objects are locked
+            name (str): name of the registry, for messages
+        """
+        super(SQLiteLockManager, self).__init__()
+        self.repo = repo
+        self.name = name
+        self.locked = set()
+        hostname = os.uname()[1]
+        self.session_name = ".".join([hostname, str(os.getpid()), str(id(self)), repr(time.time())])
+        self.session_info = "%s (pid %s) since %s" % (hostname, os.getpid(), datetime.datetime.now().strftime("%H.%M_%A_%d_%B_%Y"))
+        self.timeout = getConfig('Configuration')['DiskIOTimeout']
+        self._refresher = None
+
+    def startup(self):
+        """ Register the session in the database and start keeping it alive """
+        with self.repo._transaction() as db:
+            self._reap(db)
+            db.execute("INSERT OR REPLACE INTO sessions (session, info, heartbeat) VALUES (?, ?, ?)",
+                       (self.session_name, self.session_info, time.time()))
+        self._refresher = SQLiteSessionRefresher(self, max(self.timeout / 3., 1.))
+        self._refresher.start()
+
+    def shutdown(self):
+        """ Release all locks of the session and remove it from the database """
+        if self._refresher is not None:
+            self._refresher.stop()
+            self._refresher = None
+        try:
+            with self.repo._transaction() as db:
+                db.execute("DELETE FROM locks WHERE session = ?", (self.session_name,))
+                db.execute("DELETE FROM sessions WHERE session = ?", (self.session_name,))
+        except (sqlite3.Error, RepositoryError) as err:
+            logger.warning("Failed to remove the session from repository '%s': %s" % (self.name, err))
+        self.locked = set()
+
+    def _reap(self, db):
+        """ Remove the sessions which have stopped refreshing their heartbeat along with their locks.
+        Must be called within a write transaction
+        Args:
+            db (sqlite3.Connection): connection to the database
+        """
+        dead = [row[0] for row in db.execute("SELECT session FROM sessions WHERE heartbeat < ? AND session != ?",
+                                             (time.time() - self.timeout, self.session_name))]
+        for session in dead:
+            logger.debug("Reaping session %s of repository '%s'" % (session, self.name))
+            db.execute("DELETE FROM sessions WHERE session = ?", (session,))
+        db.execute("DELETE FROM locks WHERE session NOT IN (SELECT session FROM sessions) AND session != ?", (self.session_name,))
+
+    def updateNow(self):
+        """ Refresh the heartbeat of the session. Should the session have been reaped in the meantime (the process was
+        stopped for too long) it is registered again and keeps whichever of its locks no one else has taken """
+        with self.repo._transaction() as db:
+            updated = db.execute("UPDATE sessions SET heartbeat = ? WHERE session = ?", (time.time(), self.session_name)).rowcount
+            if updated:
+                return
+            logger.warning("The session of repository '%s' had expired, registering it again" % self.name)
+            db.execute("INSERT INTO sessions (session, info, heartbeat) VALUES (?, ?, ?)",
+                       (self.session_name, self.session_info, time.time()))
+            db.executemany("INSERT OR IGNORE INTO locks (id, session) VALUES (?, ?)",
+                           [(this_id, self.session_name) for this_id in self.locked])
+            still_locked = self._locked_in_db(db)
+        lost = self.locked - still_locked
+        if lost:
+            logger.error("Repository '%s': the locks of objects %s were taken by another session!" % (self.name, sorted(lost)))
+        self.locked = still_locked
+
+    def _locked_in_db(self, db, ids=None):
+        """ Returns the set of the ids locked by this session according to the database
+        Args:
+            db (sqlite3.Connection): connection to the database
+            ids (list): only look at these ids, all of them if None
+        """
+        if ids is None:
+            return set(row[0] for row in db.execute("SELECT id FROM locks WHERE session = ?", (self.session_name,)))
+        locked = set()
+        for id_list in _chunks(ids):
+            locked.update(row[0] for row in db.execute("SELECT id FROM locks WHERE session = ? AND id IN (%s)" % id_list,
+                                                       (self.session_name,)))
+        return locked
+
+    def make_new_ids(self, n):
+        """ Returns a list of n new ids, locked by this session
+        Args:
+            n (int): number of ids wanted
+        """
+        with self.repo._transaction() as db:
+            self._reap(db)
+            next_id = max(db.execute("SELECT value FROM counters WHERE name = 'next_id'").fetchone()[0],
+                          db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM objects").fetchone()[0],
+                          db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM locks").fetchone()[0])
+            ids = range(next_id, next_id + n)
+            db.executemany("INSERT INTO locks (id, session) VALUES (?, ?)", [(this_id, self.session_name) for this_id in ids])
+            db.execute("UPDATE counters SET value = ? WHERE name = 'next_id'", (next_id + n,))
+        self.locked.update(ids)
+        return ids
+
+    def lock_ids(self, ids):
+        """ Try to lock the given ids, returns the list of those which are now locked by this session
+        Args:
+            ids (list): ids of the objects to lock
+        """
+        with self.repo._transaction() as db:
+            self._reap(db)
+            db.executemany("INSERT OR IGNORE INTO locks (id, session) VALUES (?, ?)",
+                           [(this_id, self.session_name) for this_id in ids])
+            locked = self._locked_in_db(db, ids)
+        self.locked.update(locked)
+        return [this_id for this_id in ids if this_id in locked]
+
+    def release_ids(self, ids):
+        """ Release the locks of the given ids, returns the list of those released
+        Args:
+            ids (list): ids of the objects to unlock
+        """
+        with self.repo._transaction() as db:
+            for id_list in _chunks(ids):
+                db.execute("DELETE FROM locks WHERE session = ? AND id IN (%s)" % id_list, (self.session_name,))
+        self.locked.difference_update(ids)
+        return list(ids)
+
+    def check(self):
+        """ Make sure the locks held according to the database are the ones this session thinks it holds.
+        Raise RepositoryError if they aren't """
+        with self.repo._transaction(immediate=False) as db:
+            in_db = self._locked_in_db(db)
+        if in_db != self.locked:
+            raise RepositoryError(self.repo, "Locks of repository '%s' are inconsistent: %s in the database, %s in the session"
+                                  % (self.name, sorted(in_db), sorted(self.locked)))
+
+    def get_lock_session(self, this_id):
+        """ Returns a description of the session holding the lock on this_id, None if it's not locked
+        Args:
+            this_id (int): id of the object
+        """
+        with self.repo._transaction(immediate=False) as db:
+            row = db.execute("SELECT sessions.info FROM locks JOIN sessions ON locks.session = sessions.session "
+                             "WHERE locks.id = ?", (this_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_other_sessions(self):
+        """ Returns a description of each of the other live sessions using the database """
+        with self.repo._transaction() as db:
+            self._reap(db)
+            return [row[0] for row in db.execute("SELECT info FROM sessions WHERE session != ?", (self.session_name,))]
+
+    def reap_locks(self):
+        """ Remove the locks of the sessions which are no longer alive. Returns True on success, False on error """
+        try:
+            with self.repo._transaction() as db:
+                self._reap(db)
+        except (sqlite3.Error, RepositoryError) as err:
+            logger.debug("Reap locks error: %s" % err)
+            return False
+        return True
+
+
+class SQLiteSubJobContainer(object):
+
+    """
+    The rows of the subjobs table belonging to one master job, with the interface of SubJobContainer.
+    The records written carry the index cache of each subjob besides its XML and status.
+    """
+
+    def __init__(self, repository, master_id):
+        """
+        Args:
+            repository (GangaRepositorySQLite): repository holding the master job
+            master_id (int): id of the master job
+        """
+        super(SQLiteSubJobContainer, self).__init__()
+        self.repository = repository
+        self.master_id = master_id
+        # Only used in messages
+        self.filename = "%s (job %s)" % (repository.filename, master_id)
+
+    def exists(self):
+        """ The subjobs are always in the database, even if there are none """
+        return True
+
+    def __len__(self):
+        """ Returns the number of subjobs in the database"""
+        with self.repository._transaction(immediate=False) as db:
+            return db.execute("SELECT COUNT(*) FROM subjobs WHERE master = ?", (self.master_id,)).fetchone()[0]
+
+    def statuses(self):
+        """ Returns the list of the statuses of all subjobs, without reading any XML"""
+        with self.repository._transaction(immediate=False) as db:
+            return [row[0] for row in db.execute("SELECT status FROM subjobs WHERE master = ? ORDER BY id", (self.master_id,))]
+
+    def indexes(self):
+        """ Returns the {subjob id: index cache} of all subjobs"""
+        with self.repository._transaction(immediate=False) as db:
+            rows = db.execute("SELECT id, idx FROM subjobs WHERE master = ? AND idx IS NOT NULL", (self.master_id,)).fetchall()
+        return dict((sj_id, pickle.loads(str(idx))) for sj_id, idx in rows)
+
+    def read(self, index):
+        """ Returns the XML of one subjob
+        Args:
+            index (int): id of the subjob
+        """
+        with self.repository._transaction(immediate=False) as db:
+            row = db.execute("SELECT data FROM subjobs WHERE master = ? AND id = ?", (self.master_id, index)).fetchone()
+        if row is None:
+            raise SubJobContainerError("Subjob %s is not in %s" % (index, self.filename))
+        return str(row[0])
+
+    def write(self, records, length=None):
+        """ Store some subjobs, replacing what was there for them. Returns the number of bytes written
+        Args:
+            records (dict): subjob id -> (XML, status, index cache)
+            length (int): if given the subjobs from this id on are removed
+        """
+        rows = []
+        written = 0
+        for index, (xml, status, cache) in records.iteritems():
+            idx = pickle.dumps(cache, pickle.HIGHEST_PROTOCOL)
+            rows.append((self.master_id, index, status, sqlite3.Binary(idx), sqlite3.Binary(xml)))
+            written += len(idx) + len(xml)
+        with self.repository._transaction() as db:
+            db.executemany("INSERT OR REPLACE INTO subjobs (master, id, status, idx, data) VALUES (?, ?, ?, ?, ?)", rows)
+            if length is not None:
+                db.execute("DELETE FROM subjobs WHERE master = ? AND id >= ?", (self.master_id, length))
+        return written
+
+    def remove(self):
+        """ Remove all of the subjobs"""
+        with self.repository._transaction() as db:
+            db.execute("DELETE FROM subjobs WHERE master = ?", (self.master_id,))
+
+
+class SubJobSQLiteList(SubJobXMLList):
+
+    """
+    SubJobXMLList for the subjobs of a job held in the subjobs table of a GangaRepositorySQLite.
+    Subjobs are loaded one row at a time when needed and the index of all of them is read without loading any.
+    """
+
+    _name = 'SubJobSQLiteList'
+
+    _schema = Schema(Version(1, 0), {})
+
+    def __init__(self, repository=None, master_id=None, registry=None, parent=None):
+        """
+        Args:
+            repository (GangaRepositorySQLite): repository holding the master job
+            master_id (int): id of the master job
+            registry (Registry): the registry managing the master job
+            parent (Job): parent of self after construction
+        """
+        super(SubJobSQLiteList, self).__init__()
+
+        self._registry = registry
+        self._container = SQLiteSubJobContainer(repository, master_id) if repository is not None else None
+        self._subjobIndexData = {}
+        self._cached_filenames = {}
+        self._stored_len = []
+        self._storedKeys = {}
+        self._load_lock = threading.Lock()
+
+        if repository is None:
+            return
+
+        if parent:
+            self._setParent(parent)
+        self.load_subJobIndex()
+
+    def __deepcopy__(self, memo=None):
+        obj = super(SubJobSQLiteList, self).__deepcopy__(memo)
+        obj._container = self._container
+        return obj
+
+    def isPacked(self):
+        """The subjobs are always in the database"""
+        return self._container is not None
+
+    def load_subJobIndex(self):
+        """Read the index of all subjobs from their rows into _subjobIndexData"""
+        try:
+            self._subjobIndexData = self._container.indexes()
+        except (sqlite3.Error, RepositoryError) as err:
+            logger.debug("Subjob index read error: %s" % err)
+            self._subjobIndexData = {}
+
+    def write_subJobIndex(self, ignore_disk=False):
+        """The index of each subjob is written along with it by flush, there is nothing else to write"""
+        pass
+
+    def flush(self, ignore_disk=False):
+        """Write the dirty subjobs to the database
+        Args:
+            ignore_disk (bool): The subjobs in memory are all of the subjobs, whatever is in the database
+        """
+        records = {}
+        written = []
+        for index in self._cachedJobs:
+            subjob_obj = self._cachedJobs[index]
+            if not subjob_obj._dirty:
+                continue
+            written.append((subjob_obj, nextDirtyGeneration()))
+            xml, status = self._getSubJobRecord(index)
+            cache = self._registry.getIndexCache(subjob_obj)
+            cache['modified'] = time.time()
+            records[index] = (xml, status, cache)
+
+        if records or ignore_disk:
+            length = len(self._cachedJobs) if ignore_disk else None
+            self._countBytesWritten(self._container.write(records, length))
+            for index, (_, _, cache) in records.iteritems():
+                self._subjobIndexData[index] = cache
+            if length is not None:
+                for index in [i for i in self._subjobIndexData if i >= length]:
+                    del self._subjobIndexData[index]
+
+        for subjob_obj, flush_generation in written:
+            if not subjob_obj._isDirtySince(flush_generation):
+                subjob_obj._setFlushed()
 
 
 class GangaRepositorySQLite(GangaRepository):
 
     """GangaRepository SQLite"""
 
+    def __init__(self, registry):
+        """
+        Initialize a Repository from within a Registry and keep a reference to the Registry which 'owns' it
+        Args:
+            registry (Registry): This is the registry which manages this Repo
+        """
+        super(GangaRepositorySQLite, self).__init__(registry)
+        self.sub_split = "subjobs"
+        self.root = os.path.join(self.registry.location, "6.0")
+        self.filename = os.path.join(self.root, self.registry.name + ".db")
+        self.sessionlock = None
+        self.known_bad_ids = []
+        # Number of bytes of object data written to the database by this repository, see RegistryFlusher
+        self.bytes_written = 0
+        self._db = None
+        self._db_lock = threading.RLock()
+        self._in_transaction = False
+        self._fully_loaded = {}
+        self._index_columns = set()
+        # The number of the last change read by update_index and, per object, of the change which last wrote its row
+        # as far as this session knows
+        self._seen_changes = -1
+        self._modified = {}
+
+    @contextmanager
+    def _transaction(self, immediate=True):
+        """ All use of the database goes through here. Statements run in one transaction per outermost with block
+        Args:
+            immediate (bool): the transaction writes to the database. Only an outermost block decides this
+        """
+        with self._db_lock:
+            if self._db is None:
+                raise RepositoryError(self, "The repository '%s' is not started" % self.registry.name)
+            if self._in_transaction:
+                yield self._db
+                return
+            self._in_transaction = True
+            try:
+                with _transaction(self._db, immediate):
+                    yield self._db
+            finally:
+                self._in_transaction = False
+
     def startup(self):
-        """ Starts an repository and reads in a directory structure."""
-        self._load_timestamp = {}
-        self._cache_load_timestamp = {}
+        """ Connect to the database and read in the index of all objects.
+        Raise RepositoryError"""
         self._fully_loaded = {}
-        self.known_bad_ids = []
-        self.root = os.path.join(
-            self.registry.location, "0.1", self.registry.name)
+        self._modified = {}
+        self._seen_changes = -1
         try:
-            os.makedirs(self.root)
-        except OSError as x:
-            pass
-        self.con = sqlite3.connect(os.path.join(self.root, "database.db"))
-        logger.debug("Connected to ", os.path.join(self.root, "database.db"))
-        self.cur = self.con.cursor()
-        tables = self.cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' and name LIKE 'objects'")
-        if len(self.cur.fetchall()) == 0:
-            self.cur.execute(
-                "CREATE TABLE objects (id INTEGER PRIMARY KEY, classname VARCHAR(30), category VARCHAR(20), idx VARCHAR(100), data VARCHAR(1000))")
-        self.con.commit()
-        self.update_index(verbose=True)
+            self._db = openDatabase(self.filename, getConfig('Configuration')['DiskIOTimeout'])
+            self._index_columns = _read_index_columns(self._db)
+        except (sqlite3.Error, OSError) as err:
+            raise RepositoryError(self, "Failed to open the repository database '%s': %s" % (self.filename, err))
+        self.sessionlock = SQLiteLockManager(self, self.registry.name)
+        self.sessionlock.startup()
+        self.update_index(None, True, True)
+        logger.debug("GangaRepositorySQLite Finished Startup")
 
     def shutdown(self):
         """Shutdown the repository. Flushing is done by the Registry
         Raise RepositoryError"""
-        self.cur.close()
-        self.con.close()
+        logger.debug("Shutting Down GangaRepositorySQLite: %s" % self.registry.name)
+        if self.sessionlock is not None:
+            self.sessionlock.shutdown()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
 
-    def update_index(self, id=None, verbose=False):
-        """ Update the list of available objects
-        Raise RepositoryError"""
-        # First locate and load the index files
+    def updateLocksNow(self):
+        """
+        Trigger the session to be refreshed now
+        """
+        self.sessionlock.updateNow()
+
+    def update_index(self, this_id=None, verbose=False, firstRun=False):
+        """ Update the list of available objects from the rows changed since the last update.
+        Returns the ids of the objects which changed
+        Raise RepositoryError
+        Args:
+            this_id (int): Unused, all objects are updated
+            verbose (bool): Unused, errors are always summarised
+            firstRun (bool): True when called on startup
+        """
         logger.debug("updating index...")
-        self.cur.execute("SELECT id,classname,category,idx FROM objects")
-        for e in self.cur:
-            id = int(e[0])
-            if e[1] is None:  # deleted object
+        try:
+            with self._transaction(immediate=False) as db:
+                changes = db.execute("SELECT value FROM counters WHERE name = 'changes'").fetchone()[0]
+                if changes == self._seen_changes:
+                    return []
+                rows = db.execute("SELECT id, category, classname, idx, modified FROM objects WHERE modified > ?",
+                                  (self._seen_changes,)).fetchall()
+                all_ids = set(row[0] for row in db.execute("SELECT id FROM objects"))
+        except sqlite3.Error as err:
+            raise RepositoryError(self, "Failed to read the index of '%s': %s" % (self.registry.name, err))
+
+        changed_ids = []
+        summary = []
+        locked_ids = self.sessionlock.locked
+        for this_id, category, classname, idx, modified in rows:
+            # Skip what we wrote ourselves, what we hold the lock of and what is known to be broken
+            if self._modified.get(this_id) == modified:
                 continue
-            # Locked IDs can be ignored
-            # if id in self.sessionlock.locked:
-            #    continue
-            # Now we treat unlocked IDs
-            if id in self.objects:
-                obj = self.objects[id]
-            else:
-                obj = self._make_empty_object_(id, e[2], e[1])
-            obj._index_cache = pickle.loads(e[3])
-        logger.debug("updated index done")
+            if this_id in locked_ids and this_id in self.objects:
+                continue
+            if this_id in self.incomplete_objects:
+                continue
+            try:
+                cache = pickle.loads(str(idx)) if idx is not None else {}
+                if this_id in self.objects:
+                    obj = self.objects[this_id]
+                    # Changed by another session so read it again the next time it's used
+                    if self._fully_loaded.get(this_id) is obj:
+                        del self._fully_loaded[this_id]
+                else:
+                    obj = self._make_empty_object_(this_id, category, classname)
+                obj._index_cache = cache
+                self._modified[this_id] = modified
+                changed_ids.append(this_id)
+            except (PluginManagerError, pickle.UnpicklingError, EOFError, ValueError, TypeError) as err:
+                logger.debug("Failed to load index %i: %s" % (this_id, err))
+                summary.append((this_id, err))
+
+        deleted_ids = [this_id for this_id in self.objects if this_id not in all_ids and this_id not in locked_ids]
+        for this_id in deleted_ids:
+            self._internal_del__(this_id)
+            self._fully_loaded.pop(this_id, None)
+            self._modified.pop(this_id, None)
+            changed_ids.append(this_id)
+        if deleted_ids and not firstRun:
+            logger.warning("Registry '%s': Job %s externally deleted." % (self.registry.name, ",".join(map(str, deleted_ids))))
+
+        failed = {}
+        for this_id, err in summary:
+            if this_id in self.known_bad_ids:
+                continue
+            self.known_bad_ids.append(this_id)
+            if this_id not in self.incomplete_objects:
+                self.incomplete_objects.append(this_id)
+            failed.setdefault(getName(err), []).append(str(this_id))
+        for exc, ids in failed.items():
+            logger.error("Registry '%s': Failed to load %i jobs (IDs: %s) due to '%s'" % (self.registry.name, len(ids), ",".join(ids), exc))
 
-    def constructDataDict(self, obj):
-        data_dict = {}
-        for attr_name, attr in obj._schema.allItems():
-            if not attr['getter']:
-                data_dict[attr_name] = getattr(obj, attr_name)
-        return data_dict
+        self._seen_changes = changes
+        logger.debug("updated index done")
+        return changed_ids
 
     def add(self, objs, force_ids=None):
         """ Add the given objects to the repository, forcing the IDs if told to.
-        Raise RepositoryError"""
-        ids = []
-        # assume the ids are already locked by Registry
-        if not force_ids is None:
+        Raise RepositoryError
+        Args:
+            objs (list): GangaObject-s which we want to add to the Repo
+            force_ids (list, None): IDs to assign to object, None for auto-assign
+        """
+        if force_ids not in [None, []]:  # assume the ids are already locked by Registry
             if not len(objs) == len(force_ids):
-                raise RepositoryError(
-                    self, "Internal Error: add with different number of objects and force_ids!")
+                raise RepositoryError(self, "Internal Error: add with different number of objects and force_ids!")
             ids = force_ids
-        for i in range(0, len(objs)):
-            cls = objs[i]._name
-            cat = objs[i]._category
-            objs[i]._index_cache = self.registry.getIndexCache(objs[i])
-            data = pickle.dumps(self.constructDataDict(obj)).replace("'", "''")
-            idx = pickle.dumps(objs[i]._index_cache).replace("'", "''")
-            if force_ids is None:
-                self.cur.execute("INSERT INTO objects (id,classname,category,idx,data) VALUES (NULL,'%s','%s','%s','%s')" % (
-                    cls, cat, idx, data))
-            else:
-                self.cur.execute("INSERT INTO objects (id,classname,category,idx,data) VALUES (%i,'%s','%s','%s','%s')" % (
-                    force_ids[i], cls, cat, idx, data))
-            ids.append(self.cur.lastrowid)
-            self._internal_setitem__(ids[i], objs[i])
-        self.con.commit()
+        else:
+            ids = self.sessionlock.make_new_ids(len(objs))
+
+        for obj, this_id in zip(objs, ids):
+            self._internal_setitem__(this_id, obj)
+            # Set subjobs dirty - they will not be flushed if they are not.
+            for subjob in getattr(obj, self.sub_split, None) or []:
+                subjob._dirty = True
         return ids
 
+    def _flush_subjobs(self, this_id, obj):
+        """ Write the dirty subjobs of an object, returns True if the object has subjobs
+        Args:
+            this_id (int): id of the object
+            obj (GangaObject): the object
+        """
+        subjobs = getattr(obj, self.sub_split, None)
+        if not subjobs:
+            return False
+        if isinstance(subjobs, SubJobSQLiteList):
+            subjobs.flush()
+        else:
+            # Constructed in this session, so hand the subjobs over to a list which knows how to write them
+            # (the parent is only set afterwards so that reading the index doesn't make the object dirty)
+            temp_list = SubJobSQLiteList(self, this_id, self.registry)
+            temp_list._setParent(obj)
+            temp_list._reset_cachedJobs(dict((sj.id, stripProxy(sj)) for sj in subjobs))
+            temp_list.flush(ignore_disk=True)
+        return True
+
+    def _flush_object(self, this_id, obj):
+        """ Write an object and its subjobs to the database
+        Args:
+            this_id (int): id of the object
+            obj (GangaObject): the object
+        """
+        has_children = self._flush_subjobs(this_id, obj)
+        # Only stream the object out again if something stored with it has changed, the index is always written as
+        # it includes the statuses of the subjobs
+        write_data = not has_children or obj._own_dirty_gen or not obj._dirty_gen or this_id not in self._modified or \
+            not isinstance(getattr(obj, self.sub_split), SubJobSQLiteList)
+        cache = self.registry.getIndexCache(stripProxy(obj))
+        data = _object_to_xml(obj, self.sub_split if has_children else '') if write_data else None
+
+        with self._transaction() as db:
+            modified = _next_change(db)
+            written = 0
+            if data is None:
+                idx = pickle.dumps(cache, pickle.HIGHEST_PROTOCOL)
+                columns = _index_column_values(db, cache, self._index_columns)
+                assignments = ", ".join(["idx = ?", "modified = ?"] + ["%s = ?" % column for column in columns])
+                if db.execute("UPDATE objects SET %s WHERE id = ?" % assignments,
+                              [sqlite3.Binary(idx), modified] + columns.values() + [this_id]).rowcount:
+                    written = len(idx)
+                else:
+                    data = _object_to_xml(obj, self.sub_split)
+            if data is not None:
+                written = _write_object_row(db, this_id, obj._category, getName(obj), cache, data, modified, self._index_columns)
+            if not has_children:
+                db.execute("DELETE FROM subjobs WHERE master = ?", (this_id,))
+        self.bytes_written += written
+        self._modified[this_id] = modified
+
     def flush(self, ids):
-        for id in ids:
-            obj = self.objects[id]
-            if obj._name != "EmptyGangaObject":
-                obj._index_cache = self.registry.getIndexCache(obj)
-                data = pickle.dumps(self.constructDataDict(obj)).replace("'", "''")
-                idx = pickle.dumps(obj._index_cache).replace("'", "''")
-                self.cur.execute(
-                    "UPDATE objects SET idx='%s',data='%s' WHERE id=%s" % (idx, data, id))
-                # print "flushing id ", id, " backend ", obj.backend._name
-        self.con.commit()
-
-    def load(self, ids):
-        self.cur.execute("SELECT id,classname,category,data FROM objects WHERE id IN (%s)" % (
-            ",".join(map(str, ids))))
-        for e in self.cur:
-            # print "load: ",e
-            _id = int(e[0])
-            if e[1] is None:  # deleted object
+        """
+        Write the objects with the given ids, and their subjobs, to the database
+        NB: This adds the given objects corresponding to ids to the _fully_loaded dict
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+        """
+        logger.debug("Flushing: %s" % ids)
+        for this_id in ids:
+            if this_id in self.incomplete_objects:
+                logger.debug("Should NEVER re-flush an incomplete object, it's now 'bad' respect this!")
                 continue
-            if not _id in self.objects:
-                obj = self._make_empty_object_(_id, e[2], e[1])
-            else:
-                obj = self.objects[_id]
-            if _id not in self._fully_loaded:
-                new_data = pickle.loads(e[3])
-                for k, v in new_data:
-                    setattr(obj, k, v)
-            self._fully_loaded[_id] = obj
-            ids.remove(_id)
-        if len(ids) > 0:
-            raise KeyError(ids[0])
+            obj = self.objects[this_id]
+            if isType(obj, EmptyGangaObject):
+                raise RepositoryError(self, "Cannot flush an Empty object for ID: %s" % this_id)
+            try:
+                flush_generation = nextDirtyGeneration()
+                self._flush_object(this_id, obj)
+            except (sqlite3.Error, XMLFileError) as err:
+                raise RepositoryError(self, "Error of type: %s on flushing id '%s': %s" % (type(err), this_id, err))
+
+            if this_id not in self._fully_loaded:
+                self._fully_loaded[this_id] = obj
+
+            # Anything changed while that was going on stays dirty so that it is written out next time
+            if not obj._isDirtySince(flush_generation):
+                obj._setFlushed()
+
+    def _set_object_data(self, this_id, tmpobj, has_children):
+        """
+        Replace the attributes of objects[this_id] with those of the object read from the database, keeping the
+        object in memory the same one
+        Args:
+            this_id (int): id of the object
+            tmpobj (GangaObject): the object as read from the database
+            has_children (bool): are there subjobs of the object in the database
+        """
+        if this_id not in self.objects:
+            self._internal_setitem__(this_id, tmpobj)
+        else:
+            obj = self.objects[this_id]
+            for key, val in tmpobj._data.items():
+                obj.setSchemaAttribute(key, val)
+            for attr_name, attr_val in obj._schema.allItems():
+                if attr_name not in tmpobj._data:
+                    obj.setSchemaAttribute(attr_name, obj._schema.getDefaultValue(attr_name))
+        obj = self.objects[this_id]
+
+        if has_children:
+            # NB Keep be a SetSchemaAttribute to bypass the list manipulation which will put this into a list in some cases
+            obj.setSchemaAttribute(self.sub_split, SubJobSQLiteList(self, this_id, self.registry, obj))
+        elif obj._schema.hasAttribute(self.sub_split):
+            def_val = obj._schema.getDefaultValue(self.sub_split)
+            if def_val == []:
+                from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
+                def_val = GangaList()
+            obj.setSchemaAttribute(self.sub_split, def_val)
+
+        from GangaCore.GPIDev.Base.Objects import do_not_copy
+        for node_key, node_val in obj._data.items():
+            if isType(node_val, Node):
+                if node_key not in do_not_copy:
+                    node_val._setParent(obj)
+
+        obj._index_cache = {}
+
+    def load(self, ids, load_backup=False):
+        """
+        Load the objects with the given ids from the database
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+            load_backup (bool): Unused, there are no backups in the database
+        """
+        logger.debug("Loading Repo object(s): %s" % ids)
+        for this_id in ids:
+            if this_id in self.incomplete_objects:
+                raise RepositoryError(self, "Trying to re-load a corrupt repository id: %s" % this_id)
+
+            try:
+                with self._transaction(immediate=False) as db:
+                    row = db.execute("SELECT data, modified FROM objects WHERE id = ?", (this_id,)).fetchone()
+                    has_children = db.execute("SELECT 1 FROM subjobs WHERE master = ? LIMIT 1", (this_id,)).fetchone() is not None
+            except sqlite3.Error as err:
+                raise RepositoryError(self, "Failed to read object %s: %s" % (this_id, err))
+
+            if row is None:
+                # deleted by another session
+                if this_id in self.objects:
+                    self._internal_del__(this_id)
+                raise KeyError(this_id)
+
+            try:
+                tmpobj, errs = from_file(StringIO(str(row[0])))
+                if errs:
+                    for err in errs:
+                        logger.error("err: %s" % err)
+                    raise InaccessibleObjectError(self, this_id, errs[0])
+                self._set_object_data(this_id, tmpobj, has_children)
+            except Exception as err:
+                logger.error("Adding id: %s to Corrupt IDs will not attempt to re-load this session" % this_id)
+                self.incomplete_objects.append(this_id)
+                if isinstance(err, (RepositoryError, InaccessibleObjectError)):
+                    raise
+                raise InaccessibleObjectError(self, this_id, err)
+
+            self._modified[this_id] = row[1]
+            self._fully_loaded[this_id] = self.objects[this_id]
+            self.objects[this_id]._setFlushed()
+
+        logger.debug("Finished 'load'-ing of: %s" % ids)
 
     def delete(self, ids):
-        for id in ids:
-            self.cur.execute(
-                "UPDATE objects SET classname=NULL,category=NULL,idx=NULL,data=NULL WHERE id=%s" % (id))
-            self._internal_del__(id)
-        self.con.commit()
+        """
+        Remove the objects with the given ids, and their subjobs, from the database
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        try:
+            with self._transaction() as db:
+                _next_change(db)
+                for id_list in _chunks(ids):
+                    db.execute("DELETE FROM objects WHERE id IN (%s)" % id_list)
+                    db.execute("DELETE FROM subjobs WHERE master IN (%s)" % id_list)
+        except sqlite3.Error as err:
+            raise RepositoryError(self, "Failed to delete objects %s: %s" % (ids, err))
+        for this_id in ids:
+            if this_id in self.objects or this_id in self.incomplete_objects:
+                self._internal_del__(this_id)
+            self._fully_loaded.pop(this_id, None)
+            self._modified.pop(this_id, None)
+
+    def select_ids(self, **conditions):
+        """
+        Returns the ids of the objects whose index cache has the given values, e.g. select_ids(status='completed').
+        Only the keys of the index cache holding simple values (strings and numbers) can be used, the ':' of keys
+        such as 'display:backend' is written '__' here
+        Args:
+            conditions (dict): index cache key -> value
+        """
+        keys = dict((key.replace('__', ':'), value) for key, value in conditions.iteritems())
+        unknown = [key for key in keys if key not in self._index_columns]
+        if unknown:
+            with self._transaction(immediate=False) as db:
+                self._index_columns.update(_read_index_columns(db))
+            unknown = [key for key in keys if key not in self._index_columns]
+        if unknown:
+            raise GangaException("The index of '%s' has no column for %s" % (self.registry.name, ", ".join(unknown)))
+        where = " AND ".join("%s = ?" % _quote(_INDEX_COLUMN_PREFIX + key) for key in keys) or "1"
+        with self._transaction(immediate=False) as db:
+            return [row[0] for row in db.execute("SELECT id FROM objects WHERE %s ORDER BY id" % where,
+                                                 [_index_column_value(value) for value in keys.values()])]
 
     def lock(self, ids):
-        return ids
+        """
+        Request a session lock for the following ids
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        return self.sessionlock.lock_ids(ids)
 
     def unlock(self, ids):
-        return ids
+        """
+        Unlock the following ids
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+        """
+        released_ids = self.sessionlock.release_ids(ids)
+        if len(released_ids) < len(ids):
+            logger.error("The write locks of some objects could not be released!")
 
-    def get_lock_session(self, id):
+    def get_lock_session(self, this_id):
         """get_lock_session(id)
         Tries to determine the session that holds the lock on id for information purposes, and return an informative string.
         Returns None on failure
+        Args:
+            this_id (int): Get the id of the session which has a lock on the object with this id
         """
-        return ""
+        return self.sessionlock.get_lock_session(this_id)
 
     def get_other_sessions(self):
         """get_session_list()
         Tries to determine the other sessions that are active and returns an informative string for each of them.
         """
-        return []
+        return self.sessionlock.get_other_sessions()
 
     def reap_locks(self):
         """reap_locks() --> True/False
         Remotely clear all foreign locks from the session.
         WARNING: This is not nice.
         Returns True on success, False on error."""
-        return False
+        return self.sessionlock.reap_locks()
 
     def clean(self):
         """clean() --> True/False
         Clear EVERYTHING in this repository, counter, all jobs, etc.
         WARNING: This is not nice."""
         self.shutdown()
-        os.unlink(os.path.join(self.root, "database.db"))
+        for suffix in ['', '-wal', '-shm']:
+            try:
+                os.unlink(self.filename + suffix)
+            except OSError as err:
+                if err.errno != errno.ENOENT:
+                    logger.error("Failed to correctly clean repository due to: %s" % err)
         self.startup()
+
+    def isObjectLoaded(self, obj):
+        """
+        This will return a true false if an object has been fully loaded into memory
+        Args:
+            obj (GangaObject): The object we want to know if it was loaded into memory
+        """
+        this_id = getattr(obj, '_registry_id', None)
+        if this_id is not None and self.objects.get(this_id) is obj:
+            return self._fully_loaded.get(this_id) is obj
+        return any(o is obj for o in self._fully_loaded.itervalues())
+
+
+_CLASS_RE = re.compile(r'<class name="([^"]+)" version="[^"]*" category="([^"]+)"')
+
+
+def _read_file(filename):
+    """ Returns the contents of a file, or of its backup if the file itself is missing. None if both are
+    Args:
+        filename (str): full path of the file
+    """
+    for name in [filename, filename + '~']:
+        try:
+            with open(name) as this_file:
+                return this_file.read()
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                raise
+    return None
+
+
+def _read_pickle(filename):
+    """ Returns the object in a file written by PickleStreamer, None if it can't be read
+    Args:
+        filename (str): full path of the file
+    """
+    from GangaCore.Core.GangaRepository.PickleStreamer import from_file as pickle_from_file
+    try:
+        with open(filename) as this_file:
+            return pickle_from_file(this_file)[0]
+    except Exception as err:
+        logger.debug("Can't read %s: %s" % (filename, err))
+        return None
+
+
+def _status_from_xml(xml):
+    """ Returns the status of a subjob, parsing its XML
+    Args:
+        xml (str): XML of the subjob
+    """
+    return getattr(from_file(StringIO(xml))[0], 'status', None)
+
+
+def _read_xml_subjobs(job_dir):
+    """ Returns the {subjob id: (XML, status, index cache)} of the subjobs of a job in an XML repository
+    Args:
+        job_dir (str): directory holding the data of the master job
+    """
+    indexes = _read_pickle(os.path.join(job_dir, 'subjobs.idx')) or {}
+    records = {}
+    container = SubJobContainer.in_dir(job_dir)
+    if container.exists():
+        for index, status in enumerate(container.statuses()):
+            records[index] = (container.read(index), status, indexes.get(index, {}))
+        return records
+    for entry in os.listdir(job_dir):
+        if not entry.isdigit():
+            continue
+        xml = _read_file(os.path.join(job_dir, entry, 'data'))
+        if xml is None:
+            continue
+        cache = indexes.get(int(entry), {})
+        status = cache.get('status') if 'status' in cache else _status_from_xml(xml)
+        records[int(entry)] = (xml, status, cache)
+    return records
+
+
+def migrateXMLRepository(xml_dir, db_filename):
+    """ Copy all objects of one registry in an XML repository, with their subjobs, into a new SQLite database.
+    No Ganga session may be using the XML repository while this runs. Returns the number of objects copied
+    Args:
+        xml_dir (str): directory of the registry in the XML repository, e.g. <gangadir>/repository/<user>/LocalXML/6.0/jobs
+        db_filename (str): the database to create, e.g. <gangadir>/repository/<user>/LocalXML/6.0/jobs.db
+    """
+    from GangaCore.Core.GangaRepository.IndexStore import IndexStore, IndexStoreError
+
+    db = openDatabase(db_filename)
+    try:
+        if db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]:
+            raise GangaException("The database '%s' already holds objects, not migrating '%s' into it" % (db_filename, xml_dir))
+
+        index_store = IndexStore(os.path.join(xml_dir, 'index.store'))
+        try:
+            if index_store.exists():
+                index_store.read()
+        except (IOError, OSError, IndexStoreError) as err:
+            logger.debug("No usable index store in %s: %s" % (xml_dir, err))
+            index_store = IndexStore(os.path.join(xml_dir, 'index.store'))
+
+        try:
+            with open(os.path.join(xml_dir, 'cnt')) as cnt_file:
+                next_id = int(cnt_file.read().split("\n")[0])
+        except (IOError, ValueError):
+            next_id = 0
+
+        index_columns = _read_index_columns(db)
+        migrated = 0
+        chunk_dirs = [d for d in os.listdir(xml_dir) if d.endswith("xxx") and d[:-3].isdigit()] if os.path.isdir(xml_dir) else []
+        for chunk_dir in chunk_dirs:
+            for entry in os.listdir(os.path.join(xml_dir, chunk_dir)):
+                if not entry.isdigit():
+                    continue
+                this_id = int(entry)
+                job_dir = os.path.join(xml_dir, chunk_dir, entry)
+                xml = _read_file(os.path.join(job_dir, 'data'))
+                if xml is None:
+                    logger.warning("No data found for object %s in %s, it is not migrated" % (this_id, xml_dir))
+                    continue
+
+                entry = index_store.get(this_id)
+                if entry is not None:
+                    category, classname, cache = entry[:3]
+                else:
+                    index = _read_pickle(os.path.join(xml_dir, chunk_dir, "%s.index" % this_id))
+                    if index is not None:
+                        category, classname, cache = index
+                    else:
+                        match = _CLASS_RE.search(xml)
+                        if match is None:
+                            logger.warning("Can't tell the class of object %s in %s, it is not migrated" % (this_id, xml_dir))
+                            continue
+                        classname, category = match.groups()
+                        cache = {}
+
+                with _transaction(db):
+                    modified = _next_change(db)
+                    _write_object_row(db, this_id, category, classname, cache, xml, modified, index_columns)
+                    rows = [(this_id, index, status, sqlite3.Binary(pickle.dumps(sj_cache, pickle.HIGHEST_PROTOCOL)), sqlite3.Binary(sj_xml))
+                            for index, (sj_xml, status, sj_cache) in _read_xml_subjobs(job_dir).iteritems()]
+                    db.executemany("INSERT INTO subjobs (master, id, status, idx, data) VALUES (?, ?, ?, ?, ?)", rows)
+                next_id = max(next_id, this_id + 1)
+                migrated += 1
+
+        with _transaction(db):
+            db.execute("UPDATE counters SET value = ? WHERE name = 'next_id'", (next_id,))
+    finally:
+        db.close()
+
+    logger.info("Migrated %s objects from %s to %s" % (migrated, xml_dir, db_filename))
+    return migrated
+
+
+def migrateXMLRegistry(name, location=None):
+    """ Convert the XML repository of a registry, and that of its metadata if it has one, into the SQLite databases
+    used once [Configuration]registryTypes selects SQLite for the registry. No Ganga session may be using the
+    registry while this runs. Returns the number of objects converted
+    Args:
+        name (str): name of the registry, e.g. 'jobs'
+        location (str): location of the registry, <gangadir>/repository/<user>/LocalXML by default
+    """
+    if location is None:
+        from GangaCore.Runtime.Repository_runtime import getLocalRoot
+        location = getLocalRoot()
+    root = os.path.join(location, "6.0")
+    migrated = 0
+    for this_name in [name, name + ".metadata"]:
+        xml_dir = os.path.join(root, this_name)
+        if os.path.isdir(xml_dir):
+            migrated += migrateXMLRepository(xml_dir, os.path.join(root, this_name + ".db"))
+    return migrated
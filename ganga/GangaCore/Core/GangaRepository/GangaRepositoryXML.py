@@ -16,6 +16,7 @@ from GangaCore import GANGA_SWAN_INTEGRATION
 
 from GangaCore.Core.GangaRepository.SessionLock import SessionLockManager, dry_run_unix_locks
 from GangaCore.Core.GangaRepository.FixedLock import FixedLockManager
+from GangaCore.Core.GangaRepository.IndexStore import IndexStore, IndexStoreError
 
 import GangaCore.Utility.logging
 
@@ -26,8 +27,9 @@ from GangaCore.Core.GangaRepository.VStreamer import to_file as xml_to_file
 from GangaCore.Core.GangaRepository.VStreamer import from_file as xml_from_file
 from GangaCore.Core.GangaRepository.VStreamer import XMLFileError
 
-from GangaCore.GPIDev.Base.Objects import Node
+from GangaCore.GPIDev.Base.Objects import Node, nextDirtyGeneration
 from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+from GangaCore.Core.GangaRepository.SubJobContainer import SubJobContainer
 
 from GangaCore.GPIDev.Base.Proxy import isType, stripProxy, getName
 
@@ -79,7 +81,7 @@ def check_app_hash(obj):
             logger.warning('https://github.com/ganga-devs/ganga/issues/')
 
 def safe_save(fn, _obj, to_file, ignore_subs=''):
-    """Try to save the XML for this object in as safe a way as possible
+    """Try to save the XML for this object in as safe a way as possible. Returns the number of bytes written
     Args:
         fn (str): This is the name of the file we are to save the object to
         _obj (GangaObject): This is the object which we want to save to the file
@@ -103,6 +105,7 @@ def safe_save(fn, _obj, to_file, ignore_subs=''):
         new_name = fn + '.new'
         with open(new_name, "w") as tmpfile:
             to_file(obj, tmpfile, ignore_subs)
+            written = tmpfile.tell()
 
         # everything ready so create new data file and backup old one
         if os.path.exists(new_name):
@@ -113,6 +116,8 @@ def safe_save(fn, _obj, to_file, ignore_subs=''):
 
             os.rename(new_name, fn)
 
+        return written
+
 # Global lock for above function - See issue #185
 safe_save.lock = threading.Lock()
 
@@ -125,7 +130,7 @@ def rmrf(name, count=0):
     """
 
     if count != 0:
-        logger.debug("Trying again to remove: %s" % name)
+        logger.debug("Trying again to remove: %s", name)
         if count == 3:
             logger.error("Tried 3 times to remove file/folder: %s" % name)
             from GangaCore.Core.exceptions import GangaException
@@ -141,8 +146,8 @@ def rmrf(name, count=0):
                 #logger.debug("Move completed")
         except OSError as err:
             if err.errno != errno.ENOENT:
-                logger.debug("rmrf Err: %s" % err)
-                logger.debug("name: %s" % name)
+                logger.debug("rmrf Err: %s", err)
+                logger.debug("name: %s", name)
                 raise
             return
 
@@ -151,8 +156,8 @@ def rmrf(name, count=0):
                 rmrf(os.path.join(remove_name, sfn), count)
             except OSError as err:
                 if err.errno == errno.EBUSY:
-                    logger.debug("rmrf Remove err: %s" % err)
-                    logger.debug("name: %s" % remove_name)
+                    logger.debug("rmrf Remove err: %s", err)
+                    logger.debug("name: %s", remove_name)
                     ## Sleep 2 sec and try again
                     time.sleep(2.)
                     rmrf(os.path.join(remove_name, sfn), count+1)
@@ -162,7 +167,7 @@ def rmrf(name, count=0):
             if err.errno == errno.ENOTEMPTY:
                 rmrf(remove_name, count+1)
             elif err.errno != errno.ENOENT:
-                logger.debug("%s" % err)
+                logger.debug("%s", err)
                 raise
             return
     else:
@@ -172,8 +177,8 @@ def rmrf(name, count=0):
         except OSError as err:
             if err.errno not in [errno.ENOENT, errno.EBUSY]:
                 raise
-            logger.debug("rmrf Move err: %s" % err)
-            logger.debug("name: %s" % name)
+            logger.debug("rmrf Move err: %s", err)
+            logger.debug("name: %s", name)
             if err.errno == errno.EBUSY:
                 rmrf(name, count+1)
             return
@@ -182,8 +187,8 @@ def rmrf(name, count=0):
             os.remove(remove_name)
         except OSError as err:
             if err.errno != errno.ENOENT:
-                logger.debug("%s" % err)
-                logger.debug("name: %s" % remove_name)
+                logger.debug("%s", err)
+                logger.debug("name: %s", remove_name)
                 raise
             return
 
@@ -208,6 +213,14 @@ class GangaRepositoryLocal(GangaRepository):
         self._cache_load_timestamp = {}
         self.printed_explanation = False
         self._fully_loaded = {}
+        # Single file index of all objects, replaces reading the per-object index files on startup
+        self._index_store = IndexStore(os.path.join(self.root, "index.store"))
+        self._index_store_ok = False
+        self._pending_index = {}
+        # (mtime, ids) of the object directories found in each chunk directory, see _reconcile_index_store
+        self._chunk_listings = {}
+        # Number of bytes of object data written to disk by this repository, see RegistryFlusher
+        self.bytes_written = 0
 
     def startup(self):
         """ Starts a repository and reads in a directory structure.
@@ -248,9 +261,12 @@ class GangaRepositoryLocal(GangaRepository):
         else:
             raise RepositoryError(self, "Unable to launch due to unknown file-locking Strategy: \"%s\"" % getConfig('Configuration')['lockingStrategy'])
         self.sessionlock.startup()
+        self._index_store = IndexStore(os.path.join(self.root, "index.store"))
+        self._index_store_ok = False
+        self._pending_index = {}
         # Load the list of files, this time be verbose and print out a summary
         # of errors
-        self.update_index(True, True)
+        self.update_index(True, True, True)
         logger.debug("GangaRepositoryLocal Finished Startup")
 
     def shutdown(self):
@@ -259,12 +275,13 @@ class GangaRepositoryLocal(GangaRepository):
         Write an index file for all new objects in memory and master index file of indexes"""
         from GangaCore.Utility.logging import getLogger
         logger = getLogger()
-        logger.debug("Shutting Down GangaRepositoryLocal: %s" % self.registry.name)
+        logger.debug("Shutting Down GangaRepositoryLocal: %s", self.registry.name)
         for k in self._fully_loaded:
             try:
                 self.index_write(k, True)
             except Exception as err:
                 logger.error("Warning: problem writing index object with id %s" % k)
+        self._flush_index_store()
         try:
             self._write_master_cache(True)
         except Exception as err:
@@ -300,18 +317,26 @@ class GangaRepositoryLocal(GangaRepository):
             this_id (int): This is the id for which we want to load the index file from disk
         """
         #logger.debug("Loading index %s" % this_id)
-        fn = self.get_idxfn(this_id)
-        # index timestamp changed
-        fn_ctime = os.stat(fn).st_ctime
+        entry = self._index_store.get(this_id) if self._index_store_ok else None
+        if entry is not None:
+            fn = self._index_store.filename
+            fn_ctime = entry[3]
+        else:
+            fn = self.get_idxfn(this_id)
+            # index timestamp changed
+            fn_ctime = os.stat(fn).st_ctime
         cache_time = self._cache_load_timestamp.get(this_id, 0)
         if cache_time != fn_ctime:
-            logger.debug("%s != %s" % (cache_time, fn_ctime))
-            try:
-                with open(fn, 'r') as fobj:
-                    cat, cls, cache = pickle_from_file(fobj)[0]
-            except Exception as x:
-                logger.warning("index_load Exception: %s" % x)
-                raise IOError("Error on unpickling: %s %s" %(getName(x), x))
+            logger.debug("%s != %s", cache_time, fn_ctime)
+            if entry is not None:
+                cat, cls, cache = entry[:3]
+            else:
+                try:
+                    with open(fn, 'r') as fobj:
+                        cat, cls, cache = pickle_from_file(fobj)[0]
+                except Exception as x:
+                    logger.warning("index_load Exception: %s" % x)
+                    raise IOError("Error on unpickling: %s %s" %(getName(x), x))
             if this_id in self.objects:
                 obj = self.objects[this_id]
                 setattr(obj, "_registry_refresh", True)
@@ -337,7 +362,7 @@ class GangaRepositoryLocal(GangaRepository):
             setattr(self.objects[this_id], '_registry_refresh', True)
             return True
         else:
-            logger.debug("Doubly loading of object with ID: %s" % this_id)
+            logger.debug("Doubly loading of object with ID: %s", this_id)
             logger.debug("Just silently continuing")
         return False
 
@@ -349,7 +374,7 @@ class GangaRepositoryLocal(GangaRepository):
             shutdown (bool): True causes this to always be written regardless of any checks"""
         if this_id in self.incomplete_objects:
             return
-        logger.debug("Writing index: %s" % this_id)
+        logger.debug("Writing index: %s", this_id)
         obj = self.objects[this_id]
         try:
             ifn = self.get_idxfn(this_id)
@@ -358,25 +383,128 @@ class GangaRepositoryLocal(GangaRepository):
                 new_cache = new_idx_cache
                 with open(ifn, "w") as this_file:
                     new_index = (obj._category, getName(obj), new_cache)
-                    logger.debug("Writing: %s" % str(new_index))
+                    logger.debug("Writing: %s", new_index)
                     pickle_to_file(new_index, this_file)
                 self._cached_obj[this_id] = new_cache
                 obj._index_cache = {}
             self._cached_obj[this_id] = new_idx_cache
+            new_entry = (obj._category, getName(obj), new_idx_cache)
+            store_entry = self._index_store.get(this_id)
+            if store_entry is None or store_entry[:3] != new_entry:
+                self._pending_index[this_id] = new_entry
+            else:
+                self._cache_load_timestamp[this_id] = store_entry[3]
         except IOError as err:
             logger.error("Index saving to '%s' failed: %s %s" % (ifn, getName(err), err))
 
-    def get_index_listing(self):
-        """Get dictionary of possible objects in the Repository: True means index is present,
-            False if not present
-        Raise RepositoryError"""
+    def _flush_index_store(self):
+        """
+        Write the index entries queued by index_write to the index store in one go
+        """
+        if not self._pending_index:
+            return
+        pending = self._pending_index
+        self._pending_index = {}
+        try:
+            mtime = self._index_store.write([(this_id, cat, cls, cache) for this_id, (cat, cls, cache) in pending.iteritems()])
+        except (IOError, OSError, IndexStoreError) as err:
+            logger.warning("Failed to write to the index store '%s': %s" % (self._index_store.filename, err))
+            self._index_store_ok = False
+            return
+        for this_id in pending:
+            self._cache_load_timestamp[this_id] = mtime
+
+    def _read_index_store(self):
+        """
+        Read any changes to the index store since the last call.
+        Returns True if the store can be trusted as the listing of all objects in the repository
+        """
+        if not self._index_store.exists():
+            return False
+        try:
+            self._index_store.read()
+        except (IOError, OSError, IndexStoreError) as err:
+            logger.warning("Ignoring the index store '%s', the repository will be scanned instead: %s" % (self._index_store.filename, err))
+            return False
+        return True
+
+    def _populate_index_store(self):
+        """
+        (Re)Create the index store from the index information found by scanning the repository
+        """
+        items = [(this_id, self._cached_cat[this_id], self._cached_cls[this_id], self._cached_obj[this_id])
+                    for this_id in self._cache_load_timestamp if this_id in self._cached_cat and this_id not in self.incomplete_objects]
+        logger.debug("Populating index store '%s' with %s entries", self._index_store.filename, len(items))
+        try:
+            mtime = self._index_store.replace(items)
+        except (IOError, OSError, IndexStoreError) as err:
+            logger.warning("Failed to create the index store '%s': %s" % (self._index_store.filename, err))
+            return
+        for this_id, _, _, _ in items:
+            self._cache_load_timestamp[this_id] = mtime
+        self._index_store_ok = True
+
+    def _list_chunks(self):
+        """
+        Returns the names of the chunk directories (e.g. 1xxx) of the repository
+        Raise RepositoryError
+        """
         try:
             if not os.path.exists(self.root):
                 os.makedirs(self.root)
-            obj_chunks = [d for d in os.listdir(self.root) if d.endswith("xxx") and d[:-3].isdigit()]
+            return [d for d in os.listdir(self.root) if d.endswith("xxx") and d[:-3].isdigit()]
         except OSError as err:
-            logger.debug("get_index_listing Exception: %s" % err)
+            logger.debug("get_index_listing Exception: %s", err)
             raise RepositoryError(self, "Could not list repository '%s'!" % (self.root))
+
+    def _reconcile_index_store(self):
+        """
+        Returns the listing of the repository from the index store, checked against the object directories on disk.
+        Objects which are only on disk (created by an older release, or by a session which died before writing to the
+        store) are listed without index, and those deleted by an older release are removed from the store.
+        Only the chunk directories modified since the last call are listed again.
+        Raise RepositoryError
+        """
+        on_disk = set()
+        chunk_listings = {}
+        now = time.time()
+        for c in self._list_chunks():
+            chunk_dir = os.path.join(self.root, c)
+            try:
+                mtime = os.stat(chunk_dir).st_mtime
+                listing = self._chunk_listings.get(c)
+                if listing is None or listing[0] != mtime:
+                    listing = (mtime, set(int(l) for l in os.listdir(chunk_dir) if l.isdigit()))
+            except OSError as err:
+                logger.debug("get_index_listing Exception: %s", err)
+                raise RepositoryError(self, "Could not list repository '%s'!" % (chunk_dir))
+            # a directory changed within the resolution of its mtime may change again unnoticed
+            if now - mtime > 1:
+                chunk_listings[c] = listing
+            on_disk.update(listing[1])
+        self._chunk_listings = chunk_listings
+
+        objs = dict((this_id, this_id in on_disk) for this_id in self._index_store.ids())
+        stale_ids = [this_id for this_id, present in objs.iteritems() if not present]
+        if stale_ids:
+            logger.debug("Removing ids deleted behind the index store: %s", stale_ids)
+            try:
+                self._index_store.remove(stale_ids)
+            except (IOError, OSError, IndexStoreError) as err:
+                logger.warning("Failed to remove ids %s from the index store: %s" % (stale_ids, err))
+            for this_id in stale_ids:
+                del objs[this_id]
+        for this_id in on_disk:
+            objs.setdefault(this_id, False)
+        return objs
+
+    def get_index_listing(self):
+        """Get dictionary of possible objects in the Repository: True means index is present,
+            False if not present
+        Raise RepositoryError"""
+        if self._index_store_ok:
+            return self._reconcile_index_store()
+        obj_chunks = self._list_chunks()
         objs = {}  # True means index is present, False means index not present
         for c in obj_chunks:
             try:
@@ -395,7 +523,7 @@ class GangaRepositoryLocal(GangaRepository):
                             rmrf(self.get_idxfn(this_id))
                             logger.warning("Deleted index file without data file: %s" % self.get_idxfn(this_id))
                         except OSError as err:
-                            logger.debug("get_index_listing delete Exception: %s" % err)
+                            logger.debug("get_index_listing delete Exception: %s", err)
         return objs
 
     def _read_master_cache(self):
@@ -421,7 +549,7 @@ class GangaRepositoryLocal(GangaRepository):
         except Exception as err:
             GangaCore.Utility.logging.log_unknown_exception()
             logger.debug("Master Index corrupt, ignoring it")
-            logger.debug("Exception: %s" % err)
+            logger.debug("Exception: %s", err)
             self._clear_stored_cache()
         finally:
             rmrf(os.path.join(self.root, 'master.idx'))
@@ -452,6 +580,7 @@ class GangaRepositoryLocal(GangaRepository):
                 if abs(self._master_index_timestamp - os.stat(_master_idx).st_ctime) < 300:
                     return
 
+            new_indexes = {}
             items_to_save = self.objects.iteritems()
             for k, v in items_to_save:
                 if k in self.incomplete_objects:
@@ -465,16 +594,34 @@ class GangaRepositoryLocal(GangaRepository):
                             new_index = self.registry.getIndexCache(stripProxy(obj))
 
                         if new_index is not None:
-                            #logger.debug("k: %s" % k)
-                            arr_k = [k]
-                            if len(self.lock(arr_k)) != 0:
-                                self.index_write(k)
-                                self.unlock(arr_k)
-                                self._cached_obj[k] = new_index
+                            new_indexes[k] = new_index
 
                 except Exception as err:
-                    logger.debug("Failed to update index: %s on startup/shutdown" % k)
-                    logger.debug("Reason: %s" % err)
+                    logger.debug("Failed to update index: %s on startup/shutdown", k)
+                    logger.debug("Reason: %s", err)
+
+            if new_indexes:
+                # Lock all of them at once and only release those which weren't locked already
+                with self.sessionlock.batch():
+                    held = set(self.sessionlock.locked)
+                    locked = self.lock(new_indexes.keys())
+                    try:
+                        for k in locked:
+                            try:
+                                self.index_write(k)
+                                self._cached_obj[k] = new_indexes[k]
+                            except Exception as err:
+                                logger.debug("Failed to update index: %s on startup/shutdown", k)
+                                logger.debug("Reason: %s", err)
+                    finally:
+                        self.unlock([k for k in locked if k not in held])
+
+            if self._index_store_ok:
+                # The index store supersedes the master index, just keep it compact
+                self._flush_index_store()
+                if self._index_store.needs_compaction():
+                    self._index_store.compact()
+                return
 
             iterables = self._cache_load_timestamp.iteritems()
             for k, v in iterables:
@@ -489,8 +636,8 @@ class GangaRepositoryLocal(GangaRepository):
                     else:
                         time = -1
                 except OSError as err:
-                    logger.debug("_write_master_cache: %s" % err)
-                    logger.debug("_cache_load_timestamp: %s" % self._cache_load_timestamp)
+                    logger.debug("_write_master_cache: %s", err)
+                    logger.debug("_cache_load_timestamp: %s", self._cache_load_timestamp)
                     import errno
                     if err.errno == errno.ENOENT:  # If file is not found
                         time = -1
@@ -508,13 +655,13 @@ class GangaRepositoryLocal(GangaRepository):
                 with open(_master_idx, 'w') as of:
                     pickle_to_file(this_master_cache, of)
             except IOError as err:
-                logger.debug("write_master: %s" % err)
+                logger.debug("write_master: %s", err)
                 try:
                     os.remove(os.path.join(self.root, 'master.idx'))
                 except OSError as x:
                     GangaCore.Utility.logging.log_user_exception(True)
         except Exception as err:
-            logger.debug("write_error2: %s" % err)
+            logger.debug("write_error2: %s", err)
             GangaCore.Utility.logging.log_unknown_exception()
 
         return
@@ -537,15 +684,21 @@ class GangaRepositoryLocal(GangaRepository):
         """
         # First locate and load the index files
         logger.debug("updating index...")
+        # If the index store is there it's the listing of the repository, otherwise scan the repo and (re)create it
+        self._index_store_ok = self._read_index_store()
         objs = self.get_index_listing()
         changed_ids = []
         deleted_ids = set(self.objects.keys())
         summary = []
-        if firstRun:
+        if firstRun and not self._index_store_ok:
             self._read_master_cache()
         logger.debug("Iterating over Items")
 
         locked_ids = self.sessionlock.locked
+        if self._index_store_ok:
+            # Objects we hold the lock on can't have been deleted by anyone else,
+            # they're just not in the store yet if they've not been flushed
+            deleted_ids.difference_update(locked_ids)
 
         for this_id in objs.keys():
             deleted_ids.discard(this_id)
@@ -566,12 +719,12 @@ class GangaRepositoryLocal(GangaRepository):
                     changed_ids.append(this_id)
                 continue
             except IOError as err:
-                logger.debug("IOError: Failed to load index %i: %s" % (this_id, err))
+                logger.debug("IOError: Failed to load index %i: %s", this_id, err)
             except OSError as err:
-                logger.debug("OSError: Failed to load index %i: %s" % (this_id, err))
+                logger.debug("OSError: Failed to load index %i: %s", this_id, err)
             except PluginManagerError as err:
                 # Probably should be DEBUG
-                logger.debug("PluginManagerError: Failed to load index %i: %s" % (this_id, err))
+                logger.debug("PluginManagerError: Failed to load index %i: %s", this_id, err)
                 # This is a FATAL error - do not try to load the main file, it
                 # will fail as well
                 summary.append((this_id, err))
@@ -581,7 +734,7 @@ class GangaRepositoryLocal(GangaRepository):
             # Try to load it!
             if not this_id in self.objects:
                 try:
-                    logger.debug("Loading disk based Object: %s from %s as indexes were missing" % (this_id, self.registry.name))
+                    logger.debug("Loading disk based Object: %s from %s as indexes were missing", this_id, self.registry.name)
                     self.load([this_id])
                     changed_ids.append(this_id)
                     # Write out a new index if the file can be locked
@@ -595,13 +748,13 @@ class GangaRepositoryLocal(GangaRepository):
                                 self.objects[this_id]._setDirty()
                         #self.unlock([this_id])
                 except KeyError as err:
-                    logger.debug("update Error: %s" % err)
+                    logger.debug("update Error: %s", err)
                     # deleted job
                     if this_id in self.objects:
                         self._internal_del__(this_id)
                         changed_ids.append(this_id)
                 except (InaccessibleObjectError, ) as x:
-                    logger.debug("update_index: Failed to load id %i: %s" % (this_id, x))
+                    logger.debug("update_index: Failed to load id %i: %s", this_id, x)
                     summary.append((this_id, x))
 
         logger.debug("Iterated over Items")
@@ -637,6 +790,10 @@ class GangaRepositoryLocal(GangaRepository):
                 self.printed_explanation = True
         logger.debug("updated index done")
 
+        if not self._index_store_ok:
+            self._populate_index_store()
+        self._flush_index_store()
+
         if len(changed_ids) != 0:
             isShutdown = not firstRun
             self._write_master_cache(isShutdown)
@@ -679,7 +836,7 @@ class GangaRepositoryLocal(GangaRepository):
                         for j in range(sj_len):
                             getattr(objs[i], self.sub_split)[j]._dirty = True
                 except AttributeError as err:
-                    logger.debug("RepoXML add Exception: %s" % err)
+                    logger.debug("RepoXML add Exception: %s", err)
 
         logger.debug("Added")
 
@@ -710,21 +867,23 @@ class GangaRepositoryLocal(GangaRepository):
                     getattr(obj, self.sub_split).flush()
                 else:
                     # I have been constructed in this session, I don't know how to flush!
-                    if hasattr(getattr(obj, self.sub_split)[0], "_dirty"):
+                    # (unless the subjobs go into a container, which SubJobXMLList takes care of below)
+                    if hasattr(getattr(obj, self.sub_split)[0], "_dirty") and not getConfig('Configuration')['subjobContainer']:
                         split_cache = getattr(obj, self.sub_split)
                         for i in range(len(split_cache)):
                             if not split_cache[i]._dirty:
                                 continue
                             sfn = os.path.join(os.path.dirname(fn), str(i), self.dataFileName)
                             if not os.path.exists(os.path.dirname(sfn)):
-                                logger.debug("Constructing Folder: %s" % os.path.dirname(sfn))
+                                logger.debug("Constructing Folder: %s", os.path.dirname(sfn))
                                 os.makedirs(os.path.dirname(sfn))
                             else:
-                                logger.debug("Using Folder: %s" % os.path.dirname(sfn))
-                            safe_save(sfn, split_cache[i], self.to_file)
+                                logger.debug("Using Folder: %s", os.path.dirname(sfn))
+                            self.bytes_written += safe_save(sfn, split_cache[i], self.to_file)
                             split_cache[i]._setFlushed()
                     # Now generate an index file to take advantage of future non-loading goodness
-                    tempSubJList = SubJobXMLList(os.path.dirname(fn), self.registry, self.dataFileName, False, obj)
+                    # (the parent is only set afterwards so that not finding an index doesn't make the object dirty)
+                    tempSubJList = SubJobXMLList(os.path.dirname(fn), self.registry, self.dataFileName, False)
                     ## equivalent to for sj in job.subjobs
                     tempSubJList._setParent(obj)
                     job_dict = {}
@@ -734,7 +893,12 @@ class GangaRepositoryLocal(GangaRepository):
                     tempSubJList.flush(ignore_disk=True)
                     del tempSubJList
 
-                safe_save(fn, obj, self.to_file, self.sub_split)
+                # Only write the master again if something which is stored with it has changed
+                if obj._own_dirty_gen or not obj._dirty_gen or not os.path.exists(fn) or \
+                        not hasattr(getattr(obj, self.sub_split), 'flush'):
+                    self.bytes_written += safe_save(fn, obj, self.to_file, self.sub_split)
+                else:
+                    logger.debug("Only the subjobs of %s have changed", this_id)
                 # clean files not in subjobs anymore... (bug 64041)
                 for idn in os.listdir(os.path.dirname(fn)):
                     split_cache = getattr(obj, self.sub_split)
@@ -744,11 +908,12 @@ class GangaRepositoryLocal(GangaRepository):
 
                 logger.debug("not has_children")
 
-                safe_save(fn, obj, self.to_file, "")
+                self.bytes_written += safe_save(fn, obj, self.to_file, "")
                 # clean files leftover from sub_split
                 for idn in os.listdir(os.path.dirname(fn)):
                     if idn.isdigit():
                         rmrf(os.path.join(os.path.dirname(fn), idn))
+                SubJobContainer.in_dir(os.path.dirname(fn)).remove()
             if this_id not in self.incomplete_objects:
                 self.index_write(this_id)
         else:
@@ -764,7 +929,7 @@ class GangaRepositoryLocal(GangaRepository):
         Args:
             ids (list): List of integers, used as keys to objects in the self.objects dict
         """
-        logger.debug("Flushing: %s" % ids)
+        logger.debug("Flushing: %s", ids)
 
         #import traceback
         #traceback.print_stack()
@@ -773,7 +938,8 @@ class GangaRepositoryLocal(GangaRepository):
                 logger.debug("Should NEVER re-flush an incomplete object, it's now 'bad' respect this!")
                 continue
             try:
-                logger.debug("safe_flush: %s" % this_id)
+                logger.debug("safe_flush: %s", this_id)
+                flush_generation = nextDirtyGeneration()
                 self._safe_flush_xml(this_id)
 
                 self._cache_load_timestamp[this_id] = time.time()
@@ -790,17 +956,16 @@ class GangaRepositoryLocal(GangaRepository):
                 if this_id not in self._fully_loaded:
                     self._fully_loaded[this_id] = self.objects[this_id]
 
-                subobj_attr = getattr(self.objects[this_id], self.sub_split, None)
-                sub_attr_dirty = getattr(subobj_attr, '_dirty', False)
-                if sub_attr_dirty:
-                    if hasattr(subobj_attr, 'flush'):
-                        subobj_attr.flush()
-
-                self.objects[this_id]._setFlushed()
+                # The subjobs have been flushed along with the object by _safe_flush_xml. Anything changed while
+                # that was going on stays dirty so that it is written out next time
+                if not self.objects[this_id]._isDirtySince(flush_generation):
+                    self.objects[this_id]._setFlushed()
 
             except (OSError, IOError, XMLFileError) as x:
                 raise RepositoryError(self, "Error of type: %s on flushing id '%s': %s" % (type(x), this_id, x))
 
+        self._flush_index_store()
+
     def _check_index_cache(self, obj, this_id):
         """
         Checks the index cache of "this_id" against the index cache generated from the "obj"ect
@@ -812,8 +977,8 @@ class GangaRepositoryLocal(GangaRepository):
         """
         new_idx_cache = self.registry.getIndexCache(stripProxy(obj))
         if new_idx_cache != obj._index_cache:
-            logger.debug("NEW: %s" % new_idx_cache)
-            logger.debug("OLD: %s" % obj._index_cache)
+            logger.debug("NEW: %s", new_idx_cache)
+            logger.debug("OLD: %s", obj._index_cache)
             # index is wrong! Try to get read access - then we can fix this
             if len(self.lock([this_id])) != 0:
                 if this_id not in self.incomplete_objects:
@@ -835,7 +1000,7 @@ class GangaRepositoryLocal(GangaRepository):
                 if not old_idx_subset and not new_idx_subset:
                     if not GANGA_SWAN_INTEGRATION:
                         logger.warning("Incorrect index cache of '%s' object #%s was corrected!" % (self.registry.name, this_id))
-                    logger.debug("old cache: %s\t\tnew cache: %s" % (obj._index_cache, new_idx_cache))
+                    logger.debug("old cache: %s\t\tnew cache: %s", obj._index_cache, new_idx_cache)
                     self.unlock([this_id])
             else:
                 pass
@@ -918,7 +1083,7 @@ class GangaRepositoryLocal(GangaRepository):
         b4=time.time()
         tmpobj, errs = self.from_file(fobj)
         a4=time.time()
-        logger.debug("Loading XML file for ID: %s took %s sec" % (this_id, a4-b4))
+        logger.debug("Loading XML file for ID: %s took %s sec", this_id, a4-b4)
 
         if len(errs) > 0:
             logger.error("#%s Error(s) Loading File: %s" % (len(errs), fobj.name))
@@ -926,13 +1091,13 @@ class GangaRepositoryLocal(GangaRepository):
                 logger.error("err: %s" % err)
             raise InaccessibleObjectError(self, this_id, errs[0])
 
-        logger.debug("Checking children: %s" % str(this_id))
+        logger.debug("Checking children: %s", this_id)
 	#logger.debug("Checking in: %s" % os.path.dirname(fn))
 	#logger.debug("found: %s" % os.listdir(os.path.dirname(fn)))
 
         has_children = SubJobXMLList.checkJobHasChildren(os.path.dirname(fn), self.dataFileName)
 
-        logger.debug("Found children: %s" % str(has_children))
+        logger.debug("Found children: %s", has_children)
 
         self._parse_xml(fn, this_id, load_backup, has_children, tmpobj)
 
@@ -976,7 +1141,7 @@ class GangaRepositoryLocal(GangaRepository):
                     self._internal_del__(this_id)
                     rmrf(os.path.dirname(fn) + ".index")
                 except OSError as err:
-                    logger.debug("load unlink Error: %s" % err)
+                    logger.debug("load unlink Error: %s", err)
                     pass
                 raise KeyError(this_id)
             else:
@@ -989,7 +1154,7 @@ class GangaRepositoryLocal(GangaRepository):
                         os.rmdir(os.path.dirname(fn))
                         logger.warning("No job index or data found, removing empty directory: %s" % os.path.dirname(fn))
             except Exception as err:
-                logger.debug("load error %s" % err)
+                logger.debug("load error %s", err)
                 pass
 
         return fobj, has_loaded_backup
@@ -1008,7 +1173,7 @@ class GangaRepositoryLocal(GangaRepository):
         #traceback.print_stack()
         #print("\n")
 
-        logger.debug("Loading Repo object(s): %s" % ids)
+        logger.debug("Loading Repo object(s): %s", ids)
 
         for this_id in ids:
 
@@ -1027,8 +1192,8 @@ class GangaRepositoryLocal(GangaRepository):
                 if has_loaded_backup2:
                     has_loaded_backup = has_loaded_backup2
             except Exception as err:
-                logger.debug("XML load: Failed to load XML file: %s" % fn)
-                logger.debug("Error was:\n%s" % err)
+                logger.debug("XML load: Failed to load XML file: %s", fn)
+                logger.debug("Error was:\n%s", err)
                 logger.error("Adding id: %s to Corrupt IDs will not attempt to re-load this session" % this_id)
                 self.incomplete_objects.append(this_id)
                 raise
@@ -1036,7 +1201,7 @@ class GangaRepositoryLocal(GangaRepository):
             try:
                 self._load_xml_from_obj(fobj, fn, this_id, load_backup)
             except RepositoryError as err:
-                logger.debug("Repo Exception: %s" % err)
+                logger.debug("Repo Exception: %s", err)
                 logger.error("Adding id: %s to Corrupt IDs will not attempt to re-load this session" % this_id)
                 self.incomplete_objects.append(this_id)
                 raise
@@ -1067,7 +1232,7 @@ class GangaRepositoryLocal(GangaRepository):
             if sub_attr_dirty:
                 getattr(self.objects[this_id], self.sub_split)._setDirty()
 
-        logger.debug("Finished 'load'-ing of: %s" % ids)
+        logger.debug("Finished 'load'-ing of: %s", ids)
 
 
     def _handle_load_exception(self, err, fn, this_id, load_backup):
@@ -1085,10 +1250,10 @@ class GangaRepositoryLocal(GangaRepository):
             logger.error("Actual Error was:\n%s" % err)
 
         if load_backup:
-            logger.debug("Could not load backup object #%s: %s" % (this_id, err))
+            logger.debug("Could not load backup object #%s: %s", this_id, err)
             raise InaccessibleObjectError(self, this_id, err)
 
-        logger.debug("Could not load object #%s: %s" % (this_id, err))
+        logger.debug("Could not load object #%s: %s", this_id, err)
 
         # try loading backup
         try:
@@ -1096,7 +1261,7 @@ class GangaRepositoryLocal(GangaRepository):
             logger.warning("Object '%s' #%s loaded from backup file - recent changes may be lost." % (self.registry.name, this_id))
             return True
         except Exception as err2:
-            logger.debug("Exception when loading backup: %s" % err2 )
+            logger.debug("Exception when loading backup: %s", err2)
 
         logger.error("XML File failed to load for Job id: %s" % this_id)
         logger.error("Actual Error was:\n%s" % err2)
@@ -1125,13 +1290,18 @@ class GangaRepositoryLocal(GangaRepository):
             try:
                 rmrf(os.path.dirname(fn) + ".index")
             except OSError as err:
-                logger.debug("Delete Error: %s" % err)
+                logger.debug("Delete Error: %s", err)
+            self._pending_index.pop(this_id, None)
             self._internal_del__(this_id)
             rmrf(os.path.dirname(fn))
             if this_id in self._fully_loaded:
                 del self._fully_loaded[this_id]
             if this_id in self.objects:
                 del self.objects[this_id]
+        try:
+            self._index_store.remove(ids)
+        except (IOError, OSError, IndexStoreError) as err:
+            logger.warning("Failed to remove ids %s from the index store: %s" % (ids, err))
 
     def lock(self, ids):
         """
@@ -1190,6 +1360,9 @@ class GangaRepositoryLocal(GangaRepository):
         Args:
             obj (GangaObject): The object we want to know if it was loaded into memory
         """
+        this_id = getattr(obj, '_registry_id', None)
+        if this_id is not None and self.objects.get(this_id) is obj:
+            return self._fully_loaded.get(this_id) is obj
         try:
             _id = next(id_ for id_, o in self._fully_loaded.items() if o is obj)
             return True
@@ -0,0 +1,273 @@
+# This class (IndexStore) keeps the index information of all objects in a repository in one append-only file.
+#
+# Layout of the file on disk:
+#
+#   MAGIC
+#   record*
+#
+# with every record being
+#
+#   >II   (length of payload, crc32 of payload)
+#   payload = pickle((id, category, classname, index_cache, mtime))
+#
+# A record with category None is a tombstone marking the removal of an id. Later records override earlier ones,
+# so an update is a single append and startup is a single sequential read of the file.
+#
+# * Crash safety: a record is only accepted if it is complete and its checksum matches. A torn record at the end of the
+#   file (e.g. a crash during a write) is ignored by readers and truncated by the next writer.
+# * Concurrency: writers serialise through an fcntl lock on the store itself. Readers never lock, they only trust
+#   records which are complete. Compaction writes a new file and renames it over the old one, readers notice the
+#   change of inode and re-read the whole file.
+
+import os
+import errno
+import fcntl
+import struct
+import time
+import zlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+_MAGIC = 'GANGAIDX1\n'
+_HEADER = struct.Struct('>II')
+
+# Compact the store once it holds this many times more records than live ids (and is large enough to care)
+_COMPACT_RATIO = 3
+_COMPACT_MIN_RECORDS = 1000
+
+
+class IndexStoreError(Exception):
+
+    """Raised when the index store can't be used, the caller should fall back to the per-object index files"""
+    pass
+
+
+class IndexStore(object):
+
+    """
+    Persistent id -> (category, class, index_cache, mtime) table of a repository which lives in a single file.
+    All methods are expected to be called with the repository lock held (as for the rest of GangaRepositoryLocal)
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): Full path of the file backing this store
+        """
+        super(IndexStore, self).__init__()
+        self.filename = filename
+        # id -> (category, classname, index_cache, mtime)
+        self.entries = {}
+        # offset up to which the file has been read and the inode which it belongs to
+        self._offset = 0
+        self._inode = None
+        # number of records found on disk, used to decide when to compact
+        self._n_records = 0
+
+    def exists(self):
+        """ Returns True if there is a store on disk which can be used"""
+        return os.path.isfile(self.filename)
+
+    def get(self, this_id):
+        """ Returns the (category, classname, index_cache, mtime) entry for this id or None
+        Args:
+            this_id (int): id of the object
+        """
+        return self.entries.get(this_id)
+
+    def ids(self):
+        """ Returns the list of ids known to the store"""
+        return self.entries.keys()
+
+    def _parse(self, data, start):
+        """ Parse the complete records found in data, returns list of records and the offset after the last good one
+        Args:
+            data (str): The raw contents of the file from offset 'start'
+            start (int): Offset of data within the file
+        """
+        records = []
+        pos = 0
+        end = len(data)
+        while pos + _HEADER.size <= end:
+            length, crc = _HEADER.unpack_from(data, pos)
+            payload_start = pos + _HEADER.size
+            if payload_start + length > end:
+                break
+            payload = data[payload_start:payload_start + length]
+            if zlib.crc32(payload) & 0xffffffff != crc:
+                logger.debug("IndexStore: bad checksum at offset %s of %s" % (start + pos, self.filename))
+                break
+            try:
+                records.append(pickle.loads(payload))
+            except Exception as err:
+                logger.debug("IndexStore: corrupt record at offset %s of %s: %s" % (start + pos, self.filename, err))
+                break
+            pos = payload_start + length
+        return records, start + pos
+
+    def read(self):
+        """ Read all records which were appended since the last call (or the whole file if it was replaced).
+        Returns the set of ids whose entries changed
+        Raises IndexStoreError if the store doesn't exist or is not an index store
+        """
+        try:
+            fd = os.open(self.filename, os.O_RDONLY)
+        except OSError as err:
+            raise IndexStoreError("Can't open index store '%s': %s" % (self.filename, err))
+        changed = set()
+        try:
+            st = os.fstat(fd)
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                # New or compacted file, start again from scratch
+                magic = os.read(fd, len(_MAGIC))
+                if magic != _MAGIC:
+                    raise IndexStoreError("'%s' is not a valid index store" % self.filename)
+                changed.update(self.entries.keys())
+                self.entries = {}
+                self._n_records = 0
+                self._offset = len(_MAGIC)
+                self._inode = st.st_ino
+            if st.st_size > self._offset:
+                os.lseek(fd, self._offset, os.SEEK_SET)
+                chunks = []
+                to_read = st.st_size - self._offset
+                while to_read > 0:
+                    chunk = os.read(fd, min(to_read, 1048576))
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    to_read -= len(chunk)
+                records, self._offset = self._parse(''.join(chunks), self._offset)
+                for this_id, cat, cls, cache, mtime in records:
+                    if cat is None:
+                        if self.entries.pop(this_id, None) is not None:
+                            changed.add(this_id)
+                    else:
+                        self.entries[this_id] = (cat, cls, cache, mtime)
+                        changed.add(this_id)
+                self._n_records += len(records)
+        finally:
+            os.close(fd)
+        return changed
+
+    def _open_locked(self):
+        """ Open the store for appending with the write lock held.
+        Takes care of the store being replaced by another session while we were waiting for the lock """
+        while True:
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_ino == os.stat(self.filename).st_ino:
+                    return fd
+            except OSError as err:
+                if err.errno != errno.ENOENT:
+                    os.close(fd)
+                    raise
+            os.close(fd)
+
+    def _append(self, records):
+        """ Append the records to the store in one write
+        Args:
+            records (list): list of (id, category, classname, index_cache, mtime)
+        """
+        if not records:
+            return
+        data = []
+        for record in records:
+            payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+            data.append(_HEADER.pack(len(payload), zlib.crc32(payload) & 0xffffffff))
+            data.append(payload)
+        fd = self._open_locked()
+        try:
+            size = os.fstat(fd).st_size
+            if size == 0:
+                os.write(fd, _MAGIC)
+                size = len(_MAGIC)
+            else:
+                # Make sure we don't append behind a torn record
+                self.read()
+                if self._offset < size:
+                    logger.debug("IndexStore: truncating torn record(s) at end of %s" % self.filename)
+                    os.ftruncate(fd, self._offset)
+                    size = self._offset
+            os.lseek(fd, size, os.SEEK_SET)
+            os.write(fd, ''.join(data))
+            os.fsync(fd)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        # Pick up our own records (and anything else appended in the meantime)
+        self.read()
+
+    def write(self, items):
+        """ Store the index information for a list of objects
+        Args:
+            items (list): list of (id, category, classname, index_cache)
+        Returns the mtime which has been recorded for these entries
+        """
+        now = time.time()
+        self._append([(this_id, cat, cls, cache, now) for this_id, cat, cls, cache in items])
+        return now
+
+    def remove(self, ids):
+        """ Remove the index information of these ids from the store
+        Args:
+            ids (list): ids of the objects which have been deleted
+        """
+        now = time.time()
+        self._append([(this_id, None, None, None, now) for this_id in ids if this_id in self.entries])
+
+    def needs_compaction(self):
+        """ Returns True if the file contains many more records than entries"""
+        return self._n_records > _COMPACT_MIN_RECORDS and self._n_records > _COMPACT_RATIO * len(self.entries)
+
+    def _rewrite(self, entries):
+        """ Replace the store with one containing exactly these entries.
+        The new store is written next to the old one and renamed over it, so readers are never disturbed
+        Args:
+            entries (dict): id -> (category, classname, index_cache, mtime)
+        """
+        new_name = self.filename + '.new'
+        with open(new_name, 'wb') as new_file:
+            new_file.write(_MAGIC)
+            for this_id, (cat, cls, cache, mtime) in entries.iteritems():
+                payload = pickle.dumps((this_id, cat, cls, cache, mtime), pickle.HIGHEST_PROTOCOL)
+                new_file.write(_HEADER.pack(len(payload), zlib.crc32(payload) & 0xffffffff))
+                new_file.write(payload)
+            new_file.flush()
+            os.fsync(new_file.fileno())
+        os.rename(new_name, self.filename)
+
+    def compact(self):
+        """ Rewrite the store so that it contains one record per live id"""
+        fd = self._open_locked()
+        try:
+            self.read()
+            self._rewrite(self.entries)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.read()
+
+    def replace(self, items):
+        """ Replace the whole contents of the store, used to (re)create it from the per-object index files
+        Args:
+            items (list): list of (id, category, classname, index_cache)
+        Returns the mtime which has been recorded for these entries
+        """
+        now = time.time()
+        fd = self._open_locked()
+        try:
+            self._rewrite(dict((this_id, (cat, cls, cache, now)) for this_id, cat, cls, cache in items))
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self.read()
+        return now
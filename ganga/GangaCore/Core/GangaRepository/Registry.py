@@ -9,10 +9,12 @@ from GangaCore.Core.exceptions import (GangaException,
 
 import time
 import threading
+from collections import deque, namedtuple
+from itertools import islice
 
 from GangaCore.Core.GangaThread.GangaThread import GangaThread
 from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
-from GangaCore.GPIDev.Base.Objects import GangaObject
+from GangaCore.GPIDev.Base.Objects import GangaObject, nextDirtyGeneration
 from GangaCore.GPIDev.Schema import Schema, Version
 from GangaCore.GPIDev.Base.Proxy import isType, getName
 from GangaCore.Utility.Config import getConfig
@@ -140,7 +142,7 @@ class IncompleteObject(GangaObject):
         with self.registry._flush_lock:
             with self.registry._read_lock:
                 self.registry._load(self)
-                logger.debug("Successfully reloaded '%s' object #%i!" % (self.registry.name, self.id))
+                logger.debug("Successfully reloaded '%s' object #%i!", self.registry.name, self.id)
 
     def remove(self):
         """
@@ -154,7 +156,7 @@ class IncompleteObject(GangaObject):
                     try:
                         errstr += " Object is locked by session '%s' " % self.registry.repository.get_lock_session(self.id)
                     except Exception as err:
-                        logger.debug("Remove Lock error: %s" % err)
+                        logger.debug("Remove Lock error: %s", err)
                     raise RegistryLockError(errstr)
                 self.registry.repository.delete([self.id])
 
@@ -212,7 +214,7 @@ class RegistryFlusher(GangaThread):
     lost if Ganga is shut down abruptly.
     """
 
-    __slots__ = ('registry', '_stop')
+    __slots__ = ('registry', '_stop', 'cycles', 'last_cycle_bytes', 'total_bytes')
 
     def __init__(self, registry, *args, **kwargs):
         """
@@ -225,6 +227,10 @@ class RegistryFlusher(GangaThread):
         super(RegistryFlusher, self).__init__(*args, **kwargs)
         self.registry = registry
         self._stop = threading.Event()
+        # Number of flushes done and the bytes written by the last one and by all of them
+        self.cycles = 0
+        self.last_cycle_bytes = 0
+        self.total_bytes = 0
 
     def stop(self):
         """
@@ -269,8 +275,124 @@ class RegistryFlusher(GangaThread):
             # It will lock all objects dirty as a result of the nature of the flush command
             logger.debug('Auto-flushing: %s', self.registry.name)
             if regConf['EnableAutoFlush']:
-                self.registry.flush_all()
-        logger.debug("Auto-Flusher shutting down for Registry: %s" % self.registry.name)
+                self.flush_cycle()
+        logger.debug("Auto-Flusher shutting down for Registry: %s", self.registry.name)
+
+    def flush_cycle(self):
+        """
+        Flush all dirty objects in the registry once and keep count of how much was written out doing it
+        """
+        bytes_before = self.registry.bytesWritten()
+        self.registry.flush_all()
+        self.last_cycle_bytes = self.registry.bytesWritten() - bytes_before
+        self.total_bytes += self.last_cycle_bytes
+        self.cycles += 1
+        logger.debug('Auto-flushed %s: %s bytes written', self.registry.name, self.last_cycle_bytes)
+
+
+RegistryChange = namedtuple('RegistryChange', ['seq', 'id', 'fields'])
+
+
+class RegistryChangeFeed(object):
+    """
+    Bounded, append-only log of the changes made to the objects of a registry by this session.
+    Each entry is a RegistryChange(seq, id, fields) where seq increases by one with every change and fields is a frozenset
+    of what changed (index cache keys such as 'status', or ADDED/REMOVED) or None if that isn't known.
+    Consumers hold a cursor, the last seq they have seen, and only fetch the entries after it.
+    Listeners are told about each change as it is recorded, e.g. to wake up a consumer waiting for one.
+    """
+
+    ADDED = '<added>'
+    REMOVED = '<removed>'
+
+    __slots__ = ('_entries', '_seq', '_cursors', '_lock', '_listeners')
+
+    def __init__(self, size):
+        """
+        Args:
+            size (int): Number of entries kept, older ones are dropped
+        """
+        self._entries = deque(maxlen=max(int(size), 1))
+        self._seq = 0
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def record(self, this_id, fields=None):
+        """
+        Append a change to the feed, returns its seq
+        Args:
+            this_id (int): id of the object which changed
+            fields (iterable, None): names of what changed, None if not known
+        """
+        with self._lock:
+            self._seq += 1
+            change = RegistryChange(self._seq, this_id, frozenset(fields) if fields is not None else None)
+            self._entries.append(change)
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as err:
+                logger.debug('Registry change listener %s failed: %s', listener, err)
+        return change.seq
+
+    def addListener(self, listener):
+        """
+        Call listener(change) with every change recorded from now on, from the thread recording it.
+        Listeners must be quick as they hold up whoever changed the object
+        Args:
+            listener (callable): Called with each RegistryChange
+        """
+        self._listeners = self._listeners + [listener]
+
+    def removeListener(self, listener):
+        """
+        Stop calling a listener added with addListener
+        Args:
+            listener (callable): The listener to remove
+        """
+        self._listeners = [l for l in self._listeners if l != listener]
+
+    def lastSeq(self):
+        """ Returns the seq of the latest change, 0 if there has been none """
+        return self._seq
+
+    def since(self, seq):
+        """
+        Returns the list of changes after seq, or None if some of them have already been dropped from the feed
+        Args:
+            seq (int): seq of the last change already seen
+        """
+        with self._lock:
+            return self._since(seq)
+
+    def _since(self, seq):
+        """
+        since() for callers holding the lock
+        Args:
+            seq (int): seq of the last change already seen
+        """
+        if seq >= self._seq:
+            return []
+        if not self._entries or self._entries[0].seq > seq + 1:
+            return None
+        # The entries are numbered consecutively so the wanted ones are the last (self._seq - seq), taken from the end
+        # so that this costs as much as the number of changes returned
+        return list(islice(reversed(self._entries), self._seq - seq))[::-1]
+
+    def poll(self, consumer):
+        """
+        Returns the changes since the last poll by this consumer and moves its cursor to the latest change.
+        Returns None on the first poll or if the consumer has fallen so far behind that changes were dropped,
+        the consumer then has to look at all objects again
+        Args:
+            consumer (str): name of the consumer, e.g. 'WebGUI'
+        """
+        with self._lock:
+            cursor = self._cursors.get(consumer)
+            changes = self._since(cursor) if cursor is not None else None
+            self._cursors[consumer] = self._seq
+        return changes
 
 
 class Registry(object):
@@ -279,7 +401,7 @@ class Registry(object):
     Base class providing a dict-like locked and lazy-loading interface to a Ganga repository
     """
 
-    __slots__ = ('name', 'doc', '_hasStarted', '_needs_metadata', 'metadata', '_read_lock', '_flush_lock', '_parent', 'repository', '_objects', '_incomplete_objects', 'flush_thread', 'type', 'location')
+    __slots__ = ('name', 'doc', '_hasStarted', '_needs_metadata', 'metadata', '_read_lock', '_flush_lock', '_parent', 'repository', '_objects', '_incomplete_objects', 'flush_thread', 'type', 'location', 'changes')
 
     def __init__(self, name, doc):
         """Registry constructor, giving public name and documentation
@@ -303,6 +425,8 @@ class Registry(object):
 
         self.flush_thread = None
 
+        self.changes = RegistryChangeFeed(getConfig('Registry')['ChangeFeedSize'])
+
     def hasStarted(self):
         """
         Wrapper function to return _hasStarted boolen
@@ -326,8 +450,8 @@ class Registry(object):
         try:
             return self._objects[this_id]
         except KeyError as err:
-            logger.debug("Repo KeyError: %s" % err)
-            logger.debug("Keys: %s id: %s" % (self._objects.keys(), this_id))
+            logger.debug("Repo KeyError: %s", err)
+            logger.debug("Keys: %s id: %s", self._objects.keys(), this_id)
             raise RegistryKeyError("Could not find object #%s" % this_id)
 
     @synchronised_read_lock
@@ -398,6 +522,10 @@ class Registry(object):
         Args:
             _obj (GangaObject): This is the object we want to match in the objects repo
         """
+        # The repository records the id on the object, only fall back to searching if that's not (or no longer) right
+        this_id = getattr(obj, '_registry_id', None)
+        if this_id is not None and self._objects.get(this_id) is obj:
+            return this_id
         try:
             return next(id_ for id_, o in self._objects.items() if o is obj)
         except StopIteration:
@@ -453,6 +581,7 @@ class Registry(object):
         obj._registry_locked = True
 
         self.repository.flush(ids)
+        self.changes.record(ids[0], [RegistryChangeFeed.ADDED])
 
         return ids[0]
 
@@ -485,6 +614,7 @@ class Registry(object):
 
             logger.debug('deleting the object %d from the registry %s', this_id, self.name)
             self.repository.delete([this_id])
+            self.changes.record(this_id, [RegistryChangeFeed.REMOVED])
 
     @synchronised_flush_lock
     def _flush(self, objs):
@@ -515,9 +645,13 @@ class Registry(object):
 
             with obj.const_lock:
                 # flush the object
+                flush_generation = nextDirtyGeneration()
                 obj_id = self.find(obj)
                 self.repository.flush([obj_id])
-                obj._setFlushed()
+                self.changes.record(obj_id)
+                # anything changed during the flush is left to be written out next time
+                if not obj._isDirtySince(flush_generation):
+                    obj._setFlushed()
 
     def flush_all(self):
         """
@@ -531,6 +665,48 @@ class Registry(object):
         if self.metadata and self.metadata.hasStarted():
             self.metadata.flush_all()
 
+    def bytesWritten(self):
+        """
+        Returns the number of bytes of object data written to disk by this registry (and its metadata) so far
+        """
+        written = getattr(self.repository, 'bytes_written', 0)
+        if self.metadata:
+            written += self.metadata.bytesWritten()
+        return written
+
+    def recordChange(self, obj, fields=None):
+        """
+        Add a change of an object in this registry to the change feed, see pollChanges
+        Args:
+            obj (GangaObject): The object which changed
+            fields (iterable, None): names of what changed, None if not known
+        """
+        try:
+            self.changes.record(self.find(obj), fields)
+        except ObjectNotInRegistryError:
+            pass
+
+    def pollChanges(self, consumer):
+        """
+        Returns the list of RegistryChange(seq, id, fields) made since the last call by this consumer, or None on the first
+        call and whenever the consumer has fallen too far behind (see [Registry]ChangeFeedSize) to get all of them
+        Args:
+            consumer (str): Name of the consumer, each consumer has its own cursor
+        """
+        return self.changes.poll(consumer)
+
+    def pollChangedJobs(self, consumer):
+        """
+        Returns the sorted ids of the objects added, changed or removed since the last call by this consumer.
+        The first call, and any made after the consumer fell too far behind, returns the ids of all objects
+        Args:
+            consumer (str): Name of the consumer, each consumer has its own cursor
+        """
+        changes = self.pollChanges(consumer)
+        if changes is None:
+            return self.ids()
+        return sorted(set(change.id for change in changes))
+
     def _load(self, obj):
         """
         Use this function to load an object from disk as it will check if the object is already loaded *outside*
@@ -592,7 +768,7 @@ class Registry(object):
         """
         if self.hasStarted() is not True:
             raise RegistryAccessError("Cannot manipulate locks of a disconnected repository!")
-        logger.debug("Reg: %s _release_lock(%s)" % (self.name, self.find(obj)))
+        logger.debug("Reg: %s _release_lock(%s)", self.name, self.find(obj))
         if hasattr(obj, '_registry_locked') and obj._registry_locked:
             oid = self.find(obj)
             self.repository.flush([oid])
@@ -624,15 +800,15 @@ class Registry(object):
                 logger.debug("metadata startup")
                 self.metadata.startup()
                 t3 = time.time()
-                logger.debug("Startup of %s.metadata took %s sec" % (self.name, t3-t2))
+                logger.debug("Startup of %s.metadata took %s sec", self.name, t3-t2)
 
             logger.debug("repo startup")
             #self.hasStarted() = True
             self.repository.startup()
             t1 = time.time()
-            logger.debug("Registry '%s' [%s] startup time: %s sec" % (self.name, self.type, t1 - t0))
+            logger.debug("Registry '%s' [%s] startup time: %s sec", self.name, self.type, t1 - t0)
         except Exception as err:
-            logger.debug("Logging Repo startup Error: %s" % err)
+            logger.debug("Logging Repo startup Error: %s", err)
             self._hasStarted = False
             raise
         #finally:
@@ -9,6 +9,7 @@ from __future__ import print_function
 import functools
 import threading
 from collections import namedtuple
+from contextlib import contextmanager
 
 import os
 import time
@@ -45,6 +46,110 @@ except ConfigError, err:
 
 session_lock_refresher = None
 
+# The lock files of other sessions are only read again once they have changed on disk, going by their size and
+# modification time. A file modified less than this many seconds ago is read every time as it may be changed again
+# without its modification time changing, depending on the resolution of the filesystem
+LOCK_FILE_RACY_INTERVAL = 2.
+
+
+class SessionLockStats(object):
+
+    """ Number and duration (waiting for the global lock included) of the lock operations of this session, and how
+    many times the lock files of other sessions had to be read or were known to be unchanged """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._files = {'read': 0, 'unchanged': 0}
+
+    def record(self, operation, duration, num_ids):
+        """
+        Count an operation
+        Args:
+            operation (str): what was done, lock, release or new_ids
+            duration (float): seconds it took
+            num_ids (int): number of ids it returned
+        """
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = {'count': 0, 'ids': 0, 'total_time': 0., 'max_time': 0.}
+            stats['count'] += 1
+            stats['ids'] += num_ids
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+
+    def fileRead(self, changed):
+        """
+        Count a look at the lock file of another session
+        Args:
+            changed (bool): whether the file had to be read
+        """
+        with self._lock:
+            self._files['read' if changed else 'unchanged'] += 1
+
+    def summary(self):
+        """ Returns a dict of the stats of each operation and of the lock files of other sessions ('lock_files') """
+        with self._lock:
+            summary = dict((operation, dict(stats)) for operation, stats in self._stats.iteritems())
+            summary['lock_files'] = dict(self._files)
+        for operation, stats in summary.iteritems():
+            if operation != 'lock_files':
+                stats['mean_time'] = stats['total_time'] / stats['count']
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._files = {'read': 0, 'unchanged': 0}
+
+
+lock_stats = SessionLockStats()
+
+
+def getSessionLockStats():
+    """
+    Returns the SessionLockStats of this session
+    """
+    return lock_stats
+
+
+def timed(operation):
+    """
+    Decorator of SessionLockManager methods returning lists of ids, recording their duration in lock_stats
+    Args:
+        operation (str): name the calls are recorded as
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated(self, *args, **kwargs):
+            start = time.time()
+            ids = f(self, *args, **kwargs)
+            lock_stats.record(operation, time.time() - start, len(ids))
+            return ids
+        return decorated
+    return decorator
+
+
+def refreshSessionFile(fn):
+    """
+    Update the timestamps of a session (.session) or lock (.locks) file to show the session is alive, returns its new
+    ctime. The modification time of lock files is left as it is as other sessions go by it to know if the locks changed
+    Args:
+        fn (str): path of the file
+    """
+    if fn.endswith('.locks'):
+        try:
+            os.utime(fn, (time.time(), os.stat(fn).st_mtime))
+        except OSError as err:
+            if err.errno != errno.EPERM:
+                raise
+            os.utime(fn, None)
+    else:
+        os.utime(fn, None)
+    return os.stat(fn).st_ctime
+
+
 def setupGlobalLockRef(session_name, sdir, gfn, _on_afs):
     global session_lock_refresher
     if session_lock_refresher is None:
@@ -53,7 +158,7 @@ def setupGlobalLockRef(session_name, sdir, gfn, _on_afs):
             os.close(os.open(gfn, os.O_EXCL | os.O_CREAT | os.O_WRONLY))
             registerGlobalSessionFile(gfn)
         except OSError as err:
-            logger.debug("Startup Lock Refresher Exception: %s" % err)
+            logger.debug("Startup Lock Refresher Exception: %s", err)
             raise RepositoryError(None, "Error on session file '%s' creation: %s" % (gfn, err))
         session_lock_refresher = SessionLockRefresher(session_name, sdir, gfn, None, _on_afs)
         session_lock_refresher.start()
@@ -89,7 +194,7 @@ def removeGlobalSessionFileHandlers():
             os.close(i)
         except Exception as err:
             logger.debug("Failed to unlock or close sessionfilehandler")
-            logger.debug("%s" % err)
+            logger.debug("%s", err)
 
 
 def getGlobalSessionFiles():
@@ -166,22 +271,20 @@ class SessionLockRefresher(GangaThread):
         this_index_file = self.fns[index]
         now = None
         try:
-            oldnow = os.stat(this_index_file).st_ctime
-            os.system('touch "%s"' % this_index_file)
-            now = os.stat(this_index_file).st_ctime # os.stat(self.fn).st_ctime
+            now = refreshSessionFile(this_index_file)
         except OSError as x:
             if x.errno != errno.ENOENT:
                 logger.debug("Session file timestamp could not be updated! Locks could be lost!")
                 if now is None and failCount < 4:
                     try:
-                        logger.debug("Attempting to lock file again, unknown error:\n'%s'" % x)
+                        logger.debug("Attempting to lock file again, unknown error:\n'%s'", x)
                         import time
                         time.sleep(0.5)
                         failcount=failCount+1
                         now = self.updateLocksNow(index, failcount)
                     except Exception as err:
                         now = -999.
-                        logger.debug("Received another type of exception, failing to update lockfile: %s" % this_index_file)
+                        logger.debug("Received another type of exception, failing to update lockfile: %s", this_index_file)
                 else:
                     logger.warning("Failed to update lock file: %s 5 times." % this_index_file)
                     logger.warning("This could be due to a filesystem problem, or multiple versions of ganga trying to access the same file")
@@ -226,7 +329,7 @@ class SessionLockRefresher(GangaThread):
         except OSError as x:
             # nothing really important, another process deleted the session
             # before we did.
-            logger.debug("Unimportant OSError in cleaning locks: %s" % x)
+            logger.debug("Unimportant OSError in cleaning locks: %s", x)
 
         return
 
@@ -292,38 +395,52 @@ def dry_run_unix_locks(folder):
 
     os.unlink(test_file)
 
-def global_disk_lock(f):
-    @functools.wraps(f)
-    def decorated_global(self, *args, **kwds):
-        with global_disk_lock.global_lock:
-            if self.afs:
+@contextmanager
+def holding_global_disk_lock(manager):
+    """
+    Context manager holding the lock shared by all sessions on the lock files of a SessionLockManager
+    Args:
+        manager (SessionLockManager): the manager of the lock files
+    """
+    with global_disk_lock.global_lock:
+        if manager.afs:
+            while True:
+                try:
+                    manager.afs_lock_require()
+                    break
+                except:
+                    time.sleep(0.1)
+
+            manager.safe_LockCheck()
+            try:
+                yield
+            finally:
+                manager.afs_lock_release()
+        else:
+            with open(manager.lockfn, 'w') as f_lock:
                 while True:
                     try:
-                        self.afs_lock_require()
+                        fcntl.flock(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
                         break
-                    except:
+                    except IOError as e:
+                        if e.errno != errno.EAGAIN:
+                            raise
                         time.sleep(0.1)
-
-                self.safe_LockCheck()
                 try:
-                    return f(self, *args, **kwds)
+                    manager.safe_LockCheck()
+                    yield
                 finally:
-                    self.afs_lock_release()
-            else:
-                with open(self.lockfn, 'w') as f_lock:
-                    while True:
-                        try:
-                            fcntl.flock(f_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
-                            break
-                        except IOError as e:
-                            if e.errno != errno.EAGAIN:
-                                raise
-                            time.sleep(0.1)
-                    try:
-                        self.safe_LockCheck()
-                        return f(self, *args, **kwds)
-                    finally:
-                        fcntl.flock(f_lock, fcntl.LOCK_UN)
+                    fcntl.flock(f_lock, fcntl.LOCK_UN)
+
+
+def global_disk_lock(f):
+    @functools.wraps(f)
+    def decorated_global(self, *args, **kwds):
+        if self._batch is not None:
+            # The batch in progress holds the global lock already
+            return f(self, *args, **kwds)
+        with holding_global_disk_lock(self):
+            return f(self, *args, **kwds)
 
     return decorated_global
 
@@ -341,6 +458,7 @@ class SessionLockManager(object):
         * make_new_ids(n) returns n new (locked) ids
         * lock_ids(ids) returns the ids that were successfully locked
         * release_ids(ids) returns the ids that were successfully released (now: all)
+        * batch() context manager to lock and release many ids with a single write of the session file
     All access to an instance of this class MUST be synchronized!
     Should ONLY raise RepositoryError (if possibly-corrupting errors are found)
     """
@@ -387,6 +505,10 @@ class SessionLockManager(object):
         self._lock = threading.RLock()
         self.last_count_access = None
         self._stored_session_path = {}
+        # path of the lock file of another session -> ((inode, size, mtime), ids locked)
+        self._lock_file_cache = {}
+        # State of the batch in progress, see batch()
+        self._batch = None
 
     @synchronised
     def startup(self):
@@ -418,10 +540,10 @@ class SessionLockManager(object):
         try:
             self.count = max(self.count, self.cnt_read())
         except ValueError, err:
-            logger.debug("Startup ValueError Exception: %s" % err)
+            logger.debug("Startup ValueError Exception: %s", err)
             logger.error("Corrupt count file '%s'! Trying to recover..." % (self.cntfn))
         except OSError as err:
-            logger.debug("Startup OSError Exception: %s" % err)
+            logger.debug("Startup OSError Exception: %s", err)
             raise RepositoryError(self.repo, "OSError on count file '%s' access!" % (self.cntfn))
         self.cnt_write()
         # Setup session file
@@ -431,7 +553,7 @@ class SessionLockManager(object):
             os.write(fd, pickle.dumps(set()))
             registerGlobalSessionFile(self.fn)
         except OSError as err:
-            logger.debug("Startup Session Exception: %s" % err)
+            logger.debug("Startup Session Exception: %s", err)
             raise RepositoryError(self.repo, "Error on session file '%s' creation: %s" % (self.fn, err))
         finally:
             if fd is not None:
@@ -460,7 +582,7 @@ class SessionLockManager(object):
                     session_lock_refresher = None
             os.unlink(self.fn)
         except OSError as x:
-            logger.debug("Session file '%s' or '%s' was deleted already or removal failed: %s" % (self.fn, self.gfn, x))
+            logger.debug("Session file '%s' or '%s' was deleted already or removal failed: %s", self.fn, self.gfn, x)
 
     # Global lock function
     def global_lock_setup(self):
@@ -476,7 +598,7 @@ class SessionLockManager(object):
                     with open(lock_file, "w"):
                         pass
             except Exception as err:
-                logger.debug("Global Lock Setup Error: %s" % err)
+                logger.debug("Global Lock Setup Error: %s", err)
         else:
             try:
                 self.lockfn = os.path.join(self.sdir, "global_lock")
@@ -508,7 +630,7 @@ class SessionLockManager(object):
                     os.unlink(lock_file)
                     break
                 except Exception as err:
-                    logger.debug("Global Lock aquire Exception: %s" % err)
+                    logger.debug("Global Lock aquire Exception: %s", err)
                     time.sleep(0.1)
 
             os.system("fs setacl %s %s rliwka" % (quote(lock_path), getpass.getuser()))
@@ -533,7 +655,8 @@ class SessionLockManager(object):
     # Session read-write functions
     @synchronised
     def session_read(self, fn):
-        """ Reads a session file and returns a set of IDs locked by that session.
+        """ Reads the lock file of another session and returns the set of IDs locked by that session.
+            The file is only read if it changed since the last time, else the set read then is returned.
             The global lock MUST be held for this function to work, although on NFS additional
             locking is done
             Raises RepositoryError if severe access problems occur (corruption otherwise!) """
@@ -541,15 +664,32 @@ class SessionLockManager(object):
             # This can fail (thats OK, file deleted in the meantime)
             fd = None
             try:
+                # Opening the file (rather than a stat) makes NFS clients revalidate its attributes
                 fd = os.open(fn, os.O_RDWR)
+                st = os.fstat(fd)
+                # Whole seconds are enough as a file is only cached once it is older than the racy interval, and
+                # refreshing it may shift the sub-second part of its modification time
+                version = (st.st_ino, st.st_size, int(st.st_mtime))
+                cached = self._lock_file_cache.get(fn)
+                if cached is not None and cached[0] == version:
+                    lock_stats.fileRead(False)
+                    return cached[1]
+                lock_stats.fileRead(True)
                 os.lseek(fd, 0, 0)
                 if not self.afs:  # additional locking for NFS
                     fcntl.lockf(fd, fcntl.LOCK_SH)
                 try:
                     # 00)) # read up to 1 MB (that is more than enough...)
-                    return pickle.loads(os.read(fd, 1048576))
+                    locked = pickle.loads(os.read(fd, 1048576))
                 except Exception as x:
                     logger.warning("corrupt or inaccessible session file '%s' - ignoring it (Exception %s %s)." % (fn, getName(x), x))
+                    self._lock_file_cache.pop(fn, None)
+                else:
+                    if time.time() - st.st_mtime > LOCK_FILE_RACY_INTERVAL:
+                        self._lock_file_cache[fn] = (version, locked)
+                    else:
+                        self._lock_file_cache.pop(fn, None)
+                    return locked
             finally:
                 if fd is not None:
                     if not self.afs:  # additional locking for NFS
@@ -559,6 +699,7 @@ class SessionLockManager(object):
             if x.errno != errno.ENOENT:
                 raise RepositoryError(
                     self.repo, "Error on session file access '%s': %s" % (fn, x))
+            self._lock_file_cache.pop(fn, None)
         return set()
 
     @synchronised
@@ -676,6 +817,7 @@ class SessionLockManager(object):
                 self.last_count_access = SessionLockManager.LastCountAccess(os.stat(self.cntfn).st_ctime, self.count)
 
     # "User" functions
+    @timed('new_ids')
     @synchronised
     @global_disk_lock
     def make_new_ids(self, n):
@@ -702,7 +844,7 @@ class SessionLockManager(object):
             self.locked.update(ids)
         self.count = newcount + n
         self.cnt_write()
-        self.session_write()
+        self._locks_changed()
         return list(ids)
 
     def safe_LockCheck(self):
@@ -711,7 +853,9 @@ class SessionLockManager(object):
         if session_lock_last == 0:
             session_lock_last = this_time
         _diff = abs(session_lock_last - this_time)
-        if _diff > session_expiration_timeout * 0.5 or _diff < 1:
+        if _diff > session_expiration_timeout * 0.5 or _diff == 0:
+            # Look for dead sessions every now and then rather than on every lock operation
+            session_lock_last = this_time
             if session_lock_refresher is not None:
                 session_lock_refresher.checkAndReap()
             else:
@@ -722,38 +866,82 @@ class SessionLockManager(object):
             self._stored_session_path[session] = os.path.join(self.sdir, session)
         return self._stored_session_path[session]
 
-    @synchronised
-    @global_disk_lock
-    def lock_ids(self, ids):
-
-        #logger.debug( "locking: %s" % ids)
-        ids = set(ids)
+    def _other_sessions_locked(self):
+        """ Returns the set of IDs locked by the other sessions, the global lock MUST be held """
+        if self._batch is not None and self._batch['others'] is not None:
+            return self._batch['others']
         try:
             sessions = [sn for sn in os.listdir(self.sdir) if sn.endswith(self.name + ".locks")]
         except OSError as x:
             raise RepositoryError(self.repo, "Could not list session directory '%s'!" % (self.sdir))
 
         slocked = set()
+        session_files = set()
         for session in sessions:
             sf = self._path_helper(session)
             if sf == self.fn:
                 continue
+            session_files.add(sf)
             slocked.update(self.session_read(sf))
+        # Forget about the sessions which are gone
+        for sf in set(self._lock_file_cache) - session_files:
+            del self._lock_file_cache[sf]
+        if self._batch is not None:
+            self._batch['others'] = slocked
+        return slocked
+
+    def _locks_changed(self):
+        """ Save self.locked to the session file, once at the end of the batch in progress if there's one """
+        if self._batch is not None:
+            self._batch['changed'] = True
+        else:
+            self.session_write()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to lock and release many ids at once: until it exits the global lock is held, the lock files
+        of the other sessions are read (at most) once and the session file is written once at the end.
+        Other threads using this manager wait for the batch to finish
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield
+                return
+            with holding_global_disk_lock(self):
+                self._batch = {'others': None, 'changed': False}
+                try:
+                    yield
+                finally:
+                    changed = self._batch['changed']
+                    self._batch = None
+                    if changed:
+                        self.session_write()
+
+    @timed('lock')
+    @synchronised
+    @global_disk_lock
+    def lock_ids(self, ids):
+
+        #logger.debug( "locking: %s" % ids)
+        ids = set(ids)
+        slocked = self._other_sessions_locked()
         #logger.debug( "locked: %s" % slocked)
         ids.difference_update(slocked)
         if not GANGA_SWAN_INTEGRATION:
             # If sharing sessions don't update id to locked.
             self.locked.update(ids)
         #logger.debug( "stored_lock: %s" % self.locked)
-        self.session_write()
+        self._locks_changed()
         #logger.debug( "list: %s" % list(ids))
         return list(ids)
 
+    @timed('release')
     @synchronised
     @global_disk_lock
     def release_ids(self, ids):
         self.locked.difference_update(ids)
-        self.session_write()
+        self._locks_changed()
         #logger.debug( "list: %s" % list(ids))
         return list(ids)
 
@@ -817,7 +1005,7 @@ class SessionLockManager(object):
                 if id in names:
                     return self.session_to_info(session)
             except Exception as err:
-                logger.debug("Get Lock Session Exception: %s" % err)
+                logger.debug("Get Lock Session Exception: %s", err)
                 continue
             finally:
                 if fd is not None:
@@ -858,7 +1046,7 @@ class SessionLockManager(object):
                 global session_expiration_timeout
                 if((time.time() - os.stat(sf).st_ctime) > session_expiration_timeout):
                     if(sf.endswith(".session")):
-                        logger.debug("Reaping LockFile: %s" % (sf))
+                        logger.debug("Reaping LockFile: %s", (sf))
                     os.unlink(sf)
             except OSError as x:
                 failed = True
@@ -869,5 +1057,5 @@ class SessionLockManager(object):
         try:
             return "%s (pid %s) since %s" % (".".join(si[:-3]), si[-2], ".".join(si[-5:-3]))
         except Exception, err:
-            logger.debug( "Session Info Exception: %s" % err)
+            logger.debug("Session Info Exception: %s", err)
             return session
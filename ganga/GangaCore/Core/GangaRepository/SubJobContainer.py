@@ -0,0 +1,291 @@
+# This class (SubJobContainer) keeps the XML of all subjobs of a master job in a single file next to the master's data.
+#
+# Layout of the file on disk:
+#
+#   MAGIC
+#   >QQI  (offset, length and crc32 of the current table)
+#   (subjob XML | table)*
+#
+# The table is pickle([(offset, length, status), ...]) with one entry per subjob, in order of subjob id. It is what
+# makes random access to one subjob a single read and lets the statuses of all subjobs be had without reading any XML.
+#
+# * Updates are appends: the new XML of the changed subjobs is written at the end of the file followed by a new table,
+#   and only then is the header pointing at the table rewritten. A crash at any point leaves the previous table, and
+#   with it all of the previous data, in place.
+# * Concurrency: writers serialise through an fcntl lock on the container. Readers never lock. Once the space taken up
+#   by replaced XML and old tables outgrows the live data the container is written anew and renamed over the old one.
+
+import os
+import errno
+import fcntl
+import struct
+import zlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+_MAGIC = 'GANGASJC1\n'
+_HEADER = struct.Struct('>QQI')
+_DATA_START = len(_MAGIC) + _HEADER.size
+
+# Compact the container once it is this many times the size of the live data (and is large enough to care)
+_COMPACT_RATIO = 2
+_COMPACT_MIN_SIZE = 1048576
+
+
+class SubJobContainerError(Exception):
+
+    """Raised when the container is missing, corrupt or asked for a subjob it doesn't hold"""
+    pass
+
+
+class SubJobContainer(object):
+
+    """
+    All of the subjobs of one master job in a single file, stored as the XML written by VStreamer.to_file
+    """
+
+    filename_in_dir = 'subjobs.pack'
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): Full path of the file backing this container
+        """
+        super(SubJobContainer, self).__init__()
+        self.filename = filename
+        # list of (offset, length, status) as last read from disk
+        self._table = []
+        # header of the table above, used to tell if it needs reading again
+        self._table_header = None
+        self._inode = None
+
+    @classmethod
+    def in_dir(cls, jobDirectory):
+        """ Returns the container of the job stored in jobDirectory, whether it exists or not
+        Args:
+            jobDirectory (str): The directory holding the data of the master job
+        """
+        return cls(os.path.join(jobDirectory, cls.filename_in_dir))
+
+    def exists(self):
+        """ Returns True if there is a container on disk"""
+        return os.path.isfile(self.filename)
+
+    def _read_table(self, fd):
+        """ Make sure the table is the one currently on disk, reading it only if it changed
+        Args:
+            fd (int): Descriptor of the open container
+        """
+        inode = os.fstat(fd).st_ino
+        start = os.read(fd, _DATA_START)
+        if len(start) != _DATA_START or not start.startswith(_MAGIC):
+            raise SubJobContainerError("'%s' is not a valid subjob container" % self.filename)
+        header = _HEADER.unpack_from(start, len(_MAGIC))
+        if header == self._table_header and inode == self._inode:
+            return
+
+        offset, length, crc = header
+        if length == 0:
+            table = []
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = self._read_exactly(fd, length)
+            if zlib.crc32(data) & 0xffffffff != crc:
+                raise SubJobContainerError("Bad checksum of the table of '%s'" % self.filename)
+            table = pickle.loads(data)
+        self._table = table
+        self._table_header = header
+        self._inode = inode
+
+    def _read_exactly(self, fd, length):
+        chunks = []
+        while length > 0:
+            chunk = os.read(fd, min(length, 1048576))
+            if not chunk:
+                raise SubJobContainerError("Unexpected end of '%s'" % self.filename)
+            chunks.append(chunk)
+            length -= len(chunk)
+        return ''.join(chunks)
+
+    def _open(self):
+        try:
+            return os.open(self.filename, os.O_RDONLY)
+        except OSError as err:
+            raise SubJobContainerError("Can't open subjob container '%s': %s" % (self.filename, err))
+
+    def refresh(self):
+        """ Pick up the changes made to the container on disk since it was last looked at"""
+        fd = self._open()
+        try:
+            self._read_table(fd)
+        finally:
+            os.close(fd)
+
+    def __len__(self):
+        """ Returns the number of subjobs held by the container, 0 if there is no container"""
+        try:
+            self.refresh()
+        except SubJobContainerError as err:
+            logger.debug("SubJobContainer: %s" % err)
+            return 0
+        return len(self._table)
+
+    def statuses(self):
+        """ Returns the list of the statuses of all subjobs, read from the table only"""
+        self.refresh()
+        return [status for _, _, status in self._table]
+
+    def read(self, index):
+        """ Returns the XML of one subjob
+        Args:
+            index (int): id of the subjob
+        """
+        fd = self._open()
+        try:
+            self._read_table(fd)
+            if index < 0 or index >= len(self._table):
+                raise SubJobContainerError("Subjob %s is not in '%s'" % (index, self.filename))
+            offset, length, _ = self._table[index]
+            os.lseek(fd, offset, os.SEEK_SET)
+            return self._read_exactly(fd, length)
+        finally:
+            os.close(fd)
+
+    def _open_locked(self):
+        """ Open the container for writing with the write lock held.
+        Takes care of the container being replaced by another session while we were waiting for the lock """
+        while True:
+            fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                if os.fstat(fd).st_ino == os.stat(self.filename).st_ino:
+                    return fd
+            except OSError as err:
+                if err.errno != errno.ENOENT:
+                    os.close(fd)
+                    raise
+            os.close(fd)
+
+    @staticmethod
+    def _pack_table(table):
+        data = pickle.dumps(table, pickle.HIGHEST_PROTOCOL)
+        return data, zlib.crc32(data) & 0xffffffff
+
+    def write(self, records, length=None):
+        """ Store the XML of some subjobs, replacing what was there for them
+        Args:
+            records (dict): subjob id -> (XML, status). Ids beyond the end of the container must follow on from it
+            length (int): if given the container is cut down (or checked) to hold this many subjobs afterwards
+        """
+        fd = self._open_locked()
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.write(fd, _MAGIC + _HEADER.pack(0, 0, 0))
+                self._table = []
+                self._table_header = None
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                self._read_table(fd)
+
+            table = list(self._table)
+            new_length = max([len(table)] + [index + 1 for index in records])
+            if length is not None:
+                new_length = length
+            if new_length > len(table):
+                table.extend([None] * (new_length - len(table)))
+            else:
+                del table[new_length:]
+
+            # Anything beyond the current table may be left over from an interrupted write, it's simply written over
+            offset, table_length, _ = self._table_header or (0, 0, 0)
+            end = max(offset + table_length, _DATA_START)
+            data = []
+            for index in sorted(records):
+                if index >= new_length:
+                    continue
+                xml, status = records[index]
+                data.append(xml)
+                table[index] = (end, len(xml), status)
+                end += len(xml)
+
+            if None in table:
+                raise SubJobContainerError("Subjob %s missing from '%s'" % (table.index(None), self.filename))
+
+            table_data, table_crc = self._pack_table(table)
+            data.append(table_data)
+
+            os.lseek(fd, max(offset + table_length, _DATA_START), os.SEEK_SET)
+            os.write(fd, ''.join(data))
+            os.ftruncate(fd, end + len(table_data))
+            os.fsync(fd)
+            os.lseek(fd, len(_MAGIC), os.SEEK_SET)
+            os.write(fd, _HEADER.pack(end, len(table_data), table_crc))
+            os.fsync(fd)
+
+            self._table = table
+            self._table_header = (end, len(table_data), table_crc)
+            self._inode = os.fstat(fd).st_ino
+
+            live = sum(entry[1] for entry in table) + len(table_data)
+            if end + len(table_data) > _COMPACT_MIN_SIZE and end + len(table_data) > _COMPACT_RATIO * live:
+                self._compact(fd)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _compact(self, fd):
+        """ Write the container anew with only the live data in it and rename it over the old one. Called with the
+        write lock held
+        Args:
+            fd (int): Descriptor of the locked container
+        """
+        logger.debug("SubJobContainer: compacting %s" % self.filename)
+        new_name = self.filename + '.new'
+        records = {}
+        for index, (offset, length, status) in enumerate(self._table):
+            os.lseek(fd, offset, os.SEEK_SET)
+            records[index] = (self._read_exactly(fd, length), status)
+        self.create(new_name, records)
+        os.rename(new_name, self.filename)
+        self.refresh()
+
+    @classmethod
+    def create(cls, filename, records):
+        """ Write a complete container in one go, the file is replaced if it exists
+        Args:
+            filename (str): Full path of the container
+            records (dict): subjob id -> (XML, status) for all subjobs
+        """
+        table = []
+        data = []
+        end = _DATA_START
+        for index in range(len(records)):
+            xml, status = records[index]
+            data.append(xml)
+            table.append((end, len(xml), status))
+            end += len(xml)
+        table_data, table_crc = cls._pack_table(table)
+        with open(filename, 'wb') as new_file:
+            new_file.write(_MAGIC + _HEADER.pack(end, len(table_data), table_crc))
+            new_file.write(''.join(data))
+            new_file.write(table_data)
+            new_file.flush()
+            os.fsync(new_file.fileno())
+
+    def remove(self):
+        """ Remove the container from disk"""
+        try:
+            os.unlink(self.filename)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+        self._table = []
+        self._table_header = None
+        self._inode = None
@@ -1,15 +1,18 @@
 from GangaCore.GPIDev.Schema.Schema import Schema, SimpleItem, Version
-from GangaCore.GPIDev.Base.Objects import GangaObject
+from GangaCore.GPIDev.Base.Objects import GangaObject, nextDirtyGeneration
 from GangaCore.Utility.logging import getLogger
 from GangaCore.Core.GangaRepository.GangaRepository import RepositoryError
 from GangaCore.Core.exceptions import GangaException
 from GangaCore.GPIDev.Base.Proxy import stripProxy
 from GangaCore.Core.GangaRepository.VStreamer import XMLFileError
+from GangaCore.Core.GangaRepository.SubJobContainer import SubJobContainer, SubJobContainerError
+from GangaCore.Utility.Config import getConfig
 import errno
 import copy
 import threading
 import shutil
-from os import listdir, path, stat
+from cStringIO import StringIO
+from os import listdir, makedirs, path, rename, stat
 
 logger = getLogger()
 
@@ -71,9 +74,14 @@ class SubJobXMLList(GangaObject):
 
         self._subjob_master_index_name = "subjobs.idx"
 
+        self._container = None
+
         if jobDirectory == '' and registry is None:
             return
 
+        # Used instead of the per-subjob directories whenever it exists on disk
+        self._container = SubJobContainer.in_dir(jobDirectory)
+
         self._subjobIndexData = {}
         if parent:
             self._setParent(parent)
@@ -101,6 +109,7 @@ class SubJobXMLList(GangaObject):
         obj._load_backup = copy.deepcopy(self._load_backup, memo)
         obj._cached_filenames = copy.deepcopy(self._cached_filenames, memo)
         obj._stored_len = copy.deepcopy(self._stored_len, memo)
+        obj._container = SubJobContainer.in_dir(obj._jobDirectory) if self._container is not None else None
 
         ## Manually define unsafe/uncopyable objects
         obj._definedParent = None
@@ -114,6 +123,10 @@ class SubJobXMLList(GangaObject):
         """
         self._cachedJobs = obj
 
+    def isPacked(self):
+        """Are the subjobs stored in a single container rather than a directory each? True/False"""
+        return self._container is not None and self._container.exists()
+
     def isLoaded(self, subjob_id):
         """Has the subjob been loaded? True/False
         Args:
@@ -163,7 +176,7 @@ class SubJobXMLList(GangaObject):
                             continue
                         #self._subjobIndexData = {}
             except Exception as err:
-                logger.debug( "Subjob Index file open, error: %s" % err )
+                logger.debug("Subjob Index file open, error: %s", err)
                 self._subjobIndexData = {}
                 self._setDirty()
             finally:
@@ -185,44 +198,65 @@ class SubJobXMLList(GangaObject):
         ## Once It's known what te likely exceptions here are they'll be added
         except (IOError,) as err:
             logger.debug("Can't write Index. Moving on as this is not essential to functioning it's a performance bug")
-            logger.debug("Error: %s" % err)
+            logger.debug("Error: %s", err)
 
     def __really_writeIndex(self, ignore_disk=False):
-        """Do the actual work of writing the index for all subjobs
+        """Do the actual work of writing the index for all subjobs.
+        Only the entries of the subjobs which have changed are worked out again and nothing is written if there are none,
+        unless this list is itself dirty in which case the whole index is rebuilt
         Args:
             ignore_disk (bool): Optional flag to force the class to ignore all on-disk data when flushing
         """
 
+        index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
+
         all_caches = {}
         if ignore_disk:
             range_limit = self._cachedJobs.keys()
         else:
             range_limit = range(len(self))
 
+        rebuild = self._dirty or ignore_disk or not path.isfile(index_file)
+        changed_caches = {}
         for sj_id in range_limit:
             if sj_id in self._cachedJobs:
-                this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
-                all_caches[sj_id] = this_cache
-                disk_location = self.__get_dataFile(sj_id)
-                all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
+                if rebuild or self._cachedJobs[sj_id]._dirty or sj_id not in self._subjobIndexData:
+                    changed_caches[sj_id] = self._registry.getIndexCache(self._cachedJobs[sj_id])
+                    changed_caches[sj_id]['modified'] = self.__get_modified(sj_id)
+                else:
+                    all_caches[sj_id] = self._subjobIndexData[sj_id]
             else:
                 if sj_id in self._subjobIndexData:
                     all_caches[sj_id] = self._subjobIndexData[sj_id]
                 else:
-                    this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
-                    all_caches[sj_id] = this_cache
-                    disk_location = self.__get_dataFile(sj_id)
-                    all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
+                    changed_caches[sj_id] = self._registry.getIndexCache(self.__getitem__(sj_id))
+                    changed_caches[sj_id]['modified'] = self.__get_modified(sj_id)
+
+        if not rebuild and not changed_caches and len(all_caches) == len(self._subjobIndexData):
+            return
+
+        all_caches.update(changed_caches)
 
         try:
             from GangaCore.Core.GangaRepository.PickleStreamer import to_file
-            index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
             index_file_obj = open(index_file, "w")
             to_file(all_caches, index_file_obj)
+            self._countBytesWritten(index_file_obj.tell())
             index_file_obj.close()
         ## Once I work out what the other exceptions here are I'll add them
         except (IOError,) as err:
-            logger.debug("cache write error: %s" % err)
+            logger.debug("cache write error: %s", err)
+        else:
+            self._subjobIndexData = all_caches
+
+    def _countBytesWritten(self, num_bytes):
+        """Add to the count of bytes written kept by the repository these subjobs belong to
+        Args:
+            num_bytes (int): Number of bytes just written to disk
+        """
+        repository = getattr(self._registry, 'repository', None)
+        if repository is not None and hasattr(repository, 'bytes_written'):
+            repository.bytes_written += num_bytes
 
     def __iter__(self):
         """Return iterator for this class"""
@@ -249,8 +283,20 @@ class SubJobXMLList(GangaObject):
         self._cached_filenames[index_str] = subjob_data
         return subjob_data
 
+    def __get_modified(self, index):
+        """Get the time the data of this subjob was last written to disk
+        Args:
+            index (int): This is the index of the subjob we're interested in
+        """
+        if self.isPacked():
+            return stat(self._container.filename).st_ctime
+        return stat(self.__get_dataFile(index)).st_ctime
+
     def __len__(self):
         """ return length or lookup the last modified time compare against self._stored_len[0] and if nothings changed return self._stored_len[1]"""
+        if self.isPacked():
+            return len(self._container)
+
         try:
             this_time = stat(self._jobDirectory).st_ctime
         except OSError:
@@ -292,7 +338,7 @@ class SubJobXMLList(GangaObject):
         try:
             job_obj = self.getJobObject()
         except Exception as err:
-            logger.debug("Error: %s" % err)
+            logger.debug("Error: %s", err)
             try:
                 job_obj = self._getParent()
             except Exception as err:
@@ -329,9 +375,9 @@ class SubJobXMLList(GangaObject):
         job_obj = self.getSafeJob()
         if job_obj is not None:
             fqid = self.getMasterID()
-            logger.debug( "Loading subjob at: %s for job %s" % (subjob_data, fqid) )
+            logger.debug("Loading subjob at: %s for job %s", subjob_data, fqid)
         else:
-            logger.debug( "Loading subjob at: %s" % subjob_data )
+            logger.debug("Loading subjob at: %s", subjob_data)
         sj_file = open(subjob_data, "r")
         return sj_file
 
@@ -353,17 +399,77 @@ class SubJobXMLList(GangaObject):
             logger.error("CANNOT LOAD SUBJOB INDEX: %s. Reason: %s" % (index, err))
             raise
 
+    def _loadSubJobFromContainer(self, index):
+        """Load and parse a subjob from the container holding all of the subjobs
+        Args:
+            index (int): The index corresponding to the subjob object we want
+        """
+        from GangaCore.Core.GangaRepository.VStreamer import from_file
+
+        logger.debug("Loading subjob #%s from: %s for job %s", index, self._container.filename, self.getMasterID())
+        try:
+            sj_file = StringIO(self._container.read(index))
+        except SubJobContainerError as err:
+            raise RepositoryError(self, "Error on loading subobject %s: %s" % (index, err))
+        return from_file(sj_file)[0]
+
+    def _loadSubJobFromDirectory(self, index):
+        """Load and parse a subjob from the data file in its own directory, falling back to the backup if needed.
+        Returns the subjob and whether the backup was used
+        Args:
+            index (int): The index corresponding to the subjob object we want
+        """
+        has_loaded_backup = False
+
+        subjob_data = self.__get_dataFile(str(index))
+        try:
+            sj_file = self._loadSubJobFromDisk(subjob_data)
+        except (XMLFileError, IOError) as x:
+            logger.warning("Error loading XML file: %s" % x)
+            try:
+                logger.debug("Loading subjob #%s for job #%s from disk, recent changes may be lost", index, self.getMasterID())
+                subjob_data = self.__get_dataFile(str(index), True)
+                sj_file = self._loadSubJobFromDisk(subjob_data)
+                has_loaded_backup = True
+            except (IOError, XMLFileError) as err:
+                logger.debug("Error loading subjob XML:\n%s", err)
+
+                if isinstance(x, IOError) and x.errno == errno.ENOENT:
+                    raise IOError("Subobject %s not found: %s" % (index, x))
+                else:
+                    raise RepositoryError(self,"IOError on loading subobject %s: %s" % (index, x))
+
+        from GangaCore.Core.GangaRepository.VStreamer import from_file
+
+        # load the subobject into a temporary object
+        try:
+            loaded_sj = from_file(sj_file)[0]
+        except (IOError, XMLFileError) as err:
+
+            try:
+                logger.warning("Loading subjob #%s for job #%s from backup, recent changes may be lost" % (index, self.getMasterID()))
+                subjob_data = self.__get_dataFile(str(index), True)
+                sj_file = self._loadSubJobFromDisk(subjob_data)
+                loaded_sj = from_file(sj_file)[0]
+                has_loaded_backup = True
+            except (IOError, XMLFileError) as err:
+                logger.debug("Failed to Load XML for job: %s using: %s", index, subjob_data)
+                logger.debug("Err:\n%s", err)
+                raise
+
+        return loaded_sj, has_loaded_backup
+
     def _getItem(self, index):
         """Actual meat of loading the subjob from disk is required, parsing and storing a copy in memory
         (_cached_subjobs) for future use
         Args:
             index (int): The index corresponding to the subjob object we want
         """
-        logger.debug("Requesting subjob: #%s" % index)
+        logger.debug("Requesting subjob: #%s", index)
 
         if index not in self._cachedJobs:
 
-            logger.debug("Attempting to load subjob: #%s from disk" % index)
+            logger.debug("Attempting to load subjob: #%s from disk", index)
 
             # obtain a lock to make sure multiple loads of the same object don't happen
             with self._load_lock:
@@ -372,46 +478,14 @@ class SubJobXMLList(GangaObject):
                 if index in self._cachedJobs:
                     return self._cachedJobs[index]
 
-                has_loaded_backup = False
-
                 # Now try to load the subjob
                 if len(self) < index:
                     raise GangaException("Subjob: %s does NOT exist" % index)
-                subjob_data = self.__get_dataFile(str(index))
-                try:
-                    sj_file = self._loadSubJobFromDisk(subjob_data)
-                except (XMLFileError, IOError) as x:
-                    logger.warning("Error loading XML file: %s" % x)
-                    try:
-                        logger.debug("Loading subjob #%s for job #%s from disk, recent changes may be lost" % (index, self.getMasterID()))
-                        subjob_data = self.__get_dataFile(str(index), True)
-                        sj_file = self._loadSubJobFromDisk(subjob_data)
-                        has_loaded_backup = True
-                    except (IOError, XMLFileError) as err:
-                        logger.debug("Error loading subjob XML:\n%s" % err)
-
-                        if isinstance(x, IOError) and x.errno == errno.ENOENT:
-                            raise IOError("Subobject %s not found: %s" % (index, x))
-                        else:
-                            raise RepositoryError(self,"IOError on loading subobject %s: %s" % (index, x))
-
-                from GangaCore.Core.GangaRepository.VStreamer import from_file
-
-                # load the subobject into a temporary object
-                try:
-                    loaded_sj = from_file(sj_file)[0]
-                except (IOError, XMLFileError) as err:
-
-                    try:
-                        logger.warning("Loading subjob #%s for job #%s from backup, recent changes may be lost" % (index, self.getMasterID()))
-                        subjob_data = self.__get_dataFile(str(index), True)
-                        sj_file = self._loadSubJobFromDisk(subjob_data)
-                        loaded_sj = from_file(sj_file)[0]
-                        has_loaded_backup = True
-                    except (IOError, XMLFileError) as err:
-                        logger.debug("Failed to Load XML for job: %s using: %s" % (index, subjob_data))
-                        logger.debug("Err:\n%s" % err)
-                        raise
+                if self.isPacked():
+                    loaded_sj = self._loadSubJobFromContainer(index)
+                    has_loaded_backup = False
+                else:
+                    loaded_sj, has_loaded_backup = self._loadSubJobFromDirectory(index)
 
                 loaded_sj._setParent( self._definedParent )
                 if has_loaded_backup:
@@ -434,7 +508,7 @@ class SubJobXMLList(GangaObject):
             parent_name = "Job: %s" % parentObj.id
         else:
             parent_name = "None"
-        logger.debug('Setting Parent: %s' % parent_name)
+        logger.debug('Setting Parent: %s', parent_name)
 
         super(SubJobXMLList, self)._setParent(parentObj)
 
@@ -492,6 +566,14 @@ class SubJobXMLList(GangaObject):
                     sj_statuses.append(self.__getitem__(i).status)
                 else:
                     sj_statuses.append(self._subjobIndexData[i]['status'])
+        elif self.isPacked():
+            # The container knows the statuses of all subjobs without reading them
+            packed_statuses = self._container.statuses()
+            for i in range(len(packed_statuses)):
+                if self.isLoaded(i):
+                    sj_statuses.append(self.__getitem__(i).status)
+                else:
+                    sj_statuses.append(packed_statuses[i])
         else:
             for i in range(len(self)):
                 sj_statuses.append(self.__getitem__(i).status)
@@ -506,26 +588,135 @@ class SubJobXMLList(GangaObject):
 
         from GangaCore.Core.GangaRepository.VStreamer import to_file
 
-        if ignore_disk:
-            range_limit = self._cachedJobs.keys()
+        if getConfig('Configuration')['subjobContainer']:
+            written = self._flushToContainer(ignore_disk)
         else:
-            range_limit = range(len(self))
+            if self.isPacked():
+                self._unpack()
 
-        for index in range_limit:
-            if index in self._cachedJobs:
-                ## If it ain't dirty skip it
-                if not self._cachedJobs[index]._dirty:
-                    continue
+            if ignore_disk:
+                range_limit = self._cachedJobs.keys()
+            else:
+                range_limit = range(len(self))
 
-                subjob_data = self.__get_dataFile(str(index))
-                subjob_obj = self._cachedJobs[index]
+            written = []
+            for index in range_limit:
+                if index in self._cachedJobs:
+                    ## If it ain't dirty skip it
+                    if not self._cachedJobs[index]._dirty:
+                        continue
 
-                if subjob_obj is subjob_obj._getRoot():
-                    raise GangaException(self, "Subjob parent not set correctly in flush.")
+                    subjob_data = self.__get_dataFile(str(index))
+                    subjob_obj = self._cachedJobs[index]
 
-                safe_save( subjob_data, subjob_obj, to_file )
+                    if subjob_obj is subjob_obj._getRoot():
+                        raise GangaException(self, "Subjob parent not set correctly in flush.")
 
+                    written.append((subjob_obj, nextDirtyGeneration()))
+                    self._countBytesWritten(safe_save(subjob_data, subjob_obj, to_file))
+
+        # The index is worked out from the subjobs which are still dirty so they're only marked as flushed afterwards.
+        # Any subjob changed since it was written stays dirty to be written out next time
         self.write_subJobIndex(ignore_disk)
+        for subjob_obj, flush_generation in written:
+            if not subjob_obj._isDirtySince(flush_generation):
+                subjob_obj._setFlushed()
+
+    def _getSubJobRecord(self, index):
+        """Returns the (XML, status) of a subjob in memory as stored in the container
+        Args:
+            index (int): index of the subjob
+        """
+        from GangaCore.Core.GangaRepository.GangaRepositoryXML import check_app_hash
+        from GangaCore.Core.GangaRepository.VStreamer import to_file
+
+        subjob_obj = self._cachedJobs[index]
+        if subjob_obj is subjob_obj._getRoot():
+            raise GangaException(self, "Subjob parent not set correctly in flush.")
+        check_app_hash(subjob_obj)
+        xml = StringIO()
+        to_file(subjob_obj, xml)
+        return xml.getvalue(), subjob_obj.status
+
+    def _flushToContainer(self, ignore_disk=False):
+        """Write the dirty subjobs to the container, converting the subjobs from a directory each if needed.
+        Returns the list of (subjob, generation) of the dirty subjobs written
+        Args:
+            ignore_disk (bool): The subjobs in memory are all of the subjobs, whatever is on disk
+        """
+        records = {}
+        written = []
+        for index in self._cachedJobs:
+            if self._cachedJobs[index]._dirty:
+                written.append((self._cachedJobs[index], nextDirtyGeneration()))
+                records[index] = self._getSubJobRecord(index)
+
+        if self.isPacked():
+            if records or ignore_disk:
+                self._container.write(records, len(self._cachedJobs) if ignore_disk else None)
+                self._countBytesWritten(sum(len(xml) for xml, _ in records.itervalues()))
+        else:
+            self._pack(records, ignore_disk)
+        return written
+
+    def _pack(self, records, ignore_disk=False):
+        """Convert the subjobs from a directory each to a single container
+        Args:
+            records (dict): (XML, status) of the subjobs which have changed in memory
+            ignore_disk (bool): The subjobs in memory are all of the subjobs, whatever is on disk
+        """
+        from GangaCore.Core.GangaRepository.GangaRepositoryXML import rmrf
+
+        if ignore_disk:
+            num_subjobs = len(self._cachedJobs)
+        else:
+            num_subjobs = len(self)
+        if num_subjobs == 0:
+            return
+
+        for index in range(num_subjobs):
+            if index in records:
+                continue
+            if index in self._cachedJobs:
+                records[index] = self._getSubJobRecord(index)
+            elif index in self._subjobIndexData and 'status' in self._subjobIndexData[index]:
+                # Unchanged, so take the XML as it is without parsing it
+                try:
+                    sj_file = self._loadSubJobFromDisk(self.__get_dataFile(str(index)))
+                except IOError:
+                    sj_file = self._loadSubJobFromDisk(self.__get_dataFile(str(index), True))
+                with sj_file:
+                    records[index] = (sj_file.read(), self._subjobIndexData[index]['status'])
+            else:
+                self.__getitem__(index)
+                records[index] = self._getSubJobRecord(index)
+
+        logger.debug("Packing %s subjobs into %s", num_subjobs, self._container.filename)
+        new_name = self._container.filename + '.new'
+        SubJobContainer.create(new_name, records)
+        rename(new_name, self._container.filename)
+        self._countBytesWritten(path.getsize(self._container.filename))
+
+        # The container is used from now on so the directories can go
+        for dir_entry in listdir(self._jobDirectory):
+            if dir_entry.isdigit():
+                rmrf(path.join(self._jobDirectory, dir_entry))
+        self._cached_filenames = {}
+        self._stored_len = []
+
+    def _unpack(self):
+        """Convert the subjobs from a single container back to a directory each"""
+        num_subjobs = len(self._container)
+        logger.debug("Unpacking %s subjobs from %s", num_subjobs, self._container.filename)
+        for index in range(num_subjobs):
+            subjob_data = self.__get_dataFile(str(index))
+            if not path.isdir(path.dirname(subjob_data)):
+                makedirs(path.dirname(subjob_data))
+            with open(subjob_data + '.new', 'w') as sj_file:
+                sj_file.write(self._container.read(index))
+            rename(subjob_data + '.new', subjob_data)
+        self._container.remove()
+        self._stored_len = []
 
     def _setFlushed(self):
         """ Like Node only descend into objects which aren't in the Schema"""
@@ -559,7 +750,7 @@ class SubJobXMLList(GangaObject):
                     else:
                         vals.append(str(cached_data[display_str])[0:width])
                 except KeyError as err:
-                    logger.debug("_private_display KeyError: %s" % err)
+                    logger.debug("_private_display KeyError: %s", err)
                     vals.append("Unknown")
 
             ds += markup(this_format % tuple(vals), colour)
@@ -578,6 +769,8 @@ class SubJobXMLList(GangaObject):
 
         if not path.isdir(jobDirectory):
             return False
+        elif path.isfile(path.join(jobDirectory, SubJobContainer.filename_in_dir)):
+            return bool(len(SubJobContainer.in_dir(jobDirectory)))
         else:
             return bool(SubJobXMLList.countSubJobDirs(jobDirectory, datafileName, True))
 
@@ -608,7 +801,7 @@ class SubJobXMLList(GangaObject):
                     else:
                         subjob_count+=1
 
-        logger.debug("count: %s len: %s" % (subjob_count, len([_folder for _folder in jobDirectoryList if _folder.isdigit()])))
+        logger.debug("count: %s len: %s", subjob_count, len([_folder for _folder in jobDirectoryList if _folder.isdigit()]))
 
         if subjob_count == len([_folder for _folder in jobDirectoryList if _folder.isdigit()]):
             return subjob_count
@@ -1,7 +1,7 @@
 from __future__ import print_function, absolute_import
 from GangaCore.Core.exceptions import GangaException
 from GangaCore.Utility.logging import getLogger
-from GangaCore.GPIDev.Base.Proxy import addProxy, stripProxy, isType, getName
+from GangaCore.GPIDev.Base.Proxy import addProxy, stripProxy, isType, isProxy, getName
 
 from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList, makeGangaListByRef
 
@@ -10,13 +10,13 @@ from GangaCore.Utility.Config import config_scope
 
 from GangaCore.Utility.Plugin import PluginManagerError, allPlugins
 
-from GangaCore.GPIDev.Base.Objects import GangaObject, ObjectMetaclass
+from GangaCore.GPIDev.Base.Objects import GangaObject, ObjectMetaclass, LazyCopy
 from GangaCore.GPIDev.Schema import Schema, Version
-from GangaCore.GPIDev.Lib.GangaList.GangaList import makeGangaList
 
 from .GangaRepository import SchemaVersionError
 
 import xml.sax.saxutils
+import ast
 import copy
 from cStringIO import StringIO
 
@@ -62,18 +62,15 @@ def to_file(j, fobj=None, ignore_subs=[]):
     #return
     _ignore_subs = [ignore_subs] if not isinstance(ignore_subs, list) else ignore_subs
     try:
-        _raw_to_file(j, fobj, _ignore_subs)
+        try:
+            _fast_to_file(j, fobj, _ignore_subs)
+        except _UseVisitor as err:
+            logger.debug("Streaming %s with the VStreamer visitor: %s" % (getName(j), err))
+            _raw_to_file(j, fobj, _ignore_subs)
     except Exception as err:
         logger.error("XML to-file error for file:\n%s" % (err))
         raise XMLFileError(err, "to-file error")
 
-# Faster, but experimental version of to_file without accept()
-# def to_file(j,f=None,ignore_subs=''):
-#    sl = ["<root>"]
-#    sl.extend(fastXML(j,'   ',ignore_subs=ignore_subs))
-#    sl.append("</root>\n")
-#    f.write("".join(sl))
-
 # load object (job) from file f
 # if len(errors) > 0 the object was not loaded correctly.
 # Typical exceptions are:
@@ -86,8 +83,7 @@ def to_file(j, fobj=None, ignore_subs=[]):
 def _raw_from_file(f):
     # logger.debug('----------------------------')
     ###logger.debug('Parsing file: %s',f.name)
-    xml_content = f.read()
-    obj, errors = Loader().parse(xml_content)
+    obj, errors = Loader().parse_file(f)
     return obj, errors
 
 def from_file(f):
@@ -110,40 +106,195 @@ def escape(s):
 def unescape(s):
     return xml.sax.saxutils.unescape(s)
 
-# An experimental, fast way to print a tree of Ganga Objects to file
-# Unused at the moment
-
-
-def fastXML(obj, indent='', ignore_subs=''):
-    if hasattr(obj, "__iter__") and not hasattr(obj, "iteritems"):
-        sl = ["\n", indent, "<sequence>", "\n"]
-        for so in obj:
-            sl.append(indent)
-            sl.extend(fastXML(so, indent + ' ', ignore_subs))
-        sl.append(indent)
-        sl.append("</sequence>")
-        return sl
-    elif hasattr(obj, '_data'):
-        v = obj._schema.version
-        sl = ['\n', indent, '<class name="%s" version="%i.%i" category="%s">\n' % (getName(obj), v.major, v.minor, obj._category)]
-        for attr_name in obj._schema.allItemNames():
-            k = attr_name
-            o = getattr(obj, k)
-            if k != ignore_subs:
-                try:
-                    if not obj._schema[k]._meta["transient"]:
-                        sl.append(indent)
-                        sl.append('<attribute name="%s">' % k)
-                        sl.extend(fastXML(o, indent + '  ', ignore_subs))
-                        sl.append('</attribute>\n')
-                except KeyError as err:
-                    logger.debug("KeyError: %s" % err)
-                    pass
-        sl.append(indent)
-        sl.append('</class>')
-        return sl
+##########################################################################
+# Fast path of to_file.
+#
+# Writes exactly what the VStreamer visitor below writes, but walks the object tree using an emit plan compiled once
+# per class from its Schema rather than going through accept() and a print per line. Any value it doesn't know how to
+# write the same way as the visitor raises _UseVisitor, in which case the whole object is written by the visitor.
+
+
+class _UseVisitor(Exception):
+    pass
+
+# class -> (schema, number of schema items, class header, [(attribute name, is component, is sequence, getter)])
+_emit_plans = {}
+
+# type of value found in a sequence or component attribute -> how it is written
+_NODE, _STRING, _SEQUENCE, _VALUE = range(4)
+_value_kinds = {type(None): _VALUE, bool: _VALUE, int: _VALUE, long: _VALUE, float: _VALUE, unicode: _VALUE,
+                dict: _VALUE, list: _SEQUENCE, tuple: _SEQUENCE, str: _STRING}
+
+_indents = [' ' * (level - 1) * 3 for level in range(32)]
+
+
+def _indent(level):
+    try:
+        return _indents[level]
+    except IndexError:
+        return ' ' * (level - 1) * 3
+
+
+def _get_emit_plan(cls):
+    """
+    Returns the emit plan of a class, compiling it from the schema the first time the class is written
+    Args:
+        cls (class): A GangaObject class
+    """
+    schema = cls._schema
+    num_items = len(schema.datadict or ())
+    plan = _emit_plans.get(cls)
+    if plan is not None and plan[0] is schema and plan[1] == num_items:
+        return plan
+
+    if schema is None:
+        raise _UseVisitor("%s has no schema" % getName(cls))
+
+    header = '<class name="%s" version="%d.%d" category="%s">' % (schema.name, schema.version.major, schema.version.minor, schema.category)
+
+    # Same order and choice of attributes as GangaObject.accept and GangaList.accept, transient ones are never written
+    attributes = []
+    is_list = issubclass(cls, GangaList)
+    for name, item in schema.simpleItems():
+        if is_list and name == '_list':
+            if not item['transient']:
+                attributes.append((name, True, 1, None))
+        elif item['visitable'] and not item['transient']:
+            attributes.append((name, False, item['sequence'], item['getter']))
+    for name, item in schema.sharedItems():
+        if item['visitable'] and not item['transient']:
+            attributes.append((name, False, item['sequence'], item['getter']))
+    for name, item in schema.componentItems():
+        if item['visitable'] and not item['transient']:
+            attributes.append((name, True, item['sequence'], item['getter']))
+
+    plan = (schema, num_items, header, attributes)
+    _emit_plans[cls] = plan
+    return plan
+
+
+def _get_value_kind(cls):
+    """
+    Returns how a value of the given type is written when it's found in a sequence or component attribute
+    Args:
+        cls (type): The type of the value
+    """
+    if isProxy(cls):
+        raise _UseVisitor("can't stream a %s" % cls)
+    if issubclass(cls, GangaObject):
+        kind = _NODE
+    elif issubclass(cls, str):
+        kind = _STRING
+    elif hasattr(cls, 'accept') or hasattr(cls, '__getattr__'):
+        raise _UseVisitor("can't stream a %s" % cls)
+    elif issubclass(cls, (list, tuple)):
+        kind = _SEQUENCE
+    else:
+        kind = _VALUE
+    _value_kinds[cls] = kind
+    return kind
+
+
+def _emit_node(node, level, out, selection):
+    """
+    Write a GangaObject, same as node.accept(VStreamer)
+    Args:
+        node (GangaObject): The object to write
+        level (int): The level of the visitor when accept is called
+        out (function): Appends a string to the output
+        selection (list): Names of the attributes not written for the top level object
+    """
+    cls = node.__class__
+    if not hasattr(cls, '_schema'):
+        return
+    schema, _, header, attributes = _get_emit_plan(cls)
+
+    with node._getRoot()._lock:
+        level += 1
+        indent = _indent(level)
+        indent1 = _indent(level + 1)
+        indent2 = _indent(level + 2)
+        out('%s %s\n' % (indent, header))
+
+        data = node._data
+        for name, is_component, sequence, getter in attributes:
+            if level == 1 and name in selection:
+                continue
+            if getter is None and name in data:
+                value = data[name]
+                if value.__class__ is LazyCopy:
+                    # Write out what the copy would be without making it
+                    value = value.source
+            else:
+                # The descriptor knows what to do about getters, the index cache and loading the object
+                value = getattr(node, name)
+                data = node._data
+
+            if is_component:
+                out('%s <attribute name="%s">\n' % (indent1, name))
+                if sequence:
+                    out('%s <sequence>\n' % indent2)
+                    for element in value:
+                        _emit_optional(element, level + 2, out)
+                    out('%s </sequence>\n' % indent2)
+                else:
+                    _emit_optional(value, level + 1, out)
+                out('%s </attribute>\n' % indent1)
+            else:
+                out('%s <attribute name="%s"> ' % (indent1, name))
+                if sequence:
+                    out('\n%s <sequence>\n' % indent2)
+                    for element in value:
+                        _emit_optional(element, level + 2, out)
+                    out('%s </sequence>\n%s </attribute>\n' % (indent2, indent1))
+                else:
+                    if isinstance(value, GangaObject):
+                        out('\n')
+                        _emit_optional(value, level + 2, out)
+                    else:
+                        out('\n %s <value>%s</value>\n' % (indent2, escape(repr(value))))
+                    out('%s </attribute>\n' % indent1)
+
+        out('%s </class>\n' % indent)
+
+
+def _emit_optional(value, level, out):
+    """
+    Write a value found in an attribute, same as VStreamer.acceptOptional
+    Args:
+        value (object): The value to write
+        level (int): The level of the visitor when acceptOptional is called
+        out (function): Appends a string to the output
+    """
+    level += 1
+    cls = value.__class__
+    kind = _value_kinds.get(cls)
+    if kind is None:
+        kind = _get_value_kind(cls)
+
+    if value is None:
+        out('%s <value>None</value>\n' % _indent(level))
+    elif kind == _NODE:
+        _emit_node(value, level, out, ())
+    elif kind == _STRING:
+        out('%s <value>%s</value>\n' % (_indent(level), escape(repr(value))))
+    elif kind == _SEQUENCE:
+        indent = _indent(level)
+        out('%s <sequence>\n' % indent)
+        for element in value:
+            _emit_optional(element, level, out)
+        out('%s </sequence>\n' % indent)
     else:
-        return ["<value>", escape(repr(obj)), "</value>"]
+        out('\n %s <value>%s</value>\n' % (_indent(level), escape(repr(value))))
+
+
+def _fast_to_file(j, fobj=None, ignore_subs=[]):
+    if not isinstance(j, GangaObject):
+        raise _UseVisitor("not a GangaObject")
+    chunks = ['<root>\n']
+    _emit_node(j, 0, chunks.append, ignore_subs)
+    chunks.append('</root>\n')
+    print(''.join(chunks), file=fobj)
 
 ##########################################################################
 # A visitor to print the object tree into XML.
@@ -272,6 +423,75 @@ class EmptyGangaObject(GangaObject):
         super(EmptyGangaObject, self).__init__()
 
 
+##########################################################################
+# Values of <value> elements.
+#
+# Values are written as repr() so most of them are plain literals which are parsed without any eval. Anything else
+# (e.g. objects added to the config_scope) is evaluated in the config_scope as before. Results which aren't cheap to
+# work out are kept in a cache of bounded size so that loading a large number of subjobs doesn't grow it forever.
+
+_MAX_CACHED_VALUES = 10000
+
+_literal_constants = {'None': None, 'True': True, 'False': False}
+
+_immutable_types = (str, unicode, int, long, float, bool, type(None))
+
+
+def _eval_value(s):
+    """
+    Returns the object written as s into a <value> element
+    Args:
+        s (str): The unescaped text of the element
+    """
+    try:
+        return _literal_constants[s]
+    except KeyError:
+        pass
+
+    # A quoted string without any escape sequence in it is the string itself
+    if len(s) > 1 and s[0] in '\'"' and s[-1] == s[0] and '\\' not in s and s[0] not in s[1:-1]:
+        # eval gives back the utf-8 encoded string
+        return s[1:-1].encode('utf-8') if isinstance(s, unicode) else s[1:-1]
+
+    # (Leading zeros would make it octal)
+    if s.isdigit() and (s[0] != '0' or s == '0'):
+        return int(s)
+
+    try:
+        value = _cached_eval_strings[s]
+    except KeyError:
+        try:
+            value = ast.literal_eval(s)
+        except (ValueError, SyntaxError):
+            # This is ugly and classes which use this are bad, but this needs to be fixed in another PR
+            # TODO Make the scope of objects a lot better than whatever is in the config
+            value = eval(s, config_scope)
+        if len(_cached_eval_strings) >= _MAX_CACHED_VALUES:
+            _cached_eval_strings.clear()
+        _cached_eval_strings[s] = value
+
+    if isinstance(value, _immutable_types):
+        return value
+    return copy.deepcopy(value)
+
+
+# (category, name, version) -> class, for the classes found to be compatible with what is in the repository
+_loadable_classes = {}
+
+
+def _load_list(items):
+    """
+    Returns the GangaList of the items of a <sequence>. This is what makeGangaList does, without working out the default
+    values of the schema of GangaList first as they are overwritten straight away.
+    Args:
+        items (list): The objects and values read from the sequence
+    """
+    alist = GangaList.getNew()
+    alist.setSchemaAttribute('_list', items)
+    alist.setSchemaAttribute('_is_preparable', False)
+    return alist
+
+
 class Loader(object):
 
     """ Job object tree loader.
@@ -287,157 +507,157 @@ class Loader(object):
         # buffer for building sequences (FIXME: what about nested sequences?)
         self.sequence_start = []
 
-    def parse(self, s):
-        """ Parse and load object from string s using internal XML parser (expat).
-        """
+    def _make_parser(self):
         import xml.parsers.expat
 
-        # 3 handler functions
-        def start_element(name, attrs):
-            #logger.debug('Start element: name=%s attrs=%s', name, attrs) #FIXME: for 2.4 use CurrentColumnNumber and CurrentLineNumber
-            # if higher level element had error, ignore the corresponding part
-            # of the XML tree as we go down
-            if self.ignore_count:
-                self.ignore_count += 1
-                return
-
-            # initialize object stack
-            if name == 'root':
-                assert self.stack is None, "duplicated <root> element"
-                self.stack = []
-                return
-
-            assert not self.stack is None, "missing <root> element"
-
-            # load a class, make empty object and push it as the current object
-            # on the stack
-            if name == 'class':
-                try:
-                    cls = allPlugins.find(attrs['category'], attrs['name'])
-                except PluginManagerError as e:
-                    self.errors.append(e)
-                    #self.errors.append('Unknown class: %(name)s'%attrs)
-                    obj = EmptyGangaObject()
-                    # ignore all elemenents until the corresponding ending
-                    # element (</class>) is reached
-                    self.ignore_count = 1
-                else:
-                    version = Version(*[int(v) for v in attrs['version'].split('.')])
-                    if not cls._schema.version.isCompatible(version):
-                        attrs['currversion'] = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
-                        self.errors.append(SchemaVersionError('Incompatible schema of %(name)s, repository is %(version)s currently in use is %(currversion)s' % attrs))
-                        obj = EmptyGangaObject()
-                        # ignore all elemenents until the corresponding ending
-                        # element (</class>) is reached
-                        self.ignore_count = 1
-                    else:
-                        # Initialize and cache a c class instance to use as a classs factory
-                        obj = cls.getNew()
-                self.stack.append(obj)
-
-            # push the attribute name on the stack
-            if name == 'attribute':
-                self.stack.append(attrs['name'])
-
-            # start value_contruct mode and initialize the value buffer
-            if name == 'value':
-                self.value_construct = ''
-
-            # save a marker where the sequence begins on the stack
-            if name == 'sequence':
-                self.sequence_start.append(len(self.stack))
-
-        def end_element(name):
-            #logger.debug('End element: name=%s', name)
-
-            # if higher level element had error, ignore the corresponding part
-            # of the XML tree as we go up
-            if self.ignore_count:
-                self.ignore_count -= 1
-                return
-
-            # when </attribute> is seen the current object, attribute name and
-            # value should be on top of the stack
-            if name == 'attribute':
-                value = self.stack.pop()
-                aname = self.stack.pop()
-                obj = self.stack[-1]
-                # update the object's attribute
-                try:
-                    obj.setSchemaAttribute(aname, value)
-                except:
-                    raise GangaException("ERROR in loading XML, failed to set attribute %s for class %s" % (aname, _getName(obj)))
-                #logger.info("Setting: %s = %s" % (aname, value))
-
-            # when </value> is seen the value_construct buffer (CDATA) should
-            # be a python expression (e.g. quoted string)
-            if name == 'value':
-                try:
-                    # unescape the special characters
-                    s = unescape(self.value_construct)
-                    #logger.debug('string value: %s',s)
-                    if s not in _cached_eval_strings:
-                        # This is ugly and classes which use this are bad, but this needs to be fixed in another PR
-                        # TODO Make the scope of objects a lot better than whatever is in the config
-                        # This is a dictionary constructed from eval-ing things in the Config. Why does should it do this?
-                        # Anyway, lets save the result for speed
-                        _cached_eval_strings[s] = eval(s, config_scope)
-                    eval_str = _cached_eval_strings[s]
-                    if not isinstance(eval_str, str):
-                        val = copy.deepcopy(eval_str)
-                    else:
-                        val = eval_str
-                    #logger.debug('evaled value: %s type=%s',repr(val),type(val))
-                    self.stack.append(val)
-                    self.value_construct = None
-                except:
-                    raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\'" % str(self.value_construct))
-
-            # when </sequence> is seen we remove last items from stack (as indicated by sequence_start)
-            # we make a GangaList from these items and put it on stack
-            if name == 'sequence':
-                pos = self.sequence_start.pop()
-                try:
-                    alist = makeGangaList(self.stack[pos:])
-                except:
-                    raise GangaException("ERROR in loading XML, failed to construct a sequence(list) properly")
-                del self.stack[pos:]
-                self.stack.append(alist)
-
-            # when </class> is seen we finish initializing the new object
-            # by setting remaining attributes to their default values
-            # the object stays on the stack (will be removed by </attribute> or
-            # is a root object)
-            if name == 'class':
-                obj = self.stack[-1]
-                cls = obj.__class__
-                if isinstance(cls, GangaObject):
-                    for attr, item in cls._schema.allItems():
-                        if attr not in obj._data:
-                            if item.getProperties()['getter'] is None:
-                                try:
-                                    setattr(obj, attr, self._schema.getDefaultValue(attr))
-                                except:
-                                    raise GangaException("ERROR in loading XML, failed to set default attribute %s for class %s" % (attr, _getName(obj)))
-                pass
-
-        def char_data(data):
-            # char_data may be called many times in one CDATA section so we need to build up
-            # the full buffer for <value>CDATA</value> section incrementally
-            if self.value_construct is not None:
-                ###logger.debug('char_data: append=%s',data)
-                # FIXME: decode data
-                self.value_construct += data
-
-        # start parsing using callbacks
         p = xml.parsers.expat.ParserCreate()
+        # Hand over the text of a <value> in one go
+        p.buffer_text = True
 
-        p.StartElementHandler = start_element
-        p.EndElementHandler = end_element
-        p.CharacterDataHandler = char_data
+        p.StartElementHandler = self._start_element
+        p.EndElementHandler = self._end_element
+        p.CharacterDataHandler = self._char_data
+        return p
 
-        p.Parse(s)
+    def parse(self, s):
+        """ Parse and load object from string s using internal XML parser (expat).
+        """
+        self._make_parser().Parse(s, True)
+        return self._finish()
 
+    def parse_file(self, f):
+        """ Parse and load object from the file object f, reading it a block at a time rather than as a whole
+        """
+        self._make_parser().ParseFile(f)
+        return self._finish()
+
+    def _find_class(self, attrs):
+        """ Returns the class of a <class> element, None (and an error is recorded) if it can't be loaded
+        """
+        key = (attrs['category'], attrs['name'], attrs['version'])
+        try:
+            return _loadable_classes[key]
+        except KeyError:
+            pass
+
+        try:
+            cls = allPlugins.find(attrs['category'], attrs['name'])
+        except PluginManagerError as e:
+            self.errors.append(e)
+            #self.errors.append('Unknown class: %(name)s'%attrs)
+            return None
+
+        version = Version(*[int(v) for v in attrs['version'].split('.')])
+        if not cls._schema.version.isCompatible(version):
+            attrs['currversion'] = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
+            self.errors.append(SchemaVersionError('Incompatible schema of %(name)s, repository is %(version)s currently in use is %(currversion)s' % attrs))
+            return None
+
+        _loadable_classes[key] = cls
+        return cls
+
+    def _start_element(self, name, attrs):
+        #logger.debug('Start element: name=%s attrs=%s', name, attrs) #FIXME: for 2.4 use CurrentColumnNumber and CurrentLineNumber
+        # if higher level element had error, ignore the corresponding part
+        # of the XML tree as we go down
+        if self.ignore_count:
+            self.ignore_count += 1
+            return
+
+        # initialize object stack
+        if name == 'root':
+            assert self.stack is None, "duplicated <root> element"
+            self.stack = []
+            return
+
+        assert not self.stack is None, "missing <root> element"
+
+        # start value_contruct mode and initialize the value buffer
+        if name == 'value':
+            self.value_construct = []
+            return
+
+        # push the attribute name on the stack
+        if name == 'attribute':
+            self.stack.append(attrs['name'])
+            return
+
+        # save a marker where the sequence begins on the stack
+        if name == 'sequence':
+            self.sequence_start.append(len(self.stack))
+            return
+
+        # load a class, make empty object and push it as the current object
+        # on the stack
+        if name == 'class':
+            cls = self._find_class(attrs)
+            if cls is None:
+                obj = EmptyGangaObject()
+                # ignore all elemenents until the corresponding ending
+                # element (</class>) is reached
+                self.ignore_count = 1
+            else:
+                # Initialize and cache a c class instance to use as a classs factory
+                obj = cls.getNew()
+            self.stack.append(obj)
+
+    def _end_element(self, name):
+        #logger.debug('End element: name=%s', name)
+
+        # if higher level element had error, ignore the corresponding part
+        # of the XML tree as we go up
+        if self.ignore_count:
+            self.ignore_count -= 1
+            return
+
+        # when </value> is seen the value_construct buffer (CDATA) should
+        # be a python expression (e.g. quoted string)
+        if name == 'value':
+            try:
+                # unescape the special characters
+                self.stack.append(_eval_value(unescape(''.join(self.value_construct))))
+                self.value_construct = None
+            except:
+                raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\'" % ''.join(self.value_construct))
+            return
+
+        # when </attribute> is seen the current object, attribute name and
+        # value should be on top of the stack
+        if name == 'attribute':
+            value = self.stack.pop()
+            aname = self.stack.pop()
+            obj = self.stack[-1]
+            # update the object's attribute
+            try:
+                obj.setSchemaAttribute(aname, value)
+            except:
+                raise GangaException("ERROR in loading XML, failed to set attribute %s for class %s" % (aname, getName(obj)))
+            #logger.info("Setting: %s = %s" % (aname, value))
+            return
+
+        # when </sequence> is seen we remove last items from stack (as indicated by sequence_start)
+        # we make a GangaList from these items and put it on stack
+        if name == 'sequence':
+            pos = self.sequence_start.pop()
+            try:
+                alist = _load_list(self.stack[pos:])
+            except:
+                raise GangaException("ERROR in loading XML, failed to construct a sequence(list) properly")
+            del self.stack[pos:]
+            self.stack.append(alist)
+
+        # when </class> is seen the new object is complete, it stays on the stack (will be removed by </attribute> or
+        # is a root object)
+
+    def _char_data(self, data):
+        # char_data may be called many times in one CDATA section so we need to build up
+        # the full buffer for <value>CDATA</value> section incrementally
+        if self.value_construct is not None:
+            ###logger.debug('char_data: append=%s',data)
+            # FIXME: decode data
+            self.value_construct.append(data)
+
+    def _finish(self):
         if len(self.stack) != 1:
             self.errors.append(AssertionError('multiple objects inside <root> element'))
 
@@ -445,9 +665,9 @@ class Loader(object):
 
         #logger.info("obj.__dict__: %s" % obj.__dict__)
 
-        # Raise Exception if object is incomplete
+        # Raise Exception if object is incomplete. The attributes which were read are there, the others are looked up
+        data = obj._data
         for attr, item in obj._schema.allItems():
-            if not hasattr(obj, attr):
+            if attr not in data and not hasattr(obj, attr):
                 raise AssertionError("incomplete XML file")
         return obj, self.errors
-
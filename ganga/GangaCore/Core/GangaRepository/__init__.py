@@ -7,6 +7,7 @@ from GangaCore.Core.GangaRepository.GangaRepository import GangaRepository
 from GangaCore.Core.exceptions import RepositoryError, InaccessibleObjectError, SchemaVersionError
 from GangaCore.Core.GangaRepository.Registry import RegistryError, RegistryAccessError, RegistryKeyError, RegistryLockError, ObjectNotInRegistryError
 from GangaCore.Core.GangaRepository import GangaRepositoryXML
+from GangaCore.Core.GangaRepository import GangaRepositorySQLite
 
 allRegistries = {}
 
@@ -216,22 +216,27 @@ class ThreadPoolQueueMonitor(object):
                                            kwargs=kwargs,
                                            priority=priority)
 
-    def _addSystem(self, worker_code, args=(), kwargs={}, priority=5, name=None):
+    def _addSystem(self, worker_code, args=(), kwargs={}, priority=5, name=None, latch=None):
 
         if not isinstance(worker_code, collections.Callable):
             logger.error("Error Adding internal task!! please report this to the Ganga developers!")
+            if latch is not None:
+                latch.count_down()
             return
 
         if self.isfrozen() is True:
             if not self._shutdown:
                 logger.warning("Queue System is frozen not adding any more System processes!")
+            if latch is not None:
+                latch.count_down()
             return
 
         self._monitoring_threadpool.add_function(worker_code,
                                                  args=args,
                                                  kwargs=kwargs,
                                                  priority=priority,
-                                                 name=name)
+                                                 name=name,
+                                                 latch=latch)
 
     def addProcess(self,
                    command,
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 import Queue
+import threading
+import time
 import traceback
 import collections
 from GangaCore.Core.exceptions import GangaException, GangaTypeError
@@ -12,11 +14,94 @@ from GangaCore.GPIDev.Base.Proxy import getName
 from collections import namedtuple
 
 logger = getLogger()
-QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name'])
+QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name', 'latch'])
+QueueElement.__new__.__defaults__ = (None,)
 CommandInput = namedtuple('CommandInput',  ['command', 'timeout', 'env', 'cwd', 'shell', 'python_setup', 'eval_includes', 'update_env'])
 FunctionInput = namedtuple('FunctionInput', ['function', 'args', 'kwargs'])
 
 
+class TaskLatch(object):
+
+    """
+    Countdown latch for a group of tasks handed to a WorkerThreadPool.
+    Every task counts the latch down once it has finished, including its callback or fallback function,
+    so whoever is waiting wakes up as soon as the last task is done rather than polling for it.
+    """
+
+    def __init__(self, count=0):
+        """
+        Args:
+            count (int): Number of tasks the latch starts waiting for, more can be added with add()
+        """
+        super(TaskLatch, self).__init__()
+        self._cond = threading.Condition()
+        self._total = count
+        self._done = 0
+        self._start = time.time()
+
+    def add(self, count=1):
+        """ Expect this many more tasks
+        Args:
+            count (int): Number of tasks to add
+        """
+        with self._cond:
+            self._total += count
+
+    def count_down(self):
+        """ Mark one task as finished, wakes up the waiting threads once all tasks are done"""
+        with self._cond:
+            self._done += 1
+            if self._done >= self._total:
+                self._cond.notifyAll()
+
+    @property
+    def done(self):
+        """ Number of tasks which have finished"""
+        return self._done
+
+    @property
+    def total(self):
+        """ Number of tasks the latch is waiting for"""
+        return self._total
+
+    def elapsed(self):
+        """ Time in seconds since the latch was created"""
+        return time.time() - self._start
+
+    def rate(self):
+        """ Number of tasks finished per second so far"""
+        elapsed = self.elapsed()
+        if elapsed <= 0.:
+            return 0.
+        return self._done / elapsed
+
+    def wait(self, timeout=None, progress=None, progress_interval=10.):
+        """
+        Block until all the tasks have finished. Returns True if they did, False if the timeout was hit first
+        Args:
+            timeout (float): Maximum time to wait in seconds, None waits forever
+            progress (callable): Called as progress(latch) every progress_interval seconds while waiting
+            progress_interval (float): Time between calls to progress
+        """
+        if timeout is not None:
+            end_time = time.time() + timeout
+        with self._cond:
+            while self._done < self._total:
+                wait_time = progress_interval if progress is not None else None
+                if timeout is not None:
+                    remaining = end_time - time.time()
+                    if remaining <= 0.:
+                        return False
+                    wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                if wait_time is None:
+                    # Condition.wait without a timeout can't be interrupted in python2, so wake up now and then
+                    wait_time = 60.
+                self._cond.wait(wait_time)
+                if progress is not None and self._done < self._total:
+                    progress(self)
+        return True
+
+
 class WorkerThreadPool(object):
 
     """
@@ -105,6 +190,8 @@ class WorkerThreadPool(object):
                 logger.error("                       expected: ('FunctionInput' or 'CommandInput')")
                 self.__queue.task_done()
                 thread.unregister()
+                if item.latch is not None:
+                    item.latch.count_down()
                 continue
 
             try:
@@ -157,6 +244,8 @@ class WorkerThreadPool(object):
                 thread._timeout = 'N/A'
                 self.__queue.task_done()
                 thread.unregister()
+                if item.latch is not None:
+                    item.latch.count_down()
 
             thread.gangaName = oldname
 
@@ -164,21 +253,31 @@ class WorkerThreadPool(object):
                      function, args=(), kwargs={}, priority=5,
                      callback_func=None, callback_args=(), callback_kwargs={},
                      fallback_func=None, fallback_args=(), fallback_kwargs={},
-                     name=None):
+                     name=None, latch=None):
+        """
+        Add a python callable to the queue.
+        If a TaskLatch is given it is counted down once the function and its callback/fallback have run,
+        or straight away if the function can't be queued
+        """
 
         if not isinstance(function, collections.Callable):
             logger.error('Only a python callable object may be added to the queue using the add_function() method')
+            if latch is not None:
+                latch.count_down()
             return
         if self.isfrozen() is True:
             if not self._shutdown:
                 logger.warning("Cannot Add Process as Queue is frozen!")
+            if latch is not None:
+                latch.count_down()
             return
         self.__queue.put(QueueElement(priority=priority,
                                       command_input=FunctionInput(
                                           function, args, kwargs),
                                       callback_func=FunctionInput(
                                           callback_func, callback_args, callback_kwargs),
-                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name
+                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name,
+                                      latch=latch
                                       ))
 
     def add_process(self,
@@ -218,7 +317,12 @@ class WorkerThreadPool(object):
         """
         Purges the thread pools queue.
         """
+        purged = self.__queue.queue
         self.__queue.queue = []
+        # Nobody should be left waiting for tasks which will never run
+        for item in purged:
+            if isinstance(item, QueueElement) and item.latch is not None:
+                item.latch.count_down()
 
     def get_queue(self):
         """
@@ -0,0 +1,64 @@
+##########################################################################
+# Ganga Project. http://cern.ch/ganga
+#
+##########################################################################
+"""
+Bookkeeping of the jobs the monitoring loop has to look at.
+
+Rather than walking the whole job registry on every monitoring step, the monitoring loop keeps the set of jobs which
+are in an active state. Jobs report their status transitions here (see Job.__setattr__) so the set only has to be
+rebuilt from scratch at startup and every [PollThread]active_jobs_rescan_rate seconds (600 by default).
+Status changes which don't go through a Job of this session, e.g. jobs loaded from disk after being changed by another
+session, are only picked up by that full rescan.
+"""
+
+import threading
+
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+# States in which a (top-level) job needs to be polled by the monitoring
+ACTIVE_STATES = ('submitting', 'submitted', 'running')
+
+
+class ActiveJobSet(object):
+
+    """
+    Thread safe record of the ids of the top-level jobs whose status has changed, per registry.
+    The monitoring loop drains this in every step to update its own set of active jobs
+    """
+
+    def __init__(self):
+        super(ActiveJobSet, self).__init__()
+        self._lock = threading.Lock()
+        # registry -> set of ids whose status changed since the last call to pop_changed
+        self._changed = {}
+
+    def status_changed(self, job):
+        """
+        Record that the status of this job (or one of its subjobs) changed
+        Args:
+            job (Job): The job whose status has been set
+        """
+        root = job._getRoot()
+        reg = root._getRegistry()
+        if reg is None:
+            return
+        this_id = getattr(root, '_registry_id', None)
+        if this_id is None:
+            return
+        with self._lock:
+            self._changed.setdefault(reg, set()).add(this_id)
+
+    def pop_changed(self, registry):
+        """
+        Returns the set of ids which changed status since the last call and forgets about them
+        Args:
+            registry (Registry): The registry the jobs belong to
+        """
+        with self._lock:
+            return self._changed.pop(registry, set())
+
+
+active_jobs = ActiveJobSet()
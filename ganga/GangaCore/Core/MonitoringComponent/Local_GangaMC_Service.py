@@ -18,9 +18,10 @@ from GangaCore.Core.InternalServices import Coordinator
 from GangaCore.GPIDev.Base.Proxy import isType, stripProxy, getName, getRuntimeGPIObject
 
 from GangaCore.GPIDev.Lib.Job.Job import lazyLoadJobStatus, lazyLoadJobBackend
+from GangaCore.Core.MonitoringComponent.ActiveJobs import active_jobs
 
 # Setup logging ---------------
-from GangaCore.Utility.logging import getLogger, log_unknown_exception, log_user_exception
+from GangaCore.Utility.logging import getLogger, log_unknown_exception, log_user_exception, lazy, isDebugEnabled
 
 from GangaCore.Core.exceptions import BackendError
 from GangaCore.Utility.Config import getConfig
@@ -112,7 +113,7 @@ class MonitoringWorkerThread(GangaThread):
         # import sys
         # sys.settrace(_trace)
         while not self.should_stop():
-            log.debug("%s waiting..." % threading.currentThread())
+            log.debug("%s waiting...", threading.currentThread())
             #setattr(threading.currentThread(), 'action', None)
 
             heartbeat_times[self._thread_name] = time.time()
@@ -128,8 +129,8 @@ class MonitoringWorkerThread(GangaThread):
                 break
 
             #setattr(threading.currentThread(), 'action', action)
-            log.debug("Qin's size is currently: %d" % Qin.qsize())
-            log.debug("%s running..." % threading.currentThread())
+            log.debug("Qin's size is currently: %d", Qin.qsize())
+            log.debug("%s running...", threading.currentThread())
             self._currently_running_command = True
             if not isType(action, JobAction):
                 continue
@@ -148,7 +149,7 @@ class MonitoringWorkerThread(GangaThread):
                     self._running_args = []
                 result = action.function(*action.args, **action.kwargs)
             except Exception as err:
-                log.debug("_execUpdateAction: %s" % str(err))
+                log.debug("_execUpdateAction: %s", err)
                 action.callback_Failure()
             else:
                 if result in action.success:
@@ -321,7 +322,7 @@ class UpdateDict(object):
             self.table[backend] = _DictEntry(backendObj, set(jobList), threading.RLock(), timeoutMax)
             # queue to get processed
             Qin.put(JobAction(backendCheckingFunction, self.table[backend].updateActionTuple()))
-            log.debug("**Adding %s to new %s backend entry." % ([stripProxy(x).getFQID('.') for x in jobList], backend))
+            log.debug("**Adding %s to new %s backend entry.", lazy(lambda: [stripProxy(x).getFQID('.') for x in jobList]), backend)
             return True
 
         # backend is in Qin waiting to be processed. Increase it's list of jobs
@@ -329,28 +330,28 @@ class UpdateDict(object):
         # number of update requests.
         # i.e. It's like getting a friend in the queue to pay for your
         # purchases as well! ;p
-        log.debug("*: backend=%s, isLocked=%s, isOwner=%s, joblist=%s, queue=%s" % (backend, lock._RLock__count, lock._is_owned(), [x.id for x in jobList], Qin.qsize()))
+        log.debug("*: backend=%s, isLocked=%s, isOwner=%s, joblist=%s, queue=%s", backend, lock._RLock__count, lock._is_owned(), lazy(lambda: [x.id for x in jobList]), Qin.qsize())
         if lock.acquire(False):
             try:
                 jSetSize = len(jSet)
-                log.debug("Lock acquire successful. Updating jSet %s with %s." % ([stripProxy(x).getFQID('.') for x in jSet], [stripProxy(x).getFQID('.') for x in jobList]))
+                log.debug("Lock acquire successful. Updating jSet %s with %s.", lazy(lambda: [stripProxy(x).getFQID('.') for x in jSet]), lazy(lambda: [stripProxy(x).getFQID('.') for x in jobList]))
                 jSet.update(jobList)
                 # If jSet is empty it was cleared by an update action
                 # i.e. the queue does not contain an update action for the
                 # particular backend any more.
                 if jSetSize:  # jSet not cleared
-                    log.debug("%s backend job set exists. Added %s to it." % (backend, [stripProxy(x).getFQID('.') for x in jobList]))
+                    log.debug("%s backend job set exists. Added %s to it.", backend, lazy(lambda: [stripProxy(x).getFQID('.') for x in jobList]))
                 else:
                     Qin.put(JobAction(backendCheckingFunction, self.table[backend].updateActionTuple()))
-                    log.debug("Added new %s backend update action for jobs %s." % (backend, [stripProxy(x).getFQID('.') for x in self.table[backend].updateActionTuple()[1]]))
+                    log.debug("Added new %s backend update action for jobs %s.", backend, lazy(lambda: [stripProxy(x).getFQID('.') for x in self.table[backend].updateActionTuple()[1]]))
 
             except Exception as err:
                 log.error("addEntry error: %s" % str(err))
             finally:
                 lock.release()
 
-            log.debug("**: backend=%s, isLocked=%s, isOwner=%s, joblist=%s, queue=%s" %
-                    (backend, lock._RLock__count, lock._is_owned(), [stripProxy(x).getFQID('.') for x in jobList], Qin.qsize()))
+            log.debug("**: backend=%s, isLocked=%s, isOwner=%s, joblist=%s, queue=%s",
+                      backend, lock._RLock__count, lock._is_owned(), lazy(lambda: [stripProxy(x).getFQID('.') for x in jobList]), Qin.qsize())
             return True
 
     def clearEntry(self, backend):
@@ -372,14 +373,14 @@ class UpdateDict(object):
             # not decremented simply because there are no updates occuring.
             if entry.timeoutCounter == entry.timeoutCounterMax and entry.entryLock.acquire(False):
                 with release_when_done(entry.entryLock):
-                    log.debug("%s has been reset. Acquired lock to begin countdown." % backend)
+                    log.debug("%s has been reset. Acquired lock to begin countdown.", backend)
                     entry.timeLastUpdate = time.time()
 
                     # decrease timeout counter
                     if entry.timeoutCounter <= 0.0:
                         entry.timeoutCounter = entry.timeoutCounterMax - 0.01
                         entry.timeLastUpdate = time.time()
-                        log.debug("%s backend counter timeout. Resetting to %s." % (backend, entry.timeoutCounter))
+                        log.debug("%s backend counter timeout. Resetting to %s.", backend, entry.timeoutCounter)
                     else:
                         _l = time.time()
                         entry.timeoutCounter -= _l - entry.timeLastUpdate
@@ -453,6 +454,22 @@ def resubmit_if_required(jobList_fromset):
             j.auto_resubmit()
 
 
+def _next_bunch(jobList_fromset, start, blocks_of_size):
+    """
+    Return the bunch of jobs starting at 'start' which contains a total number of (sub)jobs
+    close to 'blocks_of_size' and the position of the next bunch
+    """
+    bunch = []
+    count = 0
+    pos = start
+    while pos < len(jobList_fromset) and count < blocks_of_size:
+        this_job = jobList_fromset[pos]
+        bunch.append(this_job)
+        count += max(len(this_job.subjobs), 1)
+        pos += 1
+    return bunch, pos
+
+
 def get_jobs_in_bunches(jobList_fromset, blocks_of_size=5, stripProxies=True):
     """
     Return a list of lists of subjobs where each list contains
@@ -460,33 +477,59 @@ def get_jobs_in_bunches(jobList_fromset, blocks_of_size=5, stripProxies=True):
     whilst not splitting jobs containing subjobs
     Also strip the jobs of their proxies...
     """
+    if stripProxies:
+        jobList_fromset = [stripProxy(this_job) for this_job in jobList_fromset]
+    else:
+        jobList_fromset = list(jobList_fromset)
+
     list_of_bunches = []
-    temp_list = []
+    pos = 0
+    while pos < len(jobList_fromset):
+        bunch, pos = _next_bunch(jobList_fromset, pos, blocks_of_size)
+        list_of_bunches.append(bunch)
 
-    for this_job in jobList_fromset:
+    return list_of_bunches
 
-        if stripProxies:
-            temp_list.append(stripProxy(this_job))
-        else:
-            temp_list.append(this_job)
 
-        count = 0
-        for found_job in temp_list:
-            sj_len = len(found_job.subjobs)
-            if sj_len > 0:
-                count += sj_len
-            else:
-                count += 1
+class _BackendPollState(object):
 
-        if count >= blocks_of_size:
-            list_of_bunches.append(temp_list)
-            temp_list = []
+    """
+    What the monitoring remembers about polling one backend between steps:
+    the number of jobs passed to the backend in one call, adapted to how long the calls take,
+    and when each job was last polled so that jobs left out because of the poll budget go first next time
+    """
 
-    if len(temp_list) != 0:
-        list_of_bunches.append(temp_list)
-        temp_list = []
+    __slots__ = ('batch_size', 'last_polled')
 
-    return list_of_bunches
+    def __init__(self, batch_size):
+        self.batch_size = max(int(batch_size), 1)
+        self.last_polled = {}
+
+    def order(self, jobList):
+        """ Return the jobs with the ones which have waited longest first"""
+        return sorted(jobList, key=lambda j: self.last_polled.get(j.id, 0.))
+
+    def adapt(self, n_jobs, elapsed):
+        """ Grow the batch size while the backend answers quickly, shrink it when a call takes too long
+        Args:
+            n_jobs (int): Number of (sub)jobs in the last call
+            elapsed (float): Time the last call took
+        """
+        target = config['monitoring_batch_target_time']
+        if elapsed > target:
+            self.batch_size = max(self.batch_size // 2, 1)
+        elif elapsed < target / 2. and n_jobs >= self.batch_size:
+            self.batch_size = min(self.batch_size * 2, max(config['max_monitoring_batch_size'], 1))
+
+
+def get_backend_poll_budget(backend_name):
+    """
+    Return the time in seconds the monitoring may spend polling this backend in one step (0 is no limit)
+    """
+    budgets = config['backend_poll_budgets']
+    if backend_name in budgets:
+        return budgets[backend_name]
+    return config['default_backend_poll_budget']
 
 
 class JobRegistry_Monitor(GangaThread):
@@ -496,7 +539,7 @@ class JobRegistry_Monitor(GangaThread):
     minPollRate = 1.
     global_count = 0
 
-    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow')
+    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow', '_activeJobs', '_lastFullScan', '_setupDone', '_pollStates')
 
     def __init__(self, registry_slice):
         GangaThread.__init__(self, name="JobRegistry_Monitor")
@@ -517,6 +560,14 @@ class JobRegistry_Monitor(GangaThread):
         self.updateJobStatus = None
         self.errors = {}
 
+        # id -> backend name of the jobs which need monitoring, None until the registry has been scanned once
+        self._activeJobs = None
+        self._lastFullScan = 0.
+        # ids of the active jobs whose backend setup hook has been run
+        self._setupDone = set()
+        # backend name -> _BackendPollState
+        self._pollStates = {}
+
         self.updateDict_ts = SynchronisedObject(UpdateDict())
 
         # Create the default backend update method and add to callback hook.
@@ -524,7 +575,7 @@ class JobRegistry_Monitor(GangaThread):
 
         # Add credential checking to monitoring loop
         for afsToken in credential_store.get_all_matching_type(AfsToken()):
-            log.debug("Setting callback hook for %s" % afsToken.location)
+            log.debug("Setting callback hook for %s", afsToken.location)
             self.setCallbackHook(JobRegistry_Monitor.makeCredCheckJobInsertor, {'thisMonitor': self, 'credObj': afsToken}, True, timeout=config['creds_poll_rate'])
 
         # Add low disk-space checking to monitoring loop
@@ -580,8 +631,8 @@ class JobRegistry_Monitor(GangaThread):
             # synchronize the main loop since we can get disable requests
             with self.__mainLoopCond:
 
-                log.debug("steps: %s" % str(self.steps))
-                log.debug("%s" % str(self.registry_slice))
+                log.debug("steps: %s", self.steps)
+                log.debug("%s", self.registry_slice)
 
                 log.debug("Monitoring loop __mainLoopCond")
                 log.debug('Monitoring loop lock acquired. Running loop')
@@ -648,20 +699,20 @@ class JobRegistry_Monitor(GangaThread):
 
         for cbHookFunc in self.callbackHookDict.keys():
 
-            log.debug("\n\nProcessing Function: %s" % cbHookFunc)
+            log.debug("\n\nProcessing Function: %s", cbHookFunc)
 
             if cbHookFunc in self.callbackHookDict:
                 cbHookEntry = self.callbackHookDict[cbHookFunc][1]
             else:
-                log.debug("Monitoring KeyError: %s" % str(cbHookFunc))
+                log.debug("Monitoring KeyError: %s", cbHookFunc)
                 continue
 
-            log.debug("cbHookEntry.enabled: %s" % str(cbHookEntry.enabled))
-            log.debug("(time.time() - cbHookEntry._lastRun): %s" % str((time.time() - cbHookEntry._lastRun)))
-            log.debug("cbHookEntry.timeout: %s" % str(cbHookEntry.timeout))
+            log.debug("cbHookEntry.enabled: %s", cbHookEntry.enabled)
+            log.debug("(time.time() - cbHookEntry._lastRun): %s", (time.time() - cbHookEntry._lastRun))
+            log.debug("cbHookEntry.timeout: %s", cbHookEntry.timeout)
 
             if cbHookEntry.enabled and (time.time() - cbHookEntry._lastRun) >= cbHookEntry.timeout:
-                log.debug("Running monitoring callback hook function %s(**%s)" %(cbHookFunc, cbHookEntry.argDict))
+                log.debug("Running monitoring callback hook function %s(**%s)", cbHookFunc, cbHookEntry.argDict)
                 #self.callbackHookDict[cbHookFunc][0](**cbHookEntry.argDict)
                 try:
                     if 'self' in cbHookEntry.argDict:
@@ -771,6 +822,10 @@ class JobRegistry_Monitor(GangaThread):
                 #log.debug("m_jobs: %s" % str(m_jobs))
                 self.makeUpdateJobStatusFunction(jobSlice=m_jobs)
 
+            # The worker threads are freed when the monitoring is disabled, the steps can't run without them
+            if not ThreadPool:
+                _makeThreadPool()
+
             log.debug("Enable Loop, Clear Iterators and setCallbackHook")
             # enable mon loop
             self.enabled = True
@@ -942,7 +997,7 @@ class JobRegistry_Monitor(GangaThread):
     def __isInProgress(self):
         if getNumAliveThreads() > 0:
             for this_thread in ThreadPool:
-                log.debug("Thread currently running: %s" % str(this_thread._running_cmd))
+                log.debug("Thread currently running: %s", this_thread._running_cmd)
         return self.steps > 0 or Qin.qsize() > 0 or getNumAliveThreads() > 0
 
     def __awaitTermination(self, timeout=5):
@@ -960,17 +1015,17 @@ class JobRegistry_Monitor(GangaThread):
 
     def setCallbackHook(self, func, argDict, enabled, timeout=0):
         func_name = getName(func)
-        log.debug('Setting Callback hook function %s.' % func_name)
-        log.debug('arg dict: %s' % str(argDict))
+        log.debug('Setting Callback hook function %s.', func_name)
+        log.debug('arg dict: %s', argDict)
         #if 'self' not in argDict:
         #    argDict['self'] = self
         if func_name in self.callbackHookDict:
-            log.debug('Replacing existing callback hook function %s with %s' % (str(self.callbackHookDict[func_name]), func_name))
+            log.debug('Replacing existing callback hook function %s with %s', str(self.callbackHookDict[func_name]), func_name)
         self.callbackHookDict[func_name] = [func, CallbackHookEntry(argDict=argDict, enabled=enabled, timeout=timeout)]
 
     def removeCallbackHook(self, func):
         func_name = getName(func)
-        log.debug('Removing Callback hook function %s.' % func_name)
+        log.debug('Removing Callback hook function %s.', func_name)
         if func_name in self.callbackHookDict:
             del self.callbackHookDict[func_name]
         else:
@@ -978,7 +1033,7 @@ class JobRegistry_Monitor(GangaThread):
 
     def enableCallbackHook(self, func):
         func_name = getName(func)
-        log.debug('Enabling Callback hook function %s.' % func_name)
+        log.debug('Enabling Callback hook function %s.', func_name)
         if func_name in self.callbackHookDict:
             self.callbackHookDict[func_name][1].enabled = True
         else:
@@ -986,7 +1041,7 @@ class JobRegistry_Monitor(GangaThread):
 
     def disableCallbackHook(self, func):
         func_name = getName(func)
-        log.debug('Disabling Callback hook function %s.' % func_name)
+        log.debug('Disabling Callback hook function %s.', func_name)
         if func_name in self.callbackHookDict:
             self.callbackHookDict[func_name][1].enabled = False
         else:
@@ -994,18 +1049,18 @@ class JobRegistry_Monitor(GangaThread):
 
     def runClientCallbacks(self):
         for clientFunc in self.clientCallbackDict:
-            log.debug('Running client callback hook function %s(**%s).' % (clientFunc, self.clientCallbackDict[clientFunc]))
+            log.debug('Running client callback hook function %s(**%s).', clientFunc, self.clientCallbackDict[clientFunc])
             clientFunc(**self.clientCallbackDict[clientFunc])
 
     def setClientCallback(self, clientFunc, argDict):
-        log.debug('Setting client callback hook function %s(**%s).' % (clientFunc, argDict))
+        log.debug('Setting client callback hook function %s(**%s).', clientFunc, argDict)
         if clientFunc in self.clientCallbackDict:
             self.clientCallbackDict[clientFunc] = argDict
         else:
             log.error("Callback hook function not found.")
 
     def removeClientCallback(self, clientFunc):
-        log.debug('Removing client callback hook function %s.' % clientFunc)
+        log.debug('Removing client callback hook function %s.', clientFunc)
         if clientFunc in self.clientCallbackDict:
             del self.clientCallbackDict[clientFunc]
         else:
@@ -1014,27 +1069,38 @@ class JobRegistry_Monitor(GangaThread):
     def __defaultActiveBackendsFunc(self, jobSlice=None):
         log.debug("__defaultActiveBackendsFunc")
         active_backends = {}
-        
+
+        registry = stripProxy(self.registry_slice).objects
+
         if GANGA_SWAN_INTEGRATION:
             # Detect new Jobs from other sessions
             new_jobs = stripProxy(self.registry_slice).objects.repository.update_index(True, True)
             self.newly_discovered_jobs = list(set(self.newly_discovered_jobs) | set(new_jobs))
 
-        # FIXME: this is not thread safe: if the new jobs are added then
-        # iteration exception is raised
-        if jobSlice is not None:
-            fixed_ids = jobSlice.ids()
+        # Only the jobs which were active or have changed status since the last step are looked at.
+        # Every now and then the whole registry is scanned again to pick up anything we weren't told about
+        now = time.time()
+        if self._activeJobs is None or now - self._lastFullScan >= config['active_jobs_rescan_rate']:
+            log.debug("Rebuilding the set of active jobs from the registry")
+            active_jobs.pop_changed(registry)
+            fixed_ids = set(self.registry_slice.ids())
+            self._activeJobs = {}
+            self._lastFullScan = now
         else:
-            fixed_ids = self.registry_slice.ids()
-        #log.debug("Registry: %s" % str(self.registry_slice))
-        log.debug("Running over fixed_ids: %s" % str(fixed_ids))
+            fixed_ids = active_jobs.pop_changed(registry)
+            fixed_ids.update(self._activeJobs.keys())
+
+        if GANGA_SWAN_INTEGRATION:
+            fixed_ids.update(self.newly_discovered_jobs)
+
+        log.debug("Running over fixed_ids: %s", fixed_ids)
         for i in fixed_ids:
             try:
                 # This is safe as it's addressing a job which _better_ be in the job repo
                 j = stripProxy(self.registry_slice(i))
 
                 job_status = lazyLoadJobStatus(j)
-                
+
                 if GANGA_SWAN_INTEGRATION:
                     # Load those Jobs from disk which are in new state to check if they are submitted
                     # in other sessions
@@ -1042,26 +1108,31 @@ class JobRegistry_Monitor(GangaThread):
                         stripProxy(self.registry_slice).objects.repository.load([i])
 
                 if job_status in ['submitted', 'running'] or (j.master and (job_status in ['submitting'])):
-                    if self.enabled is True and self.alive is True:
-                        backend_obj = lazyLoadJobBackend(j)
-                        backend_name = getName(backend_obj)
-                        active_backends.setdefault(backend_name, [])
-                        active_backends[backend_name].append(j)
+                    if i not in self._activeJobs:
+                        self._activeJobs[i] = getName(lazyLoadJobBackend(j))
+                    continue
             except RegistryKeyError as err:
                 log.debug("RegistryKeyError: The job was most likely removed")
-                log.debug("RegError %s" % str(err))
+                log.debug("RegError %s", err)
             except RegistryLockError as err:
                 log.debug("RegistryLockError: The job was most likely removed")
-                log.debug("Reg LockError%s" % str(err))
-
-        summary = '{'
-        for backend, these_jobs in active_backends.iteritems():
-            summary += '"' + str(backend) + '" : ['
-            for this_job in these_jobs:
-                summary += str(stripProxy(this_job).id) + ', '#getFQID('.')) + ', '
-            summary += '], '
-        summary += '}'
-        log.debug("Returning active_backends: %s" % summary)
+                log.debug("Reg LockError%s", err)
+            self._activeJobs.pop(i, None)
+            self._setupDone.discard(i)
+
+        if self.enabled is True and self.alive is True:
+            if jobSlice is not None:
+                slice_ids = set(jobSlice.ids())
+                monitored_ids = [i for i in self._activeJobs if i in slice_ids]
+            else:
+                monitored_ids = self._activeJobs.keys()
+            for i in monitored_ids:
+                try:
+                    active_backends.setdefault(self._activeJobs[i], []).append(stripProxy(self.registry_slice(i)))
+                except (RegistryKeyError, RegistryLockError) as err:
+                    log.debug("The job was most likely removed: %s", err)
+
+        log.debug("Returning active_backends: %s", lazy(lambda: dict((backend, [j.id for j in these_jobs]) for backend, these_jobs in active_backends.iteritems())))
         return active_backends
 
     # This function will be run by update threads
@@ -1075,7 +1146,7 @@ class JobRegistry_Monitor(GangaThread):
         self._runningNow = True
 
         try:
-            log.debug("[Update Thread %s] Lock acquired for %s" % (currentThread, getName(backendObj)))
+            log.debug("[Update Thread %s] Lock acquired for %s", currentThread, getName(backendObj))
             #alljobList_fromset = IList(filter(lambda x: x.status in ['submitted', 'running'], jobListSet), self.stopIter)
             # print alljobList_fromset
             #masterJobList_fromset = IList(filter(lambda x: (x.master is not None) and (x.status in ['submitting']), jobListSet), self.stopIter)
@@ -1092,57 +1163,65 @@ class JobRegistry_Monitor(GangaThread):
             # print jobList_fromset
             self.updateDict_ts.clearEntry(getName(backendObj))
             try:
-                log.debug("[Update Thread %s] Updating %s with %s." % (currentThread, getName(backendObj), [x.id for x in jobList_fromset]))
-
-                tested_backends = []
+                log.debug("[Update Thread %s] Updating %s with %s.", currentThread, getName(backendObj), lazy(lambda: [x.id for x in jobList_fromset]))
 
+                # The setup hook only needs to run once for every job the monitoring picks up
                 for j in jobList_fromset:
-
-                    run_setup = False
-
-                    if backendObj is not None:
-                        if hasattr(backendObj, 'setup'):
-                            stripProxy(j.backend).setup()
-                    else:
-                        if hasattr(j.backend, 'setup'):
-                            stripProxy(j.backend).setup()
+                    if j.id not in self._setupDone:
+                        stripProxy(j.backend).setup()
+                        self._setupDone.add(j.id)
 
                 if self.enabled is False and self.alive is False:
                     log.debug("NOT enabled, leaving")
                     return
 
-                block_size = config['numParallelJobs']
-                all_job_bunches = get_jobs_in_bunches(jobList_fromset, blocks_of_size = block_size )
+                backend_name = getName(backendObj)
+                if backend_name not in self._pollStates:
+                    self._pollStates[backend_name] = _BackendPollState(config['numParallelJobs'])
+                poll_state = self._pollStates[backend_name]
+                budget = get_backend_poll_budget(backend_name)
 
-                bunch_size = 0
-                for bunch in all_job_bunches:
-                    bunch_size += len(bunch)
-                assert(bunch_size == len(jobList_fromset))
+                jobList_fromset = poll_state.order([stripProxy(j) for j in jobList_fromset])
+                polled_jobs = []
 
                 all_exceptions = []
 
-                for this_job_list in all_job_bunches:
+                start_time = time.time()
+                pos = 0
+                while pos < len(jobList_fromset):
 
                     if self.enabled is False and self.alive is False:
                         log.debug("NOT enabled, breaking loop")
                         break
 
+                    if budget and time.time() - start_time >= budget:
+                        log.debug("Poll budget of %ss for %s used up, %s jobs deferred to the next step", budget, backend_name, len(jobList_fromset) - pos)
+                        break
+
+                    this_job_list, pos = _next_bunch(jobList_fromset, pos, poll_state.batch_size)
+
                     ### This tries to loop over ALL jobs in 'this_job_list' with the maximum amount of redundancy to keep
                     ### going and attempting to update all (sub)jobs if some fail
                     ### ALL ERRORS AND EXCEPTIONS ARE REPORTED VIA log.error SO NO INFORMATION IS LOST/IGNORED HERE!
-                    job_ids = ''
-                    for this_job in this_job_list:
-                        job_ids += ' %s' % str(this_job.id) 
-                    log.debug("Updating Jobs: %s" % job_ids)
+                    log.debug("Updating Jobs: %s", lazy(lambda: [this_job.id for this_job in this_job_list]))
+                    call_start = time.time()
                     try:
                         stripProxy(backendObj).master_updateMonitoringInformation(this_job_list)
                     except Exception as err:
                         #raise err
-                        log.debug("Err: %s" % str(err))
+                        log.debug("Err: %s", err)
                         ## We want to catch ALL of the exceptions
                         ## This would allow us to continue in the case of errors due to bad job/backend combinations
                         if err not in all_exceptions:
                             all_exceptions.append(err)
+                    call_end = time.time()
+                    poll_state.adapt(sum(max(len(this_job.subjobs), 1) for this_job in this_job_list), call_end - call_start)
+                    for this_job in this_job_list:
+                        poll_state.last_polled[this_job.id] = call_end
+                    polled_jobs.extend(this_job_list)
+
+                # Forget about the jobs which have left this backend
+                poll_state.last_polled = dict((j.id, poll_state.last_polled.get(j.id, 0.)) for j in jobList_fromset)
 
                 if all_exceptions != []:
                     for err in all_exceptions:
@@ -1150,6 +1229,8 @@ class JobRegistry_Monitor(GangaThread):
                     ## We should be raising exceptions no matter what
                     raise all_exceptions[0]
 
+                jobList_fromset = polled_jobs
+
                 autoKill_if_required(jobList_fromset)
                 resubmit_if_required(jobList_fromset)
 
@@ -1173,10 +1254,10 @@ class JobRegistry_Monitor(GangaThread):
             #    stripped_job._getRegistry()._flush([stripped_job])
 
         except Exception as err:
-            log.debug("Monitoring Loop Error: %s" % str(err))
+            log.debug("Monitoring Loop Error: %s", err)
         finally:
             lock.release()
-            log.debug("[Update Thread %s] Lock released for %s." % (currentThread, getName(backendObj)))
+            log.debug("[Update Thread %s] Lock released for %s.", currentThread, getName(backendObj))
             self._runningNow = False
 
         log.debug("Finishing _checkBackend")
@@ -1191,14 +1272,15 @@ class JobRegistry_Monitor(GangaThread):
         else:
             activeBackends = activeBackendsFunc(jobSlice=jobSlice)
 
-        summary = '{'
-        for this_backend, these_jobs in activeBackends.iteritems():
-            summary += '"' + this_backend + '" : ['
-            for this_job in these_jobs:
-                summary += str(stripProxy(this_job).getFQID('.')) + ', '
-            summary += '], '
-        summary += '}'
-        log.debug("Active Backends: %s" % summary)
+        if isDebugEnabled(log):
+            summary = '{'
+            for this_backend, these_jobs in activeBackends.iteritems():
+                summary += '"' + this_backend + '" : ['
+                for this_job in these_jobs:
+                    summary += str(stripProxy(this_job).getFQID('.')) + ', '
+                summary += '], '
+            summary += '}'
+            log.debug("Active Backends: %s", summary)
 
         for jList in activeBackends.values():
 
@@ -1217,8 +1299,7 @@ class JobRegistry_Monitor(GangaThread):
             #       credential requirements.
             #log.debug("addEntry: %s, %s, %s, %s" % (str(backendObj), str(thisMonitor._checkBackend), str(jList), str(pRate)))
             thisMonitor.updateDict_ts.addEntry(backendObj, thisMonitor._checkBackend, jList, pRate)
-            summary = str([stripProxy(x).getFQID('.') for x in jList])
-            log.debug("jList: %s" % str(summary))
+            log.debug("jList: %s", lazy(lambda: [stripProxy(x).getFQID('.') for x in jList]))
 
 
     def makeUpdateJobStatusFunction(self, makeActiveBackendsFunc=None, jobSlice=None):
@@ -1243,7 +1324,7 @@ class JobRegistry_Monitor(GangaThread):
                 thisMonitor.enableCallbackHook(credCheckJobInsertor)
                 thisMonitor._handleError('%s checking failed!' % getName(credObj), getName(credObj), False)
 
-            log.debug('Inserting %s checking function to Qin.' % getName(credObj))
+            log.debug('Inserting %s checking function to Qin.', getName(credObj))
             _action = JobAction(function=thisMonitor.makeCredChecker(credObj),
                                 callback_Success=cb_Success,
                                 callback_Failure=cb_Failure)
@@ -1251,13 +1332,13 @@ class JobRegistry_Monitor(GangaThread):
             try:
                 Qin.put(_action)
             except Exception as err:
-               log.debug("makeCred Err: %s" % str(err))
+               log.debug("makeCred Err: %s", err)
                cb_Failure("Put _action failure: %s" % str(_action), "unknown", True )
         return credCheckJobInsertor
 
     def makeCredChecker(self, credObj):
         def credChecker():
-            log.debug("Checking %s." % getName(credObj))
+            log.debug("Checking %s.", getName(credObj))
             try:
                 credObj.renew()
             except CredentialRenewalError:
@@ -1290,7 +1371,7 @@ class JobRegistry_Monitor(GangaThread):
         try:
             Qin.put(_action)
         except Exception as err:
-            log.debug("diskSp Err: %s" % str(err))
+            log.debug("diskSp Err: %s", err)
             cb_Failure()
 
     def updateJobs(self):
@@ -1347,7 +1428,7 @@ def getStackTrace():
             status = status + "\n"
         ## CANNOT CONVERT TO A STRING!!!
         #log.info("Queue", str(Qin.queue))
-        log.debug("Trace: %s" % str(status))
+        log.debug("Trace: %s", status)
         return status
     except Exception, err:
         print("Err: %s" % str(err))
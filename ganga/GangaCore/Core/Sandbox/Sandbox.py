@@ -1,12 +1,26 @@
 from __future__ import absolute_import
 import os
 import sys
+import errno
+import hashlib
 import mimetypes
+import shutil
+import stat
+import subprocess
+import tarfile
+import threading
+import time
+from StringIO import StringIO
+from distutils.spawn import find_executable
 import GangaCore.Utility.logging
 logger = GangaCore.Utility.logging.getLogger(modulename=True)
 
 from .WNSandbox import OUTPUT_TARBALL_NAME, PYTHON_DIR
 from GangaCore.Core.exceptions import GangaException, GangaIOError
+from GangaCore.Utility.Config import getConfig
+
+# directory of the input workspace where the packed input sandboxes are cached by their contents
+SANDBOX_CACHE_DIR = '.sandbox_cache'
 
 
 class SandboxError(GangaException):
@@ -21,96 +35,297 @@ class SandboxError(GangaException):
 
 # FIXME: os.system error handling missing in this module!
 
+class SandboxStats(object):
+
+    """ Number of input sandboxes packed or reused from the sandbox cache, with the bytes they hold and the time taken """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, kind, num_files, bytes_in, bytes_out, duration):
+        """
+        Count a sandbox
+        Args:
+            kind (str): 'packed' if it was compressed, 'reused' if it came from the sandbox cache
+            num_files (int): number of files in it
+            bytes_in (int): size of the files
+            bytes_out (int): size of the tarball
+            duration (float): seconds it took
+        """
+        with self._lock:
+            stats = self._stats.get(kind)
+            if stats is None:
+                stats = self._stats[kind] = {'count': 0, 'files': 0, 'bytes_in': 0, 'bytes_out': 0, 'total_time': 0., 'max_time': 0.}
+            stats['count'] += 1
+            stats['files'] += num_files
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+
+    def summary(self):
+        """ Returns a dict of the stats of the packed and the reused sandboxes """
+        with self._lock:
+            summary = dict((kind, dict(stats)) for kind, stats in self._stats.iteritems())
+        for stats in summary.itervalues():
+            stats['mean_time'] = stats['total_time'] / stats['count']
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+sandbox_stats = SandboxStats()
+
+
+def getSandboxStats():
+    """
+    Returns the SandboxStats of this session
+    """
+    return sandbox_stats
+
+
+# digests of the files put in sandboxes by (path, inode, size, mtime) so that unchanged files are not read again
+_file_digests = {}
+
+
+def _fileDigest(path, st):
+    """
+    Returns the sha1 of the contents of a file, remembered for as long as the file is unchanged
+    Args:
+        path (str): path of the file
+        st (posix.stat_result): os.stat of the file
+    """
+    key = (path, st.st_ino, st.st_size, st.st_mtime)
+    digest = _file_digests.get(key)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), ''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        if len(_file_digests) > 10000:
+            _file_digests.clear()
+        _file_digests[key] = digest
+    return digest
+
+
+def _sandboxEntries(sandbox_files):
+    """
+    Returns the list of (file, name in the tarball, contents, stat) to put in a sandbox with the content key of the sandbox.
+    contents is the string of a FileBuffer and None for a File, stat the os.stat of a File and None for a FileBuffer
+    Args:
+        sandbox_files (list): File or FileBuffer objects
+    """
+    from GangaCore.GPIDev.Lib.File.FileBuffer import FileBuffer
+    from GangaCore.GPIDev.Base.Proxy import isType
+
+    sha = hashlib.sha1()
+    entries = []
+    for f in sandbox_files:
+        if isType(f, FileBuffer):
+            contents = f.getContents()
+            # Don't keep the './' on files as looking for an exact filename afterwards won't work
+            # (FIX for Ganga/test/Internals/FileBuffer_Sandbox)
+            if f.subdir == os.curdir:
+                arcname = os.path.basename(f.name)
+            else:
+                arcname = os.path.join(f.subdir, os.path.basename(f.name))
+            st = None
+            digest = hashlib.sha1(contents).hexdigest()
+            mode = 0
+        else:
+            contents = None
+            arcname = os.path.join(f.subdir, os.path.basename(f.name))
+            try:
+                st = os.stat(f.name)
+                digest = _fileDigest(f.name, st)
+            except (IOError, OSError):
+                raise SandboxError("File '%s' does not exist." % f.name)
+            mode = stat.S_IMODE(st.st_mode)
+        executable = bool(f.isExecutable())
+        sha.update('%s\0%o\0%d\0%s\n' % (arcname, mode, executable, digest))
+        entries.append((f, arcname, contents, st, executable))
+    return entries, sha.hexdigest()
+
+
+def _writeTarball(entries, fileobj, mode):
+    """
+    Write the entries of a sandbox into a tarball
+    Args:
+        entries (list): as returned by _sandboxEntries
+        fileobj (file): where the tarball is written
+        mode (str): tarfile mode, e.g. 'w:gz' or 'w|' to stream an uncompressed tarball into a compressor
+    """
+    tf = tarfile.open(fileobj=fileobj, mode=mode)
+    tf.dereference = True  # --not needed in Windows
+    try:
+        for f, arcname, contents, st, executable in entries:
+            if contents is not None:
+                fileobj = StringIO(contents)
+                tinfo = tarfile.TarInfo(arcname)
+                tinfo.mtime = time.time()
+                tinfo.size = len(contents)
+            else:
+                logger.debug("Opening file for sandbox: %s" % f.name)
+                try:
+                    fileobj = open(f.name, 'rb')
+                except IOError:
+                    raise SandboxError("File '%s' does not exist." % f.name)
+                tinfo = tf.gettarinfo(f.name, arcname)
+
+            if executable:
+                tinfo.mode = tinfo.mode | stat.S_IXUSR
+            try:
+                tf.addfile(tinfo, fileobj)
+            finally:
+                fileobj.close()
+    finally:
+        tf.close()
+
+
+def _findCompressor(total_size, file_format):
+    """
+    Returns the command line of the parallel compressor to use for a sandbox, None to compress it with tarfile
+    Args:
+        total_size (int): bytes in the sandbox
+        file_format (str): compression of the tarball, 'gz' or 'bz2'
+    """
+    config = getConfig('Configuration')
+    compressor = config['sandboxCompressor']
+    if not compressor or file_format != 'gz' or total_size < config['sandboxCompressorMinSize']:
+        return None
+    args = compressor.split()
+    if find_executable(args[0]) is None:
+        logger.debug("Sandbox compressor %s not found, using tarfile" % args[0])
+        return None
+    return args + ['-c']
+
+
+def _packTarball(entries, tgzfile, file_format, total_size):
+    """
+    Pack a sandbox into a tarball, through a parallel compressor for large sandboxes if there is one
+    Args:
+        entries (list): as returned by _sandboxEntries
+        tgzfile (str): path of the tarball
+        file_format (str): compression of the tarball, 'gz' or 'bz2'
+        total_size (int): bytes in the sandbox
+    """
+    compressor = _findCompressor(total_size, file_format)
+    with open(tgzfile, 'wb') as this_tarfile:
+        if compressor is None:
+            _writeTarball(entries, this_tarfile, 'w:%s' % file_format)
+            return
+        proc = subprocess.Popen(compressor, stdin=subprocess.PIPE, stdout=this_tarfile)
+        try:
+            _writeTarball(entries, proc.stdin, 'w|')
+        finally:
+            proc.stdin.close()
+            rc = proc.wait()
+        if rc != 0:
+            raise SandboxError("Compressing the sandbox %s with %s failed (exit code %s)" % (tgzfile, compressor[0], rc))
+
+
+def _sandboxCacheDir(inws):
+    """ Returns the directory of the sandbox cache of the workspace of inws, None if the cache is disabled """
+    if getConfig('Configuration')['sandboxCacheSize'] <= 0:
+        return None
+    return os.path.join(inws.top, SANDBOX_CACHE_DIR)
+
+
+def _linkOrCopy(src, dst):
+    """ Hard link src to dst, copying it if they are not on the same filesystem """
+    if os.path.exists(dst):
+        os.unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _trimSandboxCache(cache_dir):
+    """ Remove the least recently used tarballs of the sandbox cache until it fits in [Configuration]sandboxCacheSize """
+    max_size = getConfig('Configuration')['sandboxCacheSize'] * 1024 * 1024
+    tarballs = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        tarballs.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    for mtime, size, path in sorted(tarballs):
+        if total <= max_size:
+            break
+        try:
+            os.unlink(path)
+        except OSError as err:
+            logger.debug("Cannot remove %s from the sandbox cache: %s" % (path, err))
+        total -= size
+
+
 def createPackedInputSandbox(sandbox_files, inws, name):
     """Put all sandbox_files into tarball called name and write it into to the input workspace.
        This function is called by Ganga client at the submission time.
+       Tarballs are kept in a cache in the workspace by the contents of their files and reused for any sandbox
+       with the same files, see [Configuration]sandboxCacheSize.
        Arguments:
                 'sandbox_files': a list of File or FileBuffer objects.
                 'inws': a InputFileWorkspace object
        Return: a list containing a path to the tarball
        """
 
-#    from GangaCore.Core import FileWorkspace
-#    from GangaCore.GPIDev.Lib.File import File
-
-#    tgzfile = os.path.join(tmpdir,name)
-
     tgzfile = inws.getPath(name)
 
-    import tarfile
-    import stat
-
     logger.debug("Creating packed Sandbox with %s many sandbox files." % len(sandbox_files))
 
-#
-# Curent release with os module
-#
-
-#   wsdir = os.path.join(tmpdir,"ws")
-#   ws = FileWorkspace.FileWorkspace(wsdir)
-#   ws.create()
-#   for f in sandbox_files:
-#       ws.writefile(f)
-
-    # if os.system("tar -C %s -czf %s ."%(wsdir,tgzfile)) !=0:
-    #       print "ERROR:: can't create tarball file with InputSandbox"
-
-#
-# Future release with tarball module
+    start = time.time()
 
-    if mimetypes.guess_type(tgzfile)[1] in ['gzip']:
-        file_format = 'gz'
-    elif mimetypes.guess_type(tgzfile)[1] in ['bzip2']:
+    if mimetypes.guess_type(tgzfile)[1] in ['bzip2']:
         file_format = 'bz2'
     else:
-        file_format = ''
-
-    with open(tgzfile, 'w:%s' % file_format) as this_tarfile:
-        tf = tarfile.open(name=tgzfile, fileobj=this_tarfile, mode="w:gz")
-        tf.dereference = True  # --not needed in Windows
-
-        from GangaCore.GPIDev.Lib.File.FileBuffer import FileBuffer
-        from GangaCore.GPIDev.Lib.File.File import File
-        from GangaCore.GPIDev.Base.Proxy import isType
-
-        for f in sandbox_files:
-            fileobj = None
-            if isType(f, FileBuffer):
-                contents = f.getContents()   # is it FileBuffer?
-                # print "Getting FileBuffer Contents"
+        file_format = 'gz'
 
-                from StringIO import StringIO
-                fileobj = StringIO(contents)
+    entries, key = _sandboxEntries(sandbox_files)
+    total_size = sum(len(contents) if contents is not None else st.st_size for f, arcname, contents, st, executable in entries)
 
-                tinfo = tarfile.TarInfo()
-                # FIX for Ganga/test/Internals/FileBuffer_Sandbox
-                # Don't keep the './' on files as looking for an exact filename
-                # afterwards won't work
-                if f.subdir == os.curdir:
-                    tinfo.name = os.path.basename(f.name)
-                else:
-                    tinfo.name = os.path.join(f.subdir, os.path.basename(f.name))
-                import time
-                tinfo.mtime = time.time()
-                tinfo.size = fileobj.len
-
-            else:
-                #   except AttributeError as err:         # File
-                # print "Getting File %s" % f.name
-                # tf.add(f.name,os.path.join(f.subdir,os.path.basename(f.name)))
-                logger.debug("Opening file for sandbox: %s" % f.name)
+    cache_dir = _sandboxCacheDir(inws)
+    kind = 'packed'
+    if cache_dir is None:
+        _packTarball(entries, tgzfile, file_format, total_size)
+    else:
+        cached = os.path.join(cache_dir, '%s.%s' % (key, file_format))
+        try:
+            _linkOrCopy(cached, tgzfile)
+            # mark the tarball as recently used
+            os.utime(cached, None)
+            kind = 'reused'
+        except (IOError, OSError):
+            if not os.path.isdir(cache_dir):
                 try:
-                    fileobj = open(f.name)
-                except Exception as err:
-                    raise SandboxError("File '%s' does not exist." % f.name)
-
-                tinfo = tf.gettarinfo(f.name, os.path.join(f.subdir, os.path.basename(f.name)))
-
-            if f.isExecutable():
-                tinfo.mode = tinfo.mode | stat.S_IXUSR
-            tf.addfile(tinfo, fileobj)
-            fileobj.close()
-        tf.close()
+                    os.makedirs(cache_dir)
+                except OSError as err:
+                    if err.errno != errno.EEXIST:
+                        raise
+            # packed under a temporary name so that no other thread or session picks up a partial tarball
+            tmp_name = '%s.%s.%s' % (cached, os.getpid(), threading.current_thread().ident)
+            try:
+                _packTarball(entries, tmp_name, file_format, total_size)
+                os.rename(tmp_name, cached)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+            _linkOrCopy(cached, tgzfile)
+            _trimSandboxCache(cache_dir)
+
+    duration = time.time() - start
+    packed_size = os.path.getsize(tgzfile)
+    sandbox_stats.record(kind, len(entries), total_size, packed_size, duration)
+    logger.debug("Input sandbox %s %s: %s files, %s bytes -> %s bytes in %.3f s" % (name, kind, len(entries), total_size, packed_size, duration))
 
     return [tgzfile]
 
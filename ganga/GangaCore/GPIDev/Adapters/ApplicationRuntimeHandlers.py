@@ -5,6 +5,7 @@
 ##########################################################################
 
 """ Application adapter table is a mechanism to match application and backend handlers.
+Handlers may be added lazily, with a function which imports the module defining them.
 """
 
 
@@ -12,29 +13,51 @@ class _ApplicationRuntimeHandlers(object):
 
     def __init__(self):
         self.handlers = {}
+        self._lazy = {}
 
     def add(self, application, backend, handler):
         self.handlers.setdefault(backend, {})[application] = handler
 
+    def addLazy(self, application, backend, load):
+        """ Call 'load' to add the handler the first time it is needed, unless it has been added already """
+        if application not in self.handlers.get(backend, {}):
+            self._lazy.setdefault(backend, {})[application] = load
+
     def get(self, application, backend):
-        return self.handlers[backend][application]
+        try:
+            return self.handlers[backend][application]
+        except KeyError:
+            load = self._lazy.get(backend, {}).pop(application, None)
+            if load is None:
+                raise
+            load()
+            return self.handlers[backend][application]
+
+    def _all(self):
+        all_handlers = {}
+        for table in self._lazy, self.handlers:
+            for backend, apps in table.iteritems():
+                all_handlers.setdefault(backend, {}).update(apps)
+        return all_handlers
 
     def getAllBackends(self, application=None):
+        all_handlers = self._all()
         if application is None:
-            return self.handlers.keys()
+            return all_handlers.keys()
         else:
-            return [b for b in self.handlers.keys() if application in self.handlers[b]]
+            return [b for b in all_handlers.keys() if application in all_handlers[b]]
 
     def getAllApplications(self, backend=None):
+        all_handlers = self._all()
         if backend is None:
             apps = {}
 
-            for a in self.handlers.values():
+            for a in all_handlers.values():
                 apps.update(a)
 
             return apps.keys()
         else:
-            return self.handlers[backend].keys()
+            return all_handlers[backend].keys()
 
 allHandlers = _ApplicationRuntimeHandlers()
 
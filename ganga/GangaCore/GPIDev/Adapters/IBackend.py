@@ -24,6 +24,7 @@ import time
 from collections import defaultdict
 
 from GangaCore.Core.GangaThread.WorkerThreads import getQueues
+from GangaCore.Core.GangaThread.WorkerThreads.WorkerThreadPool import TaskLatch
 from GangaCore.Utility.Config import getConfig
 
 logger = GangaCore.Utility.logging.getLogger()
@@ -146,9 +147,8 @@ class IBackend(GangaObject):
         # Shall we submit in parallel
         if parallel_submit:
 
-            from GangaCore.Core.GangaThread.WorkerThreads import getQueues
-
-            threads_before = getQueues().totalNumIntThreads()
+            # Counted down by the worker threads as each submission (and its callback) finishes
+            latch = TaskLatch()
 
             for sc, sj in zip(subjobconfigs, rjobs):
 
@@ -163,20 +163,25 @@ class IBackend(GangaObject):
                         credential_store.create(b.credential_requirements)
 
                 fqid = sj.getFQID('.')
+                latch.add()
                 # FIXME would be nice to move this to the internal threads not user ones
-                getQueues()._monitoring_threadpool.add_function(self._parallel_submit, (b, sj, sc, master_input_sandbox, fqid, logger), callback_func = self._successfulSubmit, callback_args = (sj, incomplete_subjobs))
+                getQueues()._monitoring_threadpool.add_function(self._parallel_submit, (b, sj, sc, master_input_sandbox, fqid, logger),
+                                                                callback_func=self._successfulSubmit, callback_args=(sj, incomplete_subjobs),
+                                                                latch=latch)
 
-            def subjob_status_check(rjobs):
-                has_submitted = True
-                for sj in rjobs:
-                    if sj.status not in ["submitted","failed","completed","running","completing"] and sj.getFQID('.') not in incomplete_subjobs:
-                        has_submitted = False
-                        break
-                return has_submitted
+            def report_progress(this_latch):
+                logger.info("Submitted %s/%s subjobs (%.1f subjobs/s)", this_latch.done, this_latch.total, this_latch.rate())
 
-            while not subjob_status_check(rjobs):
-                import time
-                time.sleep(1.)
+            latch.wait(progress=report_progress)
+            logger.info("Submitted %s subjobs in %.1fs (%.1f subjobs/s)", latch.total, latch.elapsed(), latch.rate())
+
+            # Anything which didn't get as far as the backend (e.g. the queue was shut down) hasn't been submitted
+            failed_fqids = set(incomplete_subjobs)
+            for sj in rjobs:
+                if sj.status not in ["submitted", "failed", "completed", "running", "completing"]:
+                    fqid = sj.getFQID('.')
+                    if fqid not in failed_fqids:
+                        incomplete_subjobs.append(fqid)
 
             if incomplete_subjobs:
                 raise IncompleteJobSubmissionError(
@@ -440,6 +445,8 @@ class IBackend(GangaObject):
         # are not locked by an active session of ganga
 
         queues = getQueues()
+        # Counted down by the worker threads as each monitoring task finishes
+        latch = TaskLatch()
 
         for j in jobs:
             ## All subjobs should have same backend
@@ -495,7 +502,8 @@ class IBackend(GangaObject):
                             subjobs_to_monitor.append(j.subjobs[sj_id])
                         if multiThreadMon:
                             if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
-                                queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor")
+                                latch.add()
+                                queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor", latch=latch)
                         else:
                             j.backend.updateMonitoringInformation(subjobs_to_monitor)
                     except Exception as err:
@@ -514,8 +522,9 @@ class IBackend(GangaObject):
                 logger.debug('Monitoring jobs: %s', repr([jj._repr() for jj in simple_jobs[this_backend]]))
                 if multiThreadMon:
                     if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
+                        latch.add()
                         queues._addSystem(stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation,
-                                          args=(simple_jobs[this_backend],), name="Backend Monitor")
+                                          args=(simple_jobs[this_backend],), name="Backend Monitor", latch=latch)
                 else:
                     stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation(simple_jobs[this_backend])
 
@@ -524,14 +533,8 @@ class IBackend(GangaObject):
         if not multiThreadMon:
             return
 
-        loop = True
-        while loop:
-            for stat in queues._monitoring_threadpool.worker_status():
-                loop = False;
-                if stat[0] is not None and stat[0].startswith("Backend Monitor"):
-                    loop = True;
-                    break;
-            time.sleep(1.)
+        # Wake up as soon as the last of our monitoring tasks is done
+        latch.wait()
 
     @staticmethod
     def updateMonitoringInformation(jobs):
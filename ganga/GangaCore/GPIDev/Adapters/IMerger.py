@@ -55,6 +55,11 @@ class IMerger(IPostProcessor):
     # auto merge
     set_outputdir_for_automerge = True
 
+    # whether the output of mergefiles can itself be merged again, e.g. hadd of ROOT files
+    # if so, large merges are done as a tree reduction of partial merges which can run in parallel,
+    # and the subjobs which complete early are merged in the background, see MergeEngine
+    partial_merge = False
+
     _category = 'postprocessor'
     _exportmethods = ['merge']
     _name = 'IMerger'
@@ -73,14 +78,27 @@ class IMerger(IPostProcessor):
         Execute
         """
         if (len(job.subjobs) != 0):
+            from GangaCore.Lib.Mergers.MergeEngine import cancelPartialMerges, removePartialMerges
+            cancelPartialMerges(job)
             try:
-                return self.merge(job.subjobs, job.outputdir)
+                result = self.merge(job.subjobs, job.outputdir)
             except PostProcessException as e:
                 logger.error("%s" % e)
                 return self.failure
+            if result is True:
+                removePartialMerges(job)
+            return result
         else:
             return True
 
+    def partialMergers(self):
+        """
+        Returns the mergers which can merge the files of groups of subjobs as they complete, set up with those files
+        """
+        if self.partial_merge and self.files:
+            return [self]
+        return []
+
     def merge(self, jobs, outputdir=None, ignorefailed=None, overwrite=None):
 
         if ignorefailed is None:
@@ -159,6 +177,7 @@ class IMerger(IPostProcessor):
                                                    'This can be overridden with the ignorefailed flag.' % (f, j.fqid))
                 # files[f].extend(matchedFiles)
 
+        outputs = {}
         for k in files.keys():
             # make sure we are not going to over write anything
             outputfile = os.path.join(outputdir, k)
@@ -179,6 +198,7 @@ class IMerger(IPostProcessor):
             # check that we are merging some files
             if not files[k]:
                 logger.warning('Attempting to merge with no files. Request will be ignored.')
+                del files[k]
                 continue
 
             # check outputfile != inputfile
@@ -186,28 +206,33 @@ class IMerger(IPostProcessor):
                 if f == outputfile:
                     raise PostProcessException(
                         'Output file %s equals input file %s. The merge will fail.' % (outputfile, f))
-            # merge the lists of files with a merge tool into outputfile
-            msg = None
-            try:
-                self.mergefiles(files[k], outputfile)
+            outputs[k] = outputfile
+
+        if not files:
+            return self.success
 
-                # create a log file of the merge
-                # we only get to here if the merge_tool ran ok
-                log_file = '%s.merge_summary' % outputfile
-                with open(log_file, 'w') as log:
+        # merge the lists of files with a merge tool into the output files
+        from GangaCore.Lib.Mergers.MergeEngine import commonMaster, mergeFiles, partialMergeDir
+        master = commonMaster(jobs)
+        partial_dir = partialMergeDir(master) if master is not None else None
+        errors = mergeFiles(self, files, outputs, outputdir, partial_dir)
+
+        for k in sorted(files.keys()):
+            # create a log file of the merge
+            log_file = '%s.merge_summary' % outputs[k]
+            with open(log_file, 'w') as log:
+                if k in errors:
+                    # store the error msg
+                    log.write('# -- Error in Merge -- #\n')
+                    log.write('\t%s\n' % errors[k])
+                else:
+                    # we only get to here if the merge_tool ran ok
                     log.write('# -- List of files merged -- #\n')
                     for f in files[k]:
                         log.write('%s\n' % f)
                     log.write('# -- End of list -- #\n')
 
-            except PostProcessException as e:
-                msg = str(e)
-
-                # store the error msg
-                log_file = '%s.merge_summary' % outputfile
-                with open(log_file, 'w') as log:
-                    log.write('# -- Error in Merge -- #\n')
-                    log.write('\t%s\n' % msg)
-                raise e
+        if errors:
+            raise PostProcessException(errors[sorted(errors.keys())[0]])
 
         return self.success
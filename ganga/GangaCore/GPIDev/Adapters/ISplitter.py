@@ -4,12 +4,25 @@
 # $Id: ISplitter.py,v 1.1 2008-07-17 16:40:52 moscicki Exp $
 ##########################################################################
 
+import threading
+from copy import deepcopy
+
 from GangaCore.GPIDev.Base import GangaObject
+from GangaCore.GPIDev.Base.Objects import Descriptor, LazyCopy, Node
 from GangaCore.GPIDev.Base.Proxy import TypeMismatchError, isType, stripProxy, getName
 from GangaCore.GPIDev.Schema import Schema, Version
 from GangaCore.Utility.util import containsGangaObjects
 from GangaCore.Core.exceptions import GangaException, SplitterError
 
+# Attributes of the master which subjobs never inherit
+_subjob_skip_args = ['splitter', 'inputsandbox', 'inputfiles', 'inputdata', 'subjobs']
+
+# Values stored as they are in a subjob, anything else is copied
+_immutable_types = (type(None), str, unicode, int, long, float, bool)
+
+# The values shared by the subjobs of the split in progress in this thread, see ISplitter._shared
+_split_state = threading.local()
+
 
 class ISplitter(GangaObject):
 
@@ -21,22 +34,76 @@ class ISplitter(GangaObject):
 
     __slots__ = list()
 
+    @staticmethod
+    def _shared(job, key, make):
+        """
+        Returns the value the subjobs of the split of job in progress share for key, making it with make() the first
+        time. Returns None if there is no split in progress for this job
+        Args:
+            job (Job): the master job
+            key (tuple): what the value is
+            make (callable): returns the value, which won't be changed afterwards
+        """
+        shared = getattr(_split_state, 'shared', None)
+        if shared is None or shared[0] is not job:
+            return None
+        values = shared[1]
+        if key not in values:
+            value = make()
+            if isinstance(value, Node):
+                value._setParent(None)
+            values[key] = value
+        return values[key]
+
     def createSubjob(self, job, additional_skip_args=None):
         """ Create a new subjob by copying the master job and setting all fields correctly.
+        While splitting through validatedSplit, the components of the master (and the defaults of what isn't copied)
+        are not copied into each subjob straight away. All the subjobs refer to a single copy of them instead and get
+        their own copy of one the first time it is used (see LazyCopy). Splitters are free to change anything of a
+        subjob as usual.
+        Args:
+            job (Job): the master job
+            additional_skip_args (list): attributes left to their default rather than copied from the master
         """
         from GangaCore.GPIDev.Lib.Job.Job import Job
-        if additional_skip_args is None:
-            additional_skip_args = []
-
-        j = Job()
-        skipping_args = ['splitter', 'inputsandbox', 'inputfiles', 'inputdata', 'subjobs']
-        for arg in additional_skip_args:
-            skipping_args.append(arg)
-        j.copyFrom(job, skipping_args)
-        j.splitter = None
-        j.inputsandbox = []
-        j.inputfiles = []
-        j.inputdata = None
+        skipping_args = list(_subjob_skip_args)
+        if additional_skip_args is not None:
+            skipping_args.extend(additional_skip_args)
+
+        j = Job.getNew()
+        schema = job._schema
+        for name, item in schema.allItems():
+            if item['getter']:
+                continue
+
+            if name in skipping_args or not item['copyable']:
+                default = schema.getDefaultValue(name)
+                if isinstance(default, _immutable_types):
+                    j.setSchemaAttribute(name, default)
+                    continue
+                shared = self._shared(job, ('default', name), lambda: Descriptor.cleanValue(j, default, name))
+                if shared is None:
+                    setattr(j, name, default)
+                else:
+                    j.setSchemaAttribute(name, LazyCopy(shared))
+                continue
+
+            if name == 'application' and hasattr(job.application, 'is_prepared'):
+                # Every subjob holds a reference to the shared area of a prepared application
+                app = job.application
+                if app.is_prepared not in [None, True]:
+                    app.incrementShareCounter(app.is_prepared)
+
+            value = getattr(job, name)
+            if isinstance(value, _immutable_types):
+                j.setSchemaAttribute(name, value)
+                continue
+            shared = self._shared(job, ('copy', name), lambda: deepcopy(value))
+            if shared is None:
+                j.setSchemaAttribute(name, deepcopy(value))
+            else:
+                j.setSchemaAttribute(name, LazyCopy(shared))
+
         return j
 
     def split(self, job):
@@ -65,8 +132,12 @@ class ISplitter(GangaObject):
         called directly by the framework and should not be modified in the derived
         classes. """
 
-        # try:
-        subjobs = self.split(stripProxy(job))
+        job = stripProxy(job)
+        _split_state.shared = (job, {})
+        try:
+            subjobs = self.split(job)
+        finally:
+            _split_state.shared = None
         # except Exception,x:
         #raise SplitterError(x)
         #raise x
@@ -75,8 +146,9 @@ class ISplitter(GangaObject):
 
         cnt = 0
         for s in subjobs:
-            if not isType(s.backend, type(stripProxy(job.backend))):
-                raise SplitterError('masterjob backend %s is not the same as the subjob (probable subjob id=%d) backend %s' % (job.backend._name, cnt, getName(s.backend)))
+            backend = LazyCopy.peek(stripProxy(s), 'backend')
+            if not isType(backend, type(stripProxy(job.backend))):
+                raise SplitterError('masterjob backend %s is not the same as the subjob (probable subjob id=%d) backend %s' % (job.backend._name, cnt, getName(backend)))
             cnt += 1
 
         return subjobs
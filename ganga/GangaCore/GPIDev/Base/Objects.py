@@ -13,6 +13,7 @@ import threading
 import thread
 from contextlib import contextmanager
 import functools
+import itertools
 
 from GangaCore.Utility.logging import getLogger
 
@@ -47,6 +48,66 @@ logger = getLogger()
 
 do_not_copy = ['_index_cache_dict', '_parent', '_registry', '_data_dict', '_lock', '_proxyObject']
 
+# Every change made to an object is stamped with the next number from here. This lets a flush tell the changes it has
+# written out from those made while it was writing
+_dirty_generations = itertools.count(1)
+
+def nextDirtyGeneration():
+    """
+    Returns a generation number larger than that of any change made so far
+    """
+    return next(_dirty_generations)
+
+class LazyCopy(object):
+    """
+    Stands in the _data of an object for a copy of source which nobody has asked for yet. The copy is made the first time
+    the attribute is read, see Descriptor.__get__, until then source may be shared by many objects and mustn't change.
+    This is how subjobs share the components of their master, see ISplitter.createSubjob
+    """
+    __slots__ = ('source',)
+
+    def __init__(self, source):
+        """
+        Args:
+            source (unknown): value to copy, not to be modified while anything refers to it
+        """
+        self.source = source
+
+    def materialise(self, obj, name):
+        """
+        Replace self in the _data of obj with a copy of the source, returns the copy
+        This doesn't make obj dirty as its contents are unchanged. If another thread swapped in its copy first that one is
+        returned, so that every change goes to the same copy
+        Args:
+            obj (GangaObject): the object owning the attribute
+            name (str): name of the attribute
+        """
+        value = deepcopy(self.source)
+        if isinstance(value, Node):
+            value._setParent(obj)
+        with obj.const_lock:
+            current = obj._data.get(name)
+            if current is self:
+                obj._data[name] = value
+                return value
+        if current.__class__ is LazyCopy:
+            return current.materialise(obj, name)
+        return current
+
+    @staticmethod
+    def peek(obj, name):
+        """
+        Returns the value of an attribute of obj for reading only, without copying it if it's still shared
+        Args:
+            obj (GangaObject): the object owning the attribute
+            name (str): name of the attribute
+        """
+        value = obj._data.get(name)
+        if value.__class__ is LazyCopy:
+            return value.source
+        return getattr(obj, name)
+
+
 def synchronised(f):
     """
     This decorator must be attached to a method on a ``Node`` subclass
@@ -72,13 +133,15 @@ class Node(object):
     thread-safe usage.
     """
     __metaclass__ = abc.ABCMeta
-    __slots__ = ('_parent', '_lock', '_dirty')
+    __slots__ = ('_parent', '_lock', '_dirty', '_dirty_gen', '_own_dirty_gen')
 
     def __init__(self, parent=None):
         super(Node, self).__init__()
         self._parent = parent
         self._lock = threading.RLock()  # Don't write from out of thread when modifying an object
         self._dirty = False  # dirty flag is true if the object has been modified locally and its contents is out-of-sync with its repository
+        self._dirty_gen = 0  # generation of the latest change to this object or anything below it, 0 once flushed
+        self._own_dirty_gen = 0  # as above but leaving out the changes to children which are stored apart from this object
 
     def __deepcopy__(self, memo=None):
         cls = self.__class__
@@ -192,16 +255,47 @@ class Node(object):
     # the registry is always associated with the root object
     def _setDirty(self):
         """ Set the dirty flag all the way up to the parent"""
+        self._markDirty(nextDirtyGeneration(), True)
+
+    def _markDirty(self, generation, own):
+        """
+        Set the dirty flag and generation of this object and pass them on to the parent
+        Args:
+            generation (int): The generation of the change
+            own (bool): Is the change stored along with this object rather than in a child stored apart from it
+        """
         self._dirty = True
+        self._dirty_gen = generation
+        if own:
+            self._own_dirty_gen = generation
         parent = self._getParent()
         if parent is not None:
-            parent._setDirty()
+            parent._markDirty(generation, own and not parent._isStoredApart(self))
+
+    def _isStoredApart(self, child):
+        """
+        Returns True if the child isn't written out as part of this object, i.e. a change to the child doesn't need
+        this object to be written out again
+        Args:
+            child (Node): The child object which has changed
+        """
+        return False
+
+    def _isDirtySince(self, generation):
+        """
+        Returns True if this object has been changed since the given generation
+        Args:
+            generation (int): A generation as returned by nextDirtyGeneration
+        """
+        return self._dirty_gen > generation
 
     def _setFlushed(self):
         """
         This returns whether this object has been marked as dirty or not
         """
         self._dirty = False
+        self._dirty_gen = 0
+        self._own_dirty_gen = 0
 
     def printTree(self, f=None, sel=''):
         """
@@ -349,9 +443,13 @@ class Descriptor(object):
         # This access should not cause the object to be loaded
         obj_data = obj._data
         try:
-            return obj_data[name]
+            value = obj_data[name]
         except KeyError:
             pass
+        else:
+            if value.__class__ is LazyCopy:
+                return value.materialise(obj, name)
+            return value
 
         # Then try to get it from the index cache
         obj_index = obj._index_cache
@@ -365,9 +463,13 @@ class Descriptor(object):
 
         # Do we have the attribute now?
         try:
-            return obj._data[name]
+            value = obj._data[name]
         except KeyError:
             pass
+        else:
+            if value.__class__ is LazyCopy:
+                return value.materialise(obj, name)
+            return value
 
         # Last option: get the default value from the schema
         if obj._schema.hasItem(name):
@@ -260,6 +260,17 @@ def is_namedtuple_instance(obj):
         return False
     return all(isinstance(n, str) for n in fields)
 
+def _getImpl(proxy):
+    """Returns the object wrapped by a proxy instance without going through its __getattribute__
+    Args:
+        proxy (GPIProxyObject): the proxy instance
+    """
+    try:
+        return object.__getattribute__(proxy, implRef)
+    except AttributeError:
+        return stripProxy(proxy)
+
+
 def stripProxy(obj):
     """Removes the proxy if there is one
     Args:
@@ -282,12 +293,13 @@ def addProxy(obj):
     Args:
         obj (GangaObject): This may be a Ganga object which you're wanting to add a proxy to
     """
-    if isType(obj, GangaObject):
-        if not isProxy(obj):
-            if hasattr(obj, proxyObject):
-                return getattr(obj, proxyObject)
-            else:
-                return GPIProxyObjectFactory(obj)
+    if isinstance(obj, GangaObject):
+        proxy = getattr(obj, proxyObject, None)
+        if proxy is not None:
+            return proxy
+        return GPIProxyObjectFactory(obj)
+    elif isinstance(obj, GPIProxyObject):
+        return obj
     elif isclass(obj) and issubclass(obj, GangaObject):
         return getProxyClass(obj)
     elif is_namedtuple_instance(obj):
@@ -348,15 +360,22 @@ valueTypeAllowed = lambda val, valTypeList: _valueTypeAllowed(val, valTypeList,
 
 class ProxyDataDescriptor(object):
 
-    __slots__ = ('_name', )
+    __slots__ = ('_name', '_schema', '_proxy_get', '_sequence', '_component')
 
-    def __init__(self, name):
+    def __init__(self, name, schema=None):
         """
         Descriptor which sits in fromnt  of raw unproxied objects
         Args:
             name (str): Name of the attribute which we're looking after here
+            schema (Schema): Schema of the proxied class, what is needed from the item is worked out once from it
         """
         self._name = name
+        self._schema = schema
+        if schema is not None:
+            item = schema[name]
+            self._proxy_get = item['proxy_get']
+            self._sequence = item['sequence']
+            self._component = isinstance(item, ComponentItem)
 
     # apply object conversion or if it failes, make the wrapper proxy
     def disguiseComponentObject(self, v):
@@ -395,38 +414,39 @@ class ProxyDataDescriptor(object):
             # return Schema.make_helper(getattr(getattr(cls, implRef), getName(self)))
             return getattr(stripProxy(cls), getName(self))
 
-        raw_obj = stripProxy(obj)
+        raw_obj = _getImpl(obj)
+        name = self._name
         try:
-            val = getattr(raw_obj, getName(self))
+            val = getattr(raw_obj, name)
         except Exception as err:
-            if getName(self) in raw_obj.__dict__:
-                val = raw_obj.__dict__[getName(self)]
+            if name in raw_obj.__dict__:
+                val = raw_obj.__dict__[name]
             else:
-                val = getattr(raw_obj, getName(self))
+                val = getattr(raw_obj, name)
 
         # wrap proxy
-        item = raw_obj._schema[getName(self)]
+        schema = raw_obj._schema
+        if schema is self._schema:
+            proxy_get, sequence, component = self._proxy_get, self._sequence, self._component
+        else:
+            # e.g. a subclass of the proxied class with its own schema
+            item = schema[name]
+            proxy_get, sequence, component = item['proxy_get'], item['sequence'], isinstance(item, ComponentItem)
 
-        if item['proxy_get']:
-            return getattr(raw_obj, item['proxy_get'])()
+        if proxy_get:
+            return getattr(raw_obj, proxy_get)()
 
-        if isType(item, ComponentItem):
+        if component:
             disguiser = self.disguiseComponentObject
         else:
             disguiser = self.disguiseAttribute
 
         ## FIXME Add GangaList?
-        if item['sequence'] and isType(val, list):
+        if sequence and isType(val, list):
             from GangaCore.GPIDev.Lib.GangaList.GangaList import makeGangaList
             val = makeGangaList(val, disguiser)
 
-        returnable = disguiser(val)
-        
-
-        if isType(returnable, GangaObject):
-            return addProxy(returnable)
-        else:
-            return returnable
+        return disguiser(val)
 
     @staticmethod
     def _check_type(obj, val, attr_name):
@@ -695,9 +715,9 @@ class ProxyDataDescriptor(object):
         # val is the value we're setting the attribute to.
         # item is the schema entry of the attribute we're about to change
 
-        attr_name = getName(self)
+        attr_name = self._name
 
-        raw_obj = stripProxy(obj)
+        raw_obj = _getImpl(obj)
 
         final_val = ProxyDataDescriptor._process_set_value(raw_obj, _val, attr_name)
 
@@ -740,7 +760,7 @@ class ProxyMethodDescriptor(object):
             if obj is None:
                 method = getattr(stripProxy(cls), self._internal_name)
             else:
-                method = getattr(stripProxy(obj), self._internal_name)
+                method = getattr(_getImpl(obj), self._internal_name)
             return proxy_wrap(method)
         except Exception as err:
             logger.error("%s" % err)
@@ -1074,7 +1094,7 @@ def GPIProxyClassFactory(name, pluginclass):
         #logger.debug("_setattr")
         # need to know about the types that require metadata attribute checking
         # this allows derived types to get same behaviour for free.
-        raw_self = stripProxy(self)
+        raw_self = _getImpl(self)
         p_Ref = raw_self
         if p_Ref is not None:
             if not isclass(p_Ref):
@@ -1121,6 +1141,13 @@ Setting a [protected] or a unexisting property raises AttributeError.""")
 #                return object.__getattribute__(self,name)
 #        return object.__getattribute__(self,name)
 
+    # The visible schema items which are read through _attribute_filter__get__, worked out once for the class
+    # rather than on every attribute access
+    if hasattr(pluginclass, '_attribute_filter__get__'):
+        filtered_items = frozenset(attr for attr, item in pluginclass._schema.allItems() if not item['hidden'])
+    else:
+        filtered_items = frozenset()
+
     def _getattribute(self, name):
 
         #logger.debug("_getattribute: %s" % name)
@@ -1128,20 +1155,26 @@ Setting a [protected] or a unexisting property raises AttributeError.""")
         if name.startswith('__') or name == implRef:
             return GPIProxyObject.__getattribute__(self, name)
         else:
-            implInstance = stripProxy(self)
+            implInstance = _getImpl(self)
 
-            if '_attribute_filter__get__' in dir(implInstance) and \
+            if type(implInstance) is pluginclass:
+                use_filter = name in filtered_items
+            else:
+                # e.g. a subclass wrapped by this proxy class, check it the long way
+                use_filter = '_attribute_filter__get__' in dir(implInstance) and \
                     not isType(implInstance, ObjectMetaclass) and \
                     implInstance._schema.hasItem(name) and \
-                    not implInstance._schema.getItem(name)['hidden']:
-                        returnable = addProxy(implInstance._attribute_filter__get__(name))
+                    not implInstance._schema.getItem(name)['hidden']
+
+            if use_filter:
+                returnable = addProxy(implInstance._attribute_filter__get__(name))
             else:
                 try:
                     returnable = GPIProxyObject.__getattribute__(self, name)
                 except AttributeError:
                     raise GangaAttributeError("Object '%s' does not have attribute: '%s'" % (getName(self), name))
 
-        if isType(returnable, GangaObject):
+        if isinstance(returnable, GangaObject):
             return addProxy(returnable)
         else:
             return returnable
@@ -1200,7 +1233,7 @@ Setting a [protected] or a unexisting property raises AttributeError.""")
     # export visible properties... do not export hidden properties
     for attr, item in pluginclass._schema.allItems():
         if not item['hidden']:
-            d[attr] = ProxyDataDescriptor(attr)
+            d[attr] = ProxyDataDescriptor(attr, pluginclass._schema)
 
     return type(name, (GPIProxyObject,), d)
 
@@ -7,6 +7,7 @@ from GangaCore.Utility.Config import ConfigError
 from GangaCore.GPIDev.Base.Proxy import stripProxy, implRef, getName
 
 from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.Config.Config import lazySections
 
 logger = GangaCore.Utility.logging.getLogger()
 
@@ -138,6 +139,14 @@ class MainConfigProxy(object):
         import GangaCore.Utility.Config
         self.__dict__[implRef] = GangaCore.Utility.Config.allConfigs
 
+    def __getattr__(self, p):
+        # sections of plugins which are not loaded yet get their proxy once the plugin is loaded
+        if p in lazySections:
+            lazySections[p]()
+            if p in self.__class__.__dict__:
+                return getattr(self, p)
+        raise AttributeError(p)
+
     def __getitem__(self, p):
         try:
             return getattr(self, p)
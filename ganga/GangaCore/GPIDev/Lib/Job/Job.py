@@ -12,6 +12,7 @@ import GangaCore.Core.FileWorkspace
 from GangaCore.GPIDev.MonitoringServices import getMonitoringObject
 from GangaCore.Core.exceptions import GangaException, IncompleteJobSubmissionError, JobManagerError, TypeMismatchError, SplitterError
 from GangaCore.Core import Sandbox
+from GangaCore.Core.MonitoringComponent.ActiveJobs import active_jobs
 from GangaCore.Core.GangaRepository import getRegistry
 from GangaCore.Core.GangaRepository.SubJobXMLList import SubJobXMLList
 from GangaCore.GPIDev.Adapters.ApplicationRuntimeHandlers import allHandlers
@@ -298,6 +299,14 @@ class Job(GangaObject):
             parent = self._getParent()
         return parent
 
+    def _isStoredApart(self, child):
+        """
+        The subjobs and the list holding them are written out separately from the XML of the master job
+        Args:
+            child (Node): The child object which has changed
+        """
+        return isinstance(child, Job) or child is self._data.get('subjobs')
+
     def _readonly(self):
         return self.status != 'new'
 
@@ -592,7 +601,7 @@ class Job(GangaObject):
 
             # move to the new state AFTER hooks are called
             self.status = newstatus
-            logger.debug("Status changed from '%s' to '%s'" % (initial_status, self.status))
+            logger.debug("Status changed from '%s' to '%s'", initial_status, self.status)
 
         except Exception as x:
             self.status = initial_status
@@ -603,6 +612,16 @@ class Job(GangaObject):
 
         if final_status != initial_status and self.master is None:
             logger.info('job %s status changed to "%s"', self.getFQID('.'), final_status)
+        if final_status != initial_status:
+            # Consumers of the change feed of the registry only see master jobs, for a subjob the change is to its master
+            registry = self._getRegistry()
+            if registry is not None:
+                root = self._getRoot()
+                registry.recordChange(root, ['status'] if root is self else ['subjobs:status'])
+            if final_status == 'completed' and self.master is not None:
+                # the output of the subjobs which complete early can be merged while the others run
+                from GangaCore.Lib.Mergers.MergeEngine import subjobCompleted
+                subjobCompleted(self)
         if update_master and self.master is not None:
             self.master.updateMasterJobStatus()
 
@@ -612,7 +631,7 @@ class Job(GangaObject):
         if new_status in ['completed', 'failed', 'killed']:
             if len(self.postprocessors) > 0:
                 if self.master:
-                    logger.debug("Running postprocessor for Job %s" % self.getFQID('.'))
+                    logger.debug("Running postprocessor for Job %s", self.getFQID('.'))
                 else:
                     logger.info("Running postprocessor for Job %s" % self.getFQID('.'))
                 passed = self.postprocessors.execute(self, new_status)
@@ -640,7 +659,7 @@ class Job(GangaObject):
 
                     backend_output_postprocess[configEntry][key] = getConfig('Output')[key]['backendPostprocess'][configEntry]
             except ConfigError as err:
-                logger.debug("ConfigError: %s" % err)
+                logger.debug("ConfigError: %s", err)
                 pass
 
         return backend_output_postprocess
@@ -667,7 +686,7 @@ class Job(GangaObject):
                 if outputfileClass in backend_output_postprocess[backendClass]:
 
                     if not self.subjobs:
-                        logger.debug("Job %s Setting Location of %s: %s" % (self.getFQID('.'), getName(outputfile), outputfile.namePattern))
+                        logger.debug("Job %s Setting Location of %s: %s", self.getFQID('.'), getName(outputfile), outputfile.namePattern)
                         try:
                             outputfile.setLocation()
                         except Exception as err:
@@ -675,7 +694,7 @@ class Job(GangaObject):
 
                     if backend_output_postprocess[backendClass][outputfileClass] == 'client':
                         try:
-                            logger.debug("Job %s Putting File %s: %s" % (self.getFQID('.'), getName(outputfile), outputfile.namePattern))
+                            logger.debug("Job %s Putting File %s: %s", self.getFQID('.'), getName(outputfile), outputfile.namePattern)
                             outputfile.put()
                             logger.debug("Cleaning up after put")
                             outputfile.cleanUpClient()
@@ -795,11 +814,11 @@ class Job(GangaObject):
             logger.error("Job %s postprocessoutput failed" % self.getFQID('.'))
             logger.error("\n%s" % x)
 
-        logger.debug("Job %s Finished" % self.getFQID('.'))
+        logger.debug("Job %s Finished", self.getFQID('.'))
 
     def postprocess_hook(self):
         if self.master:
-            logger.debug("Job %s Running PostProcessor hook" % self.getFQID('.'))
+            logger.debug("Job %s Running PostProcessor hook", self.getFQID('.'))
         else:
             logger.info("Job %s Running PostProcessor hook" % self.getFQID('.'))
         self.application.postprocess()
@@ -808,7 +827,7 @@ class Job(GangaObject):
 
     def postprocess_hook_failed(self):
         if self.master:
-            logger.debug("Job %s PostProcessor Failed" % self.getFQID('.'))
+            logger.debug("Job %s PostProcessor Failed", self.getFQID('.'))
         else:
             logger.info("Job %s PostProcessor Failed" % self.getFQID('.'))
         self.application.postprocess_failed()
@@ -886,7 +905,7 @@ class Job(GangaObject):
             return []
 
         #logger.debug( "\n" )
-        logger.debug("Creating Packed InputSandbox %s" % name)
+        logger.debug("Creating Packed InputSandbox %s", name)
         logger.debug("With:")
         for f in files:
             if hasattr(f, 'name'):
@@ -1077,7 +1096,7 @@ class Job(GangaObject):
                     try:
                         command = config[suffix]
                     except ConfigError as err:
-                        logger.debug("Config Err: %s" % err)
+                        logger.debug("Config Err: %s", err)
                         command = config["fallback_command"]
 
             mode = os.P_WAIT
@@ -1092,7 +1111,7 @@ class Job(GangaObject):
                 argList = [termCommand, exeopt, exeCommand]
                 mode = os.P_NOWAIT
             except IndexError as err:
-                logger.debug("Index Err: %s" % err)
+                logger.debug("Index Err: %s", err)
                 tmpList = command.split("&")
                 if (len(tmpList) > 1):
                     mode = os.P_NOWAIT
@@ -1163,7 +1182,7 @@ class Job(GangaObject):
             appmasterconfig = self._storedAppMasterConfig
             if appmasterconfig is None:
                 # I am going to generate the appmasterconfig now
-                logger.debug("Job %s Calling application.master_configure" % self.getFQID('.'))
+                logger.debug("Job %s Calling application.master_configure", self.getFQID('.'))
                 appmasterconfig = self.application.master_configure()[1]
                 self._storedAppMasterConfig = appmasterconfig
         else:
@@ -1183,7 +1202,7 @@ class Job(GangaObject):
             appsubconfig = self._storedAppSubConfig
             if appsubconfig is None or len(appsubconfig) == 0:
                 appmasterconfig = self._getMasterAppConfig()
-                logger.debug("Job %s Calling application.configure %s times" % (self.getFQID('.'), len(self.subjobs)))
+                logger.debug("Job %s Calling application.configure %s times", self.getFQID('.'), len(self.subjobs))
                 appsubconfig = [j.application.configure(appmasterconfig)[1] for j in subjobs]
 
         else:
@@ -1191,7 +1210,7 @@ class Job(GangaObject):
             appsubconfig = self._storedAppSubConfig
             if appsubconfig is None or len(appsubconfig) == 0:
                 appmasterconfig = self._getMasterAppConfig()
-                logger.debug("Job %s Calling application.configure 1 times" % self.getFQID('.'))
+                logger.debug("Job %s Calling application.configure 1 times", self.getFQID('.'))
                 appsubconfig = [self.application.configure(appmasterconfig)[1]]
 
         self._storedAppSubConfig = appsubconfig
@@ -1208,16 +1227,16 @@ class Job(GangaObject):
             if jobmasterconfig is None:
                 #   I am going to generate the config now
                 appmasterconfig = self._getMasterAppConfig()
-                logger.debug("appConf: %s" % appmasterconfig)
+                logger.debug("appConf: %s", appmasterconfig)
                 rtHandler = self._getRuntimeHandler()
-                logger.debug("Job %s Calling rtHandler.master_prepare for RTH: %s" % (self.getFQID('.'), getName(rtHandler)))
+                logger.debug("Job %s Calling rtHandler.master_prepare for RTH: %s", self.getFQID('.'), getName(rtHandler))
                 jobmasterconfig = rtHandler.master_prepare(self.application, appmasterconfig)
                 self._storedJobMasterConfig = jobmasterconfig
         else:
             #   I am a sub-job, lets ask the master job what to do
             jobmasterconfig = self.master._getJobMasterConfig()
 
-        logger.debug("JobMasterConfig: %s" % jobmasterconfig)
+        logger.debug("JobMasterConfig: %s", jobmasterconfig)
 
         return jobmasterconfig
 
@@ -1228,6 +1247,34 @@ class Job(GangaObject):
         finished[i] = rtHandler.prepare(app, sub_c, app_master_c, job_master_c)
         return
 
+    @staticmethod
+    def _getJobSubConfigInProcesses(rtHandler, subjobs, appsubconfig, appmasterconfig, jobmasterconfig, processes):
+        """
+        Prepare the subjob configs in a pool of worker processes, see SubjobPreparePool.
+        Returns None if that isn't possible so that the caller can prepare them in this process instead
+        Args:
+            rtHandler (IRuntimeHandler): The runtime handler of the job
+            subjobs (list): The subjobs to prepare
+            appsubconfig (list): App configs of the subjobs
+            appmasterconfig (object): App config of the master job
+            jobmasterconfig (object): Job config of the master job
+            processes (int): Number of worker processes, a negative number uses one per core
+        """
+        from GangaCore.GPIDev.Lib.Job.SubjobPreparePool import prepare_subjob_configs
+
+        apps = [sub_job.application for sub_job in subjobs]
+        # Whatever happens to the applications in the workers is lost, so get this done here
+        for app in apps:
+            if app.is_prepared in [None, False]:
+                app.prepare()
+
+        try:
+            return prepare_subjob_configs(rtHandler, apps, appsubconfig, appmasterconfig, jobmasterconfig, processes)
+        except Exception as err:
+            logger.warning("Could not prepare the subjobs in worker processes, preparing them in this process instead")
+            logger.warning("Reason: %s" % err)
+            return None
+
     def _getJobSubConfig(self, subjobs):
 
         jobsubconfig = None
@@ -1239,28 +1286,40 @@ class Job(GangaObject):
                 appmasterconfig = self._getMasterAppConfig()
                 jobmasterconfig = self._getJobMasterConfig()
                 appsubconfig = self._getAppSubConfig(subjobs)
-                logger.debug("Job %s Calling rtHandler.prepare %s times" % (self.getFQID('.'), len(self.subjobs)))
+                logger.debug("Job %s Calling rtHandler.prepare %s times", self.getFQID('.'), len(self.subjobs))
                 logger.info("Preparing subjobs")
 
-                jobsubconfig = []
+                processes = config['subjobPrepareProcesses']
+                if processes and len(subjobs) >= config['subjobPrepareProcessesMinSubjobs']:
+                    jobsubconfig = self._getJobSubConfigInProcesses(rtHandler, subjobs, appsubconfig, appmasterconfig, jobmasterconfig, processes)
 
-                if self.parallel_submit is False:
+                if jobsubconfig is not None:
+                    logger.debug("Job %s subjobs prepared in worker processes", self.getFQID('.'))
+                elif self.parallel_submit is False:
                     jobsubconfig = [rtHandler.prepare(sub_job.application, sub_conf, appmasterconfig, jobmasterconfig) for (sub_job, sub_conf) in zip(subjobs, appsubconfig)]
                 else:
 
                     finished = {}
 
                     from GangaCore.Core.GangaThread.WorkerThreads import getQueues
+                    from GangaCore.Core.GangaThread.WorkerThreads.WorkerThreadPool import TaskLatch
+                    # Counted down by the worker threads as each subjob has been prepared
+                    latch = TaskLatch(len(subjobs))
                     index=0
                     for sub_j, sub_conf in zip(subjobs, appsubconfig):
-                        getQueues()._monitoring_threadpool.add_function(self._prepare_sj, (rtHandler, index, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig, finished))
+                        getQueues()._monitoring_threadpool.add_function(self._prepare_sj, (rtHandler, index, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig, finished), latch=latch)
                         index += 1
 
-                    while len(finished) != len(subjobs):
-                        time.sleep(0.25)
+                    def report_progress(this_latch):
+                        logger.info("Prepared %s/%s subjobs (%.1f subjobs/s)", this_latch.done, this_latch.total, this_latch.rate())
+
+                    latch.wait(progress=report_progress)
+
+                    if len(finished) != len(subjobs):
+                        failed = sorted(set(range(len(subjobs))) - set(finished.keys()))
+                        raise JobError("Failed to prepare subjob(s) %s of job %s" % (failed, self.getFQID('.')))
 
-                    for index in finished.keys():
-                        jobsubconfig.insert(index, finished[index])
+                    jobsubconfig = [finished[index] for index in range(len(subjobs))]
 
         else:
             #   I am a sub-job, lets calculate my config
@@ -1268,12 +1327,12 @@ class Job(GangaObject):
             appmasterconfig = self._getMasterAppConfig()
             jobmasterconfig = self._getJobMasterConfig()
             appsubconfig = self._getAppSubConfig(self)
-            logger.debug("Job %s Calling rtHandler.prepare once for self" % self.getFQID('.'))
+            logger.debug("Job %s Calling rtHandler.prepare once for self", self.getFQID('.'))
             jobsubconfig = [rtHandler.prepare(self.application, appsubconfig[0], appmasterconfig, jobmasterconfig)]
 
         self._storedJobSubConfig = jobsubconfig
 
-        logger.debug("jobsubconfig: %s" % jobsubconfig)
+        logger.debug("jobsubconfig: %s", jobsubconfig)
 
         return jobsubconfig
 
@@ -1286,7 +1345,7 @@ class Job(GangaObject):
             if rtHandler is None:
                 # select the runtime handler
                 try:
-                    logger.debug("Job %s Calling allHandlers.get" % self.getFQID('.'))
+                    logger.debug("Job %s Calling allHandlers.get", self.getFQID('.'))
                     rtHandler = allHandlers.get(getName(self.application), getName(self.backend))()
                 except KeyError as x:
                     msg = 'runtime handler not found for application=%s and backend=%s' % (getName(self.application), getName(self.backend))
@@ -1316,7 +1375,7 @@ class Job(GangaObject):
         if hasattr(self.application, 'is_prepared'):
             logger.debug("Calling Job.prepare()")
             if (self.application.is_prepared is None) or (prepare is True):
-                logger.debug("Job %s Calling self.prepare(force=%s)" % (self.getFQID('.'), prepare))
+                logger.debug("Job %s Calling self.prepare(force=%s)", self.getFQID('.'), prepare)
                 self.prepare(force=True)
             elif self.application.is_prepared is True:
                 msg = "Job %s's application has is_prepared=True. This prevents any automatic (internal) call to the application's prepare() method." % self.getFQID('.')
@@ -1340,7 +1399,7 @@ class Job(GangaObject):
             logger.debug("Not calling prepare")
 
         if hasattr(self.application, 'is_prepared'):
-            logger.debug("App preparedness: %s" % self.application.is_prepared)
+            logger.debug("App preparedness: %s", self.application.is_prepared)
 
         return
 
@@ -1365,7 +1424,7 @@ class Job(GangaObject):
             fqid = self.getFQID('.')
 
             # App Configuration
-            logger.debug("App Configuration, Job %s:" % fqid)
+            logger.debug("App Configuration, Job %s:", fqid)
 
             # The App is configured first as information in the App may be
             # needed by the Job Splitter
@@ -1428,7 +1487,7 @@ class Job(GangaObject):
         For split jobs: consult https://twiki.cern.ch/twiki/bin/view/ArdaGrid/GangaSplitters#Subjob_submission
         """
         self._getRegistry()._flush([self])
-        logger.debug("Submitting Job %s" % self.getFQID('.'))
+        logger.debug("Submitting Job %s", self.getFQID('.'))
 
         gpiconfig = getConfig('GPI_Semantics')
 
@@ -1485,7 +1544,7 @@ class Job(GangaObject):
             self._selfAppPrepare(prepare)
 
             # Splitting
-            logger.debug("Checking Job: %s for splitting" % self.getFQID('.'))
+            logger.debug("Checking Job: %s for splitting", self.getFQID('.'))
             # split into subjobs
             rjobs = self._doSplitting()
 
@@ -1494,8 +1553,8 @@ class Job(GangaObject):
                 raise SplitterError("Splitter '%s' failed to produce any subjobs from splitting. Aborting submit" % (getName(self.splitter),))
 
             #
-            logger.debug("Now have %s subjobs" % len(self.subjobs))
-            logger.debug("Also have %s rjobs" % len(rjobs))
+            logger.debug("Now have %s subjobs", len(self.subjobs))
+            logger.debug("Also have %s rjobs", len(rjobs))
 
             # Output Files
             # validate the output files
@@ -1507,26 +1566,26 @@ class Job(GangaObject):
             # configure the application of each subjob
             appsubconfig = self._getAppSubConfig(rjobs)
             if appsubconfig is not None:
-                logger.debug("# appsubconfig: %s" % len(appsubconfig))
+                logger.debug("# appsubconfig: %s", len(appsubconfig))
 
             # Job Configuration
-            logger.debug("Job Configuration, Job %s:" % self.getFQID('.'))
+            logger.debug("Job Configuration, Job %s:", self.getFQID('.'))
 
             # prepare the master job with the correct runtime handler
             # Calls rtHandler.master_prepare if it hasn't already been called by the master job or by self
             # Only stored as transient if the master_prepare successfully
             # completes
             jobmasterconfig = self._getJobMasterConfig()
-            logger.debug("Preparing with: %s" % getName(rtHandler))
+            logger.debug("Preparing with: %s", getName(rtHandler))
 
             # prepare the subjobs with the runtime handler
             # Calls the rtHandler.prepare if it hasn't already been called by the master job or by self
             # Only stored as a transient if the prepare successfully completes
             jobsubconfig = self._getJobSubConfig(rjobs)
-            logger.debug("# jobsubconfig: %s" % len(jobsubconfig))
+            logger.debug("# jobsubconfig: %s", len(jobsubconfig))
 
             # Submission
-            logger.debug("Submitting to a backend, Job %s:" % self.getFQID('.'))
+            logger.debug("Submitting to a backend, Job %s:", self.getFQID('.'))
 
             # notify monitoring-services
             self.monitorPrepare_hook(jobsubconfig)
@@ -1749,7 +1808,7 @@ class Job(GangaObject):
         try:
             self._releaseSessionLockAndFlush()
         except Exception as err:
-            logger.debug("Remove Err: %s" % err)
+            logger.debug("Remove Err: %s", err)
             pass
 
     allowed_force_states = {'completed': ['completing', 'failed'],
@@ -1962,7 +2021,7 @@ class Job(GangaObject):
                     # before resubmitting it
                     sjs.getOutputWorkspace().remove(preserve_top=True)
             else:
-                logger.debug('There is nothing to do for resubmit of Job: %s' % self.getFQID('.'))
+                logger.debug('There is nothing to do for resubmit of Job: %s', self.getFQID('.'))
                 logger.debug('It\'s assumed all subjobs here have been completed, continuing silently')
                 self.updateStatus(oldstatus)
                 return
@@ -2140,6 +2199,14 @@ class Job(GangaObject):
             else:
                 new_value = stripProxy(runtimeEvalString(self, attr, value))
                 super(Job, self).__setattr__('backend', new_value)
+
+        elif attr == 'status':
+
+            new_value = stripProxy(runtimeEvalString(self, attr, value))
+            super(Job, self).__setattr__(attr, new_value)
+            # Let the monitoring know rather than have it scan the whole registry for active jobs
+            active_jobs.status_changed(self)
+
         elif attr.startswith('_'):
             # If it's an internal attribute then just pass it on
             super(Job, self).__setattr__(attr, value)
@@ -0,0 +1,117 @@
+##########################################################################
+# Ganga Project. http://cern.ch/ganga
+#
+##########################################################################
+"""
+Prepare the configuration of the subjobs of a large split job in a pool of worker processes.
+
+The pool is forked once everything the subjobs have in common (runtime handler, master app and job configs, subjob
+applications and app configs) has been worked out, so every worker inherits these rather than being sent them for
+each subjob. Only the index of a subjob is sent to a worker and only its prepared config comes back.
+"""
+
+import multiprocessing
+from cStringIO import StringIO
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from GangaCore.Core.GangaRepository.VStreamer import to_file, from_file
+from GangaCore.GPIDev.Base.Objects import GangaObject
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+# (rtHandler, apps, appsubconfigs, appmasterconfig, jobmasterconfig) set just before the pool is forked
+_shared = None
+
+
+def dumps_config(config):
+    """
+    Pickle a prepared config. GangaObjects found in it are stored as XML as they can't be pickled along with their parents
+    Args:
+        config (object): The object returned by rtHandler.prepare
+    """
+    def persistent_id(obj):
+        if isinstance(obj, GangaObject):
+            xml = StringIO()
+            to_file(obj, xml)
+            return xml.getvalue()
+        return None
+
+    buf = StringIO()
+    pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = persistent_id
+    pickler.dump(config)
+    return buf.getvalue()
+
+
+def loads_config(data):
+    """
+    Restore a config pickled by dumps_config
+    Args:
+        data (str): The pickled config
+    """
+    def persistent_load(xml):
+        obj, errors = from_file(StringIO(xml))
+        if errors:
+            raise errors[0]
+        return obj
+
+    unpickler = pickle.Unpickler(StringIO(data))
+    unpickler.persistent_load = persistent_load
+    return unpickler.load()
+
+
+def _prepare_subjob(index):
+    """
+    Runs in the worker processes, returns the index and the pickled config of one subjob
+    Args:
+        index (int): Index of the subjob within the lists shared with the workers
+    """
+    rtHandler, apps, appsubconfigs, appmasterconfig, jobmasterconfig = _shared
+    return index, dumps_config(rtHandler.prepare(apps[index], appsubconfigs[index], appmasterconfig, jobmasterconfig))
+
+
+def prepare_subjob_configs(rtHandler, apps, appsubconfigs, appmasterconfig, jobmasterconfig, processes):
+    """
+    Returns the list of subjob configs, in the same order as the applications, prepared by a pool of worker processes.
+    Anything which happens to the objects in the workers is lost, so the applications have to be prepared beforehand.
+    Args:
+        rtHandler (IRuntimeHandler): The runtime handler of the job
+        apps (list): Applications of the subjobs
+        appsubconfigs (list): App configs of the subjobs
+        appmasterconfig (object): App config of the master job
+        jobmasterconfig (object): Job config of the master job
+        processes (int): Number of worker processes, a negative number uses one per core
+    """
+    global _shared
+
+    if processes < 0:
+        processes = multiprocessing.cpu_count()
+    processes = max(min(processes, len(apps)), 1)
+
+    configs = [None] * len(apps)
+    _shared = (rtHandler, apps, appsubconfigs, appmasterconfig, jobmasterconfig)
+    try:
+        pool = multiprocessing.Pool(processes)
+    finally:
+        # The workers have their own copy now
+        _shared = None
+    try:
+        # Hand out a few chunks per worker so that the work stays balanced but the overhead per subjob is small
+        chunksize = max(len(apps) // (processes * 4), 1)
+        for index, data in pool.imap_unordered(_prepare_subjob, xrange(len(apps)), chunksize):
+            configs[index] = loads_config(data)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    logger.debug("Prepared %s subjobs in %s processes" % (len(configs), processes))
+
+    return configs
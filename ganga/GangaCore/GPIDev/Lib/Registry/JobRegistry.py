@@ -11,7 +11,7 @@ from GangaCore.Utility.external.OrderedDict import OrderedDict as oDict
 from GangaCore.Core.exceptions import GangaException
 from GangaCore.Core.GangaRepository.Registry import Registry, RegistryKeyError, RegistryAccessError, RegistryFlusher
 
-from GangaCore.GPIDev.Base.Proxy import stripProxy, isType
+from GangaCore.GPIDev.Base.Proxy import stripProxy, isType, getName
 
 import GangaCore.Utility.logging
 
@@ -69,6 +69,16 @@ class JobRegistry(Registry):
                 for sj in obj.subjobs:
                     cache["subjobs:status"].append(sj.status)
 
+        # store the values select() can use without loading the job, see JobRegistrySlice._index_select_keys
+        # these are prefixed as anything named after an attribute is returned in place of the attribute itself
+        for cv in ['application', 'backend']:
+            if hasattr(obj, cv):
+                cache["select:" + cv] = getName(getattr(obj, cv))
+        if hasattr(obj, "subjobs"):
+            cache["select:subjobs"] = len(obj.subjobs)
+        if hasattr(obj, "time"):
+            cache["select:time"] = dict(obj.time.timestamps)
+
         #print("Cache: %s" % str(cache))
         return cache
 
@@ -171,6 +181,13 @@ class JobRegistry(Registry):
 
 class JobRegistrySlice(RegistrySlice):
 
+    _index_select_keys = {'status': ('status', 'value'),
+                          'name': ('name', 'value'),
+                          'application': ('select:application', 'class'),
+                          'backend': ('select:backend', 'class'),
+                          'subjobs': ('select:subjobs', 'len'),
+                          'time': ('select:time', 'time')}
+
     def __init__(self, name):
         super(JobRegistrySlice, self).__init__(name, display_prefix="jobs")
         from GangaCore.Utility.ColourText import Foreground, Background, Effects
@@ -0,0 +1,134 @@
+##########################################################################
+# Ganga Project. http://cern.ch/ganga
+#
+##########################################################################
+
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+
+def _is_loaded(obj):
+    """
+    Returns True if the object is fully loaded into memory (or doesn't belong to a repository)
+    Args:
+        obj (GangaObject): Object from a registry slice
+    """
+    reg = obj._getRegistry()
+    if reg is None or reg.repository is None:
+        return True
+    return reg.repository.isObjectLoaded(obj)
+
+
+class RegistryIndexLookup(object):
+
+    """
+    Inverted indexes over the index caches of the objects of a registry slice which are not loaded into memory.
+    For every indexed key this keeps a map of value -> set of ids. An entry is refreshed as soon as the index cache of
+    the object is replaced by the repository, so keeping an instance of this around makes repeated selects cheap.
+    """
+
+    def __init__(self, keys):
+        """
+        Args:
+            keys (list): The keys of the index cache to build inverted indexes for
+        """
+        super(RegistryIndexLookup, self).__init__()
+        self.keys = keys
+        # key -> value -> set(ids)
+        self._postings = dict((k, {}) for k in keys)
+        # id -> (index_cache, {key: value})
+        self._indexed = {}
+
+    def _add(self, this_id, cache):
+        """ Add the postings of one object """
+        values = {}
+        for k in self.keys:
+            if k not in cache:
+                continue
+            v = cache[k]
+            try:
+                self._postings[k].setdefault(v, set()).add(this_id)
+            except TypeError:
+                # unhashable values can't be indexed, they're still available through get()
+                pass
+            values[k] = v
+        self._indexed[this_id] = (cache, values)
+
+    def _drop(self, this_id):
+        """ Remove the postings of one object """
+        entry = self._indexed.pop(this_id, None)
+        if entry is None:
+            return
+        for k, v in entry[1].iteritems():
+            try:
+                ids = self._postings[k].get(v)
+            except TypeError:
+                continue
+            if ids is not None:
+                ids.discard(this_id)
+                if not ids:
+                    del self._postings[k][v]
+
+    def refresh(self, items):
+        """
+        Bring the inverted indexes up to date with the index caches of these objects.
+        Returns the set of ids which are described by their index cache. Everything else has to be checked on the object.
+        Args:
+            items (list): list of (id, obj) pairs making up the slice
+        """
+        known = set()
+        for this_id, obj in items:
+            # Loaded objects generate their index cache on the fly, these are tested directly
+            if _is_loaded(obj):
+                self._drop(this_id)
+                continue
+            cache = getattr(obj, '_index_cache', None)
+            if not cache:
+                self._drop(this_id)
+                continue
+            entry = self._indexed.get(this_id)
+            if entry is None or entry[0] is not cache:
+                self._drop(this_id)
+                self._add(this_id, cache)
+            known.add(this_id)
+        for this_id in set(self._indexed) - known:
+            self._drop(this_id)
+        return known
+
+    def has(self, this_id, key):
+        """ Returns True if the index cache of this id contains the key
+        Args:
+            this_id (int): id of the object
+            key (str): key in the index cache
+        """
+        entry = self._indexed.get(this_id)
+        return entry is not None and key in entry[1]
+
+    def get(self, this_id, key):
+        """ Returns the value of this key in the index cache of this id
+        Args:
+            this_id (int): id of the object
+            key (str): key in the index cache
+        """
+        return self._indexed[this_id][1][key]
+
+    def values(self, key):
+        """ Returns the distinct (hashable) values of this key
+        Args:
+            key (str): key in the index cache
+        """
+        return self._postings[key].keys()
+
+    def lookup(self, key, matches):
+        """ Returns the set of ids whose value of key satisfies matches(value).
+        Only the distinct values are tested, not every object
+        Args:
+            key (str): key in the index cache
+            matches (callable): predicate on the value
+        """
+        found = set()
+        for value, ids in self._postings[key].iteritems():
+            if matches(value):
+                found.update(ids)
+        return found
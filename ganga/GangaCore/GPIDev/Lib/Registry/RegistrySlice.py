@@ -12,15 +12,43 @@ from GangaCore.GPIDev.Schema import ComponentItem
 from GangaCore.Utility.external.OrderedDict import OrderedDict as oDict
 import GangaCore.Utility.Config
 from GangaCore.GPIDev.Base.Proxy import isType, stripProxy, getName, addProxy
-from GangaCore.Utility.logging import getLogger
+from GangaCore.Utility.logging import getLogger, isDebugEnabled
 from GangaCore.Utility.Config import makeConfig
 
 logger = getLogger()
 
 config = GangaCore.Utility.Config.getConfig('Display')
 
+
+def _make_time_matcher(time_range):
+    """
+    Returns a matcher for a timestamps dictionary from a time range passed to select(time=...).
+    Either a (start, end) tuple applying to the creation time of the object, or a dict of status -> (start, end)
+    Either end of a range may be None to leave it open.
+    Args:
+        time_range (tuple, dict): The requested range(s)
+    """
+    if isinstance(time_range, tuple):
+        time_range = {'new': time_range}
+
+    def matches(timestamps):
+        for status, (start, end) in time_range.iteritems():
+            stamp = timestamps.get(status)
+            if stamp is None:
+                return False
+            if start is not None and stamp < start:
+                return False
+            if end is not None and stamp > end:
+                return False
+        return True
+    return matches
+
 class RegistrySlice(object):
 
+    # select() attributes which can be decided from the index cache of an object without loading it.
+    # Maps the attribute to the key in the index cache and the kind of comparison the stored value allows
+    _index_select_keys = {}
+
     def __init__(self, name, display_prefix):
         """
         Constructor for a Registry Slice object
@@ -46,6 +74,7 @@ class RegistrySlice(object):
         from GangaCore.Utility.ColourText import Effects
         self._colour_normal = Effects().normal
         self._proxyClass = None
+        self._index_lookup = None
 
     def _getColour(self, obj):
         """ Override this function in derived slices to colorize your job/task/... list"""
@@ -146,9 +175,10 @@ class RegistrySlice(object):
             flat_str = ''.join(split_str)
             attrs_str += ", %s=\"%s\"" % (a, flat_str)
 
-        logger.debug("Attrs_Str: %s" % attrs_str)
-        logger.debug("Constructing slice: %s" % ("%s.select(minid='%s', maxid='%s'%s)" % (self.name, this_repr.repr(minid), this_repr.repr(maxid), attrs_str)))
-        this_slice = self.__class__("%s.select(minid='%s', maxid='%s'%s)" % (self.name, this_repr.repr(minid), this_repr.repr(maxid), attrs_str))
+        logger.debug("Attrs_Str: %s", attrs_str)
+        slice_name = "%s.select(minid='%s', maxid='%s'%s)" % (self.name, this_repr.repr(minid), this_repr.repr(maxid), attrs_str)
+        logger.debug("Constructing slice: %s", slice_name)
+        this_slice = self.__class__(slice_name)
 
         def append(id, obj):
             this_slice.objects[id] = obj
@@ -159,6 +189,8 @@ class RegistrySlice(object):
         """Get the slice of jobs. 'minid' and 'maxid' specify optional (inclusive) slice range.
         The returned slice object has the job registry interface but it is not connected to
         persistent storage. 
+        Objects which aren't loaded are selected from their index cache where possible, only the objects
+        which can't be decided this way are loaded from disk.
         """
 
         logger = getLogger()
@@ -178,7 +210,9 @@ class RegistrySlice(object):
                 else:
                     attrs[k] = new_val
 
-        logger.debug("do_select: attrs: %s" % attrs)
+        logger.debug("do_select: attrs: %s", attrs)
+        # checked once rather than for every object
+        debug = isDebugEnabled(logger)
 
         def select_by_list(this_id):
             return this_id in ids
@@ -198,92 +232,189 @@ class RegistrySlice(object):
                 maxid = sys.maxsize
             select = select_by_range
 
-        for this_id in self.objects.keys():
-            obj = self.objects[this_id]
-            logger.debug("id, obj: %s, %s" % (this_id, obj))
-            if select(int(this_id)):
-                logger.debug("Selected: %s" % this_id)
-                selected = True
-                if self.name == 'box':
-                    name_str = obj._getRegistry()._getName(obj)
-                else:
-                    name_str = ''
-                for a in attrs:
-                    if self.name == 'box':
-                        attrvalue = attrs[a]
-                        if a == 'name':
-                            if not fnmatch.fnmatch(name_str, attrvalue):
-                                selected = False
-                                break
-                        elif a == 'application':
-                            if hasattr(obj, 'application'):
-                                if not getName(obj.application) == attrvalue:
-                                    selected = False
-                                    break
-                            else:
-                                selected = False
-                                break
-                        elif a == 'type':
-                            if not getName(obj) == attrvalue:
-                                selected = False
-                                break
-                        else:
-                            from GangaCore.GPIDev.Base import GangaAttributeError
-                            raise GangaAttributeError(
-                                'undefined select attribute: %s' % a)
-                    else:
+        all_items = [(this_id, self.objects[this_id]) for this_id in self.objects.keys()]
+        candidates = []
+        for this_id, obj in all_items:
+            if not select(int(this_id)):
+                if debug:
+                    logger.debug("NOT Selected: %s", this_id)
+                continue
+            if 'ids' in attrs and self.name != 'box' and int(this_id) not in attrs['ids']:
+                continue
+            candidates.append((this_id, obj))
+
+        if self.name == 'box':
+            for this_id, obj in candidates:
+                if self._box_select(obj, attrs):
+                    callback(this_id, obj)
+            return
 
-                        if a == 'ids':
-                            if int(this_id) not in attrs['ids']:
-                                selected = False
-                                break
-                        else:
-                            try:
-                                item = obj._schema.getItem(a)
-                                logger.debug("Here: %s, is item: %s" % (a, type(item)))
-                            except KeyError as err:
-                                from GangaCore.GPIDev.Base import GangaAttributeError
-                                logger.debug("KeyError getting item: '%s' from schema" % a)
-                                raise GangaAttributeError('undefined select attribute: %s' % a)
-                            else:
-                                attrvalue = attrs[a]
-
-                                if item.isA(ComponentItem):
-                                    ## TODO we need to distinguish between passing a Class type and a defined class instance
-                                    ## If we passed a class type to select it should look only for classes which are of this type
-                                    ## If we pass a class instance a compartison of the internal attributes should be performed
-                                    from GangaCore.GPIDev.Base.Filters import allComponentFilters
-
-                                    cfilter = allComponentFilters[item['category']]
-                                    filtered_value = cfilter(attrs[a], item)
-                                    from GangaCore.GPIDev.Base.Proxy import getName
-                                    if not filtered_value is None:
-                                        attrvalue = getName(filtered_value)
-                                    else:
-                                        attrvalue = getName(attrvalue)
-
-                                    if getName(getattr(obj, a)) != attrvalue:
-                                        selected = False
-                                        break
-                                else:
-                                    if isinstance(attrvalue, str):
-                                        regex = fnmatch.translate(attrvalue)
-                                        reobj = re.compile(regex)
-                                        # Compare the type of the attribute
-                                        # against attrvalue
-                                        if not reobj.match(str(getattr(obj, a))):
-                                            selected = False
-                                    else:
-                                        if getattr(obj, a) != attrvalue:
-                                            selected = False
-                                            break
-                if selected:
-                    logger.debug("Actually Selected")
+        attrs = dict((a, v) for a, v in attrs.iteritems() if a != 'ids')
+
+        # Objects which can be decided from the index cache and those of them which are selected
+        decided, selected_ids = self._select_from_index(all_items, candidates, attrs)
+        logger.debug("do_select: %s of %s objects decided from the index", len(decided), len(candidates))
+
+        prepared = {}
+        for this_id, obj in candidates:
+            if this_id in decided:
+                if this_id in selected_ids:
                     callback(this_id, obj)
+                continue
+            matchers = self._get_select_matchers(prepared, obj, attrs)
+            selected = True
+            for a, kind, matches in matchers:
+                if not matches(self._get_select_value(obj, a, kind)):
+                    selected = False
+                    break
+            if selected:
+                if debug:
+                    logger.debug("Actually Selected")
+                callback(this_id, obj)
+            elif debug:
+                logger.debug("NOT Actually Selected")
+
+    def _box_select(self, obj, attrs):
+        """
+        Returns True if the object in the box matches the select attributes
+        Args:
+            obj (GangaObject): the object in the box
+            attrs (dict): attributes passed to select
+        """
+        name_str = obj._getRegistry()._getName(obj)
+        for a in attrs:
+            attrvalue = attrs[a]
+            if a == 'name':
+                if not fnmatch.fnmatch(name_str, attrvalue):
+                    return False
+            elif a == 'application':
+                if hasattr(obj, 'application'):
+                    if not getName(obj.application) == attrvalue:
+                        return False
                 else:
-                    logger.debug("NOT Actually Selected")
+                    return False
+            elif a == 'type':
+                if not getName(obj) == attrvalue:
+                    return False
             else:
-                logger.debug("NOT Selected: %s" % this_id)
+                from GangaCore.GPIDev.Base import GangaAttributeError
+                raise GangaAttributeError('undefined select attribute: %s' % a)
+        return True
+
+    def _get_select_matchers(self, prepared, obj, attrs):
+        """
+        Returns a list of (attribute, kind, matcher) for the select attributes, where matcher(value) tells if the
+        value of the attribute (as returned by _get_select_value) is selected.
+        This only depends on the schema so the result is cached per class in prepared
+        Args:
+            prepared (dict): cache of matchers per class
+            obj (GangaObject): the object which is to be tested
+            attrs (dict): attributes passed to select
+        """
+        cls = type(obj)
+        if cls in prepared:
+            return prepared[cls]
+
+        matchers = []
+        for a, attrvalue in attrs.iteritems():
+            try:
+                item = obj._schema.getItem(a)
+            except KeyError as err:
+                from GangaCore.GPIDev.Base import GangaAttributeError
+                logger.debug("KeyError getting item: '%s' from schema", a)
+                raise GangaAttributeError('undefined select attribute: %s' % a)
+
+            if item.isA(ComponentItem):
+                if a == 'time' and isinstance(attrvalue, (tuple, dict)):
+                    matchers.append((a, 'time', _make_time_matcher(attrvalue)))
+                    continue
+                if item['sequence'] and isinstance(attrvalue, (int, long)) and not isinstance(attrvalue, bool):
+                    matchers.append((a, 'len', lambda v, n=attrvalue: v == n))
+                    continue
+                ## TODO we need to distinguish between passing a Class type and a defined class instance
+                ## If we passed a class type to select it should look only for classes which are of this type
+                ## If we pass a class instance a compartison of the internal attributes should be performed
+                from GangaCore.GPIDev.Base.Filters import allComponentFilters
+
+                cfilter = allComponentFilters[item['category']]
+                filtered_value = cfilter(attrvalue, item)
+                if not filtered_value is None:
+                    class_name = getName(filtered_value)
+                else:
+                    class_name = getName(attrvalue)
+                matchers.append((a, 'class', lambda v, n=class_name: v == n))
+            elif isinstance(attrvalue, str):
+                reobj = re.compile(fnmatch.translate(attrvalue))
+                # Compare the type of the attribute against attrvalue
+                matchers.append((a, 'value', lambda v, r=reobj: r.match(str(v)) is not None))
+            else:
+                matchers.append((a, 'value', lambda v, n=attrvalue: v == n))
+
+        prepared[cls] = matchers
+        return matchers
+
+    @staticmethod
+    def _get_select_value(obj, attr, kind):
+        """
+        Returns the value of the attribute of the object in the form which is stored in the index cache
+        Args:
+            obj (GangaObject): the object which is to be tested
+            attr (str): name of the attribute
+            kind (str): how the attribute is compared, see _get_select_matchers
+        """
+        value = getattr(obj, attr)
+        if kind == 'class':
+            return getName(value)
+        elif kind == 'len':
+            return len(value)
+        elif kind == 'time':
+            return value.timestamps
+        return value
+
+    def _select_from_index(self, all_items, candidates, attrs):
+        """
+        Decide which of the candidates are selected using the index caches of the objects which aren't loaded.
+        Returns the set of ids which could be decided and the set of ids which are selected
+        Args:
+            all_items (list): all (id, obj) pairs of this slice
+            candidates (list): (id, obj) pairs within the requested range
+            attrs (dict): attributes passed to select
+        """
+        if not self._index_select_keys or not candidates:
+            return set(), set()
+
+        if self._index_lookup is None:
+            from GangaCore.GPIDev.Lib.Registry.RegistryIndexLookup import RegistryIndexLookup
+            self._index_lookup = RegistryIndexLookup([key for key, kind in self._index_select_keys.values()])
+        lookup = self._index_lookup
+        known = lookup.refresh(all_items)
+
+        groups = {}
+        for this_id, obj in candidates:
+            if this_id in known:
+                groups.setdefault(type(obj), []).append((this_id, obj))
+
+        decided = set()
+        selected_ids = set()
+        prepared = {}
+        for cls, items in groups.iteritems():
+            matchers = self._get_select_matchers(prepared, items[0][1], attrs)
+            keys = []
+            for a, kind, matches in matchers:
+                if a not in self._index_select_keys or self._index_select_keys[a][1] != kind:
+                    break
+                keys.append((self._index_select_keys[a][0], kind, matches))
+            else:
+                these_ids = set(this_id for this_id, obj in items if all(lookup.has(this_id, key) for key, _, _ in keys))
+                decided.update(these_ids)
+                for key, kind, matches in keys:
+                    if kind == 'time':
+                        these_ids = set(this_id for this_id in these_ids if matches(lookup.get(this_id, key)))
+                    else:
+                        these_ids &= lookup.lookup(key, matches)
+                selected_ids.update(these_ids)
+
+        return decided, selected_ids
 
     def copy(self, keep_going):
         this_slice = self.__class__("copy of %s" % self.name)
@@ -326,8 +457,8 @@ class RegistrySlice(object):
         try:
             return addProxy(self.objects[this_id])
         except KeyError as err:
-            logger.debug('Object id=%d not found' % this_id)
-            logger.debug("%s" % err)
+            logger.debug('Object id=%d not found', this_id)
+            logger.debug("%s", err)
             raise RegistryKeyError('Object id=%d not found' % this_id)
 
     def __iter__(self):
@@ -407,15 +538,15 @@ class RegistrySlice(object):
                 else:
                     val = self._getatr(obj, item.split('.'))
             except KeyError as err:
-                logger.debug("_get_display_value KeyError: %s" % err)
-                logger.debug("item: \"%s\"" % item)
+                logger.debug("_get_display_value KeyError: %s", err)
+                logger.debug("item: \"%s\"", item)
                 #logger.debug("func: %s" % config[self._display_prefix + '_columns_functions'])
                 #val = self._getatr(obj, item.split('.'))
                 val = ""
             if not val and not item in self._display_columns_show_empty:
                 val = ""
         except AttributeError as err:
-            logger.debug("AttibErr: %s" % err)
+            logger.debug("AttibErr: %s", err)
             val = ""
         finally:
             pass
@@ -475,7 +606,7 @@ class RegistrySlice(object):
                             vals.append(str(obj._index_cache[display_str])[0:width])
                         continue
                     except KeyError as err:
-                        logger.debug("_display KeyError: %s" % err)
+                        logger.debug("_display KeyError: %s", err)
                         #pass
                         if item == "fqid":
                             vals.append(self._get_display_value(obj, item))
@@ -7,6 +7,7 @@ from GangaCore.GPIDev.Lib.Registry.JobRegistry import JobRegistrySlice, JobRegis
 from GangaCore.GPIDev.Lib.Job import MetadataDict
 from GangaCore.GPIDev.Base.Proxy import stripProxy
 from GangaCore.GPIDev.Lib.Tasks.common import getJobByID
+from GangaCore.GPIDev.Lib.Tasks.TaskEngine import notifyTaskChanged
 import time
 
 logger = getLogger()
@@ -101,6 +102,32 @@ class ITask(GangaObject):
         # update status and check
         self.updateStatus()
 
+    def updateUnits(self, units):
+        """Called by the monitoring thread instead of update() when only some units need looking at.
+        Returns 1 if a transform stopped after submitting and has more to submit
+
+        Args:
+            units (dict): ids of the units whose jobs changed by transform id, the other transforms only get to submit
+        """
+
+        # if we're new, then do nothing
+        if self.status == "new":
+            return 0
+
+        aborted = 0
+        for trf in self.transforms:
+            if trf.status != "running":
+                continue
+
+            if trf.updateUnits(units.get(trf.getID(), ())):
+                aborted = 1
+                if not self.check_all_trfs:
+                    break
+
+        # update status and check
+        self.updateStatus()
+        return aborted
+
 # Public methods:
 #
 # - remove() a task
@@ -191,6 +218,7 @@ class ITask(GangaObject):
 
             finally:
                 self.updateStatus()
+                notifyTaskChanged(self)
         else:
             logger.info("Task is already completed!")
 
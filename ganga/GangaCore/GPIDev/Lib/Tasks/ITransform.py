@@ -14,6 +14,7 @@ import time
 import os
 from GangaCore.GPIDev.Lib.Tasks.ITask import addInfoString
 from GangaCore.GPIDev.Lib.Tasks.common import getJobByID
+from GangaCore.GPIDev.Lib.Tasks.TaskEngine import notifyTaskChanged, submitBudget, wakeTaskAt
 from GangaCore.GPIDev.Adapters.IGangaFile import IGangaFile
 from GangaCore.GPIDev.Lib.File.File import File
 
@@ -59,6 +60,7 @@ class ITransform(GangaObject):
                       'setMajorRunLimit', 'getID', 'overview', 'resetUnitsByStatus', 'removeUnusedJobs',
                       'showInfo', 'showUnitInfo', 'pause', 'n_all', 'n_status' ]
     _hidden = 0
+    _additional_slots = ['_unit_status_counts']
 
     def showInfo(self):
         """Print out the info in a nice way"""
@@ -126,6 +128,7 @@ class ITransform(GangaObject):
 # Special methods:
     def __init__(self):
         super(ITransform, self).__init__()
+        self._unit_status_counts = None
         self.initialize()
 
     def _auto__init__(self):
@@ -177,6 +180,7 @@ class ITransform(GangaObject):
                         trf.resetUnit(u2.getID())
 
         self.updateStatus("running")
+        notifyTaskChanged(self._getParent())
 
     def getID(self):
         """Return the index of this trf in the parent task"""
@@ -210,15 +214,12 @@ class ITransform(GangaObject):
 
         # check for complete required units
         task = self._getParent()
-        for trf_id in self.required_trfs:
-            if task.transforms[trf_id].status != "completed":
-                return 0
+        if not self.checkRequiredTrfsCompleted():
+            return 0
 
         # report the info for this transform
-        unit_status = { "new":0, "hold":0, "running":0, "completed":0, "bad":0, "recreating":0 }
-        for unit in self.units:
-            unit_status[unit.status] += 1
-         
+        unit_status = self.unitStatusCounts()
+
         info_str = "Unit overview: %i units, %i new, %i hold, %i running, %i completed, %i bad. to_sub %i" % (len(self.units), unit_status["new"], unit_status["hold"],
                                                                                                               unit_status["running"], unit_status["completed"],
                                                                                                               unit_status["bad"], self._getParent().n_tosub())
@@ -235,8 +236,6 @@ class ITransform(GangaObject):
                 unit.start_time = time.time() + self.chain_delay * 60 - 1
 
         # loop over units and update them ((re)submits will be called here)
-        old_status = self.status
-        unit_status_list = []
 
         # find submissions first
         unit_update_list = []
@@ -251,8 +250,6 @@ class ITransform(GangaObject):
                     unit.getID(), self.getID(), task.id))
                 return 1
 
-            unit_status_list.append(unit.status)
-
         # now check for download
         for unit in unit_update_list:
             if unit.update() and self.abort_loop_on_submit:
@@ -260,18 +257,89 @@ class ITransform(GangaObject):
                     unit.getID(), self.getID(), task.id))
                 return 1
 
-            unit_status_list.append(unit.status)
+        self.updateStatusFromUnits()
+
+    def updateUnits(self, unit_ids):
+        """Called by the parent task instead of update() when only the given units had their jobs change status.
+        Updates those units, then gives the units without a job the chance to submit one.
+        Returns 1 if the loop was aborted after a submission
+
+        Args:
+            unit_ids (iterable): ids of the units to update
+        """
+        if type(self).update.__func__ is not ITransform.update.__func__:
+            # this transform does more in its update so let it look at everything
+            return self.update()
+
+        if self.status == "pause" or self.status == "new":
+            return 0
+
+        if not self.checkRequiredTrfsCompleted():
+            return 0
+
+        task = self._getParent()
+        for unit_id in sorted(unit_ids):
+            unit = self.units[unit_id]
+            if unit.update() and self.abort_loop_on_submit:
+                logger.info("Unit %d of transform %d, Task %d has aborted the loop" % (
+                    unit.getID(), self.getID(), task.id))
+                return 1
+
+        if self.submitUnits():
+            return 1
+
+        self.updateStatusFromUnits()
+        return 0
+
+    def submitUnits(self):
+        """Give the units which have no job the chance to submit one, as far as the task float and the
+        submission budget allow. Returns 1 if the loop was aborted after a submission"""
+        task = self._getParent()
+        if task.n_tosub() <= 0:
+            return 0
+
+        now = time.time()
+        for unit in self.units:
+            if not unit.active or unit.active_job_ids or unit.status in ["completed", "recreating"]:
+                continue
+
+            if not submitBudget.available(task.id):
+                return 0
+
+            if unit.update() and self.abort_loop_on_submit:
+                logger.info("Unit %d of transform %d, Task %d has aborted the loop" % (
+                    unit.getID(), self.getID(), task.id))
+                return 1
+
+            # come back when the unit is allowed to start
+            if not unit.active_job_ids and unit.start_time > now:
+                wakeTaskAt(task, unit.start_time)
+
+        return 0
+
+    def checkRequiredTrfsCompleted(self):
+        """Check the transforms this one requires have completed"""
+        task = self._getParent()
+        for trf_id in self.required_trfs:
+            if task.transforms[trf_id].status != "completed":
+                return False
+        return True
+
+    def updateStatusFromUnits(self):
+        """Set the status of the transform from the status of its units"""
 
         from GangaCore.GPIDev.Lib.Tasks.TaskChainInput import TaskChainInput
         # check for any TaskChainInput completions
+        task = self._getParent()
         for ds in self.inputdata:
             if isType(ds, TaskChainInput) and ds.input_trf_id != -1:
                 if task.transforms[ds.input_trf_id].status != "completed":
-                    return 0
+                    return
 
         # update status and check
+        unit_status = self.unitStatusCounts()
         for state in ['running', 'hold', 'bad', 'completed']:
-            if state in unit_status_list:
+            if unit_status.get(state):
                 if state == 'hold':
                     state = "running"
                 if state != self.status:
@@ -401,6 +469,7 @@ class ITransform(GangaObject):
         else:
             self.units.append(unit)
             stripProxy(unit).id = len(self.units) - 1
+        self._unit_status_counts = None
 
 # Information methods
     def fqn(self):
@@ -419,6 +488,29 @@ class ITransform(GangaObject):
     def n_status(self, status):
         return sum([u.n_status(status) for u in self.units])
 
+    def unitStatusCounts(self):
+        """Return the number of units in each status. This is counted once and then kept up to date
+        by the units as they change status"""
+        counts = self._unit_status_counts
+        if counts is None or sum(counts.values()) != len(self.units):
+            counts = dict.fromkeys(["new", "hold", "running", "completed", "bad", "recreating"], 0)
+            for unit in self.units:
+                counts[unit.status] = counts.get(unit.status, 0) + 1
+            self._unit_status_counts = counts
+        return counts
+
+    def _unitStatusChanged(self, old_status, new_status):
+        """Called by a unit of this transform when it changes status, to keep the counts up to date"""
+        counts = self._unit_status_counts
+        if counts is None:
+            return
+        if counts.get(old_status, 0) > 0:
+            counts[old_status] -= 1
+            counts[new_status] = counts.get(new_status, 0) + 1
+        else:
+            # not one of ours yet, count again next time
+            self._unit_status_counts = None
+
     def info(self):
         logger.info(markup("%s '%s'" % (getName(self), self.name), status_colours[self.status]))
         logger.info("* backend: %s" % getName(self.backend))
@@ -10,6 +10,7 @@ from GangaCore.Core.exceptions import ApplicationConfigurationError
 from GangaCore.GPIDev.Base.Proxy import stripProxy
 import time
 from GangaCore.GPIDev.Lib.Tasks.ITask import addInfoString
+from GangaCore.GPIDev.Lib.Tasks.TaskEngine import submitBudget, watchUnitJob
 import sys
 import traceback
 from GangaCore.GPIDev.Adapters.IGangaFile import IGangaFile
@@ -87,6 +88,16 @@ class IUnit(GangaObject):
         addInfoString(self, "Status change from '%s' to '%s'" % (self.status, status))
         self.status = status
 
+    def __setattr__(self, name, value):
+        # the status is also set directly by transforms and users, the transform has to know either way
+        if name != 'status':
+            return super(IUnit, self).__setattr__(name, value)
+        old_status = self.status
+        super(IUnit, self).__setattr__(name, value)
+        trf = self._getParent()
+        if old_status != value and hasattr(trf, '_unitStatusChanged'):
+            trf._unitStatusChanged(old_status, value)
+
     def createNewJob(self):
         """Create any jobs required for this unit"""
         pass
@@ -192,7 +203,7 @@ class IUnit(GangaObject):
         if len(self.req_units) > 0 and req_ok and self.start_time == 0:
             self.start_time = time.time() + trf.chain_delay * 60 - 1
 
-        if req_ok and self.checkForSubmission() and maxsub > 0:
+        if req_ok and self.checkForSubmission() and maxsub > 0 and submitBudget.take(task.id):
 
             # create job and submit
             addInfoString( self, "Creating Job..." )
@@ -220,6 +231,7 @@ class IUnit(GangaObject):
                 return 1
 
             self.active_job_ids.append(j.id)
+            watchUnitJob(self, j.id)
             self.updateStatus("running")
             trf._setDirty()  # ensure everything's saved
 
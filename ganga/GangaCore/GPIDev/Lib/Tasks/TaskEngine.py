@@ -0,0 +1,361 @@
+"""
+The engine behind the Tasks monitoring thread.
+
+Rather than updating every task every cycle, the engine listens to the change feed of the job registry and only
+re-evaluates the units whose jobs changed status, then lets the transforms of those tasks submit new jobs if they
+have room. A task is fully updated (ITask.update) when it is run, when one of its units completes, and every
+[Tasks]TaskLoopFrequency seconds as a catch-all for anything the events don't cover.
+The jobs submitted by all tasks together are limited by a SubmitBudget.
+"""
+
+from __future__ import absolute_import
+import sys
+import threading
+import time
+import traceback
+
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+config = getConfig('Tasks')
+
+# what a change to a job needs to be about for the units running it to be looked at again
+_status_fields = frozenset(['status', 'subjobs:status', '<removed>'])
+
+
+class SubmitBudget(object):
+
+    """
+    Limits the number of new jobs submitted by the Tasks monitoring across all tasks.
+    Up to [Tasks]SubmitBudget jobs can be submitted at once, after which the budget refills at SubmitBudget jobs
+    per SubmitBudgetPeriod seconds. The tasks which were refused a submission are remembered so that they are
+    looked at again once the budget allows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._last_refill = 0.
+        self._waiting = set()
+
+    def _refill(self):
+        """ Top up the tokens for the time since the last refill, called with the lock held. Returns the budget size """
+        size = config['SubmitBudget']
+        now = time.time()
+        if self._tokens is None:
+            self._tokens = float(size)
+        else:
+            period = max(config['SubmitBudgetPeriod'], 1e-3)
+            self._tokens = min(float(size), self._tokens + (now - self._last_refill) * size / period)
+        self._last_refill = now
+        return size
+
+    def available(self, task_id=None):
+        """
+        Returns whether a job can be submitted now, without using up the budget
+        Args:
+            task_id (int): id of the task asking, remembered until the budget allows another submission
+        """
+        with self._lock:
+            if self._refill() <= 0 or self._tokens >= 1:
+                return True
+            if task_id is not None:
+                self._waiting.add(task_id)
+            return False
+
+    def take(self, task_id=None):
+        """
+        Use up one submission from the budget, returns False if there was none left
+        Args:
+            task_id (int): id of the task submitting, remembered until the budget allows another submission if refused
+        """
+        with self._lock:
+            if self._refill() <= 0:
+                return True
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            if task_id is not None:
+                self._waiting.add(task_id)
+            return False
+
+    def popWaiting(self):
+        """ Returns the ids of the tasks refused a submission since the last call and forgets them """
+        with self._lock:
+            waiting, self._waiting = self._waiting, set()
+        return waiting
+
+    def waitTime(self):
+        """ Returns how long in seconds until the tasks refused a submission can be given another go, None if there are none """
+        with self._lock:
+            if not self._waiting:
+                return None
+            size = self._refill()
+            if size <= 0 or self._tokens >= 1:
+                return 0.
+            return (1 - self._tokens) * max(config['SubmitBudgetPeriod'], 1e-3) / size
+
+
+# the budget shared by every task
+submitBudget = SubmitBudget()
+
+
+class TaskEngine(object):
+
+    """
+    Decides which tasks, transforms and units the monitoring thread of a TaskRegistry has to look at
+    """
+
+    def __init__(self, registry):
+        """
+        Args:
+            registry (TaskRegistry): the registry of the tasks to monitor
+        """
+        self.registry = registry
+        self.consumer = 'Tasks:%s' % registry.name
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # ids of the tasks to update fully in the next cycle
+        self._dirty = set()
+        # ids of the tasks whose transforms were stopped part way through submitting
+        self._backlog = set()
+        # task id -> earliest time one of its units is waiting for
+        self._timers = {}
+        # job id -> (task id, transform id, unit id)
+        self._job_units = {}
+        self._next_full_update = 0.
+
+    def _jobs(self):
+        from GangaCore.Core.GangaRepository import getRegistry
+        return getRegistry('jobs')
+
+    def subscribe(self):
+        """ Start listening to the changes of the jobs, the first cycle after this updates every task """
+        self._next_full_update = 0.
+        self._jobs().changes.addListener(self.jobChanged)
+
+    def unsubscribe(self):
+        """ Stop listening to the changes of the jobs """
+        self._jobs().changes.removeListener(self.jobChanged)
+
+    def jobChanged(self, change):
+        """
+        Listener of the change feed of the jobs, wakes the monitoring thread up when a job of a task changes status
+        Args:
+            change (RegistryChange): the change recorded
+        """
+        if change.fields and change.fields & _status_fields and change.id in self._job_units:
+            self._wakeup.set()
+
+    def wake(self):
+        """ Wake the monitoring thread up """
+        self._wakeup.set()
+
+    def watchJob(self, job_id, task_id, trf_id, unit_id):
+        """
+        Remember which unit a job belongs to, to update it when the job changes status
+        Args:
+            job_id (int): id of the job
+            task_id (int): id of the task
+            trf_id (int): id of the transform in the task
+            unit_id (int): id of the unit in the transform
+        """
+        self._job_units[job_id] = (task_id, trf_id, unit_id)
+
+    def taskChanged(self, task_id):
+        """
+        Have a task fully updated in the next cycle
+        Args:
+            task_id (int): id of the task
+        """
+        with self._lock:
+            self._dirty.add(task_id)
+        self._wakeup.set()
+
+    def wakeAt(self, when, task_id):
+        """
+        Give the transforms of a task the chance to submit at a given time, e.g. when a unit's start time comes
+        Args:
+            when (float): time since the epoch
+            task_id (int): id of the task
+        """
+        with self._lock:
+            self._timers[task_id] = min(when, self._timers.get(task_id, when))
+
+    def waitTime(self):
+        """ Returns how long in seconds the monitoring thread can sleep for unless a job changes status """
+        now = time.time()
+        with self._lock:
+            if self._dirty or self._backlog:
+                return 0.
+            wake_time = self._next_full_update
+            if self._timers:
+                wake_time = min(wake_time, min(self._timers.values()))
+        budget_wait = submitBudget.waitTime()
+        if budget_wait is not None:
+            wake_time = min(wake_time, now + budget_wait)
+        return max(wake_time - now, 0.)
+
+    def wait(self, should_stop, timeout=None):
+        """
+        Sleep until there is something to do, a job of a task changes status or should_stop() is True
+        Args:
+            should_stop (callable): returns True when the thread is asked to stop
+            timeout (float): longest time to sleep for in seconds, by default until there is something to do
+        """
+        end = time.time() + (self.waitTime() if timeout is None else timeout)
+        while not should_stop():
+            remaining = end - time.time()
+            if remaining <= 0 or self._wakeup.is_set():
+                break
+            self._wakeup.wait(min(remaining, 0.5))
+        self._wakeup.clear()
+
+    def cycle(self, should_stop):
+        """
+        Update what needs updating since the last cycle
+        Args:
+            should_stop (callable): returns True when the thread is asked to stop
+        """
+        changes = self._jobs().pollChanges(self.consumer)
+        now = time.time()
+
+        if changes is None or now >= self._next_full_update:
+            # first time around, too many changes missed or time for a catch-all update
+            self._next_full_update = now + config['TaskLoopFrequency']
+            with self._lock:
+                self._dirty.clear()
+                self._backlog.clear()
+            submitBudget.popWaiting()
+            self._fullUpdate(should_stop)
+            return
+
+        with self._lock:
+            full = self._dirty
+            submit = self._backlog
+            self._dirty = set()
+            self._backlog = set()
+            for task_id, when in self._timers.items():
+                if when <= now:
+                    submit.add(task_id)
+                    del self._timers[task_id]
+        submit |= submitBudget.popWaiting()
+
+        # the units whose jobs changed, by task and transform
+        changed = {}
+        for change in changes:
+            if not change.fields or not change.fields & _status_fields:
+                continue
+            where = self._job_units.get(change.id)
+            if where is None:
+                continue
+            task_id, trf_id, unit_id = where
+            changed.setdefault(task_id, {}).setdefault(trf_id, set()).add(unit_id)
+
+        for task_id in sorted(full | submit | set(changed)):
+            if should_stop():
+                break
+            if task_id in full:
+                self._updateTask(task_id)
+            else:
+                self._updateUnits(task_id, changed.get(task_id, {}))
+
+    def _getTask(self, task_id):
+        from GangaCore.Core.GangaRepository.Registry import RegistryKeyError
+        try:
+            return self.registry[task_id]
+        except RegistryKeyError:
+            return None
+
+    def _fullUpdate(self, should_stop):
+        """ Update every task and note which unit each of their jobs belongs to """
+        job_units = {}
+        for task_id in self.registry.ids():
+            if should_stop():
+                return
+            task = self._getTask(task_id)
+            if task is None:
+                continue
+            self._runGuarded(task, task.update)
+            for trf in task.transforms:
+                for unit in trf.units:
+                    for job_id in unit.active_job_ids:
+                        job_units[job_id] = (task_id, trf.getID(), unit.getID())
+        self._job_units = job_units
+
+    def _updateTask(self, task_id):
+        task = self._getTask(task_id)
+        if task is not None:
+            self._runGuarded(task, task.update)
+
+    def _updateUnits(self, task_id, changed):
+        """
+        Update the units of a task whose jobs changed, then give its transforms the chance to submit
+        Args:
+            task_id (int): id of the task
+            changed (dict): ids of the units whose jobs changed by transform id
+        """
+        task = self._getTask(task_id)
+        if task is None:
+            return
+        completed = sum(trf.unitStatusCounts().get('completed', 0) for trf in task.transforms)
+        if self._runGuarded(task, task.updateUnits, changed):
+            with self._lock:
+                self._backlog.add(task_id)
+        if sum(trf.unitStatusCounts().get('completed', 0) for trf in task.transforms) != completed:
+            # completed units may start chained transforms so let the whole task have a look
+            self.taskChanged(task_id)
+
+    def _runGuarded(self, task, method, *args):
+        """ Call a method updating a task, pausing the task if it fails """
+        try:
+            return method(*args)
+        except Exception as x:
+            logger.error("Exception occurred in task monitoring loop: %s %s\nThe offending task was paused." % (x.__class__, x))
+            type_, value_, traceback_ = sys.exc_info()
+            logger.error("Full traceback:\n %s" % ' '.join(traceback.format_exception(type_, value_, traceback_)))
+            task.pause()
+            return 0
+
+
+def _getEngine(obj):
+    """ Returns the engine monitoring the task obj belongs to, None if it is not in a registry with one """
+    return getattr(obj._getRegistry(), 'engine', None)
+
+
+def notifyTaskChanged(task):
+    """
+    Have the monitoring look at a whole task again soon, e.g. after it is run or one of its units is reset
+    Args:
+        task (ITask): the task
+    """
+    engine = _getEngine(task)
+    if engine is not None:
+        engine.taskChanged(task.id)
+
+
+def watchUnitJob(unit, job_id):
+    """
+    Have the monitoring update a unit when the job it submitted changes status
+    Args:
+        unit (IUnit): the unit
+        job_id (int): id of the job
+    """
+    engine = _getEngine(unit)
+    if engine is not None:
+        trf = unit._getParent()
+        engine.watchJob(job_id, trf._getParent().id, trf.getID(), unit.getID())
+
+
+def wakeTaskAt(task, when):
+    """
+    Have the monitoring give a task's transforms the chance to submit at a given time
+    Args:
+        task (ITask): the task
+        when (float): time since the epoch
+    """
+    engine = _getEngine(task)
+    if engine is not None:
+        engine.wakeAt(when, task.id)
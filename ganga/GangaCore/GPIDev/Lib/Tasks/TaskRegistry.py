@@ -7,6 +7,7 @@ from GangaCore.GPIDev.Lib.Registry.JobRegistry import JobRegistrySliceProxy
 from GangaCore.Core.GangaRepository.Registry import Registry, RegistryError, RegistryKeyError, RegistryAccessError, RegistryFlusher
 from GangaCore.GPIDev.Base.Proxy import stripProxy, getName, isType
 from GangaCore.Utility.ColourText import ANSIMarkup, overview_colours, status_colours, fgcol
+from GangaCore.GPIDev.Lib.Tasks.TaskEngine import TaskEngine
 
 from GangaCore.Utility.logging import getLogger
 logger = getLogger()
@@ -28,6 +29,7 @@ class TaskRegistry(Registry):
         super(TaskRegistry, self).__init__( name, doc )
 
         self._main_thread = None
+        self.engine = TaskEngine(self)
 
         self.stored_slice = TaskRegistrySlice(self.name)
         self.stored_slice.objects = self
@@ -78,43 +80,27 @@ class TaskRegistry(Registry):
 
         logger.debug("Entering main loop")
 
-        # Main loop
-        while self._main_thread is not None and not self._main_thread.should_stop():
-
-            # If monitoring is enabled (or forced for Tasks) loop over each one and update
-            if (config['ForceTaskMonitoring'] or monitoring_component.enabled) and not config['disableTaskMon']:
-                for tid in self.ids():
-
-                    logger.debug("Running over tid: %s" % str(tid))
-
-                    try:
-                        p = self[tid]
-                        p.update()
+        # Main loop, woken up by the engine whenever a job of a task changes status
+        self.engine.subscribe()
+        try:
+            while self._main_thread is not None and not self._main_thread.should_stop():
 
-                    except Exception as x:
-                        logger.error(
-                            "Exception occurred in task monitoring loop: %s %s\nThe offending task was paused." % (x.__class__, x))
-                        type_, value_, traceback_ = sys.exc_info()
-                        logger.error("Full traceback:\n %s" % ' '.join(
-                            traceback.format_exception(type_, value_, traceback_)))
-                        p.pause()
+                # If monitoring is enabled (or forced for Tasks) update what has changed
+                if (config['ForceTaskMonitoring'] or monitoring_component.enabled) and not config['disableTaskMon']:
+                    self.engine.cycle(self._main_thread.should_stop)
 
                     if self._main_thread.should_stop():
                         break
 
-                if self._main_thread.should_stop():
-                    break
-
-            logger.debug("TaskRegistry Sleeping for: %s seconds" % str(config['TaskLoopFrequency']))
-
-            # Sleep interruptible for 10 seconds
-            for i in range(0, int(config['TaskLoopFrequency'] * 100)):
-                if self._main_thread.should_stop():
-                    break
-                time.sleep(0.01)
+                    self.engine.wait(self._main_thread.should_stop)
+                else:
+                    logger.debug("TaskRegistry Sleeping for: %s seconds" % str(config['TaskLoopFrequency']))
+                    self.engine.wait(self._main_thread.should_stop, config['TaskLoopFrequency'])
+        finally:
+            self.engine.unsubscribe()
 
     def startup(self):
-        """ Start a background thread that periodically run()s"""
+        """ Start a background thread that updates the tasks as their jobs change"""
         super(TaskRegistry, self).startup()
         from GangaCore.Core.GangaThread import GangaThread
         self._main_thread = GangaThread(name="GangaTasks", target=self._thread_main)
@@ -131,6 +117,7 @@ class TaskRegistry(Registry):
     def stop(self):
         if self._main_thread is not None:
             self._main_thread.stop()
+            self.engine.wake()
             self._main_thread.join()
 
 from GangaCore.GPIDev.Lib.Registry.RegistrySlice import RegistrySlice
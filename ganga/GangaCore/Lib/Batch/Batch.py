@@ -11,6 +11,7 @@ import GangaCore.Utility.logging
 import GangaCore.Utility.Config
 
 import os
+import re
 
 logger = GangaCore.Utility.logging.getLogger()
 
@@ -51,6 +52,88 @@ def shell_cmd(cmd, soutfile=None, allowed_exit=[0]):
     return rc, soutfile, m is None
 
 
+class StatusFile(object):
+
+    """
+    What has been read so far of the __jobstatus__ file of a job. The file is only ever appended to by the job
+    wrapper so only the lines added since the last read are parsed. A new file (e.g. after a resubmit) is read again
+    from the start.
+    """
+
+    __slots__ = ('inode', 'offset', 'fields')
+
+    # the first value of each of these is kept
+    keys = ('PID', 'QUEUE', 'ACTUALCE', 'EXITCODE')
+    patterns = {'PID': re.compile(r'\d+'), 'QUEUE': re.compile(r'\S+'), 'ACTUALCE': re.compile(r'\S+'), 'EXITCODE': re.compile(r'\d+')}
+
+    def __init__(self):
+        self.inode = None
+        self.offset = 0
+        self.fields = {}
+
+    def read(self, path):
+        """
+        Parse the lines appended to the status file since the last read and return the dict of the values found so far
+        Args:
+            path (str): path of the __jobstatus__ file
+        """
+        with open(path) as statusfile:
+            stat = os.fstat(statusfile.fileno())
+            # the inode of a removed file may be reused straight away, so a shorter file is taken to be new too
+            inode = stat.st_ino
+            if inode != self.inode or stat.st_size < self.offset:
+                self.inode = inode
+                self.offset = 0
+                self.fields = {}
+            statusfile.seek(self.offset)
+            data = statusfile.read()
+        # a line still being written is read again next time
+        end = data.rfind('\n') + 1
+        self.offset += end
+        for line in data[:end].splitlines():
+            key, sep, value = line.partition(': ')
+            if sep and key in self.keys and key not in self.fields:
+                m = self.patterns[key].match(value)
+                if m:
+                    self.fields[key] = int(m.group()) if key in ('PID', 'EXITCODE') else m.group()
+        return self.fields
+
+
+# StatusFile of each __jobstatus__ file being monitored, by path
+_status_files = {}
+
+
+def query_queue(config):
+    """
+    Returns the dict of the state in the batch system of the jobs listed by [<backend>]queue_query_str, by batch id.
+    The dict is empty if the command is not configured or failed, in which case every job is checked through its files.
+    Backends derived from Batch outside of GangaCore may not declare the queue_query options at all.
+    Args:
+        config (Config): the config section of the backend
+    """
+    states = {}
+    command = config.get('queue_query_str')
+    pattern = config.get('queue_query_pattern')
+    if not command or not pattern:
+        return states
+
+    rc, soutfile, ef = shell_cmd(command)
+    try:
+        if rc != 0 or not ef:
+            logger.debug('Problem querying the batch system with %s (exit code %s)', command, rc)
+            return states
+        pattern = re.compile(pattern)
+        with open(soutfile) as sout_file:
+            for line in sout_file:
+                m = pattern.match(line)
+                if m:
+                    states[m.group('id')] = m.group('status')
+    finally:
+        if os.path.exists(soutfile):
+            os.remove(soutfile)
+    return states
+
+
 class Batch(IBackend):
 
     """ Batch submission backend.
@@ -480,71 +563,52 @@ class Batch(IBackend):
 
     @staticmethod
     def updateMonitoringInformation(jobs):
+        """
+        Update the status of the jobs from one listing of the batch queue per backend and their status files.
+        A job whose state in the queue matches its status is left alone. Otherwise only the lines added to its
+        __jobstatus__ file since the last check are parsed, and the job is only locked if it is updated.
+        """
 
-        import re
-        repid = re.compile(r'^PID: (?P<pid>\d+)', re.M)
-        requeue = re.compile(r'^QUEUE: (?P<queue>\S+)', re.M)
-        reactualCE = re.compile(r'^ACTUALCE: (?P<actualCE>\S+)', re.M)
-        reexit = re.compile(r'^EXITCODE: (?P<exitcode>\d+)', re.M)
-
-        def get_last_alive(f):
-            """Time since the statusfile was last touched in seconds"""
-            import os.path
-            import time
-            talive = 0
-            try:
-                talive = time.time() - os.path.getmtime(f)
-            except OSError as x:
-                logger.debug('Problem reading status file: %s (%s)', f, str(x))
-
-            return talive
-
-        def get_status(f):
-            """Give (pid,queue,actualCE,exit code) for job"""
-
-            pid, queue, actualCE, exitcode = None, None, None, None
-
-            import re
-            statusfile = None
-            try:
-                statusfile = open(f)
-                stat = statusfile.read()
-            except IOError as x:
-                logger.debug('Problem reading status file: %s (%s)', f, str(x))
-                return pid, queue, actualCE, exitcode
-            finally:
-                if statusfile:
-                    statusfile.close()
-
-            mpid = repid.search(stat)
-            if mpid:
-                pid = int(mpid.group('pid'))
-
-            mqueue = requeue.search(stat)
-            if mqueue:
-                queue = str(mqueue.group('queue'))
-
-            mactualCE = reactualCE.search(stat)
-            if mactualCE:
-                actualCE = str(mactualCE.group('actualCE'))
-
-            mexit = reexit.search(stat)
-            if mexit:
-                exitcode = int(mexit.group('exitcode'))
+        from GangaCore.Utility.Config import getConfig
 
-            return pid, queue, actualCE, exitcode
+        configs = {}
+        queues = {}
+        queue_states = {}
 
-        from GangaCore.Utility.Config import getConfig
         for j in jobs:
-            stripProxy(j)._getSessionLock()
-            outw = j.getOutputWorkspace()
+            backend_name = getName(j.backend)
+            if backend_name not in configs:
+                configs[backend_name] = getConfig(backend_name).snapshot()
+                queues[backend_name] = query_queue(configs[backend_name])
+                queue_states[backend_name] = configs[backend_name].get('queue_states') or {}
+            config = configs[backend_name]
+            states = queue_states[backend_name]
+
+            # nothing to look at as long as the batch system agrees with what we know of the job
+            batch_state = queues[backend_name].get(str(j.backend.id))
+            if batch_state is not None and states.get(batch_state) == j.status:
+                continue
 
+            outw = j.getOutputWorkspace()
             statusfile = os.path.join(outw.getPath(), '__jobstatus__')
-            heartbeatfile = os.path.join(outw.getPath(), '__heartbeat__')
-            pid, queue, actualCE, exitcode = get_status(statusfile)
+            status_file = _status_files.get(statusfile)
+            if status_file is None:
+                status_file = _status_files[statusfile] = StatusFile()
+            try:
+                fields = status_file.read(statusfile)
+            except (IOError, OSError) as x:
+                logger.debug('Problem reading status file: %s (%s)', statusfile, str(x))
+                fields = {}
+                del _status_files[statusfile]
+
+            pid = fields.get('PID')
+            queue = fields.get('QUEUE')
+            actualCE = fields.get('ACTUALCE')
+            exitcode = fields.get('EXITCODE')
 
             if j.status == 'submitted':
                 if pid or queue:
+                    stripProxy(j)._getSessionLock()
                     j.updateStatus('running')
 
                     if pid:
@@ -559,20 +623,29 @@ class Batch(IBackend):
             if j.status == 'running':
                 if exitcode is not None:
                     # Job has finished
+                    stripProxy(j)._getSessionLock()
                     j.backend.exitcode = exitcode
                     if exitcode == 0:
                         j.updateStatus('completed')
                     else:
                         j.updateStatus('failed')
-                else:
-                    # Job is still running. Check if alive
-                    time = get_last_alive(heartbeatfile)
-                    config = getConfig(getName(j.backend))
-                    if time > config['timeout']:
+                elif batch_state is None or states.get(batch_state) != 'running':
+                    # Job is no longer running as far as the batch system knows. Check if alive
+                    heartbeatfile = os.path.join(outw.getPath(), '__heartbeat__')
+                    try:
+                        talive = time.time() - os.path.getmtime(heartbeatfile)
+                    except OSError as x:
+                        logger.debug('Problem reading status file: %s (%s)', heartbeatfile, str(x))
+                        talive = 0
+                    if talive > config['timeout']:
                         logger.warning(
                             'Job %s has disappeared from the batch system.', str(j.getFQID('.')))
+                        stripProxy(j)._getSessionLock()
                         j.updateStatus('failed')
 
+            if j.status not in ['submitted', 'running']:
+                _status_files.pop(statusfile, None)
+
 #_________________________________________________________________________
 
 class LSF(Batch):
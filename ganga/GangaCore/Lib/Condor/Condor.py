@@ -74,11 +74,224 @@ import commands
 import inspect
 import os
 import shutil
+import subprocess
 import time
 import datetime
 import re
+from collections import deque
+from xml.etree.ElementTree import XMLParser, ParseError
 logger = GangaCore.Utility.logging.getLogger()
 
+# attributes of the jobs read at each monitoring cycle
+QUERY_ATTRIBUTES = ('GlobalJobId', 'ClusterId', 'ProcId', 'JobStatus', 'RemoteHost', 'RemoteUserCpu')
+
+
+class ClassAdTarget(object):
+
+    """
+    Target of an XMLParser fed with the XML output of condor_q or condor_history. Every ClassAd is turned into a dict
+    of its attributes as soon as it is complete and queued in ads.
+    """
+
+    def __init__(self):
+        self.ads = deque()
+        self.ad = None
+        self.name = None
+        self.text = []
+
+    def start(self, tag, attrib):
+        if tag == 'c':
+            self.ad = {}
+        elif tag == 'a':
+            self.name = attrib.get('n')
+        elif tag == 'b' and self.ad is not None:
+            self.ad[self.name] = attrib.get('v') == 't'
+        self.text = []
+
+    def data(self, data):
+        self.text.append(data)
+
+    def end(self, tag):
+        if self.ad is None:
+            return
+        if tag == 'c':
+            self.ads.append(self.ad)
+            self.ad = None
+            return
+        text = ''.join(self.text)
+        try:
+            if tag == 'i':
+                self.ad[self.name] = int(text)
+            elif tag == 'r':
+                self.ad[self.name] = float(text)
+            elif tag in ('s', 'e'):
+                self.ad[self.name] = text
+        except ValueError:
+            self.ad[self.name] = text
+
+    def close(self):
+        return None
+
+
+def iter_classads(lines):
+    """
+    Yields a dict per ClassAd of the XML output of condor_q or condor_history as soon as it has been read. condor_q
+    -global prints one XML document per schedd, along with messages about the schedds it could not reach, so everything
+    outside the ClassAds is skipped.
+    Args:
+        lines (iterable): lines of the output
+    """
+    target = ClassAdTarget()
+    parser = XMLParser(target=target)
+    parser.feed('<classads>')
+    for line in lines:
+        stripped = line.strip()
+        if target.ad is None and (not stripped.startswith('<') or
+                                  stripped.startswith(('<?xml', '<!DOCTYPE', '<classads>', '</classads>'))):
+            if stripped and not stripped.startswith('<'):
+                logger.debug('Condor query: %s', stripped)
+            continue
+        parser.feed(line)
+        while target.ads:
+            yield target.ads.popleft()
+    parser.feed('</classads>')
+    parser.close()
+    while target.ads:
+        yield target.ads.popleft()
+
+
+def cluster_constraint(cluster_ids):
+    """
+    Returns the ClassAd expression matching the jobs of the clusters, with the runs of consecutive clusters (e.g. from
+    successive submissions) as ranges
+    Args:
+        cluster_ids (iterable): Condor cluster ids
+    """
+    ranges = []
+    for cluster_id in sorted(set(int(c) for c in cluster_ids)):
+        if ranges and ranges[-1][1] == cluster_id - 1:
+            ranges[-1][1] = cluster_id
+        else:
+            ranges.append([cluster_id, cluster_id])
+    terms = []
+    for first, last in ranges:
+        if first == last:
+            terms.append('ClusterId == %d' % first)
+        else:
+            terms.append('(ClusterId >= %d && ClusterId <= %d)' % (first, last))
+    return ' || '.join(terms)
+
+
+def query_classads(command, cluster_ids):
+    """
+    Runs a condor_q or condor_history command for the jobs of the clusters and returns the list of their ClassAds, which
+    are parsed while the command writes them. Returns None if the command failed.
+    Args:
+        command (list): the command and its options, e.g. ['condor_q', '-global']
+        cluster_ids (iterable): Condor cluster ids of the jobs
+    """
+    args = command + ['-constraint', cluster_constraint(cluster_ids),
+                      '-attributes', ','.join(QUERY_ATTRIBUTES), '-xml']
+    logger.debug('Querying Condor with %s', args)
+    try:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, close_fds=True)
+    except OSError as err:
+        logger.error('Problem running %s: %s', command[0], err)
+        return None
+    ads = []
+    try:
+        # readline rather than iterating over the file, which reads ahead
+        ads.extend(iter_classads(iter(process.stdout.readline, '')))
+    except ParseError as err:
+        logger.error('Problem parsing the output of %s: %s', command[0], err)
+        process.stdout.read()
+        process.wait()
+        return None
+    if process.wait() != 0:
+        logger.debug('%s exited with %s', command[0], process.returncode)
+        return None
+    return ads
+
+
+def split_id(condor_id):
+    """
+    Returns the cluster and process of a Condor job id, either global (schedd#cluster.proc#time) or local (cluster.proc)
+    Args:
+        condor_id (str): id of the job
+    """
+    elements = condor_id.split('#')
+    local_id = elements[0]
+    if 3 == len(elements):
+        local_id = elements[1] if '.' in elements[1] else elements[2]
+    cluster, _, proc = local_id.partition('.')
+    return cluster, proc or '0'
+
+
+def match_classads(ids, ads):
+    """
+    Returns the ClassAd of each of the job ids found in the ads. Local ids are matched on the cluster and process, only
+    if a single ad has them: with -global the same local id may belong to jobs of several schedds.
+    Args:
+        ids (iterable): Condor ids of the jobs
+        ads (list): ClassAds returned by query_classads
+    """
+    by_global = {}
+    by_local = {}
+    for ad in ads:
+        if 'GlobalJobId' in ad:
+            by_global[ad['GlobalJobId']] = ad
+        local_id = (str(ad.get('ClusterId')), str(ad.get('ProcId')))
+        # None marks the local ids of several jobs
+        by_local[local_id] = None if local_id in by_local else ad
+    matches = {}
+    for condor_id in ids:
+        if '#' in condor_id:
+            ad = by_global.get(condor_id)
+        else:
+            ad = by_local.get(split_id(condor_id))
+        if ad is not None:
+            matches[condor_id] = ad
+    return matches
+
+
+class UserLog(object):
+
+    """
+    What has been read so far of the Condor user log (condorLog) of a job. Only the lines appended since the last read
+    are searched for the end of the job. A new file (e.g. after a resubmit) is read again from the start.
+    """
+
+    __slots__ = ('inode', 'offset', 'finished')
+
+    def __init__(self):
+        self.inode = None
+        self.offset = 0
+        self.finished = False
+
+    def read(self, path):
+        """
+        Returns whether the log says the job terminated or was aborted
+        Args:
+            path (str): path of the condorLog file
+        """
+        with open(path) as logfile:
+            stat = os.fstat(logfile.fileno())
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self.inode = stat.st_ino
+                self.offset = 0
+                self.finished = False
+            logfile.seek(self.offset)
+            data = logfile.read()
+        end = data.rfind('\n') + 1
+        self.offset += end
+        if -1 != data.find('terminated', 0, end) or -1 != data.find('aborted', 0, end):
+            self.finished = True
+        return self.finished
+
+
+# UserLog of each condorLog file being monitored, by path
+_user_logs = {}
+
 
 class Condor(IBackend):
 
@@ -128,7 +341,9 @@ class Condor(IBackend):
             "2": "Running",
             "3": "Removed",
             "4": "Completed",
-            "5": "Held"
+            "5": "Held",
+            "6": "Transferring Output",
+            "7": "Suspended"
         }
 
     def __init__(self):
@@ -205,31 +420,29 @@ class Condor(IBackend):
             tmpList = output.split("\n")
             jobsDict = {}
             localID = 0
-            idString = ''
             for item in tmpList:
                 #Go through the lines until we find the local ID and add it to the dict
                 if 1 + item.find("** Proc"):
                     localID = item.strip(":").split()[2]
                     jobsDict[str(localID)] = {}
-                    idString += str(localID) + ' '
                     continue
                 #If we have found the local ID add the subsequent lines to the dict for that localID
                 if localID != 0 and ' = ' in item:
                     jobsDict[str(localID)][item.split(' = ')[0]] = item.split(' = ')[1]
 
-            #Get the global ids. This should come back as a big long string, ids separated by spaces
-            queryCommand = " ".join\
-                        (["condor_q -format \"%s \" GlobalJobId", idString])
-            qstatus, qoutput = commands.getstatusoutput(queryCommand)
-            queries = idString.rstrip().split(' ')
-            returns = qoutput.rstrip().split(' ')
-            localToGlobal = zip(queries, returns)
-            for q in localToGlobal:
-                sjIndex = jobsDict[q[0]]['Iwd'].split('/').index(str(self.getJobObject().id))
+            # The global ids come from the local schedd, which is the one the jobs were just submitted to. The local id
+            # is kept if the query fails
+            globalIDs = {}
+            if jobsDict:
+                queueAds = query_classads(["condor_q"], [split_id(localID)[0] for localID in jobsDict])
+                if queueAds is not None:
+                    globalIDs = match_classads(jobsDict.keys(), queueAds)
+            for localID, jobAttributes in jobsDict.iteritems():
+                sjIndex = jobAttributes['Iwd'].split('/').index(str(self.getJobObject().id))
                 if hasSubjobs:
                     sjIndex = sjIndex+1
-                sjNo = jobsDict[q[0]]['Iwd'].split('/')[sjIndex]
-                returnIDs[sjNo] = q[1]
+                sjNo = jobAttributes['Iwd'].split('/')[sjIndex]
+                returnIDs[sjNo] = globalIDs[localID].get("GlobalJobId", localID) if localID in globalIDs else localID
 
         return returnIDs
 
@@ -540,10 +753,12 @@ class Condor(IBackend):
         return cdfString
 
     def updateMonitoringInformation(jobs):
+        """Update the status of the jobs from one condor_q over their clusters, and one condor_history for the jobs
+        which have left the queue. The condorLog of a job is only read when neither knows of it."""
 
         jobDict = {}
         for job in jobs:
-            if job.backend.id:
+            if job.backend.id and job.status != "killed":
                 jobDict[job.backend.id] = job
 
         idList = jobDict.keys()
@@ -551,39 +766,20 @@ class Condor(IBackend):
         if not idList:
             return
 
-        queryCommand = " ".join\
-            ([
-                "condor_q -global" if getConfig(
-                    "Condor")["query_global_queues"] else "condor_q",
-                "-format \"%s \" GlobalJobId",
-                "-format \"%s \" RemoteHost",
-                "-format \"%d \" JobStatus",
-                "-format \"%f\\n\" RemoteUserCpu"
-            ])
-        status, output = commands.getstatusoutput(queryCommand)
-        if 0 != status:
+        config = getConfig("Condor")
+        queryCommand = ["condor_q", "-global"] if config["query_global_queues"] else ["condor_q"]
+        queueAds = query_classads(queryCommand, [split_id(id)[0] for id in idList])
+        if queueAds is None:
             logger.error("Problem retrieving status for Condor jobs")
             return
+        inQueue = match_classads(idList, queueAds)
 
-        if ("All queues are empty" == output):
-            infoList = []
-        else:
-            infoList = output.split("\n")
-
-        allDict = {}
-        for infoString in infoList:
-            tmpList = infoString.split()
-            id, host, status, cputime = ("", "", "", "")
-            if 3 == len(tmpList):
-                if not 'Failure' in tmpList[0]:
-                    id, status, cputime = tmpList
-            if 4 == len(tmpList):
-                id, host, status, cputime = tmpList
-            if id:
-                allDict[id] = {}
-                allDict[id]["status"] = Condor.statusDict[status]
-                allDict[id]["cputime"] = cputime
-                allDict[id]["host"] = host
+        finishedAds = {}
+        leftQueue = [id for id in idList if id not in inQueue]
+        if leftQueue and config["query_history"]:
+            historyAds = query_classads(["condor_history"], [split_id(id)[0] for id in leftQueue])
+            if historyAds is not None:
+                finishedAds = match_classads(leftQueue, historyAds)
 
         fg = Foreground()
         fx = Effects()
@@ -594,53 +790,47 @@ class Condor(IBackend):
         for id in idList:
 
             printStatus = False
-            if jobDict[id].status == "killed":
-                continue
-
-            localId = id.split("#")[-1]
-            globalId = id
-
-            if globalId == localId:
-                queryCommand = " ".join\
-                    ([
-                        "condor_q -global" if getConfig(
-                            "Condor")["query_global_queues"] else "condor_q",
-                        "-format \"%s\" GlobalJobId",
-                        id
-                    ])
-                status, output = commands.getstatusoutput(queryCommand)
-                if 0 == status:
-                    globalId = output
-
-            if globalId in allDict.keys():
-                status = allDict[globalId]["status"]
-                host = allDict[globalId]["host"]
-                cputime = allDict[globalId]["cputime"]
-                if status != jobDict[id].backend.status:
+            job = jobDict[id]
+            ad = inQueue.get(id, finishedAds.get(id))
+
+            # jobs whose global id couldn't be found at submission get it once their local id matches a single job
+            if ad is not None and ad.get("GlobalJobId") and ad["GlobalJobId"] != id:
+                job.backend.id = ad["GlobalJobId"]
+
+            if id in inQueue:
+                status = Condor.statusDict.get(str(ad.get("JobStatus")), "")
+                host = ad.get("RemoteHost", "")
+                cputime = "%f" % float(ad.get("RemoteUserCpu", 0.0))
+                if status != job.backend.status:
                     printStatus = True
-                    stripProxy(jobDict[id])._getSessionLock()
-                    jobDict[id].backend.status = status
-                    if jobDict[id].backend.status == "Running":
-                        jobDict[id].updateStatus("running")
+                    stripProxy(job)._getSessionLock()
+                    job.backend.status = status
+                    if job.backend.status == "Running":
+                        job.updateStatus("running")
 
                 if host:
-                    if jobDict[id].backend.actualCE != host:
-                        jobDict[id].backend.actualCE = host
-                jobDict[id].backend.cputime = cputime
+                    if job.backend.actualCE != host:
+                        job.backend.actualCE = host
+                job.backend.cputime = cputime
             else:
-                jobDict[id].backend.status = ""
-                outDir = jobDict[id].getOutputWorkspace().getPath()
+                outDir = job.getOutputWorkspace().getPath()
                 condorLogPath = "".join([outDir, "condorLog"])
-                checkExit = True
-                if os.path.isfile(condorLogPath):
-                    checkExit = False
-                    for line in open(condorLogPath):
-                        if -1 != line.find("terminated"):
-                            checkExit = True
-                            break
-                        if -1 != line.find("aborted"):
-                            checkExit = True
-                            break
+                if ad is not None:
+                    job.backend.status = Condor.statusDict.get(str(ad.get("JobStatus")), "")
+                    checkExit = True
+                else:
+                    job.backend.status = ""
+                    checkExit = True
+                    if os.path.isfile(condorLogPath):
+                        userLog = _user_logs.get(condorLogPath)
+                        if userLog is None:
+                            userLog = _user_logs[condorLogPath] = UserLog()
+                        try:
+                            checkExit = userLog.read(condorLogPath)
+                        except (IOError, OSError) as err:
+                            logger.debug("Problem reading %s: %s", condorLogPath, err)
+                            del _user_logs[condorLogPath]
+                            checkExit = False
 
                 if checkExit:
                     printStatus = True
@@ -661,19 +851,20 @@ class Condor(IBackend):
                             # Some filesystems/setups have the file created but empty - only worry if it's been 10mins
                             # since we first checked the file
                             if len(lineList) == 0:
-                                if not jobDict[id].backend._stdout_check_time:
-                                    jobDict[id].backend._stdout_check_time = time.time()
+                                if not job.backend._stdout_check_time:
+                                    job.backend._stdout_check_time = time.time()
 
-                                if (time.time() - jobDict[id].backend._stdout_check_time) < 10*60:
+                                if (time.time() - job.backend._stdout_check_time) < 10*60:
                                     continue
                                 else:
                                     logger.error("Empty stdout file from job %s after waiting 10mins. Marking job as"
-                                                 "failed." % jobDict[id].fqid)
+                                                 "failed." % job.fqid)
                             else:
                                 logger.error("Problem extracting exit code from job %s. Line found was '%s'." % (
-                                    jobDict[id].fqid, exitLine))
+                                    job.fqid, exitLine))
 
-                    jobDict[id].updateStatus(jobStatus)
+                    job.updateStatus(jobStatus)
+                    _user_logs.pop(condorLogPath, None)
 
             if printStatus:
                 if jobDict[id].backend.actualCE:
@@ -1,8 +1,6 @@
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
 
-from GangaCore.Utility.GridShell import getShell
-
 logger = getLogger()
 
 logger.critical('LCG Grid Simulator ENABLED')
@@ -50,12 +48,12 @@ class GridSimulator(object):
 
     credential = None
 
-    def __init__(self):
+    def __init__(self, basedir='.'):
+        """
+        Args:
+            basedir (str): directory of the data files of the simulator
+        """
         self.active = True
-        #import GangaCore.Core.FileWorkspace
-        #basedir = GangaCore.Core.FileWorkspace.gettop()
-        #basedir = '/tmp'
-        basedir = '.'
         self.gridmap_filename = '%s/lcg_simulator_gridmap' % basedir
         import shelve
         # map Grid job id into inputdir (where JDL file is)
@@ -67,8 +65,6 @@ class GridSimulator(object):
         self.ganga_finish_time = shelve.open(
             self.finished_jobs_filename, writeback=False)
 
-        self.shell = getShell('GLITE')
-
         logger.critical('Grid Simulator data files: %s %s',
                         self.gridmap_filename, self.finished_jobs_filename)
 
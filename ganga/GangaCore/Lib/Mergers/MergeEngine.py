@@ -0,0 +1,453 @@
+##########################################################################
+# Ganga Project. http://cern.ch/ganga
+#
+##########################################################################
+"""
+Merge the output files of many jobs quickly.
+
+The files are merged as a tree reduction by the mergers which can merge their own output again (e.g. hadd for ROOT
+files): groups of [Mergers]merge_group_size files are merged into partial files, which are merged in groups again
+until a single group is left to merge into the output file. The merges of each level are run in a pool of worker
+processes for large merges, see [Mergers]merge_processes.
+
+With [Mergers]merge_as_subjobs_complete the groups of subjobs which complete before the others are merged in the
+background while the rest of the job runs, so that mostly partial files are left to merge once the master job
+completes.
+"""
+
+import Queue
+import copy
+import errno
+import glob
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from GangaCore.Core.GangaThread import GangaThread
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+# the merger used by a worker process, set by _initWorker when the process starts
+_shared = None
+
+
+class MergeStats(object):
+
+    """ Number of files and bytes merged by each type of merger and how long it took """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, num_files, num_bytes, duration):
+        """
+        Count a merge
+        Args:
+            name (str): name of the merger
+            num_files (int): number of files merged
+            num_bytes (int): size of the files merged
+            duration (float): seconds it took
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {'count': 0, 'files': 0, 'bytes': 0, 'total_time': 0., 'max_time': 0.}
+            stats['count'] += 1
+            stats['files'] += num_files
+            stats['bytes'] += num_bytes
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+
+    def summary(self):
+        """ Returns a dict of the stats of each merger, with the throughput in MB/s """
+        with self._lock:
+            summary = dict((name, dict(stats)) for name, stats in self._stats.iteritems())
+        for stats in summary.itervalues():
+            stats['mean_time'] = stats['total_time'] / stats['count']
+            stats['MB/s'] = stats['bytes'] / (1024. * 1024.) / stats['total_time'] if stats['total_time'] else 0.
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+merge_stats = MergeStats()
+
+
+def getMergeStats():
+    """
+    Returns the MergeStats of this session
+    """
+    return merge_stats
+
+
+def _initWorker(merger):
+    """
+    Runs in each worker process as it starts, keeps the merger of its pool
+    Args:
+        merger (IMerger): the merger whose mergefiles is run
+    """
+    global _shared
+    _shared = merger
+
+
+def _mergeGroup(task):
+    """
+    Runs in the worker processes, merges one group of files with the shared merger
+    Args:
+        task (tuple): (key, list of files, output file)
+    Returns (key, None) or (key, error message) as exceptions don't always survive being sent back
+    """
+    key, file_list, output_file = task
+    try:
+        _shared.mergefiles(file_list, output_file)
+    except Exception as err:
+        return key, str(err) or err.__class__.__name__
+    return key, None
+
+
+class MergePool(object):
+
+    """
+    Runs the merges of a merger, in a pool of worker processes forked with the merger or within the session
+    """
+
+    def __init__(self, merger, processes):
+        """
+        Args:
+            merger (IMerger): the merger whose mergefiles is run
+            processes (int): number of worker processes, 0 or 1 to merge within the session
+        """
+        self.merger = merger
+        self.processes = processes
+        self.pool = None
+
+    def run(self, tasks):
+        """
+        Merge groups of files, returns the list of (key, error message) of the merges which failed.
+        The pool is only forked the first time there is more than one merge to run.
+        Args:
+            tasks (list): (key, list of files, output file) of each merge
+        """
+        if self.pool is None and self.processes > 1 and len(tasks) > 1:
+            # The merger goes to the workers as they are forked, so that pools of other threads don't get it
+            self.pool = multiprocessing.Pool(min(self.processes, len(tasks)), _initWorker, (self.merger,))
+
+        if self.pool is not None and len(tasks) > 1:
+            results = self.pool.map(_mergeGroup, tasks, 1)
+        else:
+            results = []
+            for key, file_list, output_file in tasks:
+                try:
+                    self.merger.mergefiles(file_list, output_file)
+                except Exception as err:
+                    results.append((key, str(err) or err.__class__.__name__))
+        return [(key, error) for key, error in results if error is not None]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def terminate(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def _mergeProcesses(num_files):
+    """ Returns the number of worker processes to merge num_files files with, see [Mergers]merge_processes """
+    config = getConfig('Mergers')
+    processes = config['merge_processes']
+    if not processes or num_files < config['merge_processes_min_files']:
+        return 0
+    if processes < 0:
+        processes = multiprocessing.cpu_count()
+    return processes
+
+
+def _groupSize():
+    return max(getConfig('Mergers')['merge_group_size'], 2)
+
+
+def _fileSize(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def partialMergePath(partial_dir, merger, rel, file_list):
+    """
+    Returns where the partial merge of a group of files is kept, named after the merger and the files so that it is
+    only used for the same files
+    Args:
+        partial_dir (str): directory of the partial merges of a job
+        merger (IMerger): the merger
+        rel (str): name of the merged file relative to the output dir of the jobs
+        file_list (list): paths of the files merged
+    """
+    sha = hashlib.sha1(merger._name)
+    for f in file_list:
+        try:
+            st = os.stat(f)
+            sha.update('%s\0%s\0%s\n' % (f, st.st_size, st.st_mtime))
+        except OSError:
+            sha.update('%s\n' % f)
+    return os.path.join(partial_dir, '%s_%s' % (sha.hexdigest(), os.path.basename(rel)))
+
+
+def mergeFiles(merger, files, outputs, workdir, partial_dir=None):
+    """
+    Merge lists of files into output files with a merger. The files are merged as a tree reduction if the merger
+    supports it (merger.partial_merge) and the merges are spread over worker processes for large merges.
+    Args:
+        merger (IMerger): the merger
+        files (dict): list of the paths of the files to merge by output file key
+        outputs (dict): path of the output file by key
+        workdir (str): directory in which the intermediate partial files are written
+        partial_dir (str): directory of the partial merges done as the subjobs completed, if any
+    Returns the dict of the error message by key of the merges which failed
+    """
+    start = time.time()
+    group_size = _groupSize()
+    num_files = sum(len(file_list) for file_list in files.itervalues())
+    num_bytes = sum(_fileSize(f) for file_list in files.itervalues() for f in file_list)
+
+    pending = dict(files)
+    errors = {}
+    tmpdir = None
+    pool = MergePool(merger, _mergeProcesses(num_files))
+    try:
+        level = 0
+        while merger.partial_merge:
+            tasks = []
+            for index, key in enumerate(sorted(pending)):
+                file_list = pending[key]
+                if len(file_list) <= group_size:
+                    continue
+                partials = []
+                for start_index in range(0, len(file_list), group_size):
+                    group = file_list[start_index:start_index + group_size]
+                    if len(group) == 1:
+                        partials.append(group[0])
+                        continue
+                    if level == 0 and partial_dir is not None:
+                        cached = partialMergePath(partial_dir, merger, key, group)
+                        if os.path.exists(cached):
+                            partials.append(cached)
+                            continue
+                    if tmpdir is None:
+                        tmpdir = tempfile.mkdtemp(prefix='.partial_merge_', dir=workdir)
+                    partial = os.path.join(tmpdir, '%s_%s_%s_%s' % (level, index, start_index // group_size, os.path.basename(key)))
+                    tasks.append((key, group, partial))
+                    partials.append(partial)
+                pending[key] = partials
+            if not tasks:
+                break
+            logger.debug("Merging %s groups of files at level %s" % (len(tasks), level))
+            for key, error in pool.run(tasks):
+                errors.setdefault(key, error)
+                pending.pop(key, None)
+            level += 1
+
+        tasks = [(key, pending[key], outputs[key]) for key in sorted(pending)]
+        for key, error in pool.run(tasks):
+            errors.setdefault(key, error)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    duration = time.time() - start
+    merge_stats.record(merger._name, num_files, num_bytes, duration)
+    logger.info("%s merged %s files (%.1f MB) into %s files in %.1f s (%.1f MB/s)", merger._name, num_files,
+                num_bytes / (1024. * 1024.), len(files), duration, num_bytes / (1024. * 1024.) / max(duration, 1e-6))
+    return errors
+
+
+def partialMergeDir(master):
+    """
+    Returns the directory in which the partial merges of the subjobs of a job are kept
+    Args:
+        master (Job): the master job
+    """
+    return os.path.join(master.getDebugWorkspace(create=False).getPath(), 'partial_merges')
+
+
+def commonMaster(jobs):
+    """ Returns the master job of a list of subjobs if they all have the same one, None otherwise """
+    from GangaCore.GPIDev.Base.Proxy import stripProxy
+    master = None
+    for j in jobs:
+        this_master = stripProxy(j).master
+        if this_master is None or (master is not None and this_master is not master):
+            return None
+        master = this_master
+    return master
+
+
+class PartialMergeThread(GangaThread):
+
+    """
+    Merges the output of the groups of subjobs which have completed while the rest of their job runs
+    """
+
+    def __init__(self):
+        super(PartialMergeThread, self).__init__(name='PartialMerger', critical=False)
+        self._queue = Queue.Queue()
+        # held while a group is merged
+        self._merge_lock = threading.Lock()
+        self._generations_lock = threading.Lock()
+        # master job id -> generation, the groups queued for an older generation are dropped
+        self._generations = {}
+
+    def add(self, master_id, mergers, outputdirs, partial_dir):
+        """
+        Queue the partial merge of a group of subjobs
+        Args:
+            master_id (int): id of the master job
+            mergers (list): mergers supporting partial merges, with their files set
+            outputdirs (list): output dirs of the subjobs in the group, in order
+            partial_dir (str): where the partial merges of the job are kept
+        """
+        with self._generations_lock:
+            generation = self._generations.setdefault(master_id, 0)
+        self._queue.put((master_id, generation, mergers, outputdirs, partial_dir))
+
+    def cancel(self, master_id):
+        """
+        Drop the partial merges queued for a job and wait for the one running to finish
+        Args:
+            master_id (int): id of the master job
+        """
+        with self._generations_lock:
+            self._generations[master_id] = self._generations.get(master_id, 0) + 1
+        with self._merge_lock:
+            pass
+
+    def run(self):
+        try:
+            while not self.should_stop():
+                try:
+                    master_id, generation, mergers, outputdirs, partial_dir = self._queue.get(timeout=0.5)
+                except Queue.Empty:
+                    continue
+                with self._merge_lock:
+                    with self._generations_lock:
+                        if self._generations.get(master_id) != generation:
+                            continue
+                    try:
+                        self._mergeGroup(mergers, outputdirs, partial_dir)
+                    except Exception as err:
+                        logger.debug("Partial merge of job %s failed: %s" % (master_id, err))
+        finally:
+            self.unregister()
+
+    def _mergeGroup(self, mergers, outputdirs, partial_dir):
+        """ Merge the files of a group of subjobs which every subjob has into the partial merge dir """
+        for merger in mergers:
+            files = {}
+            for pattern in merger.files:
+                for outputdir in outputdirs:
+                    for matched in glob.glob(os.path.join(outputdir, pattern)):
+                        files.setdefault(os.path.relpath(matched, outputdir), []).append(matched)
+            for rel, file_list in files.iteritems():
+                if self.should_stop():
+                    return
+                if len(file_list) != len(outputdirs):
+                    continue
+                cached = partialMergePath(partial_dir, merger, rel, file_list)
+                if os.path.exists(cached):
+                    continue
+                try:
+                    os.makedirs(partial_dir)
+                except OSError as err:
+                    if err.errno != errno.EEXIST:
+                        raise
+                # merged under a temporary name, keeping the extension, so that a partial file is never used
+                tmp_name = os.path.join(partial_dir, 'tmp_%s' % os.path.basename(cached))
+                start = time.time()
+                merger.mergefiles(file_list, tmp_name)
+                os.rename(tmp_name, cached)
+                merge_stats.record(merger._name, len(file_list), sum(_fileSize(f) for f in file_list), time.time() - start)
+
+
+_partial_merge_thread = None
+_thread_lock = threading.Lock()
+
+
+def _getPartialMergeThread(create=True):
+    global _partial_merge_thread
+    with _thread_lock:
+        if create and (_partial_merge_thread is None or not _partial_merge_thread.isAlive()):
+            _partial_merge_thread = PartialMergeThread()
+            _partial_merge_thread.start()
+        return _partial_merge_thread
+
+
+def _partialMergers(master):
+    """ Returns copies of the mergers of a job which support partial merges, with the files they merge set """
+    from GangaCore.GPIDev.Adapters.IMerger import IMerger
+    mergers = []
+    for postprocessor in master.postprocessors.process_objects:
+        if isinstance(postprocessor, IMerger):
+            mergers.extend(copy.deepcopy(merger) for merger in postprocessor.partialMergers())
+    return mergers
+
+
+def subjobCompleted(job):
+    """
+    Called when a subjob completes, queues the partial merge of its group of subjobs once they have all completed
+    Args:
+        job (Job): the subjob
+    """
+    try:
+        master = job.master
+        if not getConfig('Mergers')['merge_as_subjobs_complete'] or not len(master.postprocessors):
+            return
+        group_size = _groupSize()
+        first = job.id // group_size * group_size
+        subjobs = master.subjobs
+        group = [subjobs[i] for i in range(first, min(first + group_size, len(subjobs)))]
+        if len(group) < 2 or any(sj.status != 'completed' for sj in group):
+            return
+        mergers = _partialMergers(master)
+        if mergers:
+            _getPartialMergeThread().add(master.id, mergers, [sj.outputdir for sj in group], partialMergeDir(master))
+    except Exception as err:
+        logger.debug("Cannot queue the partial merge for job %s: %s" % (job.getFQID('.'), err))
+
+
+def cancelPartialMerges(master):
+    """
+    Stop merging the subjobs of a job in the background, e.g. before it is merged
+    Args:
+        master (Job): the master job
+    """
+    thread = _getPartialMergeThread(create=False)
+    if thread is not None:
+        thread.cancel(master.id)
+
+
+def removePartialMerges(master):
+    """
+    Remove the partial merges of the subjobs of a job once it has been merged
+    Args:
+        master (Job): the master job
+    """
+    partial_dir = partialMergeDir(master)
+    if os.path.isdir(partial_dir):
+        shutil.rmtree(partial_dir, ignore_errors=True)
@@ -16,6 +16,7 @@ from GangaCore.Utility.Plugin import allPlugins
 from GangaCore.Utility.logging import getLogger
 import commands
 import os
+import shutil
 import string
 import copy
 
@@ -130,7 +131,8 @@ class TextMerger(IMerger):
                 in_file = gzip.GzipFile(f)
 
             out_file.write('# Start of file %s #\n' % str(f))
-            out_file.write(in_file.read())
+            # copied in blocks so that large files are never held in memory
+            shutil.copyfileobj(in_file, out_file, 1024 * 1024)
             out_file.write('\n')
 
             in_file.close()
@@ -196,6 +198,9 @@ class RootMerger(IMerger):
     _schema.datadict['args'] = SimpleItem(defvalue=None, doc='Arguments to be passed to hadd.',
                                           typelist=[str, None])
 
+    # hadd can add up the files it has added up already
+    partial_merge = True
+
     def mergefiles(self, file_list, output_file):
 
         from GangaCore.Utility.root import getrootprefix, checkrootprefix
@@ -414,3 +419,24 @@ class SmartMerger(IMerger):
 
         return not False in merge_results
 
+    def partialMergers(self):
+        """
+        Returns the mergers of the file types which can merge the files of groups of subjobs as they complete
+        """
+        type_map = {}
+        for f in self.files:
+            if getMergerObject(f):
+                file_ext = f
+            else:
+                file_ext = os.path.splitext(f)[1].lstrip('.').lower()
+            if file_ext:
+                type_map.setdefault(file_ext, []).append(f)
+
+        result = []
+        for ext, files in type_map.iteritems():
+            merge_object = getMergerObject(ext)
+            if merge_object is not None and merge_object.partial_merge:
+                merge_object.files = files
+                result.append(merge_object)
+        return result
+
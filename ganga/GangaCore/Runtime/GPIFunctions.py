@@ -57,16 +57,58 @@ def plugins(category=None):
 
     If a category is specified (for example 'splitters') return a list
     of all plugin names in this category.
+
+    Plugins listed in the plugin manifest are included even if their
+    module has not been imported yet.
     """
     from GangaCore.Utility.Plugin import allPlugins
     if category:
-        return allPlugins.allClasses(category).keys()
+        return allPlugins.allNames(category)
     else:
         d = {}
         for c in allPlugins.allCategories():
-            d[c] = allPlugins.allCategories()[c].keys()
+            d[c] = allPlugins.allNames(c)
         return d
 
+def sessionLockStats(reset=False):
+    """Return the number, total, mean and maximum duration (sec) of the session lock operations (lock, release,
+    new_ids) of this session and how many times the lock files of other sessions were read or found unchanged ('lock_files').
+
+    If reset is True the counts start again from zero afterwards.
+    """
+    from GangaCore.Core.GangaRepository.SessionLock import getSessionLockStats
+    stats = getSessionLockStats()
+    summary = stats.summary()
+    if reset:
+        stats.reset()
+    return summary
+
+def sandboxStats(reset=False):
+    """Return, for the input sandboxes packed ('packed') and reused from the sandbox cache ('reused') in this session,
+    their number, number of files, bytes in and out and the total, mean and maximum time (sec) they took.
+
+    If reset is True the counts start again from zero afterwards.
+    """
+    from GangaCore.Core.Sandbox.Sandbox import getSandboxStats
+    stats = getSandboxStats()
+    summary = stats.summary()
+    if reset:
+        stats.reset()
+    return summary
+
+def mergeStats(reset=False):
+    """Return, for each type of merger, the number of merges done in this session, the number of files and bytes
+    merged, the total, mean and maximum time (sec) they took and the throughput in MB/s.
+
+    If reset is True the counts start again from zero afterwards.
+    """
+    from GangaCore.Lib.Mergers.MergeEngine import getMergeStats
+    stats = getMergeStats()
+    summary = stats.summary()
+    if reset:
+        stats.reset()
+    return summary
+
 # FIXME: DEPRECATED
 def list_plugins(category):
     """List all plugins in a given category, OBSOLETE: use plugins(category)"""
@@ -0,0 +1,282 @@
+"""
+The plugin manifest records which plugins, runtime handlers and configuration sections are defined
+by each group of plugin modules ("unit"): a module listed in GangaCore.Runtime.plugins or the
+loadPlugins() function of a runtime package.
+
+It is written by "ganga --write-plugin-manifest FILE", which loads every plugin at startup as usual.
+When [Configuration]PluginManifest points to it, the units it describes are not loaded at startup.
+Their plugins are added lazily to the plugin manager, their handlers to the runtime handler table and
+their sections to the configuration, and placeholders are exported to the GPI instead of the plugin
+classes. A unit is loaded the first time anything it defines is used, after which the placeholders
+are replaced by the proxy classes of its plugins.
+"""
+
+import imp
+import json
+import os
+import sys
+from functools import partial
+
+from GangaCore import _gangaVersion
+from GangaCore.Utility.logging import getLogger
+from GangaCore.Utility.Plugin import allPlugins
+from GangaCore.Utility.Runtime import startupProfile
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.Config import Config
+from GangaCore.GPIDev.Adapters.ApplicationRuntimeHandlers import allHandlers
+
+logger = getLogger()
+
+# the recorder used when writing the manifest
+_recorder = None
+# the manifest read from [Configuration]PluginManifest, by unit name
+_manifest = None
+# units which have not been loaded yet: name -> (unit, load)
+_pending = {}
+# the interfaces where placeholders have been exported
+_interfaces = []
+
+
+class PluginPlaceholder(object):
+
+    """
+    Stands in the GPI for a plugin class whose module has not been imported yet.
+    Using it in any way loads the plugin, and the placeholder is then replaced in the GPI by the proxy class.
+    """
+
+    def __init__(self, category, name):
+        self._category = category
+        self._name = name
+
+    def _load(self):
+        from GangaCore.GPIDev.Base.Proxy import addProxy
+        return addProxy(allPlugins.find(self._category, self._name))
+
+    def __call__(self, *args, **kwds):
+        return self._load()(*args, **kwds)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __instancecheck__(self, obj):
+        return isinstance(obj, self._load())
+
+    def __subclasscheck__(self, cls):
+        return issubclass(cls, self._load())
+
+    def __repr__(self):
+        return repr(self._load())
+
+    def __str__(self):
+        return str(self._load())
+
+
+class ManifestRecorder(object):
+
+    """
+    Records what each unit defines while it is loaded, to write the manifest at the end of the bootstrap
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.units = []
+
+    def record(self, name, package, module, load):
+        """
+        Load a unit and record the plugins, handlers and configuration sections which appeared
+
+        Args:
+            name (str): name of the unit
+            package (str): runtime package the unit belongs to
+            module (bool): True if the unit is a module which is loaded by importing it
+            load (callable): loads the unit
+        """
+        plugins = _allPlugins()
+        firsts = set(allPlugins.first)
+        handlers = _allHandlers()
+        sections = set(Config.allConfigs)
+
+        load()
+
+        unit = {'name': name, 'package': package, 'module': module,
+                'plugins': [], 'defaults': [], 'handlers': [], 'configs': []}
+        for (category, plugin_name), cls in sorted(_allPlugins().items()):
+            if (category, plugin_name) not in plugins:
+                unit['plugins'].append([category, plugin_name, cls.__name__,
+                                        bool(cls._declared_property('hidden'))])
+        for category in sorted(set(allPlugins.first) - firsts):
+            first = allPlugins.first[category]
+            unit['defaults'].append([category, sorted(n for n, cls in allPlugins.all_dict[category].items() if cls is first)[0]])
+        unit['handlers'] = sorted([app, backend] for app, backend in _allHandlers() - handlers)
+        unit['configs'] = sorted(set(Config.allConfigs) - sections)
+        self.units.append(unit)
+
+    def write(self):
+        """ Write the manifest to the file it was requested for """
+        tmp_name = self.filename + '.tmp'
+        with open(tmp_name, 'w') as f:
+            json.dump({'version': _gangaVersion, 'units': self.units}, f, indent=1, sort_keys=True)
+        os.rename(tmp_name, self.filename)
+        logger.info("Plugin manifest of %s units written to %s", len(self.units), self.filename)
+
+
+def _allPlugins():
+    return dict(((category, name), cls) for category, plugins in allPlugins.all_dict.items() for name, cls in plugins.items())
+
+
+def _allHandlers():
+    return set((app, backend) for backend, apps in allHandlers.handlers.items() for app in apps)
+
+
+def startRecording(filename):
+    """
+    Record what the plugins define while Ganga starts, to write the manifest to filename with writeManifest()
+
+    Args:
+        filename (str): where the manifest is written
+    """
+    global _recorder
+    _recorder = ManifestRecorder(os.path.abspath(os.path.expanduser(filename)))
+
+
+def writeManifest():
+    """ Write the manifest recorded since startRecording() """
+    if _recorder is not None:
+        _recorder.write()
+
+
+def _toStr(value):
+    """ Convert the unicode strings read from JSON to str like the plugin names used everywhere else """
+    if isinstance(value, unicode):
+        return str(value)
+    elif isinstance(value, list):
+        return [_toStr(v) for v in value]
+    elif isinstance(value, dict):
+        return dict((_toStr(k), _toStr(v)) for k, v in value.items())
+    return value
+
+
+def _getManifest():
+    """ Read the manifest named in [Configuration]PluginManifest once, returning the units by name """
+    global _manifest
+    if _manifest is None:
+        _manifest = {}
+        filename = getConfig('Configuration')['PluginManifest']
+        if filename and _recorder is None:
+            filename = os.path.expanduser(os.path.expandvars(filename))
+            try:
+                with open(filename) as f:
+                    manifest = _toStr(json.load(f))
+            except (IOError, ValueError) as err:
+                logger.warning("Cannot read the plugin manifest %s, loading all plugins: %s", filename, err)
+            else:
+                if manifest.get('version') != _gangaVersion:
+                    logger.warning("The plugin manifest %s was written by Ganga %s, loading all plugins. "
+                                   "Please write it again with ganga --write-plugin-manifest", filename, manifest.get('version'))
+                else:
+                    _manifest = dict((unit['name'], unit) for unit in manifest['units'])
+    return _manifest
+
+
+def addPlugins(name, package, load, module=True):
+    """
+    Load the plugins of a unit, or if the manifest describes the unit and it has not been loaded already
+    add what it defines lazily so that it is loaded on first use
+
+    Args:
+        name (str): name of the unit, the module name for modules
+        package (str): runtime package the unit belongs to
+        load (callable): loads the unit
+        module (bool): True if the unit is a module which is loaded by importing it
+    """
+    unit = _getManifest().get(name)
+    if _recorder is not None:
+        with startupProfile.measure(package, 'plugins'):
+            _recorder.record(name, package, module, load)
+    elif unit is None or (module and name in sys.modules):
+        with startupProfile.measure(package, 'plugins'):
+            load()
+    else:
+        _defer(unit, load)
+
+
+def _defer(unit, load):
+    _pending[unit['name']] = (unit, load)
+    load_unit = partial(_loadUnit, unit['name'])
+    for category, name, class_name, hidden in unit['plugins']:
+        allPlugins.addLazy(category, name, load_unit)
+    for category, name in unit['defaults']:
+        allPlugins.setLazyDefault(category, name)
+    for app, backend in unit['handlers']:
+        allHandlers.addLazy(app, backend, load_unit)
+    for section in unit['configs']:
+        if section not in Config.allConfigs:
+            Config.lazySections[section] = load_unit
+    logger.debug("Deferred loading plugins of %s", unit['name'])
+
+
+def _loadUnit(name):
+    # the import lock is taken so that a unit is loaded once, whichever thread uses it first
+    imp.acquire_lock()
+    try:
+        if name not in _pending:
+            return
+        unit, load = _pending.pop(name)
+        logger.debug("Loading plugins of %s", name)
+        with startupProfile.measure(unit['package'], 'plugins'):
+            sections = set(Config.allConfigs)
+            load()
+            _exportUnit(unit, sorted(set(Config.allConfigs) - sections))
+    finally:
+        imp.release_lock()
+
+
+def _exportUnit(unit, sections):
+    """
+    Replace the placeholders of a unit's plugins and create the proxies of the configuration sections made while loading it
+
+    Args:
+        unit (dict): the unit from the manifest
+        sections (list): names of the configuration sections which were made
+    """
+    from GangaCore.Runtime.GPIexport import exportToInterface
+
+    for category, name, class_name, hidden in unit['plugins']:
+        cls = allPlugins.allClasses(category, load=False).get(name)
+        if cls is None or hidden:
+            continue
+        for interface in _interfaces:
+            for export_name in set([name, class_name]):
+                if isinstance(getattr(interface, export_name, None), PluginPlaceholder):
+                    exportToInterface(interface, export_name, cls, 'Classes')
+
+    if Config._after_bootstrap:
+        from GangaCore.GPIDev.Lib.Config.Config import createSectionProxy
+        for section in sections:
+            createSectionProxy(section)
+        Config.sanityCheck(sections)
+
+
+def exportPlaceholders(interface):
+    """
+    Export a placeholder for each plugin which is not loaded yet
+
+    Args:
+        interface (module): the GPI or another interface module
+    """
+    _interfaces.append(interface)
+    for unit, load in _pending.values():
+        for category, name, class_name, hidden in unit['plugins']:
+            if hidden or not allPlugins.isLazy(category, name):
+                continue
+            placeholder = PluginPlaceholder(category, name)
+            for export_name in set([name, class_name]):
+                setattr(interface, export_name, placeholder)
+
+
+def loadAllPlugins():
+    """ Load every unit which is not loaded yet """
+    for name in _pending.keys():
+        _loadUnit(name)
@@ -127,7 +127,7 @@ def bootstrap():
         if registry.name in started_registries:
             continue
         if not hasattr(registry, 'type'):
-            registry.type = config["repositorytype"]
+            registry.type = config["registryTypes"].get(registry.name, config["repositorytype"])
         if not hasattr(registry, 'location'):
             registry.location = getLocalRoot()
         logger.debug("Registry: %s" % registry.name)
@@ -156,7 +156,7 @@ def manualExportToGPI(my_interface=None):
     exportToInterface(my_interface, 'ReadOnlyObjectError', ReadOnlyObjectError, 'Exceptions')
     exportToInterface(my_interface, 'JobError', JobError, 'Exceptions')
 
-    from GangaCore.Runtime.GPIFunctions import license, typename, categoryname, plugins, convert_merger_to_postprocessor
+    from GangaCore.Runtime.GPIFunctions import license, typename, categoryname, plugins, convert_merger_to_postprocessor, sessionLockStats, sandboxStats, mergeStats
 
     exportToInterface(my_interface, 'license', license, 'Functions')
     # FIXME:
@@ -173,6 +173,9 @@ def manualExportToGPI(my_interface=None):
     exportToInterface(my_interface, 'categoryname', categoryname, 'Functions')
     exportToInterface(my_interface, 'plugins', plugins, 'Functions')
     exportToInterface(my_interface, 'convert_merger_to_postprocessor', convert_merger_to_postprocessor, 'Functions')
+    exportToInterface(my_interface, 'sessionLockStats', sessionLockStats, 'Functions')
+    exportToInterface(my_interface, 'sandboxStats', sandboxStats, 'Functions')
+    exportToInterface(my_interface, 'mergeStats', mergeStats, 'Functions')
 
     from GangaCore.GPIDev.Persistency import export, load
     exportToInterface(my_interface, 'load', load, 'Functions')
@@ -311,12 +314,27 @@ under certain conditions; type license() for details.
         parser.add_option("--daemon", dest='daemon', action="store_true", default=False,
                           help='run Ganga as service.')
 
+        parser.add_option("--profile-startup", dest='profile_startup', action="store_true", default=False,
+                          help='report the time spent importing and initialising each package during startup')
+
+        parser.add_option("--write-plugin-manifest", dest='plugin_manifest', action="store", metavar="FILE", default=None,
+                          help='load all plugins, write the plugin manifest to FILE and exit. '
+                               'Set [Configuration]PluginManifest to FILE to only import plugins when they are first used')
+
         parser.set_defaults(force_interactive=False, config_file=None,
                             force_loglevel=None, rexec=1, monitoring=1, prompt=1, generate_config=None)
         parser.disable_interspersed_args()
 
         (self.options, self.args) = parser.parse_args(args=self.argv[1:])
 
+        if self.options.profile_startup:
+            from GangaCore.Utility.Runtime import startupProfile
+            startupProfile.enable()
+
+        if self.options.plugin_manifest:
+            from GangaCore.Runtime.PluginManifest import startRecording
+            startRecording(self.options.plugin_manifest)
+
         # check for --no-rexec. It does nothing now!
         if self.options.rexec == 0:
             from GangaCore.Utility.logging import getLogger
@@ -444,6 +462,10 @@ under certain conditions; type license() for details.
         from GangaCore.Utility.logging import getLogger
         logger = getLogger()
 
+        # the configuration sections of plugins which are not loaded yet must be written too
+        from GangaCore.Runtime.PluginManifest import loadAllPlugins
+        loadAllPlugins()
+
         # Old backup routine
         if os.path.exists(config_file):
             for i in range(100):
@@ -890,7 +912,8 @@ under certain conditions; type license() for details.
         logger.debug("Import plugins")
         try:
             # load Ganga system plugins...
-            from GangaCore.Runtime import plugins
+            from GangaCore.Runtime.plugins import loadSystemPlugins
+            loadSystemPlugins()
         except Exception as x:
             logger.critical('Ganga system plugins could not be loaded due to the following reason: %s', x)
             logger.exception(x)
@@ -919,7 +942,9 @@ under certain conditions; type license() for details.
         from GangaCore.Utility.logging import getLogger
         logger = getLogger()
 
-        manualExportToGPI()
+        from GangaCore.Utility.Runtime import startupProfile
+        with startupProfile.measure('GangaCore', 'gpi'):
+            manualExportToGPI()
 
         from GangaCore.Runtime import Workspace_runtime, Repository_runtime
         from GangaCore.GPIDev.Credentials import credential_store
@@ -933,13 +958,15 @@ under certain conditions; type license() for details.
         import GangaCore.Core
         from GangaCore.Runtime.Repository_runtime import startUpRegistries
         if config['AutoStartReg']:
-            startUpRegistries()
+            with startupProfile.measure('GangaCore', 'registries'):
+                startUpRegistries()
 
         logger.debug("Bootstrap Core Modules")
         # bootstrap core modules
         from GangaCore.Core.GangaRepository import getRegistrySlice
         ## Here is where the monitoring loop and related services are started!
-        GangaCore.Core.bootstrap(getRegistrySlice('jobs'), interactive)
+        with startupProfile.measure('GangaCore', 'services'):
+            GangaCore.Core.bootstrap(getRegistrySlice('jobs'), interactive)
 
         # export all configuration items, new options should not be added after
         # this point
@@ -952,11 +979,18 @@ under certain conditions; type license() for details.
         # run post bootstrap hooks
         for r in allRuntimes.values():
             try:
-                r.postBootstrapHook()
+                with startupProfile.measure(r.name, 'hooks'):
+                    r.postBootstrapHook()
             except Exception as err:
                 logger.error("problems with post bootstrap hook for %s" % r.name)
                 logger.error("Reason: %s" % err)
 
+        from GangaCore.Runtime.PluginManifest import writeManifest
+        writeManifest()
+
+        if startupProfile.enabled:
+            logger.info("Startup time (seconds) per package:\n%s", startupProfile.report())
+
 
     @staticmethod
     def startTestRunner(my_args):
@@ -1013,6 +1047,10 @@ under certain conditions; type license() for details.
         logger = getLogger("run")
         logger.debug("Entering run")
 
+        if self.options.plugin_manifest:
+            # the manifest has been written at the end of the bootstrap
+            return
+
         if self.options.webgui == True:
             from GangaCore.Runtime.http_server import start_server
             start_server()
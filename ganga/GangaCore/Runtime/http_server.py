@@ -442,8 +442,8 @@ def update_jobs_dictionary():
                 jobs_dictionary[job_id] = JobRelatedInfo(job, None)
 
         except RegistryKeyError:
-
-            del jobs_dictionary[job_id]
+            # removed, possibly before it ever made it into the dictionary
+            jobs_dictionary.pop(job_id, None)
 
 
 def fill_jobs_dictionary():
@@ -1,54 +1,42 @@
+"""
+Ganga system plugins, loaded at startup in this order by loadSystemPlugins().
+Modules described by the plugin manifest are only imported when one of their plugins is first used.
+"""
+from functools import partial
+from importlib import import_module
+
 import GangaCore.Utility.logging
 logger = GangaCore.Utility.logging.getLogger()
 
-logger.debug("Loading IApplication")
-import GangaCore.GPIDev.Adapters.IApplication
-logger.debug("Loading IBackend")
-import GangaCore.GPIDev.Adapters.IBackend
-logger.debug("Loading ISplitter")
-import GangaCore.GPIDev.Adapters.ISplitter
-logger.debug("Loading IMerger")
-import GangaCore.GPIDev.Adapters.IMerger
-
-logger.debug("Loading GangaList")
-import GangaCore.GPIDev.Lib.GangaList
-logger.debug("Loading File")
-import GangaCore.GPIDev.Lib.File
-logger.debug("Loading Job")
-import GangaCore.GPIDev.Lib.Job
-
-logger.debug("Loading Mergers")
-import GangaCore.Lib.Mergers
-logger.debug("Loading Splitters")
-import GangaCore.Lib.Splitters
-
-logger.debug("Loading Executable")
-import GangaCore.Lib.Executable
-logger.debug("Loading Root")
-import GangaCore.Lib.Root
-logger.debug("Loading Notebook")
-import GangaCore.Lib.Notebook
-
-logger.debug("Loading LocalHost")
-import GangaCore.Lib.Localhost
-logger.debug("Loading LCG")
-import GangaCore.Lib.LCG
-logger.debug("Loading Condor")
-import GangaCore.Lib.Condor
-logger.debug("Loading Interactive")
-import GangaCore.Lib.Interactive
-logger.debug("Loading Batch")
-import GangaCore.Lib.Batch
-logger.debug("Loading Remote")
-import GangaCore.Lib.Remote
-
-logger.debug("Loading Tasks")
-import GangaCore.GPIDev.Lib.Tasks
-
-
-logger.debug("Loading Checkers")
-import GangaCore.Lib.Checkers
-logger.debug("Loading Notifier")
-import GangaCore.Lib.Notifier
-
-logger.debug("Finished Runtime.plugins")
+system_plugins = [
+    'GangaCore.GPIDev.Adapters.IApplication',
+    'GangaCore.GPIDev.Adapters.IBackend',
+    'GangaCore.GPIDev.Adapters.ISplitter',
+    'GangaCore.GPIDev.Adapters.IMerger',
+    'GangaCore.GPIDev.Lib.GangaList',
+    'GangaCore.GPIDev.Lib.File',
+    'GangaCore.GPIDev.Lib.Job',
+    'GangaCore.Lib.Mergers',
+    'GangaCore.Lib.Splitters',
+    'GangaCore.Lib.Executable',
+    'GangaCore.Lib.Root',
+    'GangaCore.Lib.Notebook',
+    'GangaCore.Lib.Localhost',
+    'GangaCore.Lib.LCG',
+    'GangaCore.Lib.Condor',
+    'GangaCore.Lib.Interactive',
+    'GangaCore.Lib.Batch',
+    'GangaCore.Lib.Remote',
+    'GangaCore.GPIDev.Lib.Tasks',
+    'GangaCore.Lib.Checkers',
+    'GangaCore.Lib.Notifier',
+]
+
+
+def loadSystemPlugins():
+    """ Load the Ganga system plugins, or add them lazily if they are described by the plugin manifest """
+    from GangaCore.Runtime.PluginManifest import addPlugins
+    for name in system_plugins:
+        logger.debug("Loading %s", name)
+        addPlugins(name, 'GangaCore', partial(import_module, name))
+    logger.debug("Finished Runtime.plugins")
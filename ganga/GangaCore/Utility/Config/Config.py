@@ -148,6 +148,10 @@ def getLogger():
 # All configuration units
 allConfigs = {}
 
+# Configuration units defined by plugin modules which have not been imported yet,
+# mapped to a function importing the module. They may still be made after bootstrap.
+lazySections = {}
+
 # configuration session buffer
 # this dictionary contains the value for the options which are defined in the configuration file and which have
 # not yet been defined
@@ -174,6 +178,10 @@ def getConfig(name):
     try:
         return allConfigs[name]
     except KeyError:
+        if name in lazySections:
+            lazySections[name]()
+            if name in allConfigs:
+                return allConfigs[name]
         raise KeyError('Config section "[{0}]" not found'.format(name))
 
 
@@ -182,7 +190,7 @@ def makeConfig(name, docstring, **kwds):
     Create a config package and attach metadata to it. makeConfig() should be called once for each package.
     """
 
-    if _after_bootstrap:
+    if _after_bootstrap and name not in lazySections:
         raise ConfigError('attempt to create a configuration section [%s] after bootstrap' % name)
 
     try:
@@ -432,6 +440,45 @@ _after_bootstrap = False
 config_scope = {}
 
 
+class ConfigSnapshot(object):
+
+    """ Read-only view of the effective values of the options of a PackageConfig, worked out once when it is made.
+    A snapshot is never changed: when an option changes the PackageConfig makes a new one (with a higher
+    generation) the next time it is asked for. Code reading options in a loop may keep a snapshot, or the values
+    read from it, for as long as snapshot.generation == config.generation. """
+
+    __slots__ = ('name', 'generation', '_values')
+
+    def __init__(self, name, generation, values):
+        self.name = name
+        self.generation = generation
+        self._values = values
+
+    def __getitem__(self, o):
+        try:
+            return self._values[o]
+        except KeyError:
+            raise ConfigError('option "%s" does not exist in "%s"' % (o, self.name))
+
+    def __contains__(self, o):
+        return o in self._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, o, default=None):
+        return self._values.get(o, default)
+
+    def keys(self):
+        return self._values.keys()
+
+    def items(self):
+        return self._values.items()
+
+
 class PackageConfig(object):
 
     """ Package  Config object  represents a  Configuration  Unit (typically
@@ -454,7 +501,8 @@ class PackageConfig(object):
 
     """
 
-    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified', '__dict__')
+    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified',
+                 'generation', '_snapshot', '__dict__')
 
     def __init__(self, name, docstring, **meta):
         """ Arguments:
@@ -474,6 +522,10 @@ class PackageConfig(object):
         self._session_handlers = []
         self._gangarc_handlers = []
 
+        # effective values of the options, made again on first use after a change
+        self.generation = 0
+        self._snapshot = None
+
         self.is_open = False
 
         for m in meta:
@@ -494,13 +546,44 @@ class PackageConfig(object):
 
     def __getitem__(self, o):
         """ Get the effective value of option o. """
-        return self.getEffectiveOption(o)
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.snapshot()
+        try:
+            return snapshot._values[o]
+        except KeyError:
+            # raises the same errors as before for missing or undefined options
+            return self.getEffectiveOption(o)
+
+    def snapshot(self):
+        """ Return the ConfigSnapshot of the current effective values of the options. """
+        snapshot = self._snapshot
+        if snapshot is None:
+            generation = self.generation
+            values = {}
+            for name, option in self.options.items():
+                try:
+                    values[name] = option.value
+                except AttributeError:
+                    # option without any value yet
+                    pass
+            snapshot = ConfigSnapshot(self.name, generation, values)
+            # not kept if an option was changed (by another thread) in the meantime
+            if self.generation == generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidateSnapshot(self):
+        """ Drop the snapshot of the effective values after a change to the options.
+        This is done before the post handlers are called so that they already see the new values. """
+        self.generation += 1
+        self._snapshot = None
 
     def addOption(self, name, default_value, docstring, override=False, typelist=None, **meta):
         """
         Add a new option to the configuration.
         """
-        if _after_bootstrap and not self.is_open:
+        if _after_bootstrap and not self.is_open and self.name not in lazySections:
             raise ConfigError('attempt to add a new option [%s]%s after bootstrap' % (self.name, name))
 
         # has the option already been made
@@ -572,6 +655,8 @@ class PackageConfig(object):
                 if locals().get('logger') is not None:
                     locals().get('logger').debug("dbg: %s" % msg)
 
+        self.invalidateSnapshot()
+
 
     def setSessionValue(self, name, value):
         """  Add or  override options  as a  part of  second  phase of
@@ -594,7 +679,10 @@ class PackageConfig(object):
             self.options[name] = ConfigOption(name)
             this_opt = self.options[name]
 
-        this_opt.setSessionValue(value)
+        try:
+            this_opt.setSessionValue(value)
+        finally:
+            self.invalidateSnapshot()
 
         logger.debug('sucessfully set session option [%s]%s = %s', self.name, name, value)
 
@@ -624,7 +712,10 @@ class PackageConfig(object):
         for handler in self._user_handlers:
             value = handler[0](name, value)
 
-        self.options[name].setUserValue(value)
+        try:
+            self.options[name].setUserValue(value)
+        finally:
+            self.invalidateSnapshot()
 
         logger.debug('successfully set user option [%s]%s = %s', self.name, name, value)
 
@@ -646,7 +737,10 @@ class PackageConfig(object):
         for handler in self._user_handlers:
             value = handler[0](name, value)
 
-        self.options[name].setGangarcValue(value)
+        try:
+            self.options[name].setGangarcValue(value)
+        finally:
+            self.invalidateSnapshot()
 
         logger.debug('successfully set user option [%s]%s = %s', self.name, name, value)
 
@@ -656,6 +750,7 @@ class PackageConfig(object):
     def overrideDefaultValue(self, name, val):
         self.hasModified = True
         self.options[name].overrideDefaultValue(val)
+        self.invalidateSnapshot()
 
     def revertToSession(self, name):
         self.hasModified = True
@@ -664,6 +759,7 @@ class PackageConfig(object):
                 del self.options[name].user_value
         except KeyError:
             pass
+        self.invalidateSnapshot()
 
     def revertToDefault(self, name):
         self.hasModified = True
@@ -673,6 +769,7 @@ class PackageConfig(object):
                 del self.options[name].session_value
         except KeyError:
             pass
+        self.invalidateSnapshot()
 
     def revertToSessionOptions(self):
         self.hasModified = True
@@ -751,6 +848,7 @@ class PackageConfig(object):
         for o in self.options.keys():
             if not self.options[o].check_defined():
                 del self.options[o]
+        self.invalidateSnapshot()
 
 try:
     import ConfigParser
@@ -1117,16 +1215,29 @@ def expandConfigPath(path, top):
     return l
 
 
-def sanityCheck():
+def sanityCheck(names=None):
+    """
+    Report configuration units which were never made and options set in the config files which are not defined.
+    Units which are still to be made by a plugin module are not reported.
+
+    Args:
+        names (list): only check these configuration units, all of them if None
+    """
     logger = getLogger()
     for c in allConfigs.values():
+        if names is not None and c.name not in names:
+            continue
         if not c._config_made:
             logger.error("sanity check failed: %s: no makeConfig() found in the code", c.name)
 
     for name in unknownConfigFileValues:
+        if names is not None and name not in names:
+            continue
         opts = unknownConfigFileValues[name]
         if name in allConfigs:
             cfg = allConfigs[name]
+        elif name in lazySections:
+            continue
         else:
             logger.error("unknown configuration section: [%s]", name)
             continue
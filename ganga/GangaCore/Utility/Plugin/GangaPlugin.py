@@ -15,16 +15,21 @@ class PluginManagerError(GangaValueError):
 #
 # If you do not use category all plugins are registered in a flat list. Otherwise
 # there is a list of names for each category seaprately.
+#
+# Plugins may also be added lazily, with a function which imports the module
+# defining them. The module is imported the first time the plugin is looked up.
 
 
 class PluginManager(object):
 
-    __slots__ = ('all_dict', 'first', '_prev_found')
+    __slots__ = ('all_dict', 'first', '_prev_found', '_lazy', '_lazy_default')
 
     def __init__(self):
         self.all_dict = {}
         self.first = {}
         self._prev_found = {}
+        self._lazy = {}
+        self._lazy_default = {}
 
     def find(self, category, name):
         """
@@ -37,6 +42,11 @@ class PluginManager(object):
         #import traceback
         # traceback.print_stack()
 
+        if name is None and category in self._lazy_default:
+            self.setDefault(category, self._lazy_default[category])
+        elif name is not None:
+            self._loadLazy(category, name)
+
         # Simple attempt to pre-load and cache Plugin lookups
         key = str(category) + "_" + str(name)
         if key in self._prev_found:
@@ -79,6 +89,11 @@ class PluginManager(object):
             logger.error("Some Other unexpected ERROR!")
             raise
 
+        if name is not None and any(name in lazy for lazy in self._lazy.itervalues()):
+            for category_i in self._lazy.keys():
+                self._loadLazy(category_i, name)
+            return self.find(category, name)
+
         if name is None:
             s = "cannot find default plugin for category " + category
         else:
@@ -99,6 +114,34 @@ class PluginManager(object):
         cat[name] = pluginobj
         logger.debug('adding plugin %s (category "%s") ' % (name, category))
 
+    def addLazy(self, category, name, load):
+        """ Add a plugin which is not loaded yet. The function 'load' is called to
+        add() it the first time the plugin is looked up. Plugins which have already
+        been added are left alone.
+        """
+        cat = self.all_dict.setdefault(category, {})
+        if name not in cat:
+            self._lazy.setdefault(category, {})[name] = load
+
+    def setLazyDefault(self, category, name):
+        """ Make the lazily added plugin 'name' be default in a given 'category'
+        without loading it until the default is looked up.
+        """
+        if self.isLazy(category, name):
+            self._lazy_default[category] = name
+        else:
+            self.setDefault(category, name)
+
+    def isLazy(self, category, name):
+        """ Return True if the plugin has been added lazily and not loaded yet """
+        return name in self._lazy.get(category, {})
+
+    def _loadLazy(self, category, name):
+        load = self._lazy.get(category, {}).pop(name, None)
+        if load is not None:
+            logger.debug('loading plugin %s (category "%s") ' % (name, category))
+            load()
+
     def setDefault(self, category, name):
         """ Make the plugin 'name' be default in a given 'category'.
         You must first add() the plugin object before calling this method. Otherwise
@@ -107,16 +150,28 @@ class PluginManager(object):
         assert(not name is None)
         pluginobj = self.find(category, name)
         self.first[category] = pluginobj
+        self._lazy_default.pop(category, None)
+        self._prev_found.pop(str(category) + "_None", None)
 
     def allCategories(self):
         return self.all_dict
 
-    def allClasses(self, category):
+    def allClasses(self, category, load=True):
+        """ Return the plugins of a category by name. Plugins which were added lazily
+        are loaded first unless 'load' is False, in which case they are left out.
+        """
+        if load:
+            for name in self._lazy.get(category, {}).keys():
+                self._loadLazy(category, name)
         cat = self.all_dict.get(category)
         if cat:
             return cat
         else:
             return {}
 
+    def allNames(self, category):
+        """ Return the names of all plugins of a category, including those not loaded yet """
+        return sorted(set(self.all_dict.get(category, {})) | set(self._lazy.get(category, {})))
+
 allPlugins = PluginManager()
 
@@ -13,6 +13,9 @@
 #                    configuration parameter defining search path
 #                    to be passed as arument
 
+import time
+from contextlib import contextmanager
+
 from GangaCore.Core.exceptions import PluginError
 
 from GangaCore.Utility.util import importName
@@ -25,6 +28,64 @@ import GangaCore.Utility.logging
 logger = GangaCore.Utility.logging.getLogger(modulename=1)
 
 
+class StartupProfile(object):
+    """
+    Time spent importing and initialising each runtime package while Ganga starts,
+    reported at the end of the bootstrap when ganga is run with --profile-startup
+    """
+
+    stages = ('import', 'setup', 'boot', 'templates', 'plugins', 'gpi', 'hooks')
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.time()
+        self.times = oDict()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.time()
+
+    def add(self, package, stage, duration):
+        """
+        Add time spent in a stage of the startup of a package
+
+        Args:
+            package (str): name of the runtime package
+            stage (str): one of StartupProfile.stages or any other name of a startup step
+            duration (float): seconds spent
+        """
+        if self.enabled:
+            package_times = self.times.setdefault(package, {})
+            package_times[stage] = package_times.get(stage, 0.) + duration
+
+    @contextmanager
+    def measure(self, package, stage):
+        """ Time the body of the with statement as a stage of the startup of a package """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(package, stage, time.time() - start)
+
+    def report(self):
+        """ Return the startup times as a table with one row per package and one column per stage """
+        stages = list(self.stages)
+        for package_times in self.times.values():
+            stages.extend(stage for stage in package_times if stage not in stages)
+        stages = [stage for stage in stages if any(stage in t for t in self.times.values())]
+
+        width = max([len('package')] + [len(p) for p in self.times])
+        lines = ['%-*s %s %9s' % (width, 'package', ' '.join('%9s' % stage for stage in stages), 'total')]
+        for package, package_times in self.times.items():
+            lines.append('%-*s %s %9.3f' % (width, package,
+                                            ' '.join('%9.3f' % package_times.get(stage, 0.) for stage in stages),
+                                            sum(package_times.values())))
+        lines.append('startup took %.3f s in total' % (time.time() - self.started))
+        return '\n'.join(lines)
+
+startupProfile = StartupProfile()
+
+
 def getScriptPath(name="", searchPath=""):
     """Determine path to a script
 
@@ -138,22 +199,23 @@ class RuntimePackage(object):
         self.config = {}
 
         try:
-            self.mod = __import__(self.name)
-            self.modpath = os.path.dirname(
-                os.path.normpath(os.path.abspath(self.mod.__file__)))
-            if self.syspath:
-                if self.modpath.find(self.syspath) == -1:
-                    logger.warning(
-                        "runtime '%s' imported from '%s' but specified path is '%s'. You might be getting different code than expected!", self.name, self.modpath, self.syspath)
-            else:
-                logger.debug(
-                    "runtime package %s imported from %s", self.name, self.modpath)
-
-            # import the <PACKAGE>/PACKAGE.py module
-            # @see Ganga/PACKAGE.py for description of this magic module
-            # in this way we enforce any initialization of module is performed
-            # (e.g PackageSetup.setPlatform() is called)
-            __import__(self.name + ".PACKAGE")
+            with startupProfile.measure(self.name, 'import'):
+                self.mod = __import__(self.name)
+                self.modpath = os.path.dirname(
+                    os.path.normpath(os.path.abspath(self.mod.__file__)))
+                if self.syspath:
+                    if self.modpath.find(self.syspath) == -1:
+                        logger.warning(
+                            "runtime '%s' imported from '%s' but specified path is '%s'. You might be getting different code than expected!", self.name, self.modpath, self.syspath)
+                else:
+                    logger.debug(
+                        "runtime package %s imported from %s", self.name, self.modpath)
+
+                # import the <PACKAGE>/PACKAGE.py module
+                # @see Ganga/PACKAGE.py for description of this magic module
+                # in this way we enforce any initialization of module is performed
+                # (e.g PackageSetup.setPlatform() is called)
+                __import__(self.name + ".PACKAGE")
 
         except ImportError as x:
             logger.warning("cannot import runtime package %s: %s", self.name, str(x))
@@ -245,7 +307,8 @@ def initSetupRuntimePackages():
     # perform any setup of runtime packages
     logger.debug('Setting up Runtime Packages')
     for r in allRuntimes.values():
-        r.standardSetup()
+        with startupProfile.measure(r.name, 'setup'):
+            r.standardSetup()
 
 
 def initRuntimePackages():
@@ -277,24 +340,28 @@ def initRuntimePackages():
 
 def loadPlugins(environment):
     """
-    Given a list of environments fully load the found Plugins into them exposing all of the relavent objects
+    Given a list of environments fully load the found Plugins into them exposing all of the relavent objects.
+    Plugins listed in the plugin manifest are only loaded when they are first used.
     """
     from GangaCore.Utility.Runtime import allRuntimes
     from GangaCore.Utility.logging import getLogger
+    from GangaCore.Runtime.PluginManifest import addPlugins
     logger = getLogger()
     env_dict = environment.__dict__
     logger.debug("Loading: %s PLUGINS" % str(allRuntimes.keys()))
     for n, r in allRuntimes.iteritems():
         logger.debug("Bootstrapping: %s" % n)
         try:
-            r.bootstrap(env_dict)
+            with startupProfile.measure(r.name, 'boot'):
+                r.bootstrap(env_dict)
         except Exception as err:
             logger.error('problems with bootstrapping %s -- ignored', n)
             logger.error('Reason: %s' % str(err))
             raise err
         try:
-            r.loadNamedTemplates(env_dict, GangaCore.Utility.Config.getConfig('Configuration')['namedTemplates_ext'],
-          GangaCore.Utility.Config.getConfig('Configuration')['namedTemplates_pickle'])
+            with startupProfile.measure(r.name, 'templates'):
+                r.loadNamedTemplates(env_dict, GangaCore.Utility.Config.getConfig('Configuration')['namedTemplates_ext'],
+              GangaCore.Utility.Config.getConfig('Configuration')['namedTemplates_pickle'])
         except Exception as err:
             logger.error('problems with loading Named Templates for %s', n)
             logger.error('Reason: %s' % str(err))
@@ -302,7 +369,7 @@ def loadPlugins(environment):
     for n, r in allRuntimes.iteritems():
         logger.debug("Loading: %s" % n)
         try:
-            r.loadPlugins()
+            addPlugins(r.name, r.name, r.loadPlugins, module=False)
         except Exception as err:
             logger.error('problems with loading Plugin %s', n)
             logger.error('Reason: %s' % str(err))
@@ -317,15 +384,19 @@ def autoPopulateGPI(my_interface=None):
         import GangaCore.GPI
         my_interface = GangaCore.GPI
     from GangaCore.Runtime.GPIexport import exportToInterface
+    from GangaCore.Runtime.PluginManifest import exportPlaceholders
     from GangaCore.Utility.Plugin import allPlugins
     # make all plugins visible in GPI
     for k in allPlugins.allCategories():
-        for n in allPlugins.allClasses(k):
+        for n in allPlugins.allClasses(k, load=False).keys():
             cls = allPlugins.find(k, n)
             if not cls._declared_property('hidden'):
-                if n != cls.__name__:
-                    exportToInterface(my_interface, cls.__name__, cls, 'Classes')
-                exportToInterface(my_interface, n, cls, 'Classes')
+                with startupProfile.measure(cls.__module__.split('.')[0], 'gpi'):
+                    if n != cls.__name__:
+                        exportToInterface(my_interface, cls.__name__, cls, 'Classes')
+                    exportToInterface(my_interface, n, cls, 'Classes')
+    # plugins which are not loaded yet are represented by placeholders
+    exportPlaceholders(my_interface)
 
 def setPluginDefaults(my_interface=None):
     """
@@ -236,12 +236,12 @@ def execute(command,
         update_pkl_thread = update_thread(pkl_file_pipes, thread_output, pkl_output_key, require_output=False)
 
     # Execute the main command of interest
-    logger.debug("Executing Command:\n'%s'" % str(command))
+    logger.debug("Executing Command:\n'%s'", command)
     stdout, stderr = p.communicate(command)
 
     # Close the timeout watching thread
-    logger.debug("stdout: %s" % stdout)
-    logger.debug("stderr: %s" % stderr)
+    logger.debug("stdout: %s", stdout)
+    logger.debug("stderr: %s", stderr)
 
     timer.cancel()
     if timeout is not None:
@@ -300,7 +300,7 @@ def execute(command,
             try:
                 stdout_temp = eval(stdout, {}, local_ns)
             except Exception as err2:
-                logger.debug("Err2: %s" % str(err2))
+                logger.debug("Err2: %s", err2)
                 pass
 
     if stdout_temp:
@@ -19,6 +19,9 @@ from __future__ import print_function, absolute_import
 #  - all loggers are automatically configured according to this modules config dictionary (see below)
 #  - special functions:
 #       - log_user_exception() allows to format nicely exception messages
+#  - messages are formatted only when they are emitted: pass the arguments to the logger
+#     (logger.debug('job %s', j)) rather than formatting them first (logger.debug('job %s' % j)),
+#     wrap expensive arguments in lazy() and guard expensive blocks with isDebugEnabled(logger)
 
 import cStringIO
 import logging
@@ -282,19 +285,22 @@ def _guess_module_logger_name(modulename, frame=None):
     else:
         print('using frame from the caller')
 
-    global lookup_frame_names
+    this__file__ = frame.f_globals.get('__file__')
+    if this__file__ is not None:
+        try:
+            return lookup_frame_names[(this__file__, modulename)]
+        except KeyError:
+            pass
+    del frame
 
+    name = _module_logger_name(this__file__, modulename)
+    if this__file__ is not None:
+        lookup_frame_names[(this__file__, modulename)] = name
+    return name
 
-    this__file__ = None
-    if '__file__' in frame.f_globals:
-        this__file__ = frame.f_globals['__file__']
-        if this__file__ in lookup_frame_names:
-            del frame
-            return lookup_frame_names[this_file]
-        else:
-            should_store = True
-    else:
-        should_store = False
+
+def _module_logger_name(this__file__, modulename):
+    """Work out the logger name of the module in the file this__file__ (None for the interactive prompt). See _guess_module_logger_name"""
 
     # accessing __file__ from globals() is much more reliable than
     # f_code.co_filename (name = os.path.normcase(frame.f_code.co_filename))
@@ -306,7 +312,6 @@ def _guess_module_logger_name(modulename, frame=None):
         name = '_program_'
 
     # print " _guess_module_logger_name",name
-    del frame
 
     # if private_logger:
     #    private_logger.debug('searching for package matching calling module co_filename= %s',str(name))
@@ -345,13 +350,8 @@ def _guess_module_logger_name(modulename, frame=None):
     if not modulename:
         return name
 
-    return_name = name + '.' + modulename
-
-    if should_store is True:
-        lookup_frame_names[this__file__] = return_name
-
     # return custom module name
-    return return_name
+    return name + '.' + modulename
 
 _MemHandler = logging.handlers.MemoryHandler
 
@@ -391,6 +391,39 @@ class FlushedMemoryHandler(_MemHandler):
                 _MemHandler.shouldFlush(self, record)
 
 
+class lazy(object):
+    """
+    A logging argument which is only worked out if the message is emitted, e.g.
+        logger.debug('jobs: %s', lazy(lambda: [j.id for j in jobs]))
+    Args:
+        func (callable): called with args to get the value to log
+        args (list): arguments of func
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+    def __repr__(self):
+        return repr(self.func(*self.args))
+
+
+def isDebugEnabled(logger):
+    """
+    Return whether DEBUG messages of this logger are emitted, to guard blocks which only prepare debug output.
+    This is worked out on every call so that it follows any change of level. It is cheap as the Ganga loggers all have
+    a level of their own, so that the logger hierarchy isn't walked.
+    Args:
+        logger (Logger): the logger which is to be checked
+    """
+    return logger.isEnabledFor(logging.DEBUG)
+
+
 def enableCaching(custom_logger=None, custom_formatter=None):
     """
     Enable caching of log messages at interactive prompt. In the interactive IPython session, the messages from monitoring
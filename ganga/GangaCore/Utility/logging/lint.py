@@ -0,0 +1,99 @@
+"""
+Static check for debug messages which are formatted whether or not they are emitted, i.e.
+
+    logger.debug('job %s' % j)
+
+rather than logger.debug('job %s', j). Run from the ganga directory as
+
+    python -m GangaCore.Utility.logging.lint [--count] [path ...]
+
+which lists the eager calls found in the .py files under the paths (GangaCore by default) and exits with 1 if there
+are any.
+"""
+
+from __future__ import print_function
+
+import argparse
+import ast
+import os
+import sys
+
+
+class _EagerDebugFinder(ast.NodeVisitor):
+
+    """ Collects the lines of the <anything>.debug(<string> % ...) calls of a module """
+
+    def __init__(self):
+        self.lines = []
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == 'debug' and node.args:
+            message = node.args[0]
+            if isinstance(message, ast.BinOp) and isinstance(message.op, ast.Mod) and isinstance(message.left, ast.Str):
+                self.lines.append(node.lineno)
+        self.generic_visit(node)
+
+
+def findEagerDebugCalls(source, filename='<string>'):
+    """
+    Return the line numbers of the debug calls of the source with an eagerly %-formatted message
+    Args:
+        source (str): python source code
+        filename (str): name of the file, used in syntax errors
+    """
+    finder = _EagerDebugFinder()
+    finder.visit(ast.parse(source, filename))
+    return sorted(finder.lines)
+
+
+def checkPaths(paths):
+    """
+    Return the list of (filename, line number, source line) of the eager debug calls in the .py files under paths
+    Args:
+        paths (list): files or directories to check
+    """
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            filenames = [path]
+        else:
+            filenames = []
+            for dirpath, dirnames, files in os.walk(path):
+                dirnames.sort()
+                filenames.extend(os.path.join(dirpath, f) for f in sorted(files) if f.endswith('.py'))
+        for filename in filenames:
+            with open(filename) as py_file:
+                source = py_file.read()
+            try:
+                lines = findEagerDebugCalls(source, filename)
+            except SyntaxError as err:
+                print('%s: cannot be parsed: %s' % (filename, err), file=sys.stderr)
+                continue
+            source_lines = source.splitlines()
+            found.extend((filename, lineno, source_lines[lineno - 1].strip()) for lineno in lines)
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the logger.debug calls whose message is formatted eagerly with %')
+    parser.add_argument('--count', action='store_true', help='only print the number of eager calls per file')
+    parser.add_argument('paths', nargs='*', default=['GangaCore'], help='files or directories to check')
+    args = parser.parse_args(argv)
+
+    found = checkPaths(args.paths)
+    if args.count:
+        counts = {}
+        for filename, _, _ in found:
+            counts[filename] = counts.get(filename, 0) + 1
+        for filename in sorted(counts, key=lambda f: (-counts[f], f)):
+            print('%5d %s' % (counts[filename], filename))
+    else:
+        for filename, lineno, line in found:
+            print('%s:%d: %s' % (filename, lineno, line))
+    print('%d eager debug calls' % len(found))
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -104,6 +104,10 @@ If an element of the path is just a name (like in the example below)
 then the plugins will be loaded using current python path. This means that
 some packages such as GangaTest may be taken from the release area.""",
         examples="RUNTIME_PATH = GangaGUIRUNTIME_PATH = /my/SpecialExtensions:GangaTest ")
+conf_config.addOption('PluginManifest', '',
+"""plugin manifest written by "ganga --write-plugin-manifest FILE". If set, the modules of the plugins
+listed in the manifest are only imported when a plugin is first used, instead of at startup.
+The manifest is ignored if it was written by another version of Ganga.""")
 
 conf_config.addOption('TextShell', 'IPython', """ The type of the interactive shell: IPython (cooler) or Console (limited)""")
 conf_config.addOption('StartupGPI', '', 'block of GPI commands executed at startup')
@@ -111,7 +115,9 @@ conf_config.addOption('ReleaseNotes', True, 'Flag to print out the relevent subs
 conf_config.addOption('gangadir', expandvars(None, '~/gangadir'),
                  'Location of local job repositories and workspaces. Default is ~/gangadir but in somecases (such as LSF CNAF) this needs to be modified to point to the shared file system directory.', filter=GangaCore.Utility.Config.expandvars)
 conf_config.addOption('repositorytype', 'LocalXML', 'Type of the repository.', examples='LocalXML')
+conf_config.addOption('registryTypes', {}, 'Type of the repository of individual registries, overriding repositorytype for them. SQLite keeps a registry in a single database, see GangaRepositorySQLite.migrateXMLRegistry to convert an existing one', examples="{'jobs': 'SQLite', 'box': 'SQLite'}")
 conf_config.addOption('lockingStrategy', 'UNIX', 'Type of locking strategy which can be used. UNIX or FIXED . default = UNIX')
+conf_config.addOption('subjobContainer', False, 'Store the subjobs of a job in a single file (subjobs.pack) rather than in a directory each. Jobs are converted between the two layouts the next time their subjobs are written to disk')
 conf_config.addOption('workspacetype', 'LocalFilesystem',
                  'Type of workspace. Workspace is a place where input and output sandbox of jobs are stored. Currently the only supported type is LocalFilesystem.')
 conf_config.addOption('user', getpass.getuser(),
@@ -123,6 +129,11 @@ conf_config.addOption('deleteUnusedShareDir', 'always',
                  'If set to ask the user is presented with a prompt asking whether Shared directories not associated with a persisted Ganga object should be deleted upon Ganga exit. If set to never, shared directories will not be deleted upon exit, even if they are not associated with a persisted Ganga object. If set to always (the default), then shared directories will always be deleted if not associated with a persisted Ganga object.')
 
 conf_config.addOption('autoGenerateJobWorkspace', False, 'Autogenerate workspace dirs for new jobs')
+conf_config.addOption('subjobPrepareProcesses', 0, 'Number of worker processes used to prepare the subjobs of large split jobs at submission, -1 uses one per core. 0 prepares them within the Ganga session')
+conf_config.addOption('subjobPrepareProcessesMinSubjobs', 100, 'Minimum number of subjobs for which the subjobs are prepared in worker processes, see subjobPrepareProcesses')
+conf_config.addOption('sandboxCacheSize', 500, 'Maximum size in MB of the cache of packed input sandboxes kept in the workspace. Sandboxes with the same files are packed once and reused, the least recently used ones are removed when the cache is full. 0 disables the cache')
+conf_config.addOption('sandboxCompressor', 'pigz', 'Command used to compress large input sandboxes in parallel, e.g. pigz. The sandboxes are compressed by Ganga itself if it is not found or the option is empty')
+conf_config.addOption('sandboxCompressorMinSize', 10 * 1024 * 1024, 'Minimum size in bytes of the files of an input sandbox for it to be compressed with sandboxCompressor')
 
 conf_config.addOption('NoAfsToken', False, 'Do not require an AFS token when running on an AFS filesystem. Not recommended!')
 
@@ -212,6 +223,11 @@ poll_config.addOption('diskspace_poll_rate', 30, "The frequency in seconds for f
 poll_config.addOption('DiskSpaceChecker', "", "disk space checking callback. This function should return False when there is no disk space available, True otherwise")
 poll_config.addOption('max_shutdown_retries', 5, 'OBSOLETE: this option has no effect anymore')
 poll_config.addOption('numParallelJobs', 25, 'Number of Jobs to update the status for in parallel')
+poll_config.addOption('max_monitoring_batch_size', 1000, 'Maximum number of (sub)jobs passed to a backend in one monitoring call. Starting from numParallelJobs the number is doubled while the backend answers quickly')
+poll_config.addOption('monitoring_batch_target_time', 10, 'Time in seconds one monitoring call to a backend should take. The number of (sub)jobs per call is halved when a call takes longer than this')
+poll_config.addOption('default_backend_poll_budget', 0, 'Maximum time in seconds spent polling one backend in a monitoring step, jobs which are left out are polled first in the next step. 0 means no limit')
+poll_config.addOption('backend_poll_budgets', {}, 'Poll budget in seconds for individual backends, e.g. {"Dirac": 60}, overriding default_backend_poll_budget')
+poll_config.addOption('active_jobs_rescan_rate', 600, 'The frequency in seconds at which the monitoring rebuilds its list of active jobs from the whole job registry. In between only jobs which changed status are looked at')
 
 poll_config.addOption('forced_shutdown_policy', 'session_type',
                  'If there are remaining background activities at exit such as monitoring, output download Ganga will attempt to wait for the activities to complete. You may select if a user is prompted to answer if he wants to force shutdown ("interactive") or if the system waits on a timeout without questions ("timeout"). The default is "session_type" which will do interactive shutdown for CLI and timeout for scripts.')
@@ -389,6 +405,10 @@ gridsim_config.addOption(
 
 gridsim_config.addOption('status_time', 'random.uniform(1,5)',
                  'python expression which returns the time it takes (in seconds) to complete the status command (also for subjob in bulk emulation)')
+gridsim_config.addOption('single_status_time', 0.0,
+                 'python expression which returns the time it takes (in seconds) to get the status of a single job within the status command')
+gridsim_config.addOption('master_status_time', 'random.uniform(2,5)',
+                 'python expression which returns the time it takes (in seconds) to get the status of a native bulk (collection) job')
 
 gridsim_config.addOption('get_output_time', 'random.uniform(1,5)',
                  'python expression which returns the time it takes (in seconds) to complete the get_output command (also for subjob in bulk emulation)')
@@ -415,6 +435,9 @@ condor_config = makeConfig('Condor', 'Settings for Condor Batch system')
 
 condor_config.addOption('query_global_queues', True,
                  "Query global condor queues, i.e. use '-global' flag")
+condor_config.addOption('query_history', True,
+                 "Look up the jobs which have left the queue with one condor_history call per monitoring cycle. "
+                 "If False, or for the jobs condor_history doesn't know, the condorLog of the job is read instead")
 
 # ------------------------------------------------
 # LSF
@@ -434,6 +457,12 @@ lsf_config.addOption('submit_res_pattern', '^Job <(?P<id>\d*)> is submitted to .
 lsf_config.addOption('stdoutConfig', '-o %s/stdout', "String pattern for defining the stdout")
 lsf_config.addOption('stderrConfig', '-e %s/stderr', "String pattern for defining the stderr")
 
+lsf_config.addOption('queue_query_str', 'bjobs -w', "String used to list the jobs in the batch system at each monitoring cycle. Empty to check every job through its files")
+lsf_config.addOption('queue_query_pattern', r'^(?P<id>\d+)\s+\S+\s+(?P<status>\S+)',
+                 "Pattern used to extract the id and state (id and status groups) of the jobs from the output of queue_query_str")
+lsf_config.addOption('queue_states', {'PEND': 'submitted', 'PSUSP': 'submitted', 'RUN': 'running', 'USUSP': 'running', 'SSUSP': 'running'},
+                 "Ganga status of the jobs in each state of the batch system. The files of the jobs whose status matches their state are not checked")
+
 lsf_config.addOption('kill_str', 'bkill %s', "String used to kill job")
 lsf_config.addOption('kill_res_pattern',
                  '(^Job <\d+> is being terminated)|(Job <\d+>: Job has already finished)|(Job <\d+>: No matching job found)',
@@ -473,6 +502,12 @@ pbs_config.addOption('submit_res_pattern', '^(?P<id>\d*)\.pbs\s*',
 pbs_config.addOption('stdoutConfig', '-o %s/stdout', "String pattern for defining the stdout")
 pbs_config.addOption('stderrConfig', '-e %s/stderr', "String pattern for defining the stderr")
 
+pbs_config.addOption('queue_query_str', 'qstat', "String used to list the jobs in the batch system at each monitoring cycle. Empty to check every job through its files")
+pbs_config.addOption('queue_query_pattern', r'^(?P<id>\d+)\S*\s+\S+\s+\S+\s+\S+\s+(?P<status>[A-Z])\s',
+                 "Pattern used to extract the id and state (id and status groups) of the jobs from the output of queue_query_str")
+pbs_config.addOption('queue_states', {'Q': 'submitted', 'H': 'submitted', 'W': 'submitted', 'R': 'running', 'S': 'running'},
+                 "Ganga status of the jobs in each state of the batch system. The files of the jobs whose status matches their state are not checked")
+
 pbs_config.addOption('kill_str', 'qdel %s', "String used to kill job")
 pbs_config.addOption('kill_res_pattern', '(^$)|(qdel: Unknown Job Id)',
                  "String pattern for replay from the kill command")
@@ -519,6 +554,12 @@ sge_config.addOption('submit_res_pattern', 'Your job (?P<id>\d+) (.+)',
 sge_config.addOption('stdoutConfig', '-o %s/stdout', "String pattern for defining the stdout")
 sge_config.addOption('stderrConfig', '-e %s/stderr', "String pattern for defining the stderr")
 
+sge_config.addOption('queue_query_str', 'qstat', "String used to list the jobs in the batch system at each monitoring cycle. Empty to check every job through its files")
+sge_config.addOption('queue_query_pattern', r'^\s*(?P<id>\d+)\s+\S+\s+\S+\s+\S+\s+(?P<status>\w+)',
+                 "Pattern used to extract the id and state (id and status groups) of the jobs from the output of queue_query_str")
+sge_config.addOption('queue_states', {'qw': 'submitted', 'hqw': 'submitted', 'r': 'running', 't': 'running', 'Rr': 'running', 'Rt': 'running', 's': 'running'},
+                 "Ganga status of the jobs in each state of the batch system. The files of the jobs whose status matches their state are not checked")
+
 sge_config.addOption('kill_str', 'qdel %s', "String used to kill job")
 sge_config.addOption('kill_res_pattern', '(has registered the job +\d+ +for deletion)|(denied: job +"\d+" +does not exist)',
                  "String pattern for replay from the kill command")
@@ -559,6 +600,12 @@ slurm_config.addOption('submit_res_pattern', '^Submitted batch job (?P<id>\d+)\s
 slurm_config.addOption('stdoutConfig', '-o %s/stdout', "String pattern for defining the stdout")
 slurm_config.addOption('stderrConfig', '-e %s/stderr', "String pattern for defining the stderr")
 
+slurm_config.addOption('queue_query_str', 'squeue -h -u $USER -o "%i %t"', "String used to list the jobs in the batch system at each monitoring cycle. Empty to check every job through its files")
+slurm_config.addOption('queue_query_pattern', r'^\s*(?P<id>\d+)\s+(?P<status>\S+)',
+                 "Pattern used to extract the id and state (id and status groups) of the jobs from the output of queue_query_str")
+slurm_config.addOption('queue_states', {'PD': 'submitted', 'CF': 'submitted', 'R': 'running', 'S': 'running', 'ST': 'running'},
+                 "Ganga status of the jobs in each state of the batch system. The files of the jobs whose status matches their state are not checked")
+
 slurm_config.addOption('kill_str', 'scancel %s', "String used to kill job")
 slurm_config.addOption('kill_res_pattern', '(^$)|(^scancel: error: .+)',
                        "String pattern for replay from the kill command")
@@ -613,6 +660,10 @@ gangadir = getConfig('Configuration')['gangadir']
 merge_config.addOption('merge_output_dir', gangadir +
                  '/merge_results', "location of the merger's outputdir")
 merge_config.addOption('std_merge', 'TextMerger', 'Standard (default) merger')
+merge_config.addOption('merge_group_size', 20, 'Number of files merged at a time by the mergers which can merge partial merges again (e.g. RootMerger). Larger merges are done as a tree of partial merges')
+merge_config.addOption('merge_processes', 0, 'Number of worker processes over which the merges are spread, -1 uses one per core. 0 merges within the Ganga session')
+merge_config.addOption('merge_processes_min_files', 100, 'Minimum number of files to merge for the merges to be spread over worker processes, see merge_processes')
+merge_config.addOption('merge_as_subjobs_complete', False, 'Merge the output of groups of merge_group_size subjobs in the background of the Ganga session as they complete, for the mergers which can merge partial merges again')
 
 # ------------------------------------------------
 # Preparable
@@ -910,7 +961,9 @@ disp_config.addOption(
 # ------------------------------------------------
 # Tasks
 tasks_config = makeConfig('Tasks', 'Tasks configuration options')
-tasks_config.addOption('TaskLoopFrequency', 60., "Frequency of Task Monitoring loop in seconds")
+tasks_config.addOption('TaskLoopFrequency', 300., "Time in seconds between full updates of all tasks. In between, the Task Monitoring only looks at the units whose jobs changed status")
+tasks_config.addOption('SubmitBudget', 50, "Maximum number of jobs the Task Monitoring submits at once across all tasks, refilled at this many jobs per SubmitBudgetPeriod. 0 for no limit")
+tasks_config.addOption('SubmitBudgetPeriod', 60., "Time in seconds it takes for the SubmitBudget of the Task Monitoring to refill")
 tasks_config.addOption('ForceTaskMonitoring', False, "Monitor tasks even if the monitoring loop isn't enabled")
 tasks_config.addOption('disableTaskMon', False, "Should I disable the Task Monitoring loop?")
 
@@ -936,6 +989,7 @@ reg_config = makeConfig('Registry','This config controls the speed of flushing o
 reg_config.addOption('AutoFlusherWaitTime', 30, 'Time to wait between auto-flusher runs')
 reg_config.addOption('EnableAutoFlush', True, 'Enable Registry auto-flushing feature')
 reg_config.addOption('DisableLoadCheck', True, 'Disable the checking of recent bad jobs in bad state. Mainly used in testing.')
+reg_config.addOption('ChangeFeedSize', 10000, 'Number of the most recent changes to the objects of a registry kept for the consumers polling them, see Registry.pollChanges')
 
 cred_config = makeConfig('Credentials', 'This configures the credentials singleton')
 cred_config.addOption('CleanDelay', 1, 'Seconds between auto-clean of credentials when proxy externally destroyed')
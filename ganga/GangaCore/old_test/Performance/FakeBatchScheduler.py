@@ -0,0 +1,115 @@
+"""
+A stand-in for the qsub, qstat and qdel commands of PBS which runs the jobs as local processes, so the Batch backend
+can be load tested without a batch system. LoadTest.gpi points the [PBS] commands at it:
+
+    FakeBatchScheduler.py --state DIR submit [-q QUEUE] [-N NAME] -e STDERR -o STDOUT SCRIPT
+    FakeBatchScheduler.py --state DIR list
+    FakeBatchScheduler.py --state DIR kill ID
+
+The state directory keeps the last job id and one file per job with the pid of its process. The output of each
+command is what the PBS options of ganga expect.
+"""
+
+from __future__ import print_function
+
+import argparse
+import errno
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def _next_id(state):
+    """ Returns a new job id, unique within the state directory and across runs """
+    with open(os.path.join(state, 'last_id'), 'a+') as id_file:
+        fcntl.lockf(id_file, fcntl.LOCK_EX)
+        id_file.seek(0)
+        last = id_file.read().strip()
+        # start from the time so that the /tmp/<id> directories of the PBS wrapper don't clash between runs
+        job_id = int(last) + 1 if last else int(time.time()) * 1000
+        id_file.seek(0)
+        id_file.truncate()
+        id_file.write(str(job_id))
+    return job_id
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+    return True
+
+
+def submit(state, args):
+    job_id = _next_id(state)
+    env = dict(os.environ, PBS_JOBID=str(job_id), PBS_QUEUE=args.q or 'batch')
+    with open(args.o, 'w') as stdout, open(args.e, 'w') as stderr:
+        # a session of its own so that the job outlives this command, like a job in the batch system
+        process = subprocess.Popen(args.script, stdout=stdout, stderr=stderr, env=env, close_fds=True,
+                                   preexec_fn=os.setsid)
+    with open(os.path.join(state, '%d.job' % job_id), 'w') as job_file:
+        job_file.write(str(process.pid))
+    print('%d.pbs' % job_id)
+    return 0
+
+
+def list_jobs(state):
+    for name in sorted(os.listdir(state)):
+        if not name.endswith('.job'):
+            continue
+        path = os.path.join(state, name)
+        with open(path) as job_file:
+            pid = int(job_file.read())
+        if _is_alive(pid):
+            # Job id, Name, User, Time Use, S, Queue as listed by qstat
+            print('%s.pbs ganga ganga 00:00:00 R batch' % name[:-len('.job')])
+        else:
+            os.remove(path)
+    return 0
+
+
+def kill(state, job_id):
+    path = os.path.join(state, '%s.job' % job_id.split('.')[0])
+    if not os.path.exists(path):
+        print('qdel: Unknown Job Id %s' % job_id)
+        return 0
+    with open(path) as job_file:
+        pid = int(job_file.read())
+    try:
+        os.killpg(pid, signal.SIGTERM)
+    except OSError:
+        pass
+    os.remove(path)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake PBS commands running the jobs as local processes')
+    parser.add_argument('--state', required=True, help='directory of the state of the fake batch system')
+    commands = parser.add_subparsers(dest='command')
+    submit_parser = commands.add_parser('submit')
+    submit_parser.add_argument('-q')
+    submit_parser.add_argument('-N')
+    submit_parser.add_argument('-e', required=True)
+    submit_parser.add_argument('-o', required=True)
+    submit_parser.add_argument('script', nargs='+')
+    commands.add_parser('list')
+    kill_parser = commands.add_parser('kill')
+    kill_parser.add_argument('id')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.state):
+        os.makedirs(args.state)
+    if args.command == 'submit':
+        return submit(args.state, args)
+    if args.command == 'list':
+        return list_jobs(args.state)
+    return kill(args.state, args.id)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
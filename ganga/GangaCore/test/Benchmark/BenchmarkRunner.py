@@ -0,0 +1,105 @@
+"""
+Helpers to run micro-benchmarks of Ganga internals and to track their regressions.
+
+A benchmark script in this directory defines a list of (name, statement) pairs and a function returning the names
+used by the statements, then calls main() from its __main__ block. Run from the ganga directory with
+PYTHONPATH=. it accepts::
+
+    [--number N] [--save FILE] [--compare FILE] [--tolerance F] [name ...]
+
+The time per operation of each benchmark is printed. With --save the results are written to a JSON file, with
+--compare they are checked against such a file and the script exits with 1 if any benchmark is slower than the
+saved one by more than the tolerance (0.25 = 25% by default).
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import timeit
+
+
+def timeStatement(stmt, namespace, number):
+    """
+    Return the time in seconds taken by number runs of stmt
+    Args:
+        stmt (str): the statement to time
+        namespace (dict): the names used by the statement
+        number (int): number of times the statement is run
+    """
+    code = 'def _bench(_number, _timer):\n    _t0 = _timer()\n    for _i in range(_number):\n        %s\n    return _timer() - _t0\n'
+    bench_ns = dict(namespace)
+    exec(compile(code % stmt, '<benchmark>', 'exec'), bench_ns)
+    return bench_ns['_bench'](number, timeit.default_timer)
+
+
+def runBenchmarks(benchmarks, namespace, number, names=None, repeat=3):
+    """
+    Run the benchmarks and return the dict of the time per operation in microseconds by benchmark name
+    Args:
+        benchmarks (list): (name, statement) of each benchmark
+        namespace (dict): the names used by the statements
+        number (int): number of times each statement is run
+        names (list): names of the benchmarks to run, all by default
+        repeat (int): the best of this many runs is kept to leave out the noise of other processes
+    """
+    results = {}
+    for name, stmt in benchmarks:
+        if names and name not in names:
+            continue
+        best = min(timeStatement(stmt, namespace, number) for _ in range(repeat))
+        results[name] = best / number * 1e6
+    return results
+
+
+def compareResults(results, reference, tolerance):
+    """
+    Return the list of (name, time, reference time) of the benchmarks slower than the reference by more than tolerance
+    Args:
+        results (dict): times per operation by benchmark name
+        reference (dict): saved times per operation by benchmark name
+        tolerance (float): allowed slow down as a fraction of the reference time
+    """
+    slower = []
+    for name in sorted(results):
+        if name in reference and results[name] > reference[name] * (1. + tolerance):
+            slower.append((name, results[name], reference[name]))
+    return slower
+
+
+def main(description, benchmarks, setup, argv=None, number=20000):
+    """
+    Command line entry point of a benchmark module, returns the exit code
+    Args:
+        description (str): description shown by --help
+        benchmarks (list): (name, statement) of each benchmark
+        setup (callable): returns the dict of the names used by the statements
+        argv (list): command line arguments, sys.argv by default
+        number (int): default number of runs of each benchmark
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--number', type=int, default=number, help='number of runs of each benchmark')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare the results with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slow down when comparing')
+    parser.add_argument('names', nargs='*', help='names of the benchmarks to run, all by default')
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(benchmarks, setup(), args.number, args.names)
+    for name, _ in benchmarks:
+        if name in results:
+            print('%-30s %10.3f us' % (name, results[name]))
+
+    if args.save:
+        with open(args.save, 'w') as out_file:
+            json.dump(results, out_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as in_file:
+            reference = json.load(in_file)
+        slower = compareResults(results, reference, args.tolerance)
+        for name, time, ref_time in slower:
+            print('%s is slower: %.3f us against %.3f us' % (name, time, ref_time))
+        if slower:
+            return 1
+    return 0
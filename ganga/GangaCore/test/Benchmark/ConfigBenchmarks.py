@@ -0,0 +1,42 @@
+"""
+Micro-benchmarks of reading configuration options, the way the monitoring loops do.
+
+    cd ganga
+    PYTHONPATH=. python GangaCore/test/Benchmark/ConfigBenchmarks.py --save config.json
+    PYTHONPATH=. python GangaCore/test/Benchmark/ConfigBenchmarks.py --compare config.json
+
+option_value is the lookup through the option levels which config[...] did on every read before the snapshots,
+so comparing it with getitem gives the speed up. See BenchmarkRunner for the options.
+"""
+
+import sys
+
+from GangaCore.Utility.Config.Config import PackageConfig
+
+from BenchmarkRunner import main
+
+
+def setup():
+    """ Returns the names used by the benchmarks """
+    config = PackageConfig('ConfigBenchmarks', 'options read by the config benchmarks')
+    config.addOption('timeout', 600, 'a plain option')
+    config.addOption('BENCHMARK_PATH', 'a:b', 'a PATH-like option')
+    config.setSessionValue('timeout', 300)
+    config.setSessionValue('BENCHMARK_PATH', 'c')
+    config.setUserValue('timeout', 100)
+    return {'config': config, 'option': config.options['timeout'], 'path_option': config.options['BENCHMARK_PATH'],
+            'snapshot': config.snapshot()}
+
+
+BENCHMARKS = [
+    ('option_value', 'option.value'),
+    ('option_value_path', 'path_option.value'),
+    ('getitem', 'config["timeout"]'),
+    ('getitem_path', 'config["BENCHMARK_PATH"]'),
+    ('snapshot_getitem', 'snapshot["timeout"]'),
+    ('snapshot', 'config.snapshot()'),
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main('Micro-benchmarks of the configuration reads', BENCHMARKS, setup))
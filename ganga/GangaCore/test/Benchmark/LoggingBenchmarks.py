@@ -0,0 +1,97 @@
+"""
+Benchmarks of the code paths which log at DEBUG for every job, with the logging at INFO as in a normal session.
+
+    cd ganga
+    PYTHONPATH=. python GangaCore/test/Benchmark/LoggingBenchmarks.py --save logging.json
+    PYTHONPATH=. python GangaCore/test/Benchmark/LoggingBenchmarks.py --compare logging.json
+
+select is RegistrySlice.do_select over 1000 objects, half of them out of range, and monitor_summary is one
+_checkActiveBackends pass of the monitoring over 1000 jobs in 10 backends. eager_debug and deferred_debug compare a
+single debug call formatting its message up front with one passing the arguments. See BenchmarkRunner for the options.
+"""
+
+import sys
+
+from GangaCore.Utility.Config import getConfig
+
+# no monitoring threads are needed to run the monitoring functions
+getConfig('PollThread').setSessionValue('autostart_monThreads', False)
+
+from GangaCore.Core.MonitoringComponent.Local_GangaMC_Service import JobRegistry_Monitor
+from GangaCore.GPIDev.Base import GangaObject
+from GangaCore.GPIDev.Lib.Registry.RegistrySlice import RegistrySlice
+from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem
+from GangaCore.Utility.logging import getLogger, lazy, _set_log_level
+
+from BenchmarkRunner import main
+
+NUMBER_OF_OBJECTS = 1000
+
+
+class BenchmarkLoggingObject(GangaObject):
+    _schema = Schema(Version(1, 0), {
+        'number': SimpleItem(42, typelist=[int]),
+    })
+    _category = 'BenchmarkLoggingObject'
+    _name = 'BenchmarkLoggingObject'
+
+    def __str__(self):
+        # printing a whole job is not cheap either
+        return '\n'.join('%s = %s' % (name, getattr(self, name)) for name, _ in self._schema.allItems())
+
+
+class BenchmarkBackend(object):
+    pass
+
+
+class BenchmarkJob(object):
+
+    def __init__(self, job_id, backend):
+        self.id = job_id
+        self.backend = backend
+
+    def getFQID(self, sep):
+        return str(self.id)
+
+
+class BenchmarkUpdateDict(object):
+
+    def addEntry(self, backendObj, checkingFunction, jobList, pollRate):
+        pass
+
+
+class BenchmarkMonitor(object):
+    _checkBackend = None
+    updateDict_ts = BenchmarkUpdateDict()
+
+
+def setup():
+    """ Returns the names used by the benchmarks """
+    logger = getLogger()
+    for name in ('GangaCore', 'GangaCore.GPIDev.Lib.Registry', 'GangaCore.Core.MonitoringComponent'):
+        _set_log_level(getLogger(name), 'INFO')
+
+    registry_slice = RegistrySlice('jobs', 'jobs')
+    for i in range(NUMBER_OF_OBJECTS):
+        registry_slice.objects[i] = BenchmarkLoggingObject()
+
+    backends = [BenchmarkBackend() for _ in range(10)]
+    active_backends = dict(('Backend%s' % i, [BenchmarkJob(j, backend) for j in range(i, NUMBER_OF_OBJECTS, 10)])
+                           for i, backend in enumerate(backends))
+
+    return {'logger': logger, 'lazy': lazy, 'jobs': active_backends['Backend0'], 'name': 'Backend0',
+            'registry_slice': registry_slice, 'minid': NUMBER_OF_OBJECTS // 2,
+            'checkActiveBackends': JobRegistry_Monitor._checkActiveBackends, 'monitor': BenchmarkMonitor(),
+            'activeBackends': lambda: active_backends}
+
+
+BENCHMARKS = [
+    ('select', 'registry_slice.do_select(lambda i, o: None, minid)'),
+    ('monitor_summary', 'checkActiveBackends(monitor, activeBackends, None)'),
+    ('eager_debug', 'logger.debug("Updating %s with %s." % (name, [x.id for x in jobs]))'),
+    ('deferred_debug', 'logger.debug("Updating %s with %s.", name, lazy(lambda: [x.id for x in jobs]))'),
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main('Benchmarks of the debug logging on the hot paths with the logging at INFO', BENCHMARKS, setup, number=200))
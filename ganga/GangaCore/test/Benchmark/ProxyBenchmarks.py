@@ -0,0 +1,61 @@
+"""
+Micro-benchmarks of the GPI proxies: getting and setting attributes and calling exported methods through a proxy.
+
+    cd ganga
+    PYTHONPATH=. python GangaCore/test/Benchmark/ProxyBenchmarks.py --save proxy.json
+    PYTHONPATH=. python GangaCore/test/Benchmark/ProxyBenchmarks.py --compare proxy.json
+
+See BenchmarkRunner for the options.
+"""
+
+import sys
+
+from GangaCore.GPIDev.Base import GangaObject
+from GangaCore.GPIDev.Base.Proxy import addProxy, stripProxy
+from GangaCore.GPIDev.Lib.File import LocalFile
+from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem, ComponentItem
+
+from BenchmarkRunner import main
+
+
+class BenchmarkGangaObject(GangaObject):
+    _schema = Schema(Version(1, 0), {
+        'number': SimpleItem(42, typelist=[int]),
+        'name': SimpleItem('name', typelist=[str]),
+        'names': SimpleItem(['a', 'b', 'c'], typelist=[str], sequence=1),
+        'file': ComponentItem('gangafiles', defvalue=None, optional=1, load_default=False),
+        'files': ComponentItem('gangafiles', defvalue=[], sequence=1),
+        'internal': SimpleItem(0, hidden=1),
+    })
+    _category = 'BenchmarkGangaObject'
+    _name = 'BenchmarkGangaObject'
+    _exportmethods = ['method']
+
+    def method(self, value=None):
+        return value
+
+
+def setup():
+    """ Returns the names used by the benchmarks """
+    obj = addProxy(BenchmarkGangaObject())
+    obj.file = LocalFile('a.txt')
+    obj.files = [LocalFile('%s.txt' % i) for i in range(10)]
+    return {'obj': obj, 'raw': stripProxy(obj), 'addProxy': addProxy, 'stripProxy': stripProxy}
+
+
+BENCHMARKS = [
+    ('get_simple', 'obj.number'),
+    ('get_sequence', 'obj.names'),
+    ('get_component', 'obj.file'),
+    ('get_component_sequence', 'obj.files'),
+    ('get_missing', 'hasattr(obj, "missing")'),
+    ('set_simple', 'obj.number = 7'),
+    ('set_string', 'obj.name = "other"'),
+    ('call_method', 'obj.method(1)'),
+    ('add_proxy', 'addProxy(raw)'),
+    ('strip_proxy', 'stripProxy(obj)'),
+]
+
+
+if __name__ == '__main__':
+    sys.exit(main('Micro-benchmarks of the GPI proxies', BENCHMARKS, setup))
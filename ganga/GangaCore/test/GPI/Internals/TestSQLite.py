@@ -0,0 +1,20 @@
+from __future__ import absolute_import
+
+from . import TestRepo as repo_tests
+from . import TestRegistry as registry_tests
+
+
+class TestSQLiteRepo(repo_tests.TestRepo):
+    """The repository hammer test, on the SQLite repository"""
+
+    def setUp(self):
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False'), ('Configuration', 'repositorytype', 'SQLite')]
+        super(repo_tests.TestRepo, self).setUp(extra_opts=extra_opts)
+
+
+class TestSQLiteRegistry(registry_tests.TestRegistry):
+    """The registry hammer test, on the SQLite repository"""
+
+    def setUp(self):
+        extra_opts = [('Configuration', 'repositorytype', 'SQLite')]
+        super(registry_tests.TestRegistry, self).setUp(extra_opts=extra_opts)
@@ -0,0 +1,65 @@
+from __future__ import absolute_import
+
+import datetime
+
+import pytest
+
+from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+from GangaCore.testlib.decorators import add_config
+
+job_names = ['a1', 'a2', 'b1']
+
+
+@add_config([('TestingFramework', 'AutoCleanup', 'False')])
+@pytest.mark.usefixtures('gpi')
+class TestLazyLoadingSelect(object):
+
+    def test_a_JobConstruction(self):
+        """ First construct the Job objects"""
+
+        from GangaCore.GPI import Job, jobs, Executable, Local
+
+        for name in job_names:
+            Job(name=name, application=Executable(), backend=Local())
+        assert len(jobs) == len(job_names)
+
+    def test_b_SelectFromIndex(self):
+        """ Selecting on indexed attributes doesn't load any job"""
+
+        from GangaCore.GPI import jobs, Executable, Local, Interactive
+
+        def loaded():
+            return [j.id for j in jobs if stripProxy(j)._getRegistry().has_loaded(stripProxy(j))]
+
+        assert len(jobs) == len(job_names)
+        assert loaded() == []
+
+        assert len(jobs.select(status='new')) == len(job_names)
+        assert len(jobs.select(status='completed')) == 0
+        assert len(jobs.select(name='a*')) == 2
+        assert len(jobs.select(application=Executable)) == len(job_names)
+        assert len(jobs.select(backend=Local)) == len(job_names)
+        assert len(jobs.select(backend=Interactive)) == 0
+        assert len(jobs.select(subjobs=0)) == len(job_names)
+        assert len(jobs.select(1, 2, status='new', name='*1')) == 1
+
+        now = datetime.datetime.utcnow()
+        assert len(jobs.select(time=(None, now))) == len(job_names)
+        assert len(jobs.select(time=(now, None))) == 0
+        assert len(jobs.select(time={'submitted': (None, now)})) == 0
+
+        assert loaded() == []
+
+    def test_c_SelectLoadedJobs(self):
+        """ Loaded and not loaded jobs give the same answer"""
+
+        from GangaCore.GPI import jobs, Local
+
+        jobs(0).name = 'b2'
+
+        assert stripProxy(jobs(0))._getRegistry().has_loaded(stripProxy(jobs(0)))
+        assert not stripProxy(jobs(1))._getRegistry().has_loaded(stripProxy(jobs(1)))
+
+        assert [j.id for j in jobs.select(name='b*')] == [0, 2]
+        assert [j.id for j in jobs.select(name='a*', backend=Local)] == [1]
@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+
+import time
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+master_timeout = 300.
+
+
+def monitorUntilDone(someJob):
+    from GangaCore.GPI import runMonitoring
+    my_timeout = 0.
+    while someJob.status not in ['completed', 'failed', 'killed', 'removed'] and my_timeout < master_timeout:
+        runMonitoring()
+        time.sleep(1.)
+        my_timeout += 1.
+
+
+class TestActiveJobs(GangaUnitTest):
+
+    def setUp(self):
+        extra_opts = [('PollThread', 'autostart', 'False'), ('PollThread', 'base_poll_rate', 1)]
+        super(TestActiveJobs, self).setUp(extra_opts=extra_opts)
+
+    def test_a_ActiveJobsTracked(self):
+        """Only the jobs which are submitted or running are kept by the monitoring"""
+        from GangaCore.GPI import Job, Executable, runMonitoring, disableMonitoring
+        from GangaCore.Core import monitoring_component
+
+        # Make sure the monitoring only runs when we ask for it
+        disableMonitoring()
+
+        Job()
+        j = Job(application=Executable(exe='sleep', args=['10']))
+        j.submit()
+
+        self.assertTrue(runMonitoring())
+        self.assertEqual(monitoring_component._activeJobs.keys(), [j.id])
+        self.assertEqual(monitoring_component._activeJobs[j.id], 'Local')
+
+        monitorUntilDone(j)
+        self.assertEqual(j.status, 'completed')
+
+        # The status change is picked up without the registry being scanned again
+        self.assertTrue(runMonitoring())
+        self.assertEqual(monitoring_component._activeJobs, {})
+
+    def test_b_JobBunches(self):
+        """Jobs are handed to the backend in bunches of roughly equal size, without splitting up subjobs"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.MonitoringComponent.Local_GangaMC_Service import get_jobs_in_bunches
+
+        jobs_to_bunch = [Job() for _ in range(5)]
+        split_job = Job(splitter=ArgSplitter(args=[[str(i)] for i in range(4)]))
+        split_job.submit()
+        jobs_to_bunch.insert(2, split_job)
+
+        bunches = get_jobs_in_bunches(jobs_to_bunch, blocks_of_size=3)
+        self.assertEqual([[j.id for j in bunch] for bunch in bunches], [[j.id for j in jobs_to_bunch[:3]], [j.id for j in jobs_to_bunch[3:]]])
+        self.assertTrue(all(j is stripProxy(j) for bunch in bunches for j in bunch))
+
+    def test_c_AdaptiveBatchSize(self):
+        """The number of jobs per monitoring call follows the time the backend takes to answer"""
+        from GangaCore.Utility.Config import getConfig
+        from GangaCore.Core.MonitoringComponent.Local_GangaMC_Service import _BackendPollState
+
+        target = getConfig('PollThread')['monitoring_batch_target_time']
+        max_size = getConfig('PollThread')['max_monitoring_batch_size']
+
+        state = _BackendPollState(10)
+        state.adapt(10, 0.)
+        self.assertEqual(state.batch_size, 20)
+        # a call with fewer jobs than the batch size says nothing about larger batches
+        state.adapt(5, 0.)
+        self.assertEqual(state.batch_size, 20)
+        state.adapt(20, target * 2)
+        self.assertEqual(state.batch_size, 10)
+
+        for _ in range(20):
+            state.adapt(state.batch_size, 0.)
+        self.assertEqual(state.batch_size, max_size)
+        for _ in range(20):
+            state.adapt(state.batch_size, target * 2)
+        self.assertEqual(state.batch_size, 1)
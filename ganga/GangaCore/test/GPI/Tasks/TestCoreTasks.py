@@ -121,3 +121,25 @@ class TestCoreTasks(GangaUnitTest):
                 assert t.transforms[0].unit_splitter.values == ['arg 1', 'arg 2', 'arg 3']
                 assert t.float == 20
 
+
+    def test_g_UnitStatusCounts(self):
+        """The transforms keep count of the status of their units"""
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        t = self.createTask()
+        trf = stripProxy(t.transforms[0])
+        trf.createUnits()
+
+        assert trf.unitStatusCounts()['hold'] == 3
+        trf.units[0].updateStatus("running")
+        trf.units[1].updateStatus("completed")
+        counts = trf.unitStatusCounts()
+        assert (counts['hold'], counts['running'], counts['completed']) == (1, 1, 1)
+
+        # the status is also set directly by transforms and users
+        trf.units[2].status = "bad"
+        counts = trf.unitStatusCounts()
+        assert (counts['hold'], counts['running'], counts['completed'], counts['bad']) == (0, 1, 1, 1)
+
+        trf.updateStatusFromUnits()
+        assert trf.status == "running"
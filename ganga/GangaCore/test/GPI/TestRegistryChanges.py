@@ -0,0 +1,42 @@
+from __future__ import absolute_import
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestRegistryChanges(GangaUnitTest):
+
+    def setUp(self):
+        super(TestRegistryChanges, self).setUp(extra_opts=[('PollThread', 'autostart', 'False')])
+
+    def test_a_ChangeFeed(self):
+        """Adding, changing and removing jobs is seen by the consumers of the change feed"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository import getRegistry
+        from GangaCore.Core.GangaRepository.Registry import RegistryChangeFeed
+
+        registry = getRegistry('jobs')
+        j1 = Job()
+        # The first poll returns every job
+        assert registry.pollChangedJobs('Test') == [j1.id]
+        assert registry.pollChangedJobs('Test') == []
+
+        j2 = Job(splitter=ArgSplitter(args=[['a'], ['b']]))
+        raw_j2 = stripProxy(j2)
+        for i, sj in enumerate(raw_j2.splitter.split(raw_j2)):
+            sj.id = i
+            raw_j2.subjobs.append(sj)
+        changes = registry.pollChanges('Test')
+        assert RegistryChangeFeed.ADDED in changes[0].fields
+        assert set(change.id for change in changes) == set([j2.id])
+
+        stripProxy(j1).updateStatus('submitting')
+        stripProxy(j2.subjobs(1)).updateStatus('submitting', update_master=False)
+        changes = registry.pollChanges('Test')
+        assert [(change.id, change.fields) for change in changes] == [(j1.id, frozenset(['status'])),
+                                                                      (j2.id, frozenset(['subjobs:status']))]
+
+        j1_id = j1.id
+        j1.remove()
+        assert registry.pollChangedJobs('Test') == [j1_id]
+        assert RegistryChangeFeed.REMOVED in registry.changes.since(registry.changes.lastSeq() - 1)[0].fields
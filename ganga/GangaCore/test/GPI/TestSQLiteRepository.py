@@ -0,0 +1,144 @@
+from __future__ import absolute_import
+
+from os import path
+
+import pytest
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+testArgs = [[str(i)] for i in range(5)]
+
+
+def splitJob(this_job):
+    """ Add the subjobs of a job without submitting it, so that nothing else changes them """
+    from GangaCore.GPIDev.Base.Proxy import stripProxy
+    raw_job = stripProxy(this_job)
+    for i, sj in enumerate(raw_job.splitter.split(raw_job)):
+        sj.id = i
+        raw_job.subjobs.append(sj)
+    raw_job._getRegistry().flush_all()
+
+
+def makeRepository(name):
+    """ Returns a started SQLite repository for a registry of test objects, as a separate session would have it """
+    from GangaCore.Core.GangaRepository.Registry import makeRepository
+    from GangaCore.Runtime.Repository_runtime import getLocalRoot
+    from .Internals.TestRepo import FakeRegistry
+    registry = FakeRegistry(name)
+    registry.type = 'SQLite'
+    registry.location = getLocalRoot()
+    registry.repo = makeRepository(registry)
+    registry.repo.startup()
+    return registry.repo
+
+
+class TestSQLiteRepository(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests. The jobs are kept as XML until migrated"""
+        extra_opts = [('PollThread', 'autostart', 'False'), ('TestingFramework', 'AutoCleanup', 'False')]
+        if self._testMethodName >= 'test_c':
+            extra_opts.append(('Configuration', 'registryTypes', {'jobs': 'SQLite'}))
+        super(TestSQLiteRepository, self).setUp(extra_opts=extra_opts)
+
+    def test_a_XMLJobs(self):
+        """Write some jobs to the XML repository"""
+        from GangaCore.GPI import Job, ArgSplitter
+
+        splitJob(Job(name='migrated', splitter=ArgSplitter(args=testArgs)))
+        Job(name='plain')
+
+    def test_b_Migrate(self):
+        """The jobs are copied to the database, which can only be done once"""
+        from GangaCore.Core.exceptions import GangaException
+        from GangaCore.Core.GangaRepository.GangaRepositorySQLite import migrateXMLRegistry
+        from GangaCore.Runtime.Repository_runtime import getLocalRoot
+
+        assert migrateXMLRegistry('jobs') >= 2
+        assert path.isfile(path.join(getLocalRoot(), '6.0', 'jobs.db'))
+
+        with pytest.raises(GangaException):
+            migrateXMLRegistry('jobs')
+
+    def test_c_LoadMigrated(self):
+        """The migrated jobs are read from the database, the subjobs only when needed"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository import getRegistry
+        from GangaCore.Core.GangaRepository.GangaRepositorySQLite import GangaRepositorySQLite, SubJobSQLiteList
+
+        assert isinstance(getRegistry('jobs').repository, GangaRepositorySQLite)
+        assert len(jobs) == 2
+        assert jobs(1).name == 'plain'
+
+        j = jobs(0)
+        assert j.name == 'migrated'
+        subjobs = stripProxy(j).subjobs
+        assert isinstance(subjobs, SubJobSQLiteList)
+        assert len(j.subjobs) == len(testArgs)
+        assert subjobs.getAllSJStatus() == ['new'] * len(testArgs)
+        assert not any(subjobs.isLoaded(i) for i in range(len(testArgs)))
+
+        assert j.subjobs(3).application.args == testArgs[3]
+        assert subjobs.isLoaded(3)
+        assert not subjobs.isLoaded(2)
+
+    def test_d_NewJob(self):
+        """New jobs and changes to subjobs are written to the database"""
+        from GangaCore.GPI import Job, ArgSplitter, jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(name='sqlite', splitter=ArgSplitter(args=testArgs))
+        splitJob(j)
+        assert j.id == 2
+
+        j.subjobs(2).comment = 'changed'
+        assert not stripProxy(j)._own_dirty_gen
+        stripProxy(j)._getRegistry().flush_all()
+        assert not stripProxy(j)._dirty
+
+        assert len(jobs.select(name='sqlite')) == 1
+
+    def test_e_Persisted(self):
+        """The new job and its subjobs can be read back and selected on"""
+        from GangaCore.GPI import jobs
+        from GangaCore.Core.GangaRepository import getRegistry
+
+        j = jobs(2)
+        assert len(j.subjobs) == len(testArgs)
+        assert j.subjobs(2).comment == 'changed'
+        assert [sj.application.args for sj in j.subjobs] == testArgs
+
+        repository = getRegistry('jobs').repository
+        assert repository.select_ids(name='sqlite') == [2]
+        assert repository.select_ids(status='new') == [0, 1, 2]
+        assert repository.select_ids(name='sqlite', status='completed') == []
+
+    def test_f_Locks(self):
+        """Objects locked by one session can't be locked by another until released"""
+        from GangaTest.Lib.TestObjects import TestGangaObject
+
+        repo1 = makeRepository('LockTest')
+        repo2 = makeRepository('LockTest')
+        try:
+            ids = repo1.add([TestGangaObject('a'), TestGangaObject('b')])
+            repo1.flush(ids)
+
+            repo2.update_index()
+            assert sorted(repo2.objects) == sorted(ids)
+            assert repo2.lock(ids) == []
+            assert repo2.get_lock_session(ids[0]) is not None
+            assert len(repo2.get_other_sessions()) == 1
+
+            repo1.unlock([ids[0]])
+            assert repo2.lock(ids) == [ids[0]]
+            repo2.load([ids[0]])
+            assert repo2.objects[ids[0]].name == 'a'
+
+            repo1.delete([ids[1]])
+            repo2.update_index()
+            assert ids[1] not in repo2.objects
+            repo2.sessionlock.check()
+        finally:
+            repo1.shutdown()
+            repo2.shutdown()
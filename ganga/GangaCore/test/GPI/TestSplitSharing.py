@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestSplitSharing(GangaUnitTest):
+
+    def _split(self):
+        from GangaCore.GPI import Job, Executable, ArgSplitter, Local, LocalFile
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(application=Executable(exe='echo'), backend=Local(), outputfiles=[LocalFile('out.txt')],
+                splitter=ArgSplitter(args=[['arg%s' % i] for i in range(3)]))
+        rj = stripProxy(j)
+        return rj, rj.splitter.validatedSplit(rj)
+
+    def test_a_SharedUntilUsed(self):
+        """Subjobs share the components of the master until they're used and then get their own copy"""
+        from GangaCore.GPIDev.Base.Objects import LazyCopy
+
+        rj, subjobs = self._split()
+        self.assertEqual(len(subjobs), 3)
+
+        shared = [sj._data['backend'] for sj in subjobs]
+        self.assertTrue(all(value.__class__ is LazyCopy for value in shared))
+        self.assertTrue(shared[0].source is shared[1].source is shared[2].source)
+
+        backend = subjobs[0].backend
+        self.assertFalse(backend.__class__ is LazyCopy)
+        self.assertTrue(backend is not rj.backend)
+        self.assertTrue(backend._getParent() is subjobs[0])
+        self.assertTrue(subjobs[0]._data['backend'] is backend)
+
+        backend.nice = 10
+        self.assertEqual(rj.backend.nice, 0)
+        self.assertEqual(subjobs[1].backend.nice, 0)
+
+        # The arguments are set by the splitter so every subjob has its own application
+        for i, sj in enumerate(subjobs):
+            self.assertEqual(sj.application.args, ['arg%s' % i])
+        self.assertEqual(rj.application.args, ['Hello World'])
+
+    def test_b_StreamedWithoutCopying(self):
+        """A subjob is written out the same whether it still shares components or not"""
+        from StringIO import StringIO
+        from GangaCore.GPIDev.Base.Objects import LazyCopy
+        from GangaCore.Core.GangaRepository.VStreamer import to_file
+
+        rj, subjobs = self._split()
+        sj = subjobs[1]
+
+        lazy_xml = StringIO()
+        to_file(sj, lazy_xml)
+        self.assertTrue(sj._data['outputfiles'].__class__ is LazyCopy)
+
+        for name in ['backend', 'outputfiles', 'postprocessors', 'info', 'time']:
+            getattr(sj, name)
+        self.assertFalse(sj._data['outputfiles'].__class__ is LazyCopy)
+        full_xml = StringIO()
+        to_file(sj, full_xml)
+
+        self.assertEqual(lazy_xml.getvalue(), full_xml.getvalue())
+
+    def test_c_Submit(self):
+        """Jobs split with shared components submit and persist as before"""
+        from GangaCore.GPI import Job, Executable, ArgSplitter, Local, LocalFile, jobs
+        from GangaTest.Framework.utils import sleep_until_completed
+
+        j = Job(application=Executable(exe='touch'), backend=Local(), outputfiles=[LocalFile('out*.txt')],
+                splitter=ArgSplitter(args=[['out%s.txt' % i] for i in range(3)]))
+        j.submit()
+        self.assertTrue(sleep_until_completed(j, 60), 'Timeout on completing job')
+
+        for i, sj in enumerate(jobs(j.id).subjobs):
+            self.assertEqual(sj.application.args, ['out%s.txt' % i])
+            self.assertEqual(sj.outputfiles[0].namePattern, 'out%s.txt' % i)
+
+    def test_d_ConcurrentFirstRead(self):
+        """Threads reading a shared component at the same time all get the same copy"""
+        import threading
+        from GangaCore.GPIDev.Base.Objects import LazyCopy
+
+        rj, subjobs = self._split()
+        sj = subjobs[0]
+        lazy = sj._data['backend']
+        copying = threading.Event()
+        release = threading.Event()
+        materialise = LazyCopy.materialise
+
+        # the first reader is held until the second one has swapped in its copy
+        def slowMaterialise(this, obj, name):
+            if not copying.is_set():
+                copying.set()
+                release.wait(10)
+            return materialise(this, obj, name)
+
+        results = []
+        LazyCopy.materialise = slowMaterialise
+        try:
+            first = threading.Thread(target=lambda: results.append(lazy.materialise(sj, 'backend')))
+            first.start()
+            copying.wait(10)
+            results.append(sj.backend)
+            release.set()
+            first.join()
+        finally:
+            LazyCopy.materialise = materialise
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(results[0] is results[1])
+        self.assertTrue(sj._data['backend'] is results[0])
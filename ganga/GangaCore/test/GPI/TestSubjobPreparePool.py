@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestSubjobPreparePool(GangaUnitTest):
+
+    def setUp(self):
+        extra_opts = [('Configuration', 'subjobPrepareProcesses', 2),
+                      ('Configuration', 'subjobPrepareProcessesMinSubjobs', 1),
+                      ('PollThread', 'autostart', 'False')]
+        super(TestSubjobPreparePool, self).setUp(extra_opts=extra_opts)
+
+    def test_a_ConfigRoundTrip(self):
+        """Configs with GangaObjects in them survive the trip back from the worker processes"""
+        from GangaCore.GPI import File
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.GPIDev.Adapters.StandardJobConfig import StandardJobConfig
+        from GangaCore.GPIDev.Lib.Job.SubjobPreparePool import dumps_config, loads_config
+
+        config = StandardJobConfig(exe=stripProxy(File('/bin/echo')), args=['a', 'b'], outputbox=['stdout'])
+        new_config = loads_config(dumps_config(config))
+
+        self.assertEqual(new_config.getExeString(), config.getExeString())
+        self.assertEqual(new_config.getArgStrings(), ['a', 'b'])
+        self.assertEqual(new_config.getOutputSandboxFiles(), ['stdout'])
+        self.assertEqual(stripProxy(new_config.exe).name, '/bin/echo')
+
+    def test_b_SameAsInProcess(self):
+        """The configs prepared by the worker processes match the ones prepared in the session"""
+        from GangaCore.GPI import Job, Executable, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.GPIDev.Lib.Job.SubjobPreparePool import prepare_subjob_configs
+
+        j = Job(application=Executable(exe='echo'), splitter=ArgSplitter(args=[['arg%s' % i] for i in range(10)]))
+        rj = stripProxy(j)
+        rj.application.prepare()
+        subjobs = rj.splitter.split(rj)
+
+        rtHandler = rj._getRuntimeHandler()
+        appmasterconfig = rj._getMasterAppConfig()
+        jobmasterconfig = rj._getJobMasterConfig()
+        appsubconfig = rj._getAppSubConfig(subjobs)
+        apps = [sj.application for sj in subjobs]
+
+        in_process = [rtHandler.prepare(app, c, appmasterconfig, jobmasterconfig) for app, c in zip(apps, appsubconfig)]
+        in_workers = prepare_subjob_configs(rtHandler, apps, appsubconfig, appmasterconfig, jobmasterconfig, 2)
+
+        self.assertEqual([c.getArgStrings() for c in in_workers], [c.getArgStrings() for c in in_process])
+        self.assertEqual([c.getExeString() for c in in_workers], [c.getExeString() for c in in_process])
+
+    def test_c_Submit(self):
+        """A split job is submitted with its subjobs prepared in worker processes"""
+        from GangaCore.GPI import Job, Executable, ArgSplitter
+
+        j = Job(application=Executable(exe='echo'), splitter=ArgSplitter(args=[['arg%s' % i] for i in range(4)]))
+        j.submit()
+
+        self.assertEqual(len(j.subjobs), 4)
+        for sj in j.subjobs:
+            self.assertNotEqual(sj.status, 'new')
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+from os import listdir, path
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+from .utilFunctions import getXMLDir, getSJXMLFile
+
+testArgs = [[str(i)] for i in range(5)]
+
+
+def getContainerFile(this_job):
+    """ Returns the path of the file holding all subjobs of a job """
+    return path.join(getXMLDir(this_job), 'subjobs.pack')
+
+
+def getSJDirs(this_job):
+    """ Returns the names of the per-subjob directories of a job """
+    return sorted(d for d in listdir(getXMLDir(this_job)) if d.isdigit())
+
+
+def flushSubJob(this_job, sj_id):
+    """ Mark one subjob as changed and flush the registry """
+    from GangaCore.GPIDev.Base.Proxy import stripProxy
+    raw_job = stripProxy(this_job)
+    stripProxy(raw_job.subjobs(sj_id))._setDirty()
+    raw_job._getRegistry().flush_all()
+
+
+class TestSJContainer(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job object isn't destroyed between tests"""
+        extra_opts = [('Configuration', 'subjobContainer', True), ('PollThread', 'autostart', 'False'),
+                      ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSJContainer, self).setUp(extra_opts=extra_opts)
+
+    def test_a_SubmitPacked(self):
+        """The subjobs of a new job are written to a single container"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(splitter=ArgSplitter(args=testArgs))
+        j.submit()
+        stripProxy(j)._getRegistry().flush_all()
+
+        assert path.isfile(getContainerFile(j))
+        assert getSJDirs(j) == []
+
+    def test_b_LoadPacked(self):
+        """The subjobs are read back from the container, one at a time"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        subjobs = stripProxy(j).subjobs
+        assert subjobs.isPacked()
+        assert len(j.subjobs) == len(testArgs)
+        assert subjobs.getAllSJStatus() == ['submitted'] * len(testArgs)
+        assert not any(subjobs.isLoaded(i) for i in range(len(testArgs)))
+
+        assert j.subjobs(3).application.args == testArgs[3]
+        assert subjobs.isLoaded(3)
+        assert not subjobs.isLoaded(2)
+
+        container_size = path.getsize(getContainerFile(j))
+        flushSubJob(j, 2)
+        assert path.getsize(getContainerFile(j)) > container_size
+        assert getSJDirs(j) == []
+
+    def test_c_Unpack(self):
+        """The subjobs go back to a directory each once the container is switched off"""
+        from GangaCore.GPI import jobs
+        from GangaCore.Utility.Config import getConfig
+
+        getConfig('Configuration').setUserValue('subjobContainer', False)
+        j = jobs(0)
+        flushSubJob(j, 1)
+
+        assert not path.isfile(getContainerFile(j))
+        assert getSJDirs(j) == [str(i) for i in range(len(testArgs))]
+        for i in range(len(testArgs)):
+            assert path.isfile(getSJXMLFile((0, i)))
+        assert [sj.application.args for sj in j.subjobs] == testArgs
+
+    def test_d_Pack(self):
+        """Subjobs in a directory each are moved into the container the next time they are written"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        assert not stripProxy(j).subjobs.isPacked()
+        flushSubJob(j, 4)
+
+        assert path.isfile(getContainerFile(j))
+        assert getSJDirs(j) == []
+        assert stripProxy(j).subjobs.isPacked()
+        assert [sj.application.args for sj in j.subjobs] == testArgs
+        assert stripProxy(j).subjobs._container.statuses() == [sj.status for sj in j.subjobs]
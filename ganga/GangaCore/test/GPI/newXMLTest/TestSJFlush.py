@@ -0,0 +1,147 @@
+from __future__ import absolute_import
+
+from os import path, stat
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+from .utilFunctions import getXMLFile, getSJXMLFile, getSJXMLIndex
+
+testArgs = [[str(i)] for i in range(5)]
+
+
+def getModified(this_file):
+    """ Returns the modification time and size of a file """
+    return stat(this_file).st_mtime, path.getsize(this_file)
+
+
+def getAllModified(this_job):
+    """ Returns the modification times of the master XML, the subjob index and each subjob XML of a job """
+    files = [getXMLFile(this_job), getSJXMLIndex(this_job)] + [getSJXMLFile((this_job.id, i)) for i in range(len(testArgs))]
+    return dict((this_file, getModified(this_file)) for this_file in files)
+
+
+class TestSJFlush(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job object isn't destroyed between tests"""
+        extra_opts = [('PollThread', 'autostart', 'False'), ('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSJFlush, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """Construct a job with subjobs and write it out, without submitting so that nothing else changes it"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(splitter=ArgSplitter(args=testArgs))
+        for i, sj in enumerate(stripProxy(j.splitter).split(stripProxy(j))):
+            sj.id = i
+            stripProxy(j).subjobs.append(sj)
+        stripProxy(j)._getRegistry().flush_all()
+        assert not stripProxy(j)._dirty
+
+    def test_b_FlushOneSubJob(self):
+        """A change to one subjob only writes out that subjob and the subjob index"""
+        import time
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        raw_j = stripProxy(j)
+        registry = raw_j._getRegistry()
+        # Load all of the subjobs so that they could be written
+        assert [sj.application.args for sj in j.subjobs] == testArgs
+
+        before = getAllModified(j)
+        time.sleep(1.1)
+
+        raw_sj = stripProxy(j.subjobs(2))
+        raw_sj.comment = 'changed'
+        assert raw_sj._dirty
+        assert raw_j._dirty
+        assert raw_j._own_dirty_gen == 0
+
+        bytes_before = registry.bytesWritten()
+        registry.flush_all()
+        bytes_written = registry.bytesWritten() - bytes_before
+
+        after = getAllModified(j)
+        changed = sorted(this_file for this_file in before if before[this_file] != after[this_file])
+        assert changed == sorted([getSJXMLIndex(j), getSJXMLFile((0, 2))])
+        assert bytes_written == after[getSJXMLIndex(j)][1] + after[getSJXMLFile((0, 2))][1]
+
+        assert not raw_sj._dirty
+        assert not raw_j._dirty
+
+        # Nothing left to write out
+        bytes_before = registry.bytesWritten()
+        registry.flush_all()
+        assert registry.bytesWritten() == bytes_before
+
+    def test_c_FlushMaster(self):
+        """A change to the master job writes out the master but none of the subjobs"""
+        import time
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        assert j.subjobs(2).comment == 'changed'
+        before = getAllModified(j)
+        time.sleep(1.1)
+
+        j.comment = 'master changed'
+        assert stripProxy(j)._own_dirty_gen
+        stripProxy(j)._getRegistry().flush_all()
+
+        after = getAllModified(j)
+        changed = sorted(this_file for this_file in before if before[this_file] != after[this_file])
+        assert changed == [getXMLFile(j)]
+
+    def test_d_ChangedDuringFlush(self):
+        """Changes made while an object is being written out leave it dirty"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        raw_j = stripProxy(j)
+        repository = raw_j._getRegistry().repository
+        raw_sj = stripProxy(j.subjobs(1))
+        raw_sj._setDirty()
+
+        original_flush = repository._safe_flush_xml
+
+        def flush_and_change(this_id):
+            original_flush(this_id)
+            raw_sj._setDirty()
+
+        repository._safe_flush_xml = flush_and_change
+        try:
+            raw_j._getRegistry().flush_all()
+        finally:
+            del repository._safe_flush_xml
+
+        assert raw_j._dirty
+        assert raw_sj._dirty
+
+        raw_j._getRegistry().flush_all()
+        assert not raw_j._dirty
+        assert not raw_sj._dirty
+
+    def test_e_FlusherCounters(self):
+        """The flusher counts the bytes written out by each cycle"""
+        from GangaCore.GPI import jobs
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository.Registry import RegistryFlusher
+
+        j = jobs(0)
+        registry = stripProxy(j)._getRegistry()
+        flusher = RegistryFlusher(registry, 'Test_Flusher', auto_register=False)
+
+        flusher.flush_cycle()
+        assert flusher.cycles == 1
+        assert flusher.last_cycle_bytes == 0
+
+        stripProxy(j.subjobs(3))._setDirty()
+        flusher.flush_cycle()
+        assert flusher.cycles == 2
+        assert flusher.last_cycle_bytes > path.getsize(getSJXMLFile((0, 3)))
+        assert flusher.total_bytes == flusher.last_cycle_bytes
@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+from cStringIO import StringIO
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+class TestXMLLoader(GangaUnitTest):
+
+    def setUp(self):
+        extra_opts = [('PollThread', 'autostart', 'False')]
+        super(TestXMLLoader, self).setUp(extra_opts=extra_opts)
+
+    def test_a_Values(self):
+        """Values come back the same as they were written, without sharing mutable ones"""
+        from GangaCore.Core.GangaRepository.VStreamer import _eval_value
+
+        for value in [None, True, False, 0, 7, -3, 10L, 1.5, '', 'abc', "it's", '"quoted"', 'a\\b\n', u'unicode',
+                      [1, 'a'], ('a', 2), {'A': '1', 'B': ['x']}]:
+            loaded = _eval_value(repr(value))
+            self.assertEqual(loaded, value)
+            self.assertEqual(type(loaded), type(value))
+
+        # Not a decimal number
+        self.assertEqual(_eval_value('010'), 8)
+        # Parsed from unicode as the XML parser hands it over
+        self.assertEqual(_eval_value(u"'abc'"), 'abc')
+        self.assertEqual(type(_eval_value(u"'abc'")), str)
+
+        first = _eval_value("{'a': []}")
+        first['a'].append(1)
+        self.assertEqual(_eval_value("{'a': []}"), {'a': []})
+
+    def test_b_ValueCacheBounded(self):
+        """The cache of values doesn't grow forever"""
+        from GangaCore.Core.GangaRepository import VStreamer
+
+        for i in range(VStreamer._MAX_CACHED_VALUES + 10):
+            VStreamer._eval_value('[%s]' % i)
+        self.assertLessEqual(len(VStreamer._cached_eval_strings), VStreamer._MAX_CACHED_VALUES)
+
+    def test_c_ParseFile(self):
+        """Loading from a file object gives the same object as loading from a string"""
+        from GangaCore.GPI import Job, Executable, LocalFile, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository.VStreamer import to_file, from_file, Loader
+        from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
+
+        j = Job(name='<name & "more">', application=Executable(args=['a', "b'c"], env={'A': '1'}),
+                inputfiles=[LocalFile('a.txt')], splitter=ArgSplitter(args=[['1'], ['2']]))
+        out = StringIO()
+        to_file(stripProxy(j), out, 'subjobs')
+        xml = out.getvalue()
+
+        from_string, errors = Loader().parse(xml)
+        self.assertEqual(errors, [])
+        loaded, errors = from_file(StringIO(xml))
+        self.assertEqual(errors, [])
+
+        rewritten = []
+        for obj in (from_string, loaded):
+            self.assertEqual(obj.name, '<name & "more">')
+            self.assertEqual(obj.application.args, ['a', "b'c"])
+            self.assertEqual(obj.application.env, {'A': '1'})
+            self.assertEqual(obj.inputfiles[0].namePattern, 'a.txt')
+            self.assertEqual(obj.splitter.args, [['1'], ['2']])
+            # sequences are loaded as GangaLists belonging to the object, as are their items
+            self.assertTrue(isinstance(obj._data['inputfiles'], GangaList))
+            self.assertFalse(obj._data['inputfiles']._is_preparable)
+            self.assertIs(obj._data['inputfiles']._getParent(), obj)
+            self.assertIs(obj._data['inputfiles'][0]._getParent(), obj)
+            out = StringIO()
+            to_file(obj, out, 'subjobs')
+            rewritten.append(out.getvalue())
+        self.assertEqual(rewritten[0], rewritten[1])
+
+    def test_d_UnknownClass(self):
+        """A class which isn't known is loaded as an empty object and reported"""
+        from GangaCore.Core.GangaRepository.VStreamer import from_file, EmptyGangaObject
+        from GangaCore.Utility.Plugin import PluginManagerError
+
+        xml = '<root>\n <class name="NoSuchClass" version="1.0" category="applications">\n' \
+              '  <attribute name="exe"> \n   <value>\'echo\'</value>\n  </attribute>\n </class>\n</root>\n'
+        obj, errors = from_file(StringIO(xml))
+        self.assertTrue(isinstance(obj, EmptyGangaObject))
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], PluginManagerError))
@@ -0,0 +1,136 @@
+from __future__ import absolute_import
+
+import time
+from cStringIO import StringIO
+
+from GangaCore.testlib.GangaUnitTest import GangaUnitTest
+
+
+def fastXML(obj, ignore_subs=[]):
+    """Returns the XML written by to_file"""
+    from GangaCore.Core.GangaRepository.VStreamer import to_file
+    out = StringIO()
+    to_file(obj, out, ignore_subs)
+    return out.getvalue()
+
+
+def visitorXML(obj, ignore_subs=[]):
+    """Returns the XML written by the VStreamer visitor"""
+    from GangaCore.Core.GangaRepository.VStreamer import _raw_to_file
+    out = StringIO()
+    _raw_to_file(obj, out, ignore_subs if isinstance(ignore_subs, list) else [ignore_subs])
+    return out.getvalue()
+
+
+class NotStreamable(object):
+    """A value the fast path leaves to the visitor"""
+
+    def __getattr__(self, name):
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return "'not streamable'"
+
+
+class TestXMLStreamer(GangaUnitTest):
+
+    def setUp(self):
+        extra_opts = [('PollThread', 'autostart', 'False')]
+        super(TestXMLStreamer, self).setUp(extra_opts=extra_opts)
+
+    def test_a_SimpleJob(self):
+        """A default job is written byte for byte the same as by the visitor"""
+        from GangaCore.GPI import Job
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = stripProxy(Job())
+        self.assertEqual(fastXML(j), visitorXML(j))
+
+    def test_b_AllKindsOfValues(self):
+        """Strings needing escaping, unicode, dicts, None, nested lists and file objects are all written the same"""
+        from GangaCore.GPI import Job, Executable, File, LocalFile, ArgSplitter, GangaDataset
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(name='<a & "b">')
+        j.application = Executable(exe=File('/bin/echo'), args=['1', "'quoted'", '<&>'], env={'A': '1', 'B': '<b>'})
+        j.inputfiles = [LocalFile('a.txt'), LocalFile('b.txt')]
+        j.inputdata = GangaDataset(files=[LocalFile('c.txt')])
+        j.outputfiles = [LocalFile('*.root')]
+        j.splitter = ArgSplitter(args=[['x', 'y'], [], ['z']])
+        rj = stripProxy(j)
+        rj._data['comment'] = u'unicode comment'
+
+        self.assertEqual(fastXML(rj), visitorXML(rj))
+        self.assertEqual(fastXML(rj.splitter), visitorXML(rj.splitter))
+        self.assertEqual(fastXML(rj.inputfiles), visitorXML(rj.inputfiles))
+
+    def test_c_SubjobsIgnored(self):
+        """The subjobs of a split job are left out when asked, and each subjob is written the same"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+
+        j = Job(splitter=ArgSplitter(args=[[str(i)] for i in range(5)]))
+        j.submit()
+        rj = stripProxy(j)
+
+        self.assertEqual(fastXML(rj, 'subjobs'), visitorXML(rj, 'subjobs'))
+        self.assertEqual(fastXML(rj, ['subjobs']), visitorXML(rj, ['subjobs']))
+        self.assertNotIn('<attribute name="subjobs">', fastXML(rj, 'subjobs'))
+        for sj in rj.subjobs:
+            sj = stripProxy(sj)
+            self.assertEqual(fastXML(sj, 'subjobs'), visitorXML(sj, 'subjobs'))
+
+    def test_d_FallBackToVisitor(self):
+        """Values the fast path doesn't know about are left to the visitor"""
+        from GangaCore.GPI import Executable
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository.VStreamer import _fast_to_file, _UseVisitor
+
+        app = stripProxy(Executable())
+        app._data['args'] = [NotStreamable()]
+
+        self.assertRaises(_UseVisitor, _fast_to_file, app, StringIO())
+        self.assertEqual(fastXML(app), visitorXML(app))
+        self.assertIn("'not streamable'", fastXML(app))
+
+    def test_e_ReadBack(self):
+        """The XML written by the fast path loads back into the same object"""
+        from GangaCore.GPI import Job, Executable, LocalFile
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Core.GangaRepository.VStreamer import from_file
+
+        j = Job(application=Executable(args=['a', 'b']), inputfiles=[LocalFile('a.txt')])
+        rj = stripProxy(j)
+        xml = fastXML(rj, 'subjobs')
+
+        loaded, errors = from_file(StringIO(xml))
+        self.assertEqual(errors, [])
+        self.assertEqual(loaded.application.args, ['a', 'b'])
+        self.assertEqual(loaded.inputfiles[0].namePattern, 'a.txt')
+        self.assertEqual(fastXML(loaded, 'subjobs'), xml)
+
+    def test_f_Benchmark(self):
+        """The fast path writes a split job quicker than the visitor"""
+        from GangaCore.GPI import Job, ArgSplitter
+        from GangaCore.GPIDev.Base.Proxy import stripProxy
+        from GangaCore.Utility.logging import getLogger
+
+        j = Job(splitter=ArgSplitter(args=[[str(i), 'arg'] for i in range(200)]))
+        j.submit()
+        subjobs = [stripProxy(sj) for sj in j.subjobs]
+
+        def best_of(streamer, repeat=3):
+            times = []
+            for _ in range(repeat):
+                start = time.time()
+                for sj in subjobs:
+                    streamer(sj, 'subjobs')
+                times.append(time.time() - start)
+            return min(times)
+
+        visitor_time = best_of(visitorXML)
+        fast_time = best_of(fastXML)
+
+        getLogger().info("Wrote %s subjobs in %.3fs with the visitor and %.3fs with the fast path (%.1fx)" %
+                         (len(subjobs), visitor_time, fast_time, visitor_time / max(fast_time, 1e-6)))
+        self.assertLess(fast_time, visitor_time)
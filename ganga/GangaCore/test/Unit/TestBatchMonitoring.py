@@ -0,0 +1,145 @@
+import importlib
+import os
+
+import pytest
+
+# the module rather than the Batch class exported by the package
+Batch = importlib.import_module('GangaCore.Lib.Batch.Batch')
+
+
+class FakeBackend(object):
+
+    def __init__(self, batch_id):
+        self.id = batch_id
+        self.actualqueue = ''
+        self.actualCE = ''
+        self.exitcode = None
+
+
+class FakeWorkspace(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def getPath(self):
+        return self.path
+
+
+class FakeJob(object):
+
+    def __init__(self, tmpdir, job_id, batch_id):
+        self.id = job_id
+        self.status = 'submitted'
+        self.backend = FakeBackend(batch_id)
+        self.outputdir = str(tmpdir.mkdir(str(job_id)))
+        self.locks = 0
+
+    def _getSessionLock(self):
+        self.locks += 1
+
+    def getOutputWorkspace(self):
+        return FakeWorkspace(self.outputdir)
+
+    def getFQID(self, sep):
+        return str(self.id)
+
+    def updateStatus(self, status):
+        self.status = status
+
+    def write_status(self, text):
+        with open(os.path.join(self.outputdir, '__jobstatus__'), 'a') as statusfile:
+            statusfile.write(text)
+
+
+class FakeConfig(dict):
+
+    def snapshot(self):
+        return self
+
+
+@pytest.fixture
+def batch_queue(monkeypatch):
+    """Monitor the jobs as if they ran on LSF, with the listing of the queue set by the tests"""
+    queue = {}
+    config = FakeConfig({'queue_query_str': 'bjobs -w', 'timeout': 600,
+                         'queue_states': {'PEND': 'submitted', 'RUN': 'running'}})
+    monkeypatch.setattr(Batch, 'getName', lambda obj: 'LSF')
+    monkeypatch.setattr('GangaCore.Utility.Config.getConfig', lambda name: config)
+    monkeypatch.setattr(Batch, 'query_queue', lambda config: dict(queue))
+    monkeypatch.setattr(Batch, '_status_files', {})
+    return queue
+
+
+def test_status_file(tmpdir):
+    """Only the complete lines appended to the status file are parsed, and a new file is read from the start"""
+    path = tmpdir.join('__jobstatus__')
+    path.write('PID: 123.server\nQUEUE: short\n')
+    status_file = Batch.StatusFile()
+    assert status_file.read(str(path)) == {'PID': 123, 'QUEUE': 'short'}
+
+    path.write('ACTUALCE: host1\nEXITC', mode='a')
+    assert status_file.read(str(path)) == {'PID': 123, 'QUEUE': 'short', 'ACTUALCE': 'host1'}
+    path.write('ODE: 3\n', mode='a')
+    assert status_file.read(str(path))['EXITCODE'] == 3
+
+    path.remove()
+    path.write('PID: 456\n')
+    assert status_file.read(str(path)) == {'PID': 456}
+
+
+def test_monitoring(batch_queue, tmpdir):
+    """Jobs whose state in the queue matches their status are not looked at and only jobs which change are locked"""
+    pending = FakeJob(tmpdir, 0, '100')
+    started = FakeJob(tmpdir, 1, '101')
+    batch_queue.update({'100': 'PEND', '101': 'RUN'})
+    started.write_status('PID: 101\nQUEUE: long\nACTUALCE: node7\n')
+    # the file of a pending job is not read
+    pending.write_status('PID: 100\n')
+    Batch.Batch.updateMonitoringInformation([pending, started])
+
+    assert (pending.status, pending.locks) == ('submitted', 0)
+    assert (started.status, started.locks) == ('running', 1)
+    assert (started.backend.id, started.backend.actualqueue, started.backend.actualCE) == (101, 'long', 'node7')
+
+    # a running job is left alone while it is running, and completes once it has left the queue
+    started.write_status('EXITCODE: 0\n')
+    Batch.Batch.updateMonitoringInformation([started])
+    assert (started.status, started.locks) == ('running', 1)
+    del batch_queue['101']
+    Batch.Batch.updateMonitoringInformation([started])
+    assert (started.status, started.backend.exitcode, started.locks) == ('completed', 0, 2)
+    assert Batch._status_files == {}
+
+
+def test_disappeared_job(batch_queue, tmpdir):
+    """A job which has left the queue without finishing fails once its heartbeat is too old"""
+    job = FakeJob(tmpdir, 0, '100')
+    job.status = 'running'
+    job.write_status('PID: 100\n')
+    heartbeat = os.path.join(job.outputdir, '__heartbeat__')
+    open(heartbeat, 'w').close()
+
+    Batch.Batch.updateMonitoringInformation([job])
+    assert (job.status, job.locks) == ('running', 0)
+
+    os.utime(heartbeat, (0, 0))
+    Batch.Batch.updateMonitoringInformation([job])
+    assert (job.status, job.locks) == ('failed', 1)
+
+
+def test_no_queue_query(monkeypatch, tmpdir):
+    """A backend whose config lacks the queue_query options (e.g. WestGrid) is monitored through the status files only"""
+    config = FakeConfig({'timeout': 600})
+    monkeypatch.setattr(Batch, 'getName', lambda obj: 'WestGrid')
+    monkeypatch.setattr('GangaCore.Utility.Config.getConfig', lambda name: config)
+    monkeypatch.setattr(Batch, '_status_files', {})
+    assert Batch.query_queue(config) == {}
+
+    job = FakeJob(tmpdir, 0, '100')
+    job.write_status('PID: 100\n')
+    Batch.Batch.updateMonitoringInformation([job])
+    assert job.status == 'running'
+
+    job.write_status('EXITCODE: 1\n')
+    Batch.Batch.updateMonitoringInformation([job])
+    assert (job.status, job.backend.exitcode) == ('failed', 1)
@@ -0,0 +1,199 @@
+import importlib
+import os
+
+import pytest
+
+# the module rather than the Condor class exported by the package
+Condor = importlib.import_module('GangaCore.Lib.Condor.Condor')
+
+QUEUE_XML = '''<?xml version="1.0"?>
+<!DOCTYPE classads SYSTEM "classads.dtd">
+<classads>
+<c>
+    <a n="GlobalJobId"><s>schedd1#12.0#1500000000</s></a>
+    <a n="ClusterId"><i>12</i></a>
+    <a n="ProcId"><i>0</i></a>
+    <a n="JobStatus"><i>2</i></a>
+    <a n="RemoteHost"><s>slot1@node1</s></a>
+    <a n="RemoteUserCpu"><r>1.5</r></a>
+</c>
+</classads>
+-- Failed to fetch ads from: <10.0.0.2:9618> : schedd2
+<?xml version="1.0"?>
+<!DOCTYPE classads SYSTEM "classads.dtd">
+<classads>
+<c>
+    <a n="GlobalJobId"><s>schedd3#13.1#1500000001</s></a>
+    <a n="ClusterId"><i>13</i></a>
+    <a n="ProcId"><i>1</i></a>
+    <a n="JobStatus"><i>1</i></a>
+    <a n="Description"><s>two
+lines</s></a>
+    <a n="OnExitRemove"><b v="t"/></a>
+</c>
+</classads>
+'''
+
+
+class FakeBackend(object):
+
+    def __init__(self, condor_id):
+        self.id = condor_id
+        self.status = ''
+        self.actualCE = ''
+        self.cputime = ''
+        self._stdout_check_time = 0
+
+
+class FakeWorkspace(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def getPath(self):
+        return self.path
+
+
+class FakeJob(object):
+
+    def __init__(self, tmpdir, job_id, condor_id):
+        self.fqid = str(job_id)
+        self.status = 'submitted'
+        self.backend = FakeBackend(condor_id)
+        # the output workspace path ends with a separator
+        self.outputdir = str(tmpdir.mkdir(str(job_id))) + os.sep
+
+    def _getSessionLock(self):
+        pass
+
+    def getOutputWorkspace(self):
+        return FakeWorkspace(self.outputdir)
+
+    def updateStatus(self, status):
+        self.status = status
+
+    def write(self, name, text):
+        with open(os.path.join(self.outputdir, name), 'a') as output:
+            output.write(text)
+
+
+@pytest.fixture
+def condor(monkeypatch):
+    """Monitor the jobs with the ClassAds returned by condor_q and condor_history set by the tests"""
+    ads = {'condor_q': [], 'condor_history': []}
+    calls = []
+
+    def query_classads(command, cluster_ids):
+        calls.append((command[0], sorted(set(cluster_ids))))
+        return ads[command[0]]
+
+    config = {'query_global_queues': False, 'query_history': True}
+    monkeypatch.setattr(Condor, 'getConfig', lambda name: config)
+    monkeypatch.setattr(Condor, 'query_classads', query_classads)
+    monkeypatch.setattr(Condor, '_user_logs', {})
+    return ads, calls
+
+
+def test_iter_classads():
+    """The ClassAds of all the documents of condor_q -global are parsed, the messages in between are skipped"""
+    ads = list(Condor.iter_classads(QUEUE_XML.splitlines(True)))
+    assert len(ads) == 2
+    assert ads[0] == {'GlobalJobId': 'schedd1#12.0#1500000000', 'ClusterId': 12, 'ProcId': 0, 'JobStatus': 2,
+                      'RemoteHost': 'slot1@node1', 'RemoteUserCpu': 1.5}
+    assert ads[1]['Description'] == 'two\nlines'
+    assert ads[1]['OnExitRemove'] is True
+
+
+def test_cluster_constraint():
+    """Consecutive clusters are matched as ranges"""
+    assert Condor.cluster_constraint(['7']) == 'ClusterId == 7'
+    assert Condor.cluster_constraint(['12', '13', '14', '14', '20']) == '(ClusterId >= 12 && ClusterId <= 14) || ClusterId == 20'
+
+
+def test_split_id():
+    assert Condor.split_id('schedd1#12.3#1500000000') == ('12', '3')
+    assert Condor.split_id('12.3') == ('12', '3')
+
+
+def test_match_classads():
+    """A local id is only matched if a single job of the queues has it"""
+    ads = [{'GlobalJobId': 'schedd1#12.0#1500000000', 'ClusterId': 12, 'ProcId': 0},
+           {'GlobalJobId': 'schedd2#12.0#1500000005', 'ClusterId': 12, 'ProcId': 0},
+           {'GlobalJobId': 'schedd1#13.0#1500000001', 'ClusterId': 13, 'ProcId': 0}]
+    matches = Condor.match_classads(['12.0', '13.0', 'schedd2#12.0#1500000005'], ads)
+    assert sorted(matches) == ['13.0', 'schedd2#12.0#1500000005']
+    assert matches['13.0'] is ads[2]
+    assert matches['schedd2#12.0#1500000005'] is ads[1]
+
+
+def test_user_log(tmpdir):
+    """Only the lines appended to the log are searched, and a new log is read from the start"""
+    path = tmpdir.join('condorLog')
+    path.write('000 (012.000.000) 07/20 10:00:00 Job submitted from host\n...\n')
+    user_log = Condor.UserLog()
+    assert not user_log.read(str(path))
+    offset = user_log.offset
+
+    path.write('005 (012.000.000) 07/20 10:05:00 Job termin', mode='a')
+    assert not user_log.read(str(path))
+    assert user_log.offset == offset
+
+    path.write('ated.\n', mode='a')
+    assert user_log.read(str(path))
+
+    path.remove()
+    path.write('000 (013.000.000) 07/20 11:00:00 Job submitted from host\n')
+    assert not user_log.read(str(path))
+
+
+def test_running_job(tmpdir, condor):
+    """A job in the queue gets its state and host from condor_q, and its global id if it still has a local one"""
+    ads, calls = condor
+    ads['condor_q'] = list(Condor.iter_classads(QUEUE_XML.splitlines(True)))
+    running = FakeJob(tmpdir, 1, '12.0')
+    idle = FakeJob(tmpdir, 2, 'schedd3#13.1#1500000001')
+
+    Condor.Condor.updateMonitoringInformation([running, idle])
+
+    assert calls == [('condor_q', ['12', '13'])]
+    assert running.status == 'running'
+    assert running.backend.id == 'schedd1#12.0#1500000000'
+    assert running.backend.status == 'Running'
+    assert running.backend.actualCE == 'slot1@node1'
+    assert running.backend.cputime == '1.500000'
+    assert idle.status == 'submitted'
+    assert idle.backend.status == 'Idle'
+
+
+def test_finished_jobs(tmpdir, condor):
+    """The jobs which left the queue are looked up with a single condor_history, the log is read only for the others"""
+    ads, calls = condor
+    ads['condor_history'] = [{'GlobalJobId': 'schedd1#12.0#1500000000', 'ClusterId': 12, 'ProcId': 0, 'JobStatus': 4}]
+    done = FakeJob(tmpdir, 1, 'schedd1#12.0#1500000000')
+    done.write('stdout', 'hello\nexit status 0\n')
+    aborted = FakeJob(tmpdir, 2, 'schedd1#14.0#1500000002')
+    aborted.write('condorLog', '009 (014.000.000) 07/20 10:05:00 Job was aborted by the user.\n')
+    queued = FakeJob(tmpdir, 3, 'schedd1#15.0#1500000003')
+    queued.write('condorLog', '000 (015.000.000) 07/20 10:00:00 Job submitted from host\n')
+
+    Condor.Condor.updateMonitoringInformation([done, aborted, queued])
+
+    assert calls == [('condor_q', ['12', '14', '15']), ('condor_history', ['12', '14', '15'])]
+    assert done.status == 'completed'
+    assert done.backend.status == 'Completed'
+    assert aborted.status == 'failed'
+    assert queued.status == 'submitted'
+    # the finished jobs are forgotten, the log of the other one is only read from where it was left
+    assert list(Condor._user_logs) == [os.path.join(queued.outputdir, 'condorLog')]
+
+
+def test_failed_query(tmpdir, condor):
+    """Nothing is changed when condor_q fails"""
+    ads, calls = condor
+    ads['condor_q'] = None
+    job = FakeJob(tmpdir, 1, 'schedd1#12.0#1500000000')
+
+    Condor.Condor.updateMonitoringInformation([job])
+
+    assert calls == [('condor_q', ['12'])]
+    assert job.status == 'submitted'
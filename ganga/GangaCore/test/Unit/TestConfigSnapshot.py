@@ -0,0 +1,57 @@
+import pytest
+
+import GangaCore.Utility.Config.Config
+from GangaCore.Utility.Config.Config import PackageConfig, ConfigError
+
+
+@pytest.fixture
+def config(monkeypatch):
+    # the section is made whether or not other tests have already bootstrapped ganga
+    monkeypatch.setattr(GangaCore.Utility.Config.Config, '_after_bootstrap', False)
+    config = PackageConfig('SnapshotTest', 'options of the snapshot tests')
+    config.addOption('a', 1, 'a plain option')
+    config.addOption('MY_PATH', 'x', 'a PATH-like option')
+    return config
+
+
+def test_snapshot_values(config):
+    """The snapshot has the effective values of the options and the same snapshot is kept until an option changes"""
+    snapshot = config.snapshot()
+    assert snapshot['a'] == config['a'] == 1
+    assert dict(snapshot.items()) == config.getEffectiveOptions()
+    assert config.snapshot() is snapshot
+    with pytest.raises(ConfigError):
+        snapshot['b']
+    with pytest.raises(ConfigError):
+        config['b']
+
+    config.setSessionValue('MY_PATH', 'y')
+    config.setUserValue('a', 3)
+    assert config['a'] == 3
+    assert config['MY_PATH'] == config.getEffectiveOption('MY_PATH') == 'y:x:'
+    # a snapshot which was handed out never changes
+    assert snapshot['a'] == 1
+    assert config.snapshot().generation > snapshot.generation
+
+
+def test_snapshot_invalidation(config):
+    """Every way of changing the options makes a new snapshot, before the post handlers are called"""
+    seen = []
+    config.attachUserHandler(None, lambda name, value: seen.append(config[name]))
+    config.setUserValue('a', 2)
+    assert seen == [2]
+
+    config.revertToSession('a')
+    assert config['a'] == 1
+    config.setSessionValue('a', 4)
+    assert config['a'] == 4
+    config.revertToDefault('a')
+    assert config['a'] == 1
+    config.overrideDefaultValue('a', 5)
+    assert config['a'] == 5
+    config.addOption('b', 'b', 'an option added later')
+    assert config['b'] == 'b'
+
+    with pytest.raises(Exception):
+        config.setUserValue('a', 'not a number')
+    assert config['a'] == 5
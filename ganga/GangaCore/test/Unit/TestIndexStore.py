@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from GangaCore.Core.GangaRepository.IndexStore import IndexStore, IndexStoreError
+
+
+@pytest.fixture
+def store_dir():
+    this_dir = tempfile.mkdtemp()
+    yield this_dir
+    shutil.rmtree(this_dir)
+
+
+def test_write_and_read(store_dir):
+    """Entries written by one store are seen by another one reading the same file"""
+    fn = os.path.join(store_dir, 'index.store')
+    writer = IndexStore(fn)
+    mtime = writer.write([(0, 'jobs', 'Job', {'status': 'new'}), (1, 'jobs', 'Job', {'status': 'completed'})])
+
+    reader = IndexStore(fn)
+    assert reader.read() == set([0, 1])
+    assert reader.get(0) == ('jobs', 'Job', {'status': 'new'}, mtime)
+    assert reader.get(1)[2] == {'status': 'completed'}
+
+    # Only the appended changes are reported on the next read
+    writer.write([(1, 'jobs', 'Job', {'status': 'failed'})])
+    writer.remove([0])
+    assert reader.read() == set([0, 1])
+    assert reader.get(0) is None
+    assert reader.get(1)[2] == {'status': 'failed'}
+    assert reader.read() == set()
+
+
+def test_torn_record_is_ignored(store_dir):
+    """A partially written record at the end of the file is skipped and then overwritten"""
+    fn = os.path.join(store_dir, 'index.store')
+    store = IndexStore(fn)
+    store.write([(0, 'jobs', 'Job', {'status': 'new'})])
+    size = os.path.getsize(fn)
+    store.write([(1, 'jobs', 'Job', {'status': 'new'})])
+
+    with open(fn, 'r+b') as f:
+        f.truncate(os.path.getsize(fn) - 3)
+
+    reader = IndexStore(fn)
+    assert reader.read() == set([0])
+
+    store.write([(2, 'jobs', 'Job', {'status': 'new'})])
+    assert reader.read() == set([2])
+    assert sorted(reader.ids()) == [0, 2]
+    assert os.path.getsize(fn) > size
+
+
+def test_compact(store_dir):
+    """Compaction keeps the live entries and readers notice the new file"""
+    fn = os.path.join(store_dir, 'index.store')
+    store = IndexStore(fn)
+    for i in range(10):
+        store.write([(0, 'jobs', 'Job', {'status': str(i)}), (i, 'jobs', 'Job', {})])
+    store.remove(range(5, 10))
+
+    reader = IndexStore(fn)
+    reader.read()
+    size = os.path.getsize(fn)
+
+    store.compact()
+    assert os.path.getsize(fn) < size
+    reader.read()
+    assert sorted(reader.ids()) == range(5)
+    assert reader.get(0)[2] == {'status': '9'}
+
+
+def test_invalid_store(store_dir):
+    """Something which is not an index store is refused"""
+    fn = os.path.join(store_dir, 'index.store')
+    with open(fn, 'w') as f:
+        f.write('ThisIsNotAnIndexStore')
+    with pytest.raises(IndexStoreError):
+        IndexStore(fn).read()
+    with pytest.raises(IndexStoreError):
+        IndexStore(os.path.join(store_dir, 'missing')).read()
+
+
+def test_listing_reconciled_with_disk(store_dir):
+    """Objects created or deleted behind the back of the store (e.g. by an older release) are seen in the listing"""
+    from GangaCore.Core.GangaRepository.GangaRepositoryXML import GangaRepositoryLocal
+
+    store = IndexStore(os.path.join(store_dir, 'index.store'))
+    store.write([(0, 'jobs', 'Job', {}), (1, 'jobs', 'Job', {})])
+    for this_id in (0, 1):
+        os.makedirs(os.path.join(store_dir, '0xxx', str(this_id)))
+
+    repo = GangaRepositoryLocal.__new__(GangaRepositoryLocal)
+    repo.root = store_dir
+    repo._index_store = IndexStore(store.filename)
+    repo._index_store.read()
+    repo._index_store_ok = True
+    repo._chunk_listings = {}
+    assert repo.get_index_listing() == {0: True, 1: True}
+
+    # a job written without the store and a job deleted without telling it
+    os.makedirs(os.path.join(store_dir, '1xxx', '1000'))
+    with open(os.path.join(store_dir, '1xxx', '1000.index'), 'w') as f:
+        f.write('')
+    shutil.rmtree(os.path.join(store_dir, '0xxx', '1'))
+
+    assert repo.get_index_listing() == {0: True, 1000: False}
+    assert sorted(repo._index_store.ids()) == [0]
+    reader = IndexStore(store.filename)
+    reader.read()
+    assert sorted(reader.ids()) == [0]
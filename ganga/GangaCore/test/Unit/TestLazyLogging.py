@@ -0,0 +1,80 @@
+import logging
+import os
+
+import GangaCore
+import GangaCore.Utility.logging
+from GangaCore.Utility.logging import lazy, isDebugEnabled
+from GangaCore.Utility.logging.lint import findEagerDebugCalls, checkPaths
+
+
+class CountingList(list):
+
+    """A list which counts how many times it is turned into a string"""
+
+    calls = 0
+
+    def __str__(self):
+        CountingList.calls += 1
+        return list.__str__(self)
+
+
+def test_lazy_arguments():
+    """Lazy arguments are only worked out when the message is emitted, which follows the level however it is set"""
+    logger = GangaCore.Utility.logging.getLogger('GangaCore.test.LazyLogging')
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handler = Handler()
+    logger.addHandler(handler)
+    try:
+        GangaCore.Utility.logging._set_log_level(logger, 'INFO')
+        assert not isDebugEnabled(logger)
+        logger.debug('ids: %s', lazy(lambda: CountingList([1, 2])))
+        assert CountingList.calls == 0
+        assert records == []
+
+        GangaCore.Utility.logging._set_log_level(logger, 'DEBUG')
+        assert isDebugEnabled(logger)
+        logger.debug('ids: %s', lazy(lambda ids: CountingList(ids), [1, 2]))
+        assert CountingList.calls > 0
+        assert records == ['ids: [1, 2]']
+
+        logger.setLevel(logging.INFO)
+        assert not isDebugEnabled(logger)
+        logger.setLevel(logging.DEBUG)
+        assert isDebugEnabled(logger)
+    finally:
+        logger.removeHandler(handler)
+        GangaCore.Utility.logging._set_log_level(logger, 'INFO')
+
+
+def test_eager_debug_checker(tmpdir):
+    """Only debug calls whose message is %-formatted before the call are reported"""
+    source = '\n'.join([
+        'logger.debug("id: %s" % this_id)',
+        'logger.debug("id: %s", this_id)',
+        'log.debug("id: %s" % (this_id,)); logger.info("id: %s" % this_id)',
+        'logger.debug(message % this_id)',
+        'obj.debug("%s, %s" % (a, b))',
+    ])
+    assert findEagerDebugCalls(source) == [1, 3, 5]
+
+    tmpdir.join('sub').ensure(dir=True).join('module.py').write(source)
+    tmpdir.join('other.txt').write(source)
+    found = checkPaths([str(tmpdir)])
+    assert [(lineno, line) for _, lineno, line in found] == [(1, 'logger.debug("id: %s" % this_id)'),
+                                                           (3, 'log.debug("id: %s" % (this_id,)); logger.info("id: %s" % this_id)'),
+                                                           (5, 'obj.debug("%s, %s" % (a, b))')]
+
+
+def test_hot_paths_format_lazily():
+    """The modules which log for every job in the registry and monitoring loops have no eager debug calls"""
+    root = os.path.dirname(GangaCore.__file__)
+    hot_paths = ['Core/MonitoringComponent/Local_GangaMC_Service.py', 'Core/GangaRepository/GangaRepositoryXML.py',
+                 'Core/GangaRepository/Registry.py', 'Core/GangaRepository/SessionLock.py',
+                 'Core/GangaRepository/SubJobXMLList.py', 'GPIDev/Lib/Job/Job.py',
+                 'GPIDev/Lib/Registry/RegistrySlice.py', 'Utility/execute.py']
+    assert checkPaths([os.path.join(root, path) for path in hot_paths]) == []
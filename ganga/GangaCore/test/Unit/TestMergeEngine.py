@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from GangaCore.Lib.Mergers import MergeEngine
+
+
+class AddMerger(object):
+
+    """Adds up the numbers in its files, so that its output can be merged again"""
+
+    _name = 'AddMerger'
+    partial_merge = True
+
+    def __init__(self, files=None):
+        self.files = files or []
+        self.merges = []
+
+    def mergefiles(self, file_list, output_file):
+        self.merges.append(len(file_list))
+        total = 0
+        for f in file_list:
+            with open(f) as in_file:
+                total += int(in_file.read())
+        if total < 0:
+            raise ValueError('negative total')
+        with open(output_file, 'w') as out_file:
+            out_file.write('%s' % total)
+
+
+@pytest.fixture
+def merge_config(monkeypatch):
+    """Merge in groups of 3 within the session and start with empty stats"""
+    config = {'merge_group_size': 3, 'merge_processes': 0, 'merge_processes_min_files': 0, 'merge_as_subjobs_complete': True}
+    monkeypatch.setattr(MergeEngine, 'getConfig', lambda name: config)
+    monkeypatch.setattr(MergeEngine, 'merge_stats', MergeEngine.MergeStats())
+    return config
+
+
+def write_numbers(tmpdir, name, numbers):
+    paths = []
+    for i, number in enumerate(numbers):
+        path = tmpdir.join('%s' % i).ensure(dir=True).join(name)
+        path.write('%s' % number)
+        paths.append(str(path))
+    return paths
+
+
+def test_tree_merge(merge_config, tmpdir):
+    """Files are merged in groups, then the partial files are merged until one group is left"""
+    merger = AddMerger()
+    files = {'a.num': write_numbers(tmpdir, 'a.num', range(10)), 'b.num': write_numbers(tmpdir, 'b.num', [1, 2])}
+    outputs = dict((key, str(tmpdir.join('out_%s' % key))) for key in files)
+
+    assert MergeEngine.mergeFiles(merger, files, outputs, str(tmpdir)) == {}
+    assert tmpdir.join('out_a.num').read() == '45'
+    assert tmpdir.join('out_b.num').read() == '3'
+    # 10 files -> 3 partials and a file left over -> 1 partial and the file -> output, 2 files -> output
+    assert sorted(merger.merges) == [2, 2, 3, 3, 3, 3]
+    assert not [name for name in os.listdir(str(tmpdir)) if name.startswith('.partial_merge_')]
+
+    stats = MergeEngine.getMergeStats().summary()['AddMerger']
+    assert stats['count'] == 1
+    assert stats['files'] == 12
+    assert stats['bytes'] == 12
+
+
+def test_tree_merge_in_processes(merge_config, tmpdir):
+    """The merges can be spread over worker processes and their failures are reported by key"""
+    merge_config['merge_processes'] = 2
+    merger = AddMerger()
+    files = {'a.num': write_numbers(tmpdir, 'a.num', range(7)), 'b.num': write_numbers(tmpdir, 'b.num', [-5, 1, 1, 1])}
+    outputs = dict((key, str(tmpdir.join('out_%s' % key))) for key in files)
+
+    assert MergeEngine.mergeFiles(merger, files, outputs, str(tmpdir)) == {'b.num': 'negative total'}
+    assert tmpdir.join('out_a.num').read() == '21'
+    assert not tmpdir.join('out_b.num').exists()
+
+
+def test_partial_merges_are_reused(merge_config, tmpdir):
+    """The groups merged as the subjobs completed are used by the final merge as long as their files are unchanged"""
+    merger = AddMerger(['a.num'])
+    paths = write_numbers(tmpdir, 'a.num', range(8))
+    partial_dir = str(tmpdir.join('partial'))
+    thread = MergeEngine.PartialMergeThread.__new__(MergeEngine.PartialMergeThread)
+    thread.should_stop = lambda: False
+    thread._mergeGroup([merger], [os.path.dirname(path) for path in paths[:3]], partial_dir)
+    thread._mergeGroup([merger], [os.path.dirname(path) for path in paths[3:6]], partial_dir)
+    assert len(os.listdir(partial_dir)) == 2
+
+    tmpdir.join('4', 'a.num').write('14')
+    merger.merges = []
+    output = str(tmpdir.join('out.num'))
+    assert MergeEngine.mergeFiles(merger, {'a.num': paths}, {'a.num': output}, str(tmpdir), partial_dir) == {}
+    assert tmpdir.join('out.num').read() == '38'
+    # the second group changed and is merged again, with the last one, before the output
+    assert merger.merges == [3, 2, 3]
@@ -0,0 +1,138 @@
+import json
+import types
+
+import pytest
+
+from GangaCore import _gangaVersion
+from GangaCore.Runtime import PluginManifest
+from GangaCore.Utility.Config import Config
+from GangaCore.Utility.Plugin.GangaPlugin import PluginManager
+from GangaCore.GPIDev.Adapters.ApplicationRuntimeHandlers import _ApplicationRuntimeHandlers
+
+
+class FakePlugin(object):
+
+    @classmethod
+    def _declared_property(cls, name):
+        return False
+
+
+class FakeBackend(FakePlugin):
+    pass
+
+
+class FakeApplication(FakePlugin):
+    pass
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    """Run the manifest against an empty plugin manager and handler table"""
+    manager = PluginManager()
+    handlers = _ApplicationRuntimeHandlers()
+    monkeypatch.setattr(PluginManifest, 'allPlugins', manager)
+    monkeypatch.setattr(PluginManifest, 'allHandlers', handlers)
+    monkeypatch.setattr(PluginManifest, '_recorder', None)
+    monkeypatch.setattr(PluginManifest, '_manifest', None)
+    monkeypatch.setattr(PluginManifest, '_pending', {})
+    monkeypatch.setattr(PluginManifest, '_interfaces', [])
+    monkeypatch.setattr(Config, 'lazySections', {})
+    return manager, handlers
+
+
+def test_lazy_plugins():
+    """Plugins added lazily are listed but only loaded when they are looked up"""
+    manager = PluginManager()
+    loads = []
+
+    def load():
+        loads.append('FakeBackend')
+        manager.add(FakeBackend, 'backends', 'FakeBackend')
+
+    manager.add(FakePlugin, 'backends', 'FakePlugin')
+    manager.addLazy('backends', 'FakeBackend', load)
+    manager.setLazyDefault('backends', 'FakeBackend')
+
+    assert manager.allNames('backends') == ['FakeBackend', 'FakePlugin']
+    assert manager.allClasses('backends', load=False) == {'FakePlugin': FakePlugin}
+    assert manager.isLazy('backends', 'FakeBackend')
+    assert loads == []
+
+    assert manager.find('backends', None) is FakeBackend
+    assert manager.find('backends', 'FakeBackend') is FakeBackend
+    assert loads == ['FakeBackend']
+    assert not manager.isLazy('backends', 'FakeBackend')
+
+
+def test_lazy_handlers():
+    """Handlers added lazily are listed but only loaded when they are needed"""
+    handlers = _ApplicationRuntimeHandlers()
+    handlers.add('Executable', 'Local', 'local handler')
+    handlers.addLazy('Executable', 'Fake', lambda: handlers.add('Executable', 'Fake', 'fake handler'))
+
+    assert sorted(handlers.getAllBackends('Executable')) == ['Fake', 'Local']
+    assert handlers.handlers.keys() == ['Local']
+    assert handlers.get('Executable', 'Fake') == 'fake handler'
+    with pytest.raises(KeyError):
+        handlers.get('Root', 'Fake')
+
+
+def test_write_and_use_manifest(plugins, monkeypatch, tmpdir):
+    """A unit recorded in the manifest is loaded when one of its plugins is used, not when it is added"""
+    manager, handlers = plugins
+    loads = []
+
+    def load():
+        loads.append('Fake')
+        manager.add(FakeBackend, 'backends', 'FakeBackend')
+        manager.add(FakeApplication, 'applications', 'FakeApplication')
+        handlers.add('FakeApplication', 'FakeBackend', 'fake handler')
+
+    filename = str(tmpdir.join('manifest.json'))
+    PluginManifest.startRecording(filename)
+    PluginManifest.addPlugins('Fake', 'Fake', load, module=False)
+    PluginManifest.writeManifest()
+    assert loads == ['Fake']
+
+    with open(filename) as f:
+        manifest = json.load(f)
+    assert manifest['version'] == _gangaVersion
+    assert manifest['units'][0]['plugins'] == [['applications', 'FakeApplication', 'FakeApplication', False],
+                                               ['backends', 'FakeBackend', 'FakeBackend', False]]
+    assert manifest['units'][0]['handlers'] == [['FakeApplication', 'FakeBackend']]
+
+    # start again with the manifest
+    manager = PluginManager()
+    handlers = _ApplicationRuntimeHandlers()
+    monkeypatch.setattr(PluginManifest, 'allPlugins', manager)
+    monkeypatch.setattr(PluginManifest, 'allHandlers', handlers)
+    monkeypatch.setattr(PluginManifest, '_recorder', None)
+    monkeypatch.setattr(PluginManifest, '_manifest', None)
+    monkeypatch.setattr(PluginManifest, 'getConfig', lambda name: {'PluginManifest': filename})
+    interface = types.ModuleType('interface')
+
+    PluginManifest.addPlugins('Fake', 'Fake', load, module=False)
+    PluginManifest.exportPlaceholders(interface)
+    assert loads == ['Fake']
+    assert isinstance(interface.FakeBackend, PluginManifest.PluginPlaceholder)
+    assert manager.allNames('backends') == ['FakeBackend']
+
+    assert handlers.get('FakeApplication', 'FakeBackend') == 'fake handler'
+    assert loads == ['Fake', 'Fake']
+    assert interface.FakeBackend is FakeBackend
+    assert interface.FakeApplication is FakeApplication
+
+    # the unit is only loaded once
+    assert manager.find('backends', 'FakeBackend') is FakeBackend
+    assert loads == ['Fake', 'Fake']
+
+
+def test_placeholder(plugins):
+    """A placeholder loads its plugin when it is used"""
+    manager, handlers = plugins
+    manager.addLazy('backends', 'FakeBackend', lambda: manager.add(FakeBackend, 'backends', 'FakeBackend'))
+    placeholder = PluginManifest.PluginPlaceholder('backends', 'FakeBackend')
+
+    assert isinstance(FakeBackend(), placeholder)
+    assert isinstance(placeholder(), FakeBackend)
+    assert placeholder._declared_property('hidden') is False
@@ -159,3 +159,68 @@ class TestProxy(unittest.TestCase):
             self.p.not_proxied()
 
         self.assertRaises(GangaCore.Core.exceptions.GangaAttributeError, _call)
+
+
+class FilteredGangaObject(GangaObject):
+    """
+    A class whose visible attributes are read through _attribute_filter__get__, as for Job
+    """
+    _schema = Schema(Version(1, 0), {
+        'a': SimpleItem(42, typelist=[int]),
+        'hidden': SimpleItem(0, hidden=1),
+    })
+    _category = 'TestGangaObject'
+    _name = 'FilteredGangaObject'
+
+    def _attribute_filter__get__(self, name):
+        return 'filtered_%s' % name
+
+
+class DerivedGangaObject(SampleGangaObject):
+    """
+    A subclass with its own schema, where 'c' is no longer a component
+    """
+    _schema = Schema(Version(1, 0), {
+        'a': SimpleItem(42, typelist=[int]),
+        'c': SimpleItem(5, typelist=[int]),
+    })
+    _category = 'TestGangaObject'
+    _name = 'DerivedGangaObject'
+
+
+class TestProxyDispatch(unittest.TestCase):
+    """
+    Test the attribute dispatch worked out once per proxy class
+    """
+
+    def test_attribute_filter(self):
+        """
+        Only the visible schema items go through the attribute filter
+        """
+        p = GangaCore.GPIDev.Base.Proxy.addProxy(FilteredGangaObject())
+        self.assertEqual(p.a, 'filtered_a')
+
+        def _get():
+            temp = p.hidden
+
+        self.assertRaises(GangaCore.Core.exceptions.GangaAttributeError, _get)
+
+    def test_component_is_proxied(self):
+        """
+        Component items are returned with a proxy and kept the same between reads
+        """
+        p = GangaCore.GPIDev.Base.Proxy.addProxy(SampleGangaObject())
+        p.c = LocalFile('a.txt')
+        self.assertTrue(GangaCore.GPIDev.Base.Proxy.isProxy(p.c))
+        self.assertTrue(p.c is p.c)
+        self.assertEqual(p.c.namePattern, 'a.txt')
+
+    def test_subclass_schema(self):
+        """
+        A subclass wrapped by the proxy class of its base uses its own schema
+        """
+        proxy_class = GangaCore.GPIDev.Base.Proxy.getProxyClass(SampleGangaObject)
+        p = proxy_class(_proxy_impl_obj_to_wrap=DerivedGangaObject())
+        self.assertEqual(p.c, 5)
+        p.c = 7
+        self.assertEqual(p.c, 7)
@@ -0,0 +1,36 @@
+from GangaCore.Core.GangaRepository.Registry import RegistryChangeFeed
+
+
+def test_poll_deltas():
+    """Each consumer only gets the changes made since its last poll"""
+    feed = RegistryChangeFeed(10)
+    assert feed.poll('a') is None
+
+    feed.record(1, [RegistryChangeFeed.ADDED])
+    feed.record(1, ['status'])
+    assert feed.poll('b') is None
+    feed.record(2)
+
+    changes = feed.poll('a')
+    assert [(c.seq, c.id, c.fields) for c in changes] == [(1, 1, frozenset([RegistryChangeFeed.ADDED])),
+                                                          (2, 1, frozenset(['status'])),
+                                                          (3, 2, None)]
+    assert [c.id for c in feed.poll('b')] == [2]
+    assert feed.poll('a') == []
+    assert feed.lastSeq() == 3
+
+
+def test_overflow():
+    """A consumer which has fallen behind the oldest change kept has to start again"""
+    feed = RegistryChangeFeed(3)
+    feed.poll('a')
+    feed.poll('b')
+    for this_id in range(3):
+        feed.record(this_id)
+    assert [c.id for c in feed.poll('a')] == [0, 1, 2]
+
+    feed.record(3)
+    assert feed.poll('b') is None
+    assert [c.id for c in feed.poll('a')] == [3]
+    assert feed.since(0) is None
+    assert [c.seq for c in feed.since(2)] == [3, 4]
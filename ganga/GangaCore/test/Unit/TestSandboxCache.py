@@ -0,0 +1,92 @@
+import os
+import tarfile
+
+import pytest
+
+from GangaCore.Core.Sandbox import Sandbox
+
+
+class FakeFile(object):
+
+    def __init__(self, name, subdir=os.curdir, executable=False):
+        self.name = name
+        self.subdir = subdir
+        self.executable = executable
+
+    def isExecutable(self):
+        return self.executable
+
+
+class FakeWorkspace(object):
+
+    def __init__(self, top, jobid):
+        self.top = top
+        self.jobid = jobid
+
+    def getPath(self, name=''):
+        path = os.path.join(self.top, str(self.jobid), 'input')
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        return os.path.join(path, name)
+
+
+@pytest.fixture
+def sandbox_config(monkeypatch):
+    """Use the sandbox cache without a parallel compressor and start with empty stats"""
+    config = {'sandboxCacheSize': 1, 'sandboxCompressor': '', 'sandboxCompressorMinSize': 0}
+    monkeypatch.setattr(Sandbox, 'getConfig', lambda name: config)
+    monkeypatch.setattr(Sandbox, 'sandbox_stats', Sandbox.SandboxStats())
+    return config
+
+
+def test_sandbox_cache(sandbox_config, tmpdir):
+    """Sandboxes with the same files are packed once and those with changed files are packed again"""
+    script = tmpdir.join('script.sh')
+    script.write('echo hello\n')
+    data = tmpdir.join('data.txt')
+    data.write('some data\n')
+    files = [FakeFile(str(script), executable=True), FakeFile(str(data), subdir='inputs')]
+    top = str(tmpdir.join('workspace'))
+
+    first = Sandbox.createPackedInputSandbox(files, FakeWorkspace(top, 0), '_input_sandbox_0.tgz')[0]
+    second = Sandbox.createPackedInputSandbox(files, FakeWorkspace(top, 1), '_input_sandbox_1.tgz')[0]
+    stats = Sandbox.getSandboxStats().summary()
+    assert stats['packed']['count'] == 1
+    assert stats['reused']['count'] == 1
+    assert stats['reused']['files'] == 2
+
+    tf = tarfile.open(second)
+    assert sorted(tf.getnames()) == ['./script.sh', 'inputs/data.txt']
+    assert tf.getmember('./script.sh').mode & 0o100
+    assert tf.extractfile('inputs/data.txt').read() == 'some data\n'
+    tf.close()
+    assert open(first, 'rb').read() == open(second, 'rb').read()
+
+    # a changed file gives a new sandbox
+    data.write('other data\n')
+    third = Sandbox.createPackedInputSandbox(files, FakeWorkspace(top, 2), '_input_sandbox_2.tgz')[0]
+    assert Sandbox.getSandboxStats().summary()['packed']['count'] == 2
+    assert tarfile.open(third).extractfile('inputs/data.txt').read() == 'other data\n'
+    assert len(os.listdir(os.path.join(top, Sandbox.SANDBOX_CACHE_DIR))) == 2
+
+    # with the cache disabled the sandbox is always packed
+    sandbox_config['sandboxCacheSize'] = 0
+    Sandbox.createPackedInputSandbox(files, FakeWorkspace(top, 3), '_input_sandbox_3.tgz')
+    assert Sandbox.getSandboxStats().summary()['packed']['count'] == 3
+
+
+def test_missing_file(sandbox_config, tmpdir):
+    """A missing file is reported as a SandboxError"""
+    with pytest.raises(Sandbox.SandboxError):
+        Sandbox.createPackedInputSandbox([FakeFile(str(tmpdir.join('missing')))], FakeWorkspace(str(tmpdir), 0), 'sandbox.tgz')
+
+
+def test_trim_sandbox_cache(sandbox_config, tmpdir):
+    """The least recently used sandboxes are removed once the cache is full"""
+    cache_dir = tmpdir.mkdir('cache')
+    for i in range(3):
+        tarball = cache_dir.join('%s.gz' % i)
+        tarball.write('x' * 400 * 1024)
+        os.utime(str(tarball), (1000 + i, 1000 + i))
+    Sandbox._trimSandboxCache(str(cache_dir))
+    assert sorted(os.listdir(str(cache_dir))) == ['1.gz', '2.gz']
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import pytest
+
+from GangaCore.Core.GangaRepository import SessionLock
+from GangaCore.Core.GangaRepository.SessionLock import SessionLockManager, refreshSessionFile, getSessionLockStats
+
+OTHER_SESSION = 'otherhost.12.00_Monday_01_January_2018.PID.99999.session'
+
+
+@pytest.yield_fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(SessionLock, 'session_expiration_timeout', 3600)
+    root = tempfile.mkdtemp()
+    manager = SessionLockManager(None, root, 'jobs')
+    manager.startup()
+    getSessionLockStats().reset()
+    yield manager
+    manager.shutdown()
+    shutil.rmtree(root)
+
+
+def write_other_locks(manager, ids, mtime):
+    """Write the lock file of another (live) session"""
+    session_file = os.path.join(manager.sdir, OTHER_SESSION)
+    with open(session_file, 'w'):
+        pass
+    lock_file = session_file + '.jobs.locks'
+    with open(lock_file, 'w') as f:
+        f.write(pickle.dumps(set(ids)))
+    os.utime(lock_file, (mtime, mtime))
+
+
+def test_other_sessions_locks_cached(manager):
+    """The lock files of other sessions are only read again when they change"""
+    write_other_locks(manager, [1, 2], time.time() - 60)
+
+    assert sorted(manager.lock_ids([1, 2, 3])) == [3]
+    assert sorted(manager.lock_ids([2, 4])) == [4]
+    stats = getSessionLockStats().summary()
+    assert stats['lock_files'] == {'read': 1, 'unchanged': 1}
+    assert stats['lock']['count'] == 2
+    assert stats['lock']['ids'] == 2
+
+    write_other_locks(manager, [1, 2, 5], time.time() - 30)
+    assert sorted(manager.lock_ids([5, 6])) == [6]
+    assert getSessionLockStats().summary()['lock_files']['read'] == 2
+
+
+def test_refresh_keeps_lock_file_mtime(manager):
+    """Refreshing a lock file doesn't make it look changed to other sessions, refreshing a session file does"""
+    past = time.time() - 100
+    os.utime(manager.fn, (past, past))
+    os.utime(manager.gfn, (past, past))
+
+    refreshSessionFile(manager.fn)
+    refreshSessionFile(manager.gfn)
+
+    assert abs(os.stat(manager.fn).st_mtime - past) < 1e-3
+    assert os.stat(manager.fn).st_atime > past
+    assert os.stat(manager.gfn).st_mtime > past
+
+
+def test_batch(manager):
+    """Locks taken and released in a batch are written out once, at the end"""
+    writes = []
+    session_write = manager.session_write
+    manager.session_write = lambda: writes.append(1) or session_write()
+
+    with manager.batch():
+        assert manager.lock_ids([10]) == [10]
+        assert manager.lock_ids([11]) == [11]
+        manager.release_ids([10])
+        assert writes == []
+    assert writes == [1]
+
+    with open(manager.fn) as f:
+        assert pickle.load(f) == set([11])
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from GangaCore.Core.GangaRepository import SubJobContainer as container_module
+from GangaCore.Core.GangaRepository.SubJobContainer import SubJobContainer, SubJobContainerError
+
+
+@pytest.fixture
+def job_dir():
+    this_dir = tempfile.mkdtemp()
+    yield this_dir
+    shutil.rmtree(this_dir)
+
+
+def test_write_and_read(job_dir):
+    """Subjobs written by one container are seen by another one reading the same file"""
+    writer = SubJobContainer.in_dir(job_dir)
+    assert not writer.exists()
+    assert len(writer) == 0
+
+    writer.write({0: ('<xml0/>', 'new'), 1: ('<xml1/>', 'submitted')})
+    reader = SubJobContainer.in_dir(job_dir)
+    assert len(reader) == 2
+    assert reader.read(1) == '<xml1/>'
+    assert reader.statuses() == ['new', 'submitted']
+
+    # Replace one subjob and add another one on the end
+    writer.write({1: ('<xml1 changed/>', 'completed'), 2: ('<xml2/>', 'new')})
+    assert reader.statuses() == ['new', 'completed', 'new']
+    assert reader.read(0) == '<xml0/>'
+    assert reader.read(1) == '<xml1 changed/>'
+    assert reader.read(2) == '<xml2/>'
+
+    with pytest.raises(SubJobContainerError):
+        reader.read(3)
+
+
+def test_gaps_and_truncation(job_dir):
+    """Subjobs have to follow on from each other and the container can be cut down"""
+    store = SubJobContainer.in_dir(job_dir)
+    store.write({0: ('a', 'new'), 1: ('b', 'new'), 2: ('c', 'new')})
+
+    with pytest.raises(SubJobContainerError):
+        store.write({4: ('e', 'new')})
+    assert len(store) == 3
+
+    store.write({0: ('A', 'failed')}, 1)
+    assert len(SubJobContainer.in_dir(job_dir)) == 1
+    assert store.read(0) == 'A'
+
+
+def test_interrupted_write(job_dir):
+    """Data written after the current table without the header being updated is ignored and then written over"""
+    store = SubJobContainer.in_dir(job_dir)
+    store.write({0: ('a', 'new')})
+    with open(store.filename, 'ab') as f:
+        f.write('half a subjob')
+
+    reader = SubJobContainer.in_dir(job_dir)
+    assert reader.statuses() == ['new']
+    store.write({1: ('b', 'new')})
+    assert reader.read(0) == 'a'
+    assert reader.read(1) == 'b'
+
+
+def test_compact(job_dir, monkeypatch):
+    """Old versions of the subjobs are dropped once they take up too much space"""
+    monkeypatch.setattr(container_module, '_COMPACT_MIN_SIZE', 0)
+    store = SubJobContainer.in_dir(job_dir)
+    store.write(dict((i, ('x' * 100, 'new')) for i in range(10)))
+    size = os.path.getsize(store.filename)
+    reader = SubJobContainer.in_dir(job_dir)
+    reader.statuses()
+
+    for i in range(10):
+        store.write({i: ('y' * 100, 'completed')})
+    assert os.path.getsize(store.filename) < 2 * size
+    assert reader.statuses() == ['completed'] * 10
+    assert all(reader.read(i) == 'y' * 100 for i in range(10))
+
+
+def test_invalid_container(job_dir):
+    """Something which is not a container is refused"""
+    store = SubJobContainer.in_dir(job_dir)
+    with open(store.filename, 'w') as f:
+        f.write('ThisIsNotASubJobContainer')
+    with pytest.raises(SubJobContainerError):
+        store.statuses()
+    assert len(store) == 0
@@ -0,0 +1,153 @@
+import pytest
+
+from GangaCore.Core.GangaRepository.Registry import RegistryChangeFeed
+from GangaCore.GPIDev.Lib.Tasks import TaskEngine
+
+
+class FakeTime(object):
+
+    def __init__(self):
+        self.now = 1000.
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Set the Tasks options used by the engine and let the tests move the time on"""
+    fake_time = FakeTime()
+    monkeypatch.setattr(TaskEngine, 'config', {'SubmitBudget': 2, 'SubmitBudgetPeriod': 10., 'TaskLoopFrequency': 300.})
+    monkeypatch.setattr(TaskEngine.time, 'time', fake_time.time)
+    return fake_time
+
+
+class FakeUnit(object):
+
+    def __init__(self, unit_id, job_ids):
+        self.id = unit_id
+        self.active_job_ids = job_ids
+
+    def getID(self):
+        return self.id
+
+
+class FakeTransform(object):
+
+    def __init__(self, trf_id, units):
+        self.id = trf_id
+        self.units = units
+
+    def getID(self):
+        return self.id
+
+    def unitStatusCounts(self):
+        return {}
+
+
+class FakeTask(object):
+
+    def __init__(self, task_id, transforms):
+        self.id = task_id
+        self.transforms = transforms
+        self.calls = []
+
+    def update(self):
+        self.calls.append('update')
+
+    def updateUnits(self, units):
+        self.calls.append(units)
+        return 0
+
+
+class FakeRegistry(dict):
+
+    name = 'tasks'
+
+    def ids(self):
+        return sorted(self.keys())
+
+
+class FakeJobs(object):
+
+    def __init__(self):
+        self.changes = RegistryChangeFeed(100)
+
+    def pollChanges(self, consumer):
+        return self.changes.poll(consumer)
+
+
+def test_submit_budget(clock):
+    """The budget allows SubmitBudget submissions at once and refills over SubmitBudgetPeriod"""
+    budget = TaskEngine.SubmitBudget()
+    assert budget.take(1)
+    assert budget.take(1)
+    assert budget.waitTime() is None
+    assert not budget.available(2)
+    assert not budget.take(3)
+    assert budget.waitTime() == pytest.approx(5.)
+
+    clock.now += 5.
+    assert budget.take(1)
+    assert not budget.take(1)
+    assert budget.popWaiting() == set([1, 2, 3])
+    assert budget.popWaiting() == set()
+
+    clock.now += 100.
+    assert budget.take(1)
+    assert budget.take(1)
+    assert not budget.take(1)
+
+
+def test_engine_updates_changed_units(clock, monkeypatch):
+    """After the first full update, only the units whose jobs changed status are updated"""
+    jobs = FakeJobs()
+    registry = FakeRegistry()
+    registry[0] = FakeTask(0, [FakeTransform(0, [FakeUnit(0, [10]), FakeUnit(1, [11])])])
+    registry[1] = FakeTask(1, [FakeTransform(0, [FakeUnit(0, [12])]), FakeTransform(1, [FakeUnit(0, [])])])
+    engine = TaskEngine.TaskEngine(registry)
+    monkeypatch.setattr(engine, '_jobs', lambda: jobs)
+    engine.subscribe()
+    stop = lambda: False
+
+    engine.cycle(stop)
+    assert [registry[0].calls, registry[1].calls] == [['update'], ['update']]
+    assert engine.waitTime() == pytest.approx(300.)
+
+    # only status changes of the jobs of tasks matter
+    jobs.changes.record(11, ['status'])
+    jobs.changes.record(12, None)
+    jobs.changes.record(13, ['status'])
+    assert engine._wakeup.is_set()
+    engine.wait(stop)
+    assert not engine._wakeup.is_set()
+    engine.cycle(stop)
+    assert registry[0].calls == ['update', {0: set([1])}]
+    assert registry[1].calls == ['update']
+
+    # a job submitted by a unit is watched from then on, and a task can ask to be fully updated
+    engine.watchJob(14, 1, 1, 0)
+    jobs.changes.record(14, ['subjobs:status'])
+    engine.taskChanged(0)
+    assert engine.waitTime() == 0.
+    engine.cycle(stop)
+    assert registry[0].calls == ['update', {0: set([1])}, 'update']
+    assert registry[1].calls == ['update', {1: set([0])}]
+
+    # units waiting for their start time are looked at when it comes
+    engine.wakeAt(clock.now + 20., 1)
+    assert engine.waitTime() == pytest.approx(20.)
+    clock.now += 20.
+    engine.cycle(stop)
+    assert registry[1].calls[-1] == {}
+
+    # and everything is updated again after TaskLoopFrequency
+    clock.now += 300.
+    engine.cycle(stop)
+    assert registry[0].calls[-1] == registry[1].calls[-1] == 'update'
+
+    # the engine is no longer woken up once it unsubscribes
+    engine._wakeup.clear()
+    engine.unsubscribe()
+    jobs.changes.record(10, ['status'])
+    assert not engine._wakeup.is_set()
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from GangaCore.Core.GangaThread.WorkerThreads.WorkerThreadPool import TaskLatch, WorkerThreadPool
+
+
+@pytest.fixture
+def pool():
+    this_pool = WorkerThreadPool(num_worker_threads=3, worker_thread_prefix='TestWorker_')
+    yield this_pool
+    this_pool._stop_worker_threads(shutdown=True)
+
+
+def test_latch_wakes_up_when_done():
+    """Waiting on a latch returns as soon as the last task counts it down"""
+    latch = TaskLatch(2)
+    assert not latch.wait(timeout=0.1)
+
+    def finish():
+        time.sleep(0.2)
+        latch.count_down()
+        latch.count_down()
+
+    t = threading.Thread(target=finish)
+    t.start()
+    start = time.time()
+    assert latch.wait(timeout=30)
+    assert time.time() - start < 5
+    assert latch.done == latch.total == 2
+    t.join()
+
+
+def test_latch_reports_progress():
+    """The progress function is called while tasks are outstanding"""
+    latch = TaskLatch(1)
+    seen = []
+
+    def progress(this_latch):
+        seen.append(this_latch.done)
+        if len(seen) == 3:
+            this_latch.count_down()
+
+    assert latch.wait(timeout=30, progress=progress, progress_interval=0.01)
+    assert seen == [0, 0, 0]
+
+
+def test_pool_counts_down_latch(pool):
+    """Every task given to the pool counts the latch down after its callback, whether it worked or not"""
+    latch = TaskLatch()
+    results = []
+    lock = threading.Lock()
+
+    def work(i):
+        if i % 2:
+            raise ValueError('Failing task %s' % i)
+        return i
+
+    def callback(result):
+        with lock:
+            results.append(result)
+
+    for i in range(20):
+        latch.add()
+        pool.add_function(work, (i,), callback_func=callback, latch=latch)
+
+    assert latch.wait(timeout=60)
+    assert sorted(results) == range(0, 20, 2)
+
+
+def test_frozen_pool_releases_latch(pool):
+    """Tasks which can't be queued don't leave anyone waiting"""
+    latch = TaskLatch(1)
+    pool.freeze()
+    pool.add_function(lambda: None, latch=latch)
+    assert latch.wait(timeout=1)
@@ -2,6 +2,7 @@ import os
 import sys
 import time
 import socket
+import signal
 import inspect
 import traceback
 import pickle
@@ -12,7 +13,7 @@ from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
 #from GangaCore.Core.GangaThread.WorkerThreads.WorkerThreadPool import WorkerThreadPool
 #from GangaCore.Core.GangaThread.WorkerThreads.ThreadPoolQueueMonitor import ThreadPoolQueueMonitor
-from GangaDirac.Lib.Utilities.DiracUtilities import execute
+from GangaDirac.Lib.Utilities.DiracUtilities import execute, getDiracCommandStats
 logger = getLogger()
 #user_threadpool       = WorkerThreadPool()
 #monitoring_threadpool = WorkerThreadPool()
@@ -57,10 +58,12 @@ def startDiracProcess():
     Start a subprocess that runs the DIRAC commands
     '''
     HOST = 'localhost'  #Connect to localhost
-    end_trans = '###END-TRANS###'
     import subprocess
     from GangaDirac.Lib.Utilities.DiracUtilities import getDiracEnv, getDiracCommandIncludes, GangaDiracError
+    from GangaDirac.Lib.Utilities.DiracConnectionPool import DiracConnection
     global dirac_process
+    #Don't leave the workers of a previous server behind
+    stopDiracProcess(quiet=True)
     #Some magic to locate the python script to run
     from GangaDirac.Lib.Server.InspectionClient import runClient
     #Create a socket and bind it to 0 to find a free port
@@ -68,10 +71,11 @@ def startDiracProcess():
     s.bind((HOST, 0))
     PORT = s.getsockname()[1]
     s.close()
-    #Pass the port no as an argument to the popen
+    #Pass the port no and the number of workers as arguments to the popen
     serverpath = os.path.join(os.path.dirname(inspect.getsourcefile(runClient)), 'DiracProcess.py')
-    popen_cmd = ['python',serverpath, str(PORT)]
-    dirac_process = subprocess.Popen(popen_cmd, env = getDiracEnv(), stdin=subprocess.PIPE)
+    popen_cmd = ['python', serverpath, str(PORT), str(getConfig('DIRAC')['ServerWorkers'])]
+    #The server and its workers get a process group of their own so that they can be stopped together
+    dirac_process = subprocess.Popen(popen_cmd, env = getDiracEnv(), stdin=subprocess.PIPE, preexec_fn=os.setsid)
     global running_dirac_process
     running_dirac_process = (dirac_process.pid, PORT)
 
@@ -79,41 +83,49 @@ def startDiracProcess():
     rand_hash = uuid.uuid4()
     global dirac_process_ids
     dirac_process_ids = (dirac_process.pid, PORT, rand_hash)
-    #Pipe the random string without waiting for the process to finish.
-    dirac_process.stdin.write(bytes(str(rand_hash)))
+    #Pipe the random string followed by the DIRAC commands for the workers to load, without waiting for the process to finish.
+    dirac_process.stdin.write(bytes(str(rand_hash)) + '\n' + getDiracCommandIncludes())
     dirac_process.stdin.close()
 
-    data = ''
     #We have to wait a little bit for the subprocess to start the server so we try until the connection stops being refused. Set a limit of one minute.
     connection_timeout = time.time() + 60
-    started = False
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    while time.time()<connection_timeout and not started:
+    conn = None
+    while time.time()<connection_timeout and conn is None and dirac_process.poll() is None:
         try:
-            s.connect((HOST, PORT))
-            started = True
+            conn = DiracConnection(PORT, rand_hash)
         except socket.error as serr:
             time.sleep(1)
-    if not started:
+    if conn is None:
         raise GangaDiracError("Failed to start the Dirac server process!")
-    #Now setup the Dirac environment in the subprocess
-    dirac_command = str(rand_hash)
-    dirac_command = dirac_command + getDiracCommandIncludes()
-    dirac_command = dirac_command + end_trans
-    s.sendall(dirac_command)
-    data = s.recv(1024)
-    s.close()
+    #Check that a worker has loaded the DIRAC commands
+    try:
+        request, _ = conn.submit('True')
+        if not request.wait(getConfig('DIRAC')['Timeout']):
+            raise GangaDiracError("Timed out waiting for the Dirac server process to start")
+        if request.error is not None:
+            raise GangaDiracError("Failed to start the Dirac server process: %s" % request.error)
+        if not request.result['OK']:
+            raise GangaDiracError(request.result['Message'])
+    finally:
+        conn.close()
 
 exportToGPI('startDiracProcess', startDiracProcess, 'Functions')
 
-def stopDiracProcess():
+def stopDiracProcess(quiet=False):
     '''
     Stop the Dirac process if it is running
+    Args:
+        quiet (bool): Don't log anything
     '''
     global running_dirac_process
     if running_dirac_process:
-        logger.info('Stopping the DIRAC process')
-        dirac_process.kill()
+        if not quiet:
+            logger.info('Stopping the DIRAC process')
+        try:
+            os.killpg(dirac_process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        dirac_process.wait()
         running_dirac_process = False
 
 exportToGPI('stopDiracProcess', stopDiracProcess, 'Functions')
@@ -159,6 +171,18 @@ exportToGPI('diracAPI_async', diracAPI_async, 'Functions')
 #\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/#
 
 
+def diracCommandStats():
+    '''
+    Returns the number, failures and total, mean and maximum duration (sec) of the commands sent to the DIRAC server
+    in this session, per type of command: the name of the DIRAC command called or 'script'
+    '''
+    return getDiracCommandStats()
+
+exportToGPI('diracCommandStats', diracCommandStats, 'Functions')
+
+#\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/#
+
+
 def getDiracFiles():
     from GangaDirac.Lib.Files.DiracFile import DiracFile
     from GangaCore.GPIDev.Lib.GangaList.GangaList import GangaList
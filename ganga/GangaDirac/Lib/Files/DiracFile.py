@@ -23,6 +23,7 @@ from GangaDirac.Lib.Credentials.DiracProxy import DiracProxy, DiracProxyInfo
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
 from GangaDirac.Lib.Backends.DiracUtils import getAccessURLs
+from GangaDirac.Lib.Utilities.LFNCache import getBulkReplicas, getBulkMetadata, invalidateLFNs, resolveDiracFiles
 configDirac = getConfig('DIRAC')
 logger = getLogger()
 regex = re.compile('[*?\[\]]')
@@ -396,7 +397,10 @@ class DiracFile(IGangaFile):
         if self.lfn == "":
             raise GangaFileError('Can\'t remove a  file from DIRAC SE without an LFN.')
         logger.info('Removing file %s' % self.lfn)
-        stdout = execute('removeFile("%s")' % self.lfn, cred_req=self.credential_requirements)
+        try:
+            stdout = execute('removeFile("%s")' % self.lfn, cred_req=self.credential_requirements)
+        finally:
+            invalidateLFNs(self.lfn)
 
         self.lfn = ""
         self.locations = []
@@ -417,6 +421,8 @@ class DiracFile(IGangaFile):
             self.locations.remove(SE)
         except GangaDiracError as err:
             raise err
+        finally:
+            invalidateLFNs(self.lfn)
 
         return True 
 
@@ -436,7 +442,7 @@ class DiracFile(IGangaFile):
 
         # eval again here as datatime not included in dirac_ganga_server
 
-        ret = execute('getMetadata("%s")' % self.lfn, cred_req=self.credential_requirements)
+        ret = getBulkMetadata([self.lfn], self.credential_requirements)
 
         if self.guid != ret.get('Successful',{}).get(self.lfn,{}).get('GUID',False):
             self.guid = ret['Successful'][self.lfn]['GUID']
@@ -496,6 +502,11 @@ class DiracFile(IGangaFile):
 
         if len(self.subfiles) != 0:
 
+            # Look up the subfiles which don't know their replicas yet all at once
+            if forceRefresh:
+                invalidateLFNs([i.lfn for i in self.subfiles])
+            resolveDiracFiles([i for i in self.subfiles if forceRefresh or i._storedReplicas == {}])
+
             allReplicas = []
             for i in self.subfiles:
                 allReplicas.append(i.getReplicas())
@@ -509,8 +520,10 @@ class DiracFile(IGangaFile):
                 self._storedReplicas = copy.deepcopy(self._storedReplicas)
             if (self._storedReplicas == {} and len(self.subfiles) == 0) or forceRefresh:
 
+                if forceRefresh:
+                    invalidateLFNs(self.lfn)
                 try:
-                    self._storedReplicas = execute('getReplicas("%s")' % self.lfn, cred_req=self.credential_requirements)
+                    self._storedReplicas = getBulkReplicas([self.lfn], self.credential_requirements)
                 except GangaDiracError as err:
                     logger.error("Couldn't find replicas for: %s" % str(self.lfn))
                     self._storedReplicas = {}
@@ -632,7 +645,10 @@ class DiracFile(IGangaFile):
             raise GangaFileError('Must supply an lfn to replicate')
 
         logger.info("Replicating file %s to %s" % (self.lfn, destSE))
-        stdout = execute('replicateFile("%s", "%s", "%s")' % (self.lfn, destSE, sourceSE), cred_req=self.credential_requirements)
+        try:
+            stdout = execute('replicateFile("%s", "%s", "%s")' % (self.lfn, destSE, sourceSE), cred_req=self.credential_requirements)
+        finally:
+            invalidateLFNs(self.lfn)
 
         if destSE not in self.locations:
             self.locations.append(destSE)
@@ -771,6 +787,8 @@ class DiracFile(IGangaFile):
             stdout = ''
             logger.info('Uploading file \'%s\' to \'%s\' as \'%s\'' % (name, storage_elements[0], lfn))
             logger.debug('execute: uploadFile("%s", "%s", %s)' % (lfn, os.path.join(sourceDir, name), str([storage_elements[0]])))
+            # Whatever was known about the LFN is about to be out of date
+            invalidateLFNs(lfn)
             try:
                 stdout = execute('uploadFile("%s", "%s", %s)' % (lfn, os.path.join(sourceDir, name), str([storage_elements[0]])), cred_req=self.credential_requirements)
             except GangaDiracError as err:
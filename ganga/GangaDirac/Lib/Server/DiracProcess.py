@@ -1,83 +1,217 @@
 #!/usr/bin/env python
+# The DIRAC server of a Ganga session, run as
+#
+#   DiracProcess.py <port> [<number of workers>]
+#
+# within the DIRAC environment. The first line of stdin is the token of the session, the rest is the source of the
+# DIRAC commands (DiracDefinition.py, DiracCommands.py...) which are loaded by every worker.
+#
+# The master process listens on the port and forks the workers which all accept connections from it. A worker serves
+# one connection at a time for as long as the client keeps it open, executing the requests sent on it in order, see
+# DiracProtocol.py for the format. Workers exit after IDLE_TIMEOUT seconds without a connection and the master once
+# all of them have.
 import sys
 import os
 import errno
+import shutil
 import socket
+import tempfile
+import time
 import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from DiracProtocol import send_frame, recv_frame, dumps, loads, ProtocolError
+
 HOST = 'localhost'  # Standard loopback interface address (localhost)
-PORT = int(sys.argv[1])        # Port to listen on
-rand_hash = raw_input() 
-import time
-#We have to define an output function as a placeholder here.
-def output(data):
-    pass
-
-#A function to shutdown an existing processes
-def closeSocket():
-    sc = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sc.connect((HOST, PORT))
-    sc.sendall(b'close server')
-    sc.close()
-end_trans = '###END-TRANS###'
-#This is a wrapper for the client sockets
-class socketWrapper(object):
-
-    def __init__(self, skt):
-        self._socket = skt
-
-    def read(self):
-        cmd = ''
-        while end_trans not in cmd:
-            data = self._socket.recv(1024)
-            if not data:
-                cmd = '###BROKEN###'
-                break
-            cmd += data
-        #Check the random string is in the cmd so we know it came from a trusted source.
-        if not rand_hash in cmd:
-            return 'close-connection'
-        if cmd == '###BROKEN###':
-            return ''
-        return_string = cmd.replace(rand_hash, '')
-        return return_string.replace(end_trans, '')
-
-#Start the socket
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.bind((HOST, PORT))
-s.listen(1024)
-#Set 30 minute timeout
-s.settimeout(1800)
-while True:
+
+# 30 minutes without any connection
+IDLE_TIMEOUT = 1800
+
+# Number of times workers which crashed are replaced before giving up on them
+MAX_RESPAWNS = 10
+
+
+class CommandRunner(object):
+
+    """
+    Executes the commands sent to a worker in the namespace the DIRAC commands were loaded in.
+    The result of a command is what it passed to output() (which all the functions wrapped by diracCommand do), else
+    its value wrapped as a DIRAC result
+    """
+
+    def __init__(self, includes):
+        self.outputs = []
+        self.namespace = {'output': self.outputs.append}
+        self.load_error = None
+        # The DIRAC commands parse the command line of the process
+        sys.argv = sys.argv[:1]
+        try:
+            exec(compile(includes, '<DIRAC commands>', 'exec'), self.namespace)
+        except BaseException:
+            self.load_error = traceback.format_exc()
+            sys.stderr.write("Failed to load the DIRAC commands:\n%s\n" % self.load_error)
+
+    def run(self, command, cwd):
+        if self.load_error is not None:
+            return {'OK': False, 'Message': "Failed to load the DIRAC commands:\n%s" % self.load_error}
+        del self.outputs[:]
+        try:
+            os.chdir(cwd)
+            try:
+                code = compile(command, '<command>', 'eval')
+            except SyntaxError:
+                code = compile(command, '<command>', 'exec')
+            value = eval(code, self.namespace)
+        except (Exception, SystemExit):
+            return {'OK': False, 'Message': "Exception raised executing command '%s'\n%s" % (command, traceback.format_exc())}
+        if self.outputs:
+            return self.outputs[-1]
+        return {'OK': True, 'Value': value}
+
+
+def clearDirectory(path):
+    """
+    Remove whatever a command left behind in a directory
+    Args:
+        path (str): the directory
+    """
+    for name in os.listdir(path):
+        full_path = os.path.join(path, name)
+        if os.path.isdir(full_path) and not os.path.islink(full_path):
+            shutil.rmtree(full_path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(full_path)
+            except OSError:
+                pass
+
+
+def serveConnection(conn, token, runner, scratch_dir):
+    """
+    Execute the requests sent on a connection until it is closed
+    Args:
+        conn (socket): the accepted connection
+        token (str): token of the session, the connection is dropped unless it is the first thing sent
+        runner (CommandRunner): executes the commands
+        scratch_dir (str): where to execute commands sent without a directory
+    """
     try:
-        conn, addr = s.accept()
-        sock = socketWrapper(conn)
-        cmd = sock.read()
-        #Here we define the output method to just send the output of the diracCommand wrapper.
-        def output(data):
-            conn.sendall(repr(data))
-
-        if cmd=='close-connection':
+        first = recv_frame(conn)
+        if first is None or loads(first) != token:
+            return
+        while True:
+            payload = recv_frame(conn)
+            if payload is None:
+                break
+            request_id, cwd, command = loads(payload)
+            result = runner.run(command, cwd or scratch_dir)
+            send_frame(conn, dumps((request_id, result)))
+            if not cwd:
+                clearDirectory(scratch_dir)
+    except (socket.error, ProtocolError, ValueError):
+        pass
+    finally:
+        try:
             conn.shutdown(socket.SHUT_RDWR)
-            conn.close()
-            continue
+        except socket.error:
+            pass
+        conn.close()
 
-        if cmd=='close-server':
-            conn.shutdown(socket.SHUT_RDWR)
-            conn.close()
-            break
-        try:
-            print(eval(cmd))
-        except:
+
+def runWorker(listener, token, includes, master):
+    """
+    Main loop of a worker process
+    Args:
+        listener (socket): listening socket shared by all workers
+        token (str): token of the session
+        includes (str): source of the DIRAC commands
+        master (int): pid of the master process, the worker exits if it goes away
+    """
+    runner = CommandRunner(includes)
+    scratch_dir = tempfile.mkdtemp(prefix='DiracProcess-')
+    try:
+        listener.settimeout(1)
+        idle_since = time.time()
+        while os.getppid() == master:
             try:
-                exec(cmd)
-            except:
-                print("Exception raised executing command (cmd) '%s'\n" % cmd)
-                print(traceback.format_exc())
-
-        conn.sendall('###END-TRANS###')
-    #Catch the timeout and exit
-    except socket.timeout:
-        break
-
-s.shutdown(socket.SHUT_RDWR)
-s.close()
+                conn, _ = listener.accept()
+            except socket.timeout:
+                if time.time() - idle_since > IDLE_TIMEOUT:
+                    break
+                continue
+            except socket.error as err:
+                if err.errno == errno.EINTR:
+                    continue
+                raise
+            conn.settimeout(None)
+            serveConnection(conn, token, runner, scratch_dir)
+            idle_since = time.time()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def startWorker(listener, token, includes):
+    """
+    Fork a worker, returns its pid
+    Args:
+        listener (socket): listening socket shared by all workers
+        token (str): token of the session
+        includes (str): source of the DIRAC commands
+    """
+    master = os.getpid()
+    pid = os.fork()
+    if pid:
+        return pid
+    exit_code = 0
+    try:
+        runWorker(listener, token, includes, master)
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def main():
+    port = int(sys.argv[1])
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    token = sys.stdin.readline().strip()
+    includes = sys.stdin.read()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((HOST, port))
+    listener.listen(1024)
+
+    parent = os.getppid()
+    workers = set(startWorker(listener, token, includes) for _ in range(max(num_workers, 1)))
+    respawns = 0
+    while workers:
+        if os.getppid() != parent:
+            # Ganga has gone, so should we
+            for pid in workers:
+                try:
+                    os.kill(pid, 9)
+                except OSError:
+                    pass
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except OSError as err:
+            if err.errno == errno.EINTR:
+                continue
+            break
+        if not pid:
+            time.sleep(1)
+            continue
+        workers.discard(pid)
+        if status != 0 and respawns < MAX_RESPAWNS and os.getppid() == parent:
+            respawns += 1
+            workers.add(startWorker(listener, token, includes))
+
+    listener.close()
+
+
+if __name__ == '__main__':
+    main()
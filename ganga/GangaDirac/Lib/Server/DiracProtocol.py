@@ -0,0 +1,169 @@
+# Wire format spoken between Ganga (GangaDirac.Lib.Utilities.DiracConnectionPool) and the DIRAC server (DiracProcess.py).
+#
+# Every message is a frame: a 4 byte big-endian length followed by that many bytes of payload. A payload is the repr()
+# of a plain python value (str, unicode, numbers, bool, None, tuple, list, dict, set and datetime objects) which is
+# read back by loads(). loads() only accepts such literals, nothing received is ever eval'd.
+#
+#   client -> server   first frame of a connection: the token of the session, the connection is dropped otherwise
+#                      then any number of (request id, cwd or None, python source of the command)
+#   server -> client   (request id, result) for each request, in the order the requests were sent
+#
+# A client may send further requests before the answers to the previous ones have arrived.
+#
+# NB: this file is also imported by DiracProcess.py running in the DIRAC environment so must not import anything from Ganga
+
+import ast
+import datetime
+import struct
+
+_HEADER = struct.Struct('>I')
+
+# Largest frame accepted, anything bigger means the stream is corrupt
+MAX_FRAME = 1 << 30
+
+_LITERAL_TYPES = (str, unicode, int, long, float, bool, type(None), datetime.timedelta)
+_CALLABLES = {'datetime': datetime.datetime, 'date': datetime.date, 'time': datetime.time,
+              'timedelta': datetime.timedelta, 'set': set, 'frozenset': frozenset}
+_NAMES = {'None': None, 'True': True, 'False': False, 'inf': float('inf'), 'nan': float('nan')}
+
+
+class ProtocolError(Exception):
+
+    """Raised when a frame or a payload can't be read"""
+    pass
+
+
+def send_frame(sock, payload):
+    """
+    Send one frame
+    Args:
+        sock (socket): connected socket
+        payload (str): bytes to send
+    """
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, length):
+    """
+    Returns exactly length bytes from the socket, None if the connection is closed before the first of them
+    Args:
+        sock (socket): connected socket
+        length (int): number of bytes to read
+    """
+    chunks = []
+    remaining = length
+    while remaining:
+        data = sock.recv(min(remaining, 1 << 20))
+        if not data:
+            if remaining == length:
+                return None
+            raise ProtocolError("Connection closed in the middle of a frame")
+        chunks.append(data)
+        remaining -= len(data)
+    return ''.join(chunks)
+
+
+def recv_frame(sock):
+    """
+    Returns the payload of the next frame, None if the connection was closed
+    Args:
+        sock (socket): connected socket
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    length = _HEADER.unpack(header)[0]
+    if length > MAX_FRAME:
+        raise ProtocolError("Frame of %s bytes is too large" % length)
+    if length == 0:
+        return ''
+    payload = _recv_exactly(sock, length)
+    if payload is None:
+        raise ProtocolError("Connection closed in the middle of a frame")
+    return payload
+
+
+def _plain(obj):
+    """
+    Returns obj with anything dumps() can't send replaced by its repr
+    Args:
+        obj (object): value to send
+    """
+    if isinstance(obj, bool) or obj is None:
+        return obj
+    if isinstance(obj, (datetime.datetime, datetime.time)):
+        return obj if obj.tzinfo is None else repr(obj)
+    if isinstance(obj, _LITERAL_TYPES + (datetime.date,)):
+        return obj
+    if isinstance(obj, dict):
+        return dict((_plain(key), _plain(value)) for key, value in obj.iteritems())
+    if isinstance(obj, list):
+        return [_plain(item) for item in obj]
+    if isinstance(obj, tuple):
+        return tuple(_plain(item) for item in obj)
+    if isinstance(obj, frozenset):
+        return frozenset(_plain(item) for item in obj)
+    if isinstance(obj, set):
+        return set(_plain(item) for item in obj)
+    return repr(obj)
+
+
+def dumps(obj):
+    """
+    Returns the payload for a value
+    Args:
+        obj (object): value to send
+    """
+    return repr(_plain(obj))
+
+
+def _convert(node):
+    """
+    Returns the value of a node of the syntax tree of a payload, raise ProtocolError for anything but a literal
+    Args:
+        node (ast.AST): node of the tree
+    """
+    if isinstance(node, ast.Str):
+        return node.s
+    if isinstance(node, ast.Num):
+        return node.n
+    if isinstance(node, ast.Tuple):
+        return tuple(_convert(item) for item in node.elts)
+    if isinstance(node, ast.List):
+        return [_convert(item) for item in node.elts]
+    if isinstance(node, ast.Dict):
+        return dict((_convert(key), _convert(value)) for key, value in zip(node.keys, node.values))
+    if isinstance(node, ast.Name) and node.id in _NAMES:
+        return _NAMES[node.id]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _convert(node.operand)
+        if isinstance(operand, (int, long, float)):
+            return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.Call) and not node.keywords and node.starargs is None and node.kwargs is None:
+        func = node.func
+        # datetime.datetime(...) as well as plain datetime(...)
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == 'datetime':
+            name = func.attr
+        elif isinstance(func, ast.Name):
+            name = func.id
+        else:
+            name = None
+        if name in _CALLABLES:
+            return _CALLABLES[name](*[_convert(arg) for arg in node.args])
+    raise ProtocolError("Unexpected '%s' in payload" % type(node).__name__)
+
+
+def loads(payload):
+    """
+    Returns the value sent as payload
+    Args:
+        payload (str): payload of a frame
+    """
+    try:
+        tree = ast.parse(payload, mode='eval')
+    except SyntaxError as err:
+        raise ProtocolError("Can't parse payload: %s" % err)
+    try:
+        return _convert(tree.body)
+    except (TypeError, ValueError) as err:
+        raise ProtocolError("Bad value in payload: %s" % err)
@@ -1,5 +1,6 @@
 from GangaCore.Core.exceptions import SplitterError
 from GangaDirac.Lib.Utilities.DiracUtilities import execute
+from GangaDirac.Lib.Utilities.LFNCache import resolveDiracFiles
 from GangaDirac.Lib.Backends.DiracUtils import result_ok
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
@@ -30,26 +31,22 @@ def GangaDiracSplitter(inputs, filesPerJob, maxFiles, ignoremissing):
 
     file_replicas = {}
 
-    from GangaCore.Core.GangaThread.WorkerThreads import getQueues
-
-    for i in inputs:
-        #logging.debug( "getting metadata: %s" % str(i.lfn) )
-        getQueues().add(i.getReplicas)
-
     logger.info("Requesting LFN replica info")
 
-    # This finds all replicas for all LFNs...
-    # This will probably struggle for LFNs which don't exist
-    all_lfns = [i.locations for i in inputs]
-    while [] in all_lfns:
-        import time
-        time.sleep(0.5)
-        all_lfns = [i.locations for i in inputs]
+    # This finds all replicas for all LFNs in bulk
+    bad_lfns = resolveDiracFiles(inputs)
+    if bad_lfns:
+        if not ignoremissing:
+            logger.error("Errors found getting LFNs:\n%s" % str(bad_lfns))
+            raise SplitterError("Error trying to split dataset with invalid LFN and ignoremissing = False")
+        for lfn in bad_lfns:
+            logger.warning("LFN: %s was either unknown to DIRAC or unavailable, Ganga is ignoring it!" % str(lfn))
 
     logger.info("Got replicas")
 
     for i in inputs:
-        file_replicas[i.lfn] = i.locations
+        if i.lfn not in bad_lfns:
+            file_replicas[i.lfn] = i.locations
         #logger.info( "%s" % str( i.accessURL() ) )
 
     logger.debug("found all replicas")
@@ -5,6 +5,7 @@ from GangaCore.Utility.logging import getLogger
 from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
 from GangaCore.Core.GangaThread.WorkerThreads import getQueues
 from GangaDirac.Lib.Files.DiracFile import DiracFile
+from GangaDirac.Lib.Utilities.LFNCache import resolveDiracFiles
 from copy import deepcopy
 import random
 import time
@@ -26,7 +27,7 @@ import math
             For a given CE which SE can we access?
 
     3. Get a full list of all of the replicas for all files against all of the valid SE
-        This is attempted to be done in large chunks goverened by LFN_parallel_limit
+        This is attempted to be done in large chunks goverened by the DIRAC.LFNChunkSize config option
         Requesting all replicas for >3,000 files can cause timeouts and other problems
         I opted to reduce this and run mulitple queries in parallel to speed this up.
 
@@ -98,7 +99,6 @@ logger = getLogger()
 
 global_random = random
 
-LFN_parallel_limit = 250.
 def wrapped_execute(command, expected_type):
     """
     A wrapper around execute to protect us from commands which had errors
@@ -140,43 +140,6 @@ def find_random_site(original_SE_list, banned_SE):
     return chosen_element
 
 
-def getLFNReplicas(allLFNs, index, allLFNData):
-    """
-    This method gets the location of all replicas for 'allLFNs' and stores the infomation in 'allLFNData'
-
-    This is a 'static' method which is called multiple times with the same 'allLFNs' and 'allLFNData' and different index.
-    e.g. This allows Dirac to determine the replicas for ~250LFN all at once rather than for ~40,000 all at once which risks timeouts and other errors
-
-    Args:
-        allLFNs (list): This is a list of all LFN which have replicas on the grid
-        index (int): This is used to determine which slice of LFNs we want to look at
-        allLFNData (dict): This is a dict where the replica information is to be stored temporarily
-    """
-    output = None
-
-    global LFN_parallel_limit
-
-    this_min = int(index * LFN_parallel_limit)
-
-    if (index + 1) * LFN_parallel_limit > len(allLFNs):
-        this_max = len(allLFNs)
-    else:
-        this_max = int((index + 1) * LFN_parallel_limit)
-
-    try:
-        output = wrapped_execute('getReplicasForJobs(%s)' % str(allLFNs[this_min:this_max]), dict)
-    except SplitterError:
-        logger.error("Failed to Get Replica Info: [%s:%s] of %s" % (str(this_min), str(this_max), len(allLFNs)))
-        raise
-
-    import GangaCore.Runtime.Repository_runtime
-    GangaCore.Runtime.Repository_runtime.updateLocksNow()
-
-    allLFNData[index] = output
-
-    logger.info("Got Replica Info: [%s:%s] of %s" % (str(this_min), str(this_max), len(allLFNs)))
-
-
 def generate_site_selection(input_site, wanted_common_SE, uniqueSE, CE_to_SE_mapping, SE_to_CE_mapping):
     """
     Return a set of sites which are a subset of the given input_site.
@@ -299,36 +262,20 @@ def calculateSiteSEMapping(file_replicas, uniqueSE, CE_to_SE_mapping, SE_to_CE_m
 
 def lookUpLFNReplicas(inputs, ignoremissing):
     """
-    This method launches several worker threads to collect the replica information for all LFNs which are given as inputs and stores this in allLFNData
+    This method collects the replica information for all LFNs which are given as inputs in bulk and stores it in the DiracFiles
     Args:
         inputs (list): This is a list of input DiracFile which are 
     Returns:
         bad_lfns (list): A list of LFN which have no replica information when querying `getReplicasForJobs` from DIRAC
     """
-    allLFNData = {}
-    # Build a useful dictionary and list
-    allLFNs = [_lfn.lfn for _lfn in inputs]
-    LFNdict = dict.fromkeys(allLFNs)
-    for _lfn in inputs:
-        LFNdict[_lfn.lfn] = _lfn
-
-    # Request the replicas for all LFN 'LFN_parallel_limit' at a time to not overload the
-    # server and give some feedback as this is going on
-    global LFN_parallel_limit
-    for i in range(int(math.ceil(float(len(allLFNs)) / LFN_parallel_limit))):
-
-        getQueues()._monitoring_threadpool.add_function(getLFNReplicas, (allLFNs, i, allLFNData))
-
-    while len(allLFNData) != int(math.ceil(float(len(allLFNs)) / LFN_parallel_limit)):
-        time.sleep(1.)
-        # This can take a while so lets protect any repo locks
-        import GangaCore.Runtime.Repository_runtime
-        GangaCore.Runtime.Repository_runtime.updateLocksNow()
-
-    bad_lfns = []
+    # Request the replicas for all LFN 'LFNChunkSize' at a time to not overload the server
+    try:
+        bad_lfns = resolveDiracFiles(inputs, forJobs=True)
+    except GangaDiracError as err:
+        raise SplitterError("Error from Dirac: %s" % err)
 
-    # Sort this information and store is in the relevant Ganga objects
-    updateLFNData(bad_lfns, allLFNs, LFNdict, ignoremissing, allLFNData)
+    for this_lfn in bad_lfns:
+        logger.warning("LFN: %s was either unknown to DIRAC or unavailable, Ganga is ignoring it!" % str(this_lfn))
 
     # Check if we have any bad lfns
     if bad_lfns and ignoremissing is False:
@@ -338,61 +285,6 @@ def lookUpLFNReplicas(inputs, ignoremissing):
     return bad_lfns
 
 
-def updateLFNData(bad_lfns, allLFNs, LFNdict, ignoremissing, allLFNData):
-    """
-    Method to re-sort the LFN replica data and check for bad LFNs
-
-    Args:
-        bad_lfns (list): This is the list which will contain LFNs which have no replicas
-        allLFNs (list): List of all of the LFNs in the inputs which have accessible replicas
-        LFNdict (dict): dict of LFN to DiracFiles
-        ignoremissing (bool): Check if we have any bad lfns
-        allLFNData (dict): All LFN replica data
-    """
-
-    global LFN_parallel_limit
-
-    for i in range(int(math.ceil(float(len(allLFNs)) / LFN_parallel_limit))):
-        output = allLFNData.get(i)
-
-        if output is None:
-            msg = "Error getting Replica information from Dirac: [%s,%s]" % ( str(i * LFN_parallel_limit), str((i + 1) * LFN_parallel_limit))
-            raise SplitterError(msg)
-
-        # Identify files which have Failed to be found by DIRAC
-        results = output
-        values = results.get('Successful')
-
-        upper_limit = (i+1)*LFN_parallel_limit
-        if upper_limit > len(allLFNs):
-            upper_limit = len(allLFNs)
-
-        #logger.debug("Updating LFN Physical Locations: [%s:%s] of %s" % (str(i * LFN_parallel_limit), str(upper_limit), str(len(allLFNs))))
-
-        for this_lfn in values.keys():
-            #logger.debug("LFN: %s" % str(this_lfn))
-            this_dict = {}
-            this_dict[this_lfn] = values.get(this_lfn)
-
-            if this_lfn in LFNdict:
-                #logger.debug("Updating RemoteURLs")
-                LFNdict[this_lfn]._updateRemoteURLs(this_dict)
-                #logger.debug("This_dict: %s" % str(this_dict))
-            else:
-                logger.error("Error updating remoteURLs for: %s" % str(this_lfn))
-
-            # If we find NO replicas then also mark this as bad!
-            if this_dict[this_lfn].keys() == []:
-                bad_lfns.append(this_lfn)
-
-        for this_lfn in bad_lfns:
-            logger.warning("LFN: %s was either unknown to DIRAC or unavailable, Ganga is ignoring it!" % str(this_lfn))
-            if this_lfn in LFNdict:
-                del LFNdict[this_lfn]
-            if this_lfn in allLFNs:
-                allLFNs.remove(this_lfn)
-
-
 # Actually Do the work of the splitting
 
 def OfflineGangaDiracSplitter(_inputs, filesPerJob, maxFiles, ignoremissing, bannedSites=[]):
@@ -0,0 +1,325 @@
+import re
+import socket
+import threading
+import time
+from itertools import count
+
+from GangaCore.Utility.logging import getLogger
+from GangaDirac.Lib.Server.DiracProtocol import send_frame, recv_frame, dumps, loads, ProtocolError
+from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+
+logger = getLogger()
+
+HOST = 'localhost'
+
+# The type of a command is the name of the DIRAC command it calls, anything else is a script
+_command_type = re.compile(r'^\s*([A-Za-z_]\w*)\s*\(')
+
+
+class DiracRequest(object):
+
+    """ A command sent on a DiracConnection, waiting for its result """
+
+    __slots__ = ('_event', 'result', 'error')
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def set(self, result):
+        self.result = result
+        self._event.set()
+
+    def fail(self, error):
+        self.error = error
+        self._event.set()
+
+    def wait(self, timeout=None):
+        """
+        Returns True once the result (or error) is there, False if it wasn't before the timeout
+        Args:
+            timeout (float): seconds to wait for, forever if None
+        """
+        return self._event.wait(timeout)
+
+
+class DiracConnection(object):
+
+    """
+    A connection to the DIRAC server which any number of threads can send commands on without waiting for the results
+    of the others. The results are read by a thread of the connection and handed to the requests waiting for them.
+    """
+
+    def __init__(self, port, token, host=HOST):
+        """
+        Args:
+            port (int): port the DIRAC server listens on
+            token (str): token of the session
+            host (str): host the DIRAC server listens on
+        """
+        self._socket = socket.create_connection((host, port))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_frame(self._socket, dumps(str(token)))
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        # commands the pool has picked this connection for but which haven't been submitted yet
+        self._reserved = 0
+        self._request_ids = count()
+        self.closed = False
+        self._reader = threading.Thread(target=self._read, name='DiracConnection_%s' % port)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def inFlight(self):
+        """ Returns the number of requests waiting for their results, or about to be submitted """
+        return len(self._pending) + self._reserved
+
+    def reserve(self):
+        """ Count a command which is about to be submitted as in flight, the submit has to be made with reserved=True """
+        with self._lock:
+            self._reserved += 1
+
+    def submit(self, command, cwd=None, reserved=False):
+        """
+        Send a command, returns the DiracRequest to wait on for its result
+        Args:
+            command (str): python source of the command
+            cwd (str): directory to execute it in, a scratch directory of the server if None
+            reserved (bool): whether the command was counted in flight by reserve
+        """
+        request = DiracRequest()
+        with self._lock:
+            if reserved:
+                self._reserved -= 1
+            if self.closed:
+                raise GangaDiracError("The connection to the DIRAC server is closed")
+            request_id = next(self._request_ids)
+            self._pending[request_id] = request
+        try:
+            with self._send_lock:
+                send_frame(self._socket, dumps((request_id, cwd, command)))
+        except socket.error as err:
+            self._close("Failed to send the command to the DIRAC server: %s" % err)
+        return request, request_id
+
+    def _read(self):
+        """ Main loop of the reader thread """
+        reason = "Lost the connection to the DIRAC server"
+        try:
+            while True:
+                payload = recv_frame(self._socket)
+                if payload is None:
+                    break
+                request_id, result = loads(payload)
+                with self._lock:
+                    request = self._pending.pop(request_id, None)
+                if request is not None:
+                    request.set(result)
+        except (socket.error, ProtocolError, ValueError) as err:
+            reason = "%s: %s" % (reason, err)
+        finally:
+            self._close(reason)
+
+    def _close(self, reason):
+        """
+        Close the connection, failing the requests still waiting
+        Args:
+            reason (str): error given to them
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._socket.close()
+        for request in pending.values():
+            request.fail(reason)
+
+    def close(self, reason="The connection to the DIRAC server was closed"):
+        """
+        Close the connection
+        Args:
+            reason (str): error given to the requests still waiting
+        """
+        self._close(reason)
+
+
+class DiracCommandStats(object):
+
+    """ Number, failures and duration of the commands executed against DIRAC, per type of command """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def commandType(command):
+        """
+        Returns the type a command is counted as
+        Args:
+            command (str): python source of the command
+        """
+        match = _command_type.match(command)
+        return match.group(1) if match else 'script'
+
+    def record(self, command, duration, ok):
+        """
+        Count an executed command
+        Args:
+            command (str): python source of the command
+            duration (float): seconds it took to get the result
+            ok (bool): whether DIRAC reported success
+        """
+        command_type = self.commandType(command)
+        with self._lock:
+            stats = self._stats.get(command_type)
+            if stats is None:
+                stats = self._stats[command_type] = {'count': 0, 'errors': 0, 'total_time': 0., 'max_time': 0.}
+            stats['count'] += 1
+            if not ok:
+                stats['errors'] += 1
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+
+    def summary(self):
+        """ Returns a dict of the stats of each type of command """
+        with self._lock:
+            summary = dict((command_type, dict(stats)) for command_type, stats in self._stats.iteritems())
+        for stats in summary.itervalues():
+            stats['mean_time'] = stats['total_time'] / stats['count']
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class DiracConnectionPool(object):
+
+    """
+    Persistent connections to the DIRAC server, as many as it has workers. Commands go to an idle connection if there
+    is one, else to the one with the fewest commands in flight, so that they run concurrently on the workers.
+    A worker serves a single connection and runs its commands one at a time, so a connection whose command timed out is
+    closed rather than reused, and the next command goes to a fresh connection served by a free worker.
+    """
+
+    def __init__(self, size, start_server):
+        """
+        Args:
+            size (int): maximum number of connections
+            start_server (callable): start_server(restart) returns (port, token) of the DIRAC server, (re)starting it
+                if needed or restart is True
+        """
+        self.size = max(size, 1)
+        self._start_server = start_server
+        self._lock = threading.Lock()
+        # notified when a connection being opened is added to the pool, or failed to open
+        self._connected = threading.Condition(self._lock)
+        # the server is only started by one thread at a time, outside of the pool lock
+        self._server_lock = threading.Lock()
+        self._connections = []
+        self._connecting = 0
+        self.stats = DiracCommandStats()
+
+    def _connect(self):
+        """ Returns a new connection, restarting the server if it can't be reached """
+        with self._server_lock:
+            port, token = self._start_server(False)
+            try:
+                return DiracConnection(port, token)
+            except socket.error as err:
+                logger.debug("Failed to connect to the DIRAC server, restarting it: %s" % err)
+            # Restarting stops the workers of the server, the commands in flight on its connections won't get results
+            self._closeAll("The DIRAC server was restarted")
+            port, token = self._start_server(True)
+            try:
+                return DiracConnection(port, token)
+            except socket.error as err:
+                raise GangaDiracError("Failed to connect to the DIRAC server: %s" % err)
+
+    def _getConnection(self):
+        """
+        Returns the connection to send the next command on, with the command reserved on it so that concurrent callers
+        pick other connections
+        """
+        with self._lock:
+            while True:
+                self._connections = [conn for conn in self._connections if not conn.closed]
+                best = min(self._connections, key=lambda conn: conn.inFlight()) if self._connections else None
+                can_connect = len(self._connections) + self._connecting < self.size
+                if best is not None and not (best.inFlight() and can_connect):
+                    best.reserve()
+                    return best
+                if can_connect:
+                    break
+                # All the connections allowed are being opened
+                self._connected.wait()
+            self._connecting += 1
+        connection = None
+        try:
+            connection = self._connect()
+            connection.reserve()
+            return connection
+        finally:
+            with self._lock:
+                self._connecting -= 1
+                if connection is not None:
+                    self._connections.append(connection)
+                self._connected.notify_all()
+
+    def _drop(self, connection, reason):
+        """
+        Close a connection and take it out of the pool
+        Args:
+            connection (DiracConnection): connection to drop
+            reason (str): error given to the requests still waiting on it
+        """
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close(reason)
+
+    def _closeAll(self, reason):
+        """
+        Close all the connections
+        Args:
+            reason (str): error given to the requests still waiting on them
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close(reason)
+
+    def execute(self, command, cwd=None, timeout=None):
+        """
+        Execute a command on the DIRAC server, returns its result
+        Args:
+            command (str): python source of the command
+            cwd (str): directory to execute it in, a scratch directory of the server if None
+            timeout (float): seconds to wait for the result, forever if None
+        """
+        start = time.time()
+        ok = False
+        try:
+            connection = self._getConnection()
+            request, _ = connection.submit(command, cwd, reserved=True)
+            if not request.wait(timeout):
+                # The worker is busy with the command until it finishes, whatever else is sent on the connection waits
+                self._drop(connection, "A command sent before timed out on the connection to the DIRAC server")
+                raise GangaDiracError("DIRAC command timed out")
+            if request.error is not None:
+                raise GangaDiracError(request.error)
+            ok = isinstance(request.result, dict) and bool(request.result.get('OK'))
+            return request.result
+        finally:
+            self.stats.record(command, time.time() - start, ok)
+
+    def close(self):
+        """ Close all the connections """
+        self._closeAll("The connection to the DIRAC server was closed")
@@ -6,7 +6,6 @@ import tempfile
 import shutil
 import json
 import time
-import socket
 from copy import deepcopy
 from GangaCore.Utility.Config import getConfig
 from GangaCore.Utility.logging import getLogger
@@ -22,7 +21,8 @@ DIRAC_ENV = {}
 DIRAC_INCLUDE = ''
 Dirac_Env_Lock = threading.Lock()
 Dirac_Proxy_Lock = threading.Lock()
-Dirac_Exec_Lock = threading.Lock()
+Dirac_Pool_Lock = threading.Lock()
+DIRAC_CONNECTION_POOL = None
 # /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
 
 class GangaDiracError(GangaException):
@@ -160,6 +160,42 @@ def getDiracCommandIncludes(force=False):
 # /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
 
 
+def startDiracServer(restart=False):
+    """
+    Returns the port and token of the DIRAC server of this session, starting it if it isn't running.
+    The connection pool calls it from one thread at a time.
+    Args:
+        restart (bool): Start a new server even if one was started already, e.g. because it can't be reached anymore
+    """
+    import GangaDirac.BOOT as boot
+    if restart or not boot.running_dirac_process:
+        boot.startDiracProcess()
+    return boot.dirac_process_ids[1], boot.dirac_process_ids[2]
+
+
+def getDiracConnectionPool():
+    """
+    Returns the pool of connections to the DIRAC server which execute() sends commands to
+    """
+    global DIRAC_CONNECTION_POOL
+    with Dirac_Pool_Lock:
+        if DIRAC_CONNECTION_POOL is None:
+            from GangaDirac.Lib.Utilities.DiracConnectionPool import DiracConnectionPool
+            DIRAC_CONNECTION_POOL = DiracConnectionPool(getConfig('DIRAC')['ServerWorkers'], startDiracServer)
+    return DIRAC_CONNECTION_POOL
+
+
+def getDiracCommandStats():
+    """
+    Returns a dict of the number, failures and duration of the commands sent to the DIRAC server per type of command
+    """
+    if DIRAC_CONNECTION_POOL is None:
+        return {}
+    return DIRAC_CONNECTION_POOL.stats.summary()
+
+# /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
+
+
 def getValidDiracFiles(job, names=None):
     """
     This is a generator for all DiracFiles in a jobs outputfiles
@@ -219,52 +255,19 @@ def execute(command,
         new_subprocess(bool): Do we want to do this in a fresh subprocess or just connect to the DIRAC server process?
     """
 
-    if cwd is None:
-        # We can in all likelyhood be in a temp folder on a shared (SLOW) filesystem
-        # If we are we do NOT want to execute commands which will involve any I/O on the system that isn't needed
-        cwd_ = tempfile.mkdtemp()
-    else:
-        # We know were whe want to run, lets just run there
-        cwd_ = cwd
-
-    from GangaDirac.BOOT import startDiracProcess
     returnable = ''
     if not new_subprocess:
-        with Dirac_Exec_Lock:
-            # First check if a Dirac process is running
-            from GangaDirac.BOOT import running_dirac_process
-            if not running_dirac_process:
-                startDiracProcess()
-            #Set up a socket to connect to the process
-            from GangaDirac.BOOT import dirac_process_ids
-            HOST = 'localhost'  # The server's hostname or IP address
-            PORT = dirac_process_ids[1]        # The port used by the server
-
-            #Put inside a try/except in case the existing process has timed out
-            try:
-                s= socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.connect((HOST, PORT))
-            except socket.error as serr:
-                #Start a new process
-                startDiracProcess()
-                from GangaDirac.BOOT import dirac_process_ids
-                PORT = dirac_process_ids[1]
-                s= socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.connect((HOST, PORT))
-
-            #Send a random string, then change the directory to carry out the command, then send the command
-            command_to_send  = str(dirac_process_ids[2])
-            command_to_send += 'os.chdir("%s")\n' % cwd_
-            command_to_send += command
-            s.sendall(b'%s###END-TRANS###' % command_to_send)
-            out = ''
-            while '###END-TRANS###' not in out:
-                data = s.recv(1024)
-                out += data
-            s.close()
-            returnable = eval(out)
+        returnable = getDiracConnectionPool().execute(command, cwd=cwd, timeout=timeout)
 
     else:
+        if cwd is None:
+            # We can in all likelyhood be in a temp folder on a shared (SLOW) filesystem
+            # If we are we do NOT want to execute commands which will involve any I/O on the system that isn't needed
+            cwd_ = tempfile.mkdtemp()
+        else:
+            # We know were whe want to run, lets just run there
+            cwd_ = cwd
+
         if env is None:
             if cred_req is None:
                 env = getDiracEnv()
@@ -287,6 +290,9 @@ def execute(command,
                                       eval_includes=eval_includes,
                                       update_env=update_env)
 
+        if cwd is None:
+            shutil.rmtree(cwd_, ignore_errors=True)
+
         # If the time 
         if returnable == 'Command timed out!':
             raise GangaDiracError("DIRAC command timed out")
@@ -294,9 +300,6 @@ def execute(command,
         # TODO we would like some way of working out if the code has been executed correctly
         # Most commands will be OK now that we've added the check for the valid proxy before executing commands here
 
-    if cwd is None:
-        shutil.rmtree(cwd_, ignore_errors=True)
-
     if isinstance(returnable, dict) and not return_raw_dict:
         # If the output is a dictionary allow for automatic error detection
         if returnable['OK']:
@@ -0,0 +1,225 @@
+"""
+Bulk lookups of the replicas and metadata of LFNs, backed by a cache for the session.
+
+DIRAC is asked about many LFNs at once, in chunks of DIRAC.LFNChunkSize run concurrently, and only about those which
+aren't in the cache already. Entries are kept for DIRAC.LFNCacheTime seconds and dropped as soon as Ganga changes the
+file behind an LFN (DiracFile.put, replicate, remove...) through invalidateLFNs.
+"""
+import copy
+import threading
+import time
+
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.logging import getLogger
+from GangaDirac.Lib.Utilities.DiracUtilities import execute
+
+logger = getLogger()
+
+# What is looked up about an LFN, and the DIRAC command doing it for a list of LFNs
+REPLICAS = 'getReplicas'
+JOB_REPLICAS = 'getReplicasForJobs'
+METADATA = 'getMetadata'
+
+
+class LFNCache(object):
+
+    """
+    Results of lookups of LFNs by the kind of lookup, each expiring after a given time. Thread safe.
+    """
+
+    def __init__(self, lifetime):
+        """
+        Args:
+            lifetime (float): seconds an entry is valid for, nothing is cached if 0
+        """
+        self.lifetime = lifetime
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, kind, lfns):
+        """
+        Returns a dict of the cached results for the LFNs, and the list of those which weren't cached
+        Args:
+            kind (str): kind of lookup
+            lfns (list): the LFNs
+        """
+        found = {}
+        missing = []
+        now = time.time()
+        with self._lock:
+            for lfn in lfns:
+                entry = self._entries.get(lfn, {}).get(kind)
+                if entry is not None and entry[0] > now:
+                    found[lfn] = entry[1]
+                else:
+                    missing.append(lfn)
+        return found, missing
+
+    def put(self, kind, results):
+        """
+        Store results of a lookup
+        Args:
+            kind (str): kind of lookup
+            results (dict): result per LFN
+        """
+        if self.lifetime <= 0:
+            return
+        expires = time.time() + self.lifetime
+        with self._lock:
+            for lfn, result in results.iteritems():
+                self._entries.setdefault(lfn, {})[kind] = (expires, result)
+
+    def invalidate(self, lfns):
+        """
+        Forget everything about some LFNs
+        Args:
+            lfns (list): the LFNs
+        """
+        with self._lock:
+            for lfn in lfns:
+                self._entries.pop(lfn, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def getLFNCache():
+    """
+    Returns the LFN cache of this session
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LFNCache(getConfig('DIRAC')['LFNCacheTime'])
+    return _cache
+
+
+def invalidateLFNs(lfns):
+    """
+    Drop what is cached about LFNs whose files have changed
+    Args:
+        lfns (list, str): an LFN or a list of them
+    """
+    if isinstance(lfns, basestring):
+        lfns = [lfns]
+    getLFNCache().invalidate(lfns)
+
+
+def _lookUp(kind, lfns, cred_req):
+    """
+    Returns {'Successful': {lfn: result}, 'Failed': {lfn: reason}} for a lookup of LFNs, asking DIRAC about those which
+    aren't cached, in chunks run in parallel
+    Args:
+        kind (str): the kind of lookup, also the DIRAC command run on a chunk of LFNs
+        lfns (list): the LFNs
+        cred_req (ICredentialRequirement): credentials to use
+    """
+    cache = getLFNCache()
+    # Drop duplicates, keeping the order
+    seen = set()
+    lfns = [lfn for lfn in lfns if not (lfn in seen or seen.add(lfn))]
+    found, missing = cache.get(kind, lfns)
+    failed = {}
+    if missing:
+        chunk_size = max(getConfig('DIRAC')['LFNChunkSize'], 1)
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        outputs = [None] * len(chunks)
+        errors = []
+
+        def lookUpChunks(indices):
+            for index in indices:
+                try:
+                    outputs[index] = execute('%s(%s)' % (kind, repr(chunks[index])), cred_req=cred_req)
+                except Exception as err:
+                    errors.append(err)
+                    return
+                logger.debug("Got %s for %s of %s LFNs" % (kind, len(chunks[index]), len(missing)))
+
+        num_threads = min(len(chunks), max(getConfig('DIRAC')['ServerWorkers'], 1))
+        if num_threads == 1:
+            lookUpChunks(range(len(chunks)))
+        else:
+            threads = [threading.Thread(target=lookUpChunks, args=(range(i, len(chunks), num_threads),))
+                       for i in range(num_threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+        for output in outputs:
+            successful = output.get('Successful', {})
+            cache.put(kind, successful)
+            found.update(successful)
+            failed.update(output.get('Failed', {}))
+
+    # Hand out copies so that callers can't change what is cached
+    return {'Successful': copy.deepcopy(found), 'Failed': failed}
+
+
+def getBulkReplicas(lfns, cred_req=None, forJobs=False):
+    """
+    Returns {'Successful': {lfn: {SE: url}}, 'Failed': {lfn: reason}} for a list of LFNs
+    Args:
+        lfns (list): the LFNs
+        cred_req (ICredentialRequirement): credentials to use
+        forJobs (bool): only the replicas at SEs which jobs can use (getReplicasForJobs)
+    """
+    return _lookUp(JOB_REPLICAS if forJobs else REPLICAS, lfns, cred_req)
+
+
+def getBulkMetadata(lfns, cred_req=None):
+    """
+    Returns {'Successful': {lfn: metadata}, 'Failed': {lfn: reason}} for a list of LFNs
+    Args:
+        lfns (list): the LFNs
+        cred_req (ICredentialRequirement): credentials to use
+    """
+    return _lookUp(METADATA, lfns, cred_req)
+
+
+def resolveDiracFiles(files, metadata=False, forJobs=False):
+    """
+    Look up the replicas (and optionally the metadata) of many DiracFiles at once and store them in the files, as
+    DiracFile.getReplicas and getMetadata do for one. Returns the list of LFNs without any replica.
+    Args:
+        files (list): DiracFiles, the subfiles of those which have some are looked up instead
+        metadata (bool): also look up the metadata, to set the guid of the files
+        forJobs (bool): only the replicas at SEs which jobs can use (getReplicasForJobs)
+    """
+    all_files = []
+    for this_file in files:
+        if this_file.subfiles:
+            all_files.extend(this_file.subfiles)
+        else:
+            all_files.append(this_file)
+    all_files = [this_file for this_file in all_files if this_file.lfn]
+    if not all_files:
+        return []
+
+    cred_req = all_files[0].credential_requirements
+    lfns = [this_file.lfn for this_file in all_files]
+    replicas = getBulkReplicas(lfns, cred_req, forJobs)['Successful']
+    bad_lfns = []
+    for this_file in all_files:
+        these_replicas = replicas.get(this_file.lfn)
+        if these_replicas:
+            this_file._storedReplicas = {this_file.lfn: these_replicas}
+            this_file._updateRemoteURLs(this_file._storedReplicas)
+        elif this_file.lfn not in bad_lfns:
+            bad_lfns.append(this_file.lfn)
+
+    if metadata:
+        all_metadata = getBulkMetadata([lfn for lfn in lfns if lfn not in bad_lfns], cred_req)['Successful']
+        for this_file in all_files:
+            guid = all_metadata.get(this_file.lfn, {}).get('GUID')
+            if guid and this_file.guid != guid:
+                this_file.guid = guid
+
+    return bad_lfns
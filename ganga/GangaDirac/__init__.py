@@ -20,8 +20,17 @@ if not _after_bootstrap:
     configDirac.addOption('Timeout', 1000,
                       'Default timeout (seconds) for Dirac commands')
 
+    configDirac.addOption('ServerWorkers', 4,
+                      'Number of processes of the DIRAC server executing commands concurrently, each with a persistent connection from Ganga')
+
     configDirac.addOption('splitFilesChunks', 5000,
                       'when splitting datasets, pre split into chunks of this int')
+
+    configDirac.addOption('LFNChunkSize', 250,
+                      'Number of LFNs DIRAC is asked about at once when looking up the replicas or metadata of many files')
+
+    configDirac.addOption('LFNCacheTime', 300,
+                      'Seconds the replicas and metadata of an LFN are cached for. Set to 0 to always ask DIRAC')
     diracenv = ""
     if "GANGADIRACENVIRONMENT" in os.environ:
         diracenv = os.environ["GANGADIRACENVIRONMENT"]
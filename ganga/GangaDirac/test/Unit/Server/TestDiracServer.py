@@ -0,0 +1,207 @@
+import datetime
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+from GangaDirac.Lib.Server import DiracProtocol
+from GangaDirac.Lib.Server.DiracProtocol import dumps, loads, ProtocolError
+from GangaCore.testlib.GangaUnitTest import load_config_files, clear_config
+
+# Stand-ins for the DIRAC commands, which report their results through output() like those wrapped by diracCommand
+fake_includes = '''
+import os
+import time
+
+def echo(value):
+    output({'OK': True, 'Value': value})
+
+def whoAmI(seconds):
+    time.sleep(seconds)
+    output({'OK': True, 'Value': os.getpid()})
+
+def fail():
+    output({'OK': False, 'Message': 'failed'})
+'''
+
+
+@pytest.yield_fixture(scope='module', autouse=True)
+def config_files():
+    """
+    Load the config files in a way similar to a full Ganga session
+    """
+    load_config_files()
+    yield
+    clear_config()
+
+
+@pytest.yield_fixture(scope='module')
+def server():
+    """ A DIRAC server with two workers running the fake commands, yields its port and token """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('localhost', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    token = str(uuid.uuid4())
+    server_path = os.path.join(os.path.dirname(DiracProtocol.__file__), 'DiracProcess.py')
+    process = subprocess.Popen([sys.executable, server_path, str(port), '2'], stdin=subprocess.PIPE, preexec_fn=os.setsid)
+    process.stdin.write(token + '\n' + fake_includes)
+    process.stdin.close()
+    yield port, token
+    os.killpg(process.pid, 9)
+    process.wait()
+
+
+@pytest.yield_fixture
+def pool(server):
+    from GangaDirac.Lib.Utilities.DiracConnectionPool import DiracConnectionPool
+
+    def start_server(restart):
+        # Wait for the server to listen
+        for _ in range(50):
+            try:
+                socket.create_connection(('localhost', server[0])).close()
+                break
+            except socket.error:
+                time.sleep(0.1)
+        return server
+
+    pool = DiracConnectionPool(2, start_server)
+    yield pool
+    # A worker serves a single connection at a time
+    pool.close()
+
+
+def test_protocol_roundtrip():
+    value = {'OK': True, 'Value': [1, -2L, 3.5, float('inf'), u'\xe9', (None, False), set([1]),
+                                   datetime.datetime(2017, 3, 1, 12, 30), datetime.timedelta(seconds=3)]}
+    assert loads(dumps(value)) == value
+    # Objects which aren't plain data are sent as their repr
+    assert loads(dumps([object]))[0] == repr(object)
+
+
+def test_protocol_rejects_code():
+    for payload in ("__import__('os').system('true')", "open('/etc/passwd')", "[x for x in ()]", "().__class__"):
+        with pytest.raises(ProtocolError):
+            loads(payload)
+
+
+def test_execute(pool):
+    assert pool.execute('echo([1, "a"])', timeout=30) == {'OK': True, 'Value': [1, 'a']}
+    assert pool.execute('fail()', timeout=30) == {'OK': False, 'Message': 'failed'}
+    # Expressions which don't call output() give their value, scripts what they output()
+    assert pool.execute('1 + 1', timeout=30) == {'OK': True, 'Value': 2}
+    assert pool.execute('a = 2\noutput({"OK": True, "Value": a * 3})', timeout=30) == {'OK': True, 'Value': 6}
+    result = pool.execute('undefined()', timeout=30)
+    assert not result['OK'] and 'NameError' in result['Message']
+
+
+def test_cwd(pool, tmpdir):
+    assert pool.execute('echo(os.getcwd())', cwd=str(tmpdir), timeout=30)['Value'] == str(tmpdir)
+    scratch = pool.execute('open("left_behind", "w").close() or echo(os.getcwd())', timeout=30)['Value']
+    assert not os.path.exists(os.path.join(scratch, 'left_behind'))
+
+
+def test_concurrent(pool):
+    """Commands sent at the same time run on different workers"""
+    results = []
+
+    def run():
+        results.append(pool.execute('whoAmI(1)', timeout=30)['Value'])
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.time() - start < 1.9
+    assert len(set(results)) == 2
+
+
+def test_timeout_and_stats(pool):
+    from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+    pool.stats.reset()
+    with pytest.raises(GangaDiracError):
+        pool.execute('whoAmI(2)', timeout=0.2)
+    pool.execute('echo(1)', timeout=30)
+    pool.execute('fail()', timeout=30)
+    stats = pool.stats.summary()
+    assert stats['whoAmI']['count'] == 1 and stats['whoAmI']['errors'] == 1
+    assert stats['echo']['count'] == 1 and stats['echo']['errors'] == 0
+    assert stats['fail']['errors'] == 1
+
+
+def test_timeout_drops_connection(pool):
+    """A connection whose command timed out isn't reused, the next command runs on another worker"""
+    from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+    pool.execute('echo(0)', timeout=30)
+    with pytest.raises(GangaDiracError):
+        pool.execute('whoAmI(5)', timeout=0.5)
+    assert len(pool._connections) == 0
+    start = time.time()
+    assert pool.execute('echo(1)', timeout=30)['Value'] == 1
+    assert time.time() - start < 3
+
+
+def test_restart_fails_pending(server):
+    """The commands in flight when the server is restarted fail rather than wait for their timeout"""
+    from GangaDirac.Lib.Utilities.DiracConnectionPool import DiracConnectionPool
+    from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('localhost', 0))
+    unreachable = listener.getsockname()[1]
+    listener.close()
+    restarts = []
+    servers = [server]
+
+    def start_server(restart):
+        if restart:
+            restarts.append(True)
+            servers[0] = server
+        return servers[0]
+
+    pool = DiracConnectionPool(2, start_server)
+    failed = []
+
+    def run():
+        try:
+            pool.execute('whoAmI(3)', timeout=30)
+        except GangaDiracError:
+            failed.append(time.time())
+
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        while not pool._connections or not pool._connections[0].inFlight():
+            time.sleep(0.01)
+        # The server can't be reached anymore when the second command opens a connection
+        servers[0] = (unreachable, server[1])
+        start = time.time()
+        assert pool.execute('echo(1)', timeout=30)['Value'] == 1
+        thread.join()
+        assert restarts == [True]
+        assert len(failed) == 1 and failed[0] - start < 1
+    finally:
+        pool.close()
+
+
+def test_bad_token(server):
+    from GangaDirac.Lib.Utilities.DiracConnectionPool import DiracConnection
+    from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+    conn = DiracConnection(server[0], 'not the token')
+    try:
+        request, _ = conn.submit('echo(1)')
+    except GangaDiracError:
+        # the server may have dropped the connection already
+        pass
+    else:
+        assert request.wait(30)
+        assert request.error is not None
+    with pytest.raises(GangaDiracError):
+        conn.submit('echo(1)')
@@ -0,0 +1,113 @@
+import ast
+import re
+
+import pytest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from GangaCore.testlib.GangaUnitTest import load_config_files, clear_config
+
+
+@pytest.yield_fixture(scope='function', autouse=True)
+def config_files():
+    """
+    Load the config files in a way similar to a full Ganga session, with an empty LFN cache
+    """
+    import GangaDirac.Lib.Utilities.LFNCache as LFNCache
+    from GangaCore.Utility.Config import getConfig
+    load_config_files()
+    getConfig('DIRAC').setSessionValue('LFNChunkSize', 3)
+    LFNCache._cache = None
+    yield
+    LFNCache._cache = None
+    clear_config()
+
+
+class FakeDIRAC(object):
+    """ Answers getReplicas and getMetadata for a list of LFNs, those starting with 'bad' are unknown """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, command, cred_req=None):
+        name, args = re.match(r'(\w+)\((.*)\)$', command).groups()
+        lfns = ast.literal_eval(args)
+        self.calls.append((name, lfns))
+        good = [lfn for lfn in lfns if not lfn.startswith('bad')]
+        if name == 'getMetadata':
+            successful = dict((lfn, {'GUID': 'guid-' + lfn}) for lfn in good)
+        else:
+            successful = dict((lfn, {'SE1': 'url:' + lfn}) for lfn in good)
+        return {'Successful': successful, 'Failed': dict((lfn, 'No such file') for lfn in lfns if lfn not in good)}
+
+
+class FakeFile(object):
+    """ The parts of a DiracFile resolveDiracFiles uses """
+
+    def __init__(self, lfn, subfiles=()):
+        self.lfn = lfn
+        self.subfiles = list(subfiles)
+        self.credential_requirements = None
+        self.guid = ''
+        self.locations = []
+        self._storedReplicas = {}
+
+    def _updateRemoteURLs(self, reps):
+        self.locations = reps[self.lfn].keys()
+
+
+def test_bulk_and_cached():
+    from GangaDirac.Lib.Utilities.LFNCache import getBulkReplicas, invalidateLFNs
+    dirac = FakeDIRAC()
+    lfns = ['/lfn/%s' % i for i in range(7)]
+    with patch('GangaDirac.Lib.Utilities.LFNCache.execute', dirac):
+        result = getBulkReplicas(lfns + ['bad'])
+        assert sorted(result['Successful']) == sorted(lfns)
+        assert result['Failed'].keys() == ['bad']
+        # 8 LFNs in chunks of 3
+        assert sorted(len(call[1]) for call in dirac.calls) == [2, 3, 3]
+
+        # Only what isn't cached is asked for, failures aren't cached
+        dirac.calls = []
+        result['Successful']['/lfn/0']['SE2'] = 'changed'
+        result = getBulkReplicas(lfns[:2] + ['bad'])
+        assert dirac.calls == [('getReplicas', ['bad'])]
+        assert result['Successful']['/lfn/0'] == {'SE1': 'url:/lfn/0'}
+
+        # The replicas for jobs are a different lookup
+        dirac.calls = []
+        getBulkReplicas(lfns[:1], forJobs=True)
+        assert dirac.calls == [('getReplicasForJobs', ['/lfn/0'])]
+
+        dirac.calls = []
+        invalidateLFNs('/lfn/1')
+        getBulkReplicas(lfns[:2])
+        assert dirac.calls == [('getReplicas', ['/lfn/1'])]
+
+
+def test_no_cache():
+    from GangaCore.Utility.Config import getConfig
+    from GangaDirac.Lib.Utilities.LFNCache import getBulkMetadata
+    getConfig('DIRAC').setSessionValue('LFNCacheTime', 0)
+    dirac = FakeDIRAC()
+    with patch('GangaDirac.Lib.Utilities.LFNCache.execute', dirac):
+        assert getBulkMetadata(['a'])['Successful'] == {'a': {'GUID': 'guid-a'}}
+        getBulkMetadata(['a'])
+    assert len(dirac.calls) == 2
+
+
+def test_resolveDiracFiles():
+    from GangaDirac.Lib.Utilities.LFNCache import resolveDiracFiles
+    dirac = FakeDIRAC()
+    files = [FakeFile('a'), FakeFile('bad1'), FakeFile('', [FakeFile('b'), FakeFile('c')]), FakeFile('a')]
+    with patch('GangaDirac.Lib.Utilities.LFNCache.execute', dirac):
+        assert resolveDiracFiles(files, metadata=True) == ['bad1']
+    # a once, in two chunks, then the metadata of those with replicas
+    assert sorted(call[0] for call in dirac.calls) == ['getMetadata', 'getReplicas', 'getReplicas']
+    assert files[0].locations == ['SE1'] and files[0].guid == 'guid-a'
+    assert files[0]._storedReplicas == {'a': {'SE1': 'url:a'}}
+    assert files[1].locations == [] and files[1].guid == ''
+    assert [f.guid for f in files[2].subfiles] == ['guid-b', 'guid-c']
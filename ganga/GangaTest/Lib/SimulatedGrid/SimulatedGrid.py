@@ -0,0 +1,98 @@
+import os
+import threading
+
+from GangaCore.GPIDev.Adapters.ApplicationRuntimeHandlers import allHandlers
+from GangaCore.GPIDev.Adapters.IBackend import IBackend
+from GangaCore.GPIDev.Lib.File import FileBuffer
+from GangaCore.GPIDev.Schema import Schema, Version, SimpleItem
+from GangaCore.Lib.Executable.Executable import RTHandler
+from GangaCore.Utility.Config import getConfig
+from GangaCore.Utility.logging import getLogger
+
+logger = getLogger()
+
+monconf = getConfig('PollThread')
+monconf.addOption('SimulatedGrid', 1, 'poll rate for the simulated grid backend')
+
+
+class SimulatedGrid(IBackend):
+
+    """
+    LCG-like backend whose jobs are submitted to, monitored and cancelled through the GridSimulator, with the delays
+    and failure rates of the [GridSimulator] configuration. Used to load test ganga without a grid.
+    """
+
+    _schema = Schema(Version(1, 0), {
+        'id': SimpleItem(defvalue='', protected=1, copyable=0, doc='Simulated grid job id'),
+        'status': SimpleItem(defvalue='', protected=1, copyable=0, doc='Simulated grid job status'),
+        'exitcode': SimpleItem(defvalue=None, typelist=[int, None], protected=1, copyable=0, doc='Simulated exit code'),
+    })
+    _category = 'backends'
+    _name = 'SimulatedGrid'
+
+    # One simulator, whose data files are in the gangadir, for all the jobs of the session
+    _simulator = None
+    # The data files of the simulator can't be used from several threads at once, like the middleware of a single UI
+    _simulator_lock = threading.RLock()
+
+    @classmethod
+    def simulator(cls):
+        """ Returns the GridSimulator of the session """
+        with cls._simulator_lock:
+            if cls._simulator is None:
+                from GangaCore.Lib.LCG.GridSimulator import GridSimulator
+                from GangaCore.Utility.files import expandfilename
+                basedir = os.path.join(expandfilename(getConfig('Configuration')['gangadir']), 'simulator')
+                if not os.path.isdir(basedir):
+                    os.makedirs(basedir)
+                cls._simulator = GridSimulator(basedir)
+            return cls._simulator
+
+    def submit(self, jobconfig, master_input_sandbox):
+        """
+        Write the JDL of the job into its input workspace and submit it to the simulator
+        Args:
+            jobconfig (StandardJobConfig): configuration of the job
+            master_input_sandbox (list): files of the master job sandbox
+        """
+        job = self.getJobObject()
+        jdl = {'Type': 'Job',
+               'Executable': jobconfig.getExeString(),
+               'Arguments': jobconfig.getArgStrings()}
+        jdlpath = job.getInputWorkspace().writefile(FileBuffer('__jdlfile__', self.simulator().expandjdl(jdl)))
+        with self._simulator_lock:
+            jobid = self.simulator().submit(jdlpath)
+        if not jobid:
+            return False
+        self.id = jobid
+        self.status = 'Submitted'
+        return True
+
+    def kill(self):
+        with self._simulator_lock:
+            return self.simulator().cancel(self.id)
+
+    @staticmethod
+    def updateMonitoringInformation(jobs):
+        jobs = [j for j in jobs if j.backend.id]
+        with SimulatedGrid._simulator_lock:
+            infos = SimulatedGrid.simulator().status([j.backend.id for j in jobs])
+
+        for j, info in zip(jobs, infos):
+            if info['status'] is None:
+                if j.status == 'submitted':
+                    j.backend.status = 'Running'
+                    j.updateStatus('running')
+                continue
+
+            j.backend.status = info['status']
+            j.backend.exitcode = info['exit']
+            if info['status'] == 'Done (Success)':
+                with SimulatedGrid._simulator_lock:
+                    SimulatedGrid.simulator().get_output(j.backend.id, j.getOutputWorkspace().getPath())
+                j.updateStatus('completed')
+            else:
+                j.updateStatus('failed')
+
+
+allHandlers.add('Executable', 'SimulatedGrid', RTHandler)
@@ -4,4 +4,5 @@ import TestSubmitter.TestSubmitter
 import TestSubmitter.TestSplitter
 import TestApplication.TestApplication
 import GListApp.GListApp
-import TFile.TFile
\ No newline at end of file
+import TFile.TFile
+import SimulatedGrid.SimulatedGrid
\ No newline at end of file
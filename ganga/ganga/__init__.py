@@ -39,7 +39,8 @@ setProxyInterface(ganga)
 logger.debug("Import plugins")
 try:
     # load Ganga system plugins...
-    from GangaCore.Runtime import plugins
+    from GangaCore.Runtime.plugins import loadSystemPlugins
+    loadSystemPlugins()
 except Exception as x:
     logger.critical('Ganga system plugins could not be loaded due to the following reason: %s', x)
     logger.exception(x)